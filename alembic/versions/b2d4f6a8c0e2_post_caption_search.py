@@ -0,0 +1,49 @@
+"""post caption search
+
+Revision ID: b2d4f6a8c0e2
+Revises: a1c3e5f7b9d1
+Create Date: 2026-10-18 11:32:40.905117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d4f6a8c0e2'
+down_revision: Union[str, None] = 'a1c3e5f7b9d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def trigram_available() -> bool:
+    """pg_trgm is optional, only create trigram index when the extension can be installed"""
+    return op.get_bind().execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    ).first() is not None
+
+
+def upgrade() -> None:
+    op.add_column('post', sa.Column(
+        'caption_search',
+        postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('english'::regconfig, coalesce(caption, ''))", persisted=True),
+        nullable=True,
+    ))
+    op.create_index('ix_post_caption_search', 'post', ['caption_search'], unique=False, postgresql_using='gin')
+    if trigram_available():
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.create_index(
+            'ix_post_caption_trgm', 'post', ['caption'], unique=False,
+            postgresql_using='gin', postgresql_ops={'caption': 'gin_trgm_ops'},
+        )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_post_caption_trgm")
+    op.drop_index('ix_post_caption_search', table_name='post', postgresql_using='gin')
+    op.drop_column('post', 'caption_search')
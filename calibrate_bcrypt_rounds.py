@@ -0,0 +1,11 @@
+import sys
+
+from src.infrastructure.auth_service.services import calibrate_bcrypt_rounds
+from src.setup.config.settings import settings
+
+# usage: python calibrate_bcrypt_rounds.py [target verify ms], set the result as PASSWORD_BCRYPT_ROUNDS
+target_ms = float(sys.argv[1]) if len(sys.argv) > 1 else settings.PASSWORD_VERIFY_TARGET_MS
+rounds, timings = calibrate_bcrypt_rounds(target_ms=target_ms)
+for cost, duration in timings:
+    print(f"rounds {cost}: {duration:.1f} ms")
+print(f"PASSWORD_BCRYPT_ROUNDS={rounds}")
@@ -19,6 +19,13 @@ class StatusType(str, Enum):
     APPROVED = "approved"
     REJECTED = "rejected"
 
+class BulkFollowResult(str, Enum):
+    """enum for result of each username of bulk follow operations"""
+    APPLIED = "applied"
+    # no follow request or follow with the required status
+    SKIPPED = "skipped"
+    USER_NOT_FOUND = "user_not_found"
+
 class FilterDates(str, Enum):
     """enum for filtering by dates"""
     THIS_MONTH = "this-month"
@@ -56,6 +63,26 @@ class PriceModel(int, Enum):
     MONTHLY = 100
     DAILY = 20
 
+class PaginationType(str, Enum):
+    """enum for selecting pagination type: page number or keyset cursor"""
+    PAGE = "page"
+    CURSOR = "cursor"
+
+class ImageFormat(str, Enum):
+    """enum for selecting format of resized image variants"""
+    WEBP = "webp"
+    JPEG = "jpeg"
+
+class ExportFormat(str, Enum):
+    """enum for selecting format of streamed exports"""
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+class StorageBackend(str, Enum):
+    """enum for selecting where media files are stored"""
+    S3 = "s3"
+    LOCAL = "local"
+
 class Environment(str, Enum):
     """enum for selecting environment"""
     DEVELOPMENT = "development"
@@ -9,6 +9,8 @@ from starlette.status import (
     HTTP_403_FORBIDDEN,
     HTTP_422_UNPROCESSABLE_ENTITY,
     HTTP_409_CONFLICT,
+    HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    HTTP_503_SERVICE_UNAVAILABLE,
 )
 from fastapi import Request, Response
 from fastapi.responses import JSONResponse
@@ -75,6 +77,22 @@ class CustomUniqueConstraintError(CustomException):
         super().__init__(status_code, detail)
 
 
+class PayloadTooLargeException(CustomException):
+    """raise payload too large exception"""
+
+    def __init__(self, detail: Optional[str] = None) -> None:
+        status_code = HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        super().__init__(status_code, detail)
+
+
+class ServiceUnavailableException(CustomException):
+    """raise service unavailable exception"""
+
+    def __init__(self, detail: Optional[str] = None) -> None:
+        status_code = HTTP_503_SERVICE_UNAVAILABLE
+        super().__init__(status_code, detail)
+
+
 def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded) -> Response:
     """
     Build a simple JSON response that includes the details of the rate limit
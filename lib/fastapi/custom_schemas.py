@@ -1,6 +1,8 @@
-from typing import Optional, List
+from typing import Optional, List, Generic, TypeVar
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+T = TypeVar("T")
 
 
 class BaseResponseSchema(BaseModel):
@@ -15,3 +17,41 @@ class BaseResponseNoDataSchema(BaseModel):
 
     data: List = []
     success: Optional[bool] = True
+
+
+class CursorPage(BaseModel, Generic[T]):
+    """keyset paginated page: pass next_cursor back as cursor to fetch the next page"""
+
+    items: List[T]
+    size: int
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+
+class UploadFileSchema(BaseModel):
+    """file to be uploaded directly to storage"""
+
+    filename: str
+    content_type: str
+    size: int = Field(gt=0)
+
+
+class DirectUploadSchema(BaseModel):
+    """
+    where to upload a file directly to storage, either a presigned POST form (url and fields)
+    or a multipart upload with one presigned PUT url per part of part_size bytes
+    """
+
+    object_key: str
+    url: Optional[str] = None
+    fields: Optional[dict] = None
+    upload_id: Optional[str] = None
+    part_size: Optional[int] = None
+    part_urls: Optional[List[str]] = None
+
+
+class UploadedFileSchema(BaseModel):
+    """file uploaded directly to storage, upload_id of multipart uploads to complete them"""
+
+    object_key: str
+    upload_id: Optional[str] = None
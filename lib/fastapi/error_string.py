@@ -57,6 +57,38 @@ def get_invalid_file_type(valid_types: List[str]):
     return f"Invalid File Type. Accepted valid types: {valid_types}"
 
 
+def get_file_too_large(max_size: int) -> str:
+    return f"File too large. Maximum allowed size: {max_size} bytes"
+
+
+def get_invalid_content_length() -> str:
+    return "Invalid Content-Length header! It must be a non-negative number of bytes."
+
+
+def get_upload_not_found(object_key: str) -> str:
+    return f"Uploaded file not found: {object_key}"
+
+
+def get_invalid_object_key() -> str:
+    return "Invalid object key! Use the object keys returned while starting the upload."
+
+
+def get_storage_file_not_found(object_key: str) -> str:
+    return f"File not found: {object_key}"
+
+
+def get_invalid_storage_signature() -> str:
+    return "Invalid or expired storage url signature!"
+
+
+def get_post_created() -> str:
+    return "Post already created!"
+
+
+def get_invalid_image() -> str:
+    return "Invalid image! Image could not be read."
+
+
 def get_user_created() -> str:
     return "User already created! Do you want to update?"
 
@@ -137,3 +169,19 @@ def get_transaction_not_created() -> str:
 
 def get_user_not_subscribed() -> str:
     return "Please subscribe to access this url!"
+
+
+def get_invalid_cursor() -> str:
+    return "Invalid cursor value! Use next_cursor from the previous page."
+
+
+def get_fuzzy_search_disabled() -> str:
+    return "Fuzzy search is not enabled! Search without fuzzy to use full text search."
+
+
+def get_bulk_follow_usernames_required() -> str:
+    return "Send usernames or set all_pending to true!"
+
+
+def get_password_hash_pool_busy() -> str:
+    return "Too many login requests right now! Please try again in a moment."
@@ -1,7 +1,13 @@
+import csv
+import io
+import json
 import pytz
 import random
 import uuid
-from typing import List
+import base64
+import binascii
+from enum import Enum
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
 import re
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
@@ -13,13 +19,21 @@ from starlette.status import HTTP_422_UNPROCESSABLE_ENTITY
 from fastapi.exceptions import RequestValidationError
 # from fastapi.security import HTTPAuthorizationCredentials
 
-from lib.fastapi.custom_enums import Role, FilterDates, SubscriptionInterval, PriceModel
-from lib.fastapi.custom_exceptions import CustomValidationError, ForbiddenException
+from lib.fastapi.custom_enums import Role, FilterDates, SubscriptionInterval, PriceModel, ExportFormat
+from lib.fastapi.custom_exceptions import (
+    BadRequestException,
+    CustomValidationError,
+    ForbiddenException,
+    PayloadTooLargeException,
+)
 from lib.fastapi.error_string import (
     get_incorrect_id,
     get_no_permission,
     get_invalid_file_type,
+    get_file_too_large,
+    get_invalid_content_length,
     get_admin_not_allowed,
+    get_invalid_cursor,
 )
 from src.setup.config.settings import settings
 
@@ -52,6 +66,10 @@ def get_valid_image_formats_list() -> List[str]:
     return ["image/jpeg", "image/png", "image/heic", "image/jpg"]
 
 
+def get_valid_video_formats_list() -> List[str]:
+    return ["video/mp4", "video/mpeg"]
+
+
 def get_valid_post_formats_list() -> List[str]:
     return [
         "image/jpeg",
@@ -87,6 +105,30 @@ def check_file_type(content_type: str, valid_types: List) -> None:
         raise CustomValidationError(get_invalid_file_type(valid_types=valid_types))
 
 
+def check_file_size(size: Optional[int | str], max_size: int) -> None:
+    """
+    reject file larger than max_size, unknown size is checked while uploading,
+    size taken from a malformed Content-Length header is rejected with 400
+    """
+    if size is None:
+        return None
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise BadRequestException(get_invalid_content_length())
+    if size < 0:
+        raise BadRequestException(get_invalid_content_length())
+    if size > max_size:
+        raise PayloadTooLargeException(get_file_too_large(max_size=max_size))
+
+
+def get_max_upload_size(content_type: str) -> int:
+    """get maximum upload size for file type"""
+    if content_type in get_valid_video_formats_list():
+        return settings.VIDEO_MAX_UPLOAD_SIZE
+    return settings.IMAGE_MAX_UPLOAD_SIZE
+
+
 def get_after_date_from_enum(value: FilterDates) -> datetime:
     """get date value from today based on enum"""
     today = datetime.now(tz=get_default_timezone())
@@ -150,6 +192,86 @@ def get_random_values_from_list(var_list: List, count: int) -> List:
     return random.choices(population=var_list, k=count)
 
 
+def encode_cursor(created_at: datetime, id: uuid.UUID) -> str:
+    """encode (created_at, id) keyset position into an opaque url safe cursor"""
+    value = f"{created_at.isoformat()}|{id}"
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """decode opaque cursor back into (created_at, id) keyset position"""
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        value = base64.urlsafe_b64decode(f"{cursor}{padding}".encode()).decode()
+        created_at, id = value.split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise CustomValidationError(get_invalid_cursor())
+
+
+def get_cursor_page(rows: Sequence, size: int) -> dict:
+    """
+    build keyset page from rows fetched with one extra row past size
+    `Returns`
+        [dict]:
+            items, size and next_cursor (None on last page)
+    """
+    items = rows[:size]
+    next_cursor = None
+    if len(rows) > size:
+        next_cursor = encode_cursor(created_at=items[-1].created_at, id=items[-1].id)
+    return dict(items=items, size=size, next_cursor=next_cursor)
+
+
+def get_export_value(value):
+    """json and csv friendly value of a database column"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def get_export_media_type(export_format: ExportFormat) -> str:
+    """content type of streamed export"""
+    if export_format == ExportFormat.CSV:
+        return "text/csv"
+    return "application/x-ndjson"
+
+
+def iter_export_chunks(
+    rows: Iterable[Sequence],
+    fields: Sequence[str],
+    export_format: ExportFormat,
+    chunk_size: int,
+) -> Iterator[str]:
+    """
+    serialize rows as ndjson lines or csv with a header row,
+    rows are consumed lazily and written in chunks of chunk_size rows so memory use does not grow with the rows
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format == ExportFormat.CSV:
+        writer.writerow(fields)
+    buffered = 0
+    for row in rows:
+        values = [get_export_value(value) for value in row]
+        if export_format == ExportFormat.CSV:
+            writer.writerow(values)
+        else:
+            buffer.write(json.dumps(dict(zip(fields, values))) + "\n")
+        buffered += 1
+        if buffered >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            buffered = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
 def get_price(subscription: SubscriptionInterval) -> int:
     """get price based on interval"""
     if subscription == SubscriptionInterval.DAILY:
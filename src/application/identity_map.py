@@ -0,0 +1,92 @@
+import threading
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+from sqlalchemy import inspect
+from sqlalchemy.orm.exc import ObjectDeletedError
+from sqlmodel import Session, SQLModel
+
+ModelType = TypeVar("ModelType", bound=SQLModel)
+
+# fields rows are looked up by, a row is registered under all of them once loaded
+LOOKUP_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "User": ("id", "username", "base_user_id"),
+    "BaseUser": ("id",),
+    "Post": ("id",),
+}
+
+
+class IdentityMap:
+    """
+    lookup cache of rows for one session, a session lives for one request (see get_session)
+    so repeated lookups by id, username or base_user_id in a request are served from memory
+    """
+
+    _lock = threading.Lock()
+    # lookups served from memory by all identity maps of the process, for debugging
+    total_saved = 0
+
+    def __init__(self) -> None:
+        self.saved = 0
+        self._rows: Dict[Tuple[str, str, str], SQLModel] = {}
+
+    @classmethod
+    def for_session(cls, session: Session) -> "IdentityMap":
+        """get identity map stored in session info, created on first use"""
+        identity_map = session.info.get("identity_map")
+        if identity_map is None:
+            identity_map = session.info["identity_map"] = cls()
+        return identity_map
+
+    @classmethod
+    def get_total_saved(cls) -> int:
+        """number of database lookups saved since process start"""
+        return cls.total_saved
+
+    @staticmethod
+    def _is_current(row: SQLModel, field: str, value: str) -> bool:
+        """row is still in the session and its field still has the value, expired fields are refreshed first"""
+        state = inspect(row)
+        if state.deleted or state.was_deleted or state.detached:
+            return False
+        try:
+            return str(getattr(row, field)) == value
+        except ObjectDeletedError:
+            return False
+
+    def get(
+        self,
+        model: type[ModelType],
+        field: str,
+        value,
+        loader: Callable[[], Optional[ModelType]],
+    ) -> Optional[ModelType]:
+        """get row by field value from memory, rows not seen in the session yet are loaded with loader"""
+        key = (model.__name__, field, str(value))
+        row = self._rows.get(key)
+        if row is not None:
+            # expired rows (e.g. after a commit) are refreshed with a query, only loaded rows save one
+            loaded = field not in inspect(row).unloaded
+            if self._is_current(row=row, field=field, value=key[2]):
+                if loaded:
+                    self.saved += 1
+                    with self._lock:
+                        IdentityMap.total_saved += 1
+                return row
+        self._rows.pop(key, None)
+        row = loader()
+        if row is not None:
+            self.add(row=row)
+        return row
+
+    def add(self, row: SQLModel) -> None:
+        """register row under all its lookup fields"""
+        model_name = type(row).__name__
+        for field in LOOKUP_FIELDS.get(model_name, ("id",)):
+            value = getattr(row, field, None)
+            if value is not None:
+                self._rows[(model_name, field, str(value))] = row
+
+    def discard(self, row: SQLModel) -> None:
+        """forget row before it is updated or deleted"""
+        for key in [key for key, cached in self._rows.items() if cached is row]:
+            del self._rows[key]
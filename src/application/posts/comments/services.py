@@ -10,6 +10,8 @@ from src.application.posts.services import PostAppService
 from lib.fastapi.custom_exceptions import NotFoundException
 from lib.fastapi.error_string import get_post_not_found
 from src.application.users.users.services import UserAppService
+from lib.fastapi.utils import get_cursor_page, decode_cursor
+from lib.fastapi.custom_enums import Role
 
 
 class CommentAppService:
@@ -23,6 +25,20 @@ class CommentAppService:
         """get comment by comment id"""
         return self.comment_service.get_comment_by_id(id=comment_id)
 
+    def get_comments_by_post_id(
+        self, current_user: dict, post_id: uuid.UUID, size: int, cursor: Optional[str]
+    ) -> dict:
+        """get page of comments on post with commenter's username using keyset cursor"""
+        PostAppService(session=self.db_session).get_post_for_user_access(
+            current_user=current_user, post_id=post_id
+        )
+        comments = self.comment_service.get_comments_by_post_id_after_cursor(
+            post_id=post_id,
+            size=size,
+            cursor=decode_cursor(cursor=cursor) if cursor else None,
+        )
+        return get_cursor_page(rows=comments, size=size)
+
     def comment_post(self, comment: CommentPost) -> Optional[Comments]:
         """comment on post for post_id"""
         post_app_service = PostAppService(session=self.db_session)
@@ -31,13 +47,10 @@ class CommentAppService:
             # return None
             raise NotFoundException(get_post_not_found())
         user_app_service = UserAppService(session=self.db_session)
-        commented_by = user_app_service.get_user_by_id(id=comment.commented_by)
         posted_by = user_app_service.get_user_by_id(id=post.posted_by)
+        # only users (never admins) comment, commenter is checked by user id without loading its row
         user_app_service.check_private_user(
-            current_user={
-                "id": str(commented_by.base_user_id),
-                "role": commented_by.base_user.role,
-            },
+            current_user={"role": Role.USER.value, "user_id": str(comment.commented_by)},
             user=posted_by,
         )
         return self.comment_service.create(comment=comment)
@@ -1,3 +1,4 @@
+import uuid
 from typing import Optional
 
 from sqlmodel import Session
@@ -7,6 +8,8 @@ from src.domain.posts.likes.services import LikeService
 from src.domain.models import Likes
 from src.application.posts.services import PostAppService
 from src.application.users.users.services import UserAppService
+from lib.fastapi.utils import get_cursor_page, decode_cursor
+from lib.fastapi.custom_enums import Role
 
 
 class LikeAppService:
@@ -24,6 +27,20 @@ class LikeAppService:
             post_id=like.post_id, liked_by=like.liked_by
         )
 
+    def get_likes_by_post_id(
+        self, current_user: dict, post_id: uuid.UUID, size: int, cursor: Optional[str]
+    ) -> dict:
+        """get page of likes on post with liker's username using keyset cursor"""
+        PostAppService(session=self.db_session).get_post_for_user_access(
+            current_user=current_user, post_id=post_id
+        )
+        likes = self.like_service.get_likes_by_post_id_after_cursor(
+            post_id=post_id,
+            size=size,
+            cursor=decode_cursor(cursor=cursor) if cursor else None,
+        )
+        return get_cursor_page(rows=likes, size=size)
+
     def like_post(self, like: LikePost) -> Optional[Likes]:
         """like post for post_id"""
         post_app_service = PostAppService(session=self.db_session)
@@ -32,13 +49,10 @@ class LikeAppService:
         if not post:
             return None
         user_app_service = UserAppService(session=self.db_session)
-        liked_by = user_app_service.get_user_by_id(id=like.liked_by)
         posted_by = user_app_service.get_user_by_id(id=post.posted_by)
+        # only users (never admins) like posts, liker is checked by user id without loading its row
         user_app_service.check_private_user(
-            current_user={
-                "id": str(liked_by.base_user_id),
-                "role": liked_by.base_user.role,
-            },
+            current_user={"role": Role.USER.value, "user_id": str(like.liked_by)},
             user=posted_by,
         )
         return self.like_service.create(like=like)
@@ -1,11 +1,43 @@
+import io
+import math
+import hashlib
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Iterable, List, Optional, Set, Tuple
+
 from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session
 
-from src.infrastructure.file_upload.services import Boto3Service
-from src.domain.models import Media
-from src.domain.posts.media.services import MediaService
+from src.infrastructure.file_upload.services import get_storage_service
+from src.infrastructure.image_processing.services import ImageService
+from src.setup.config.settings import settings
+from lib.fastapi.custom_enums import ImageFormat
+from lib.fastapi.custom_exceptions import CustomException, BadRequestException, CustomValidationError
+from lib.fastapi.custom_schemas import UploadFileSchema, DirectUploadSchema, UploadedFileSchema
+from lib.fastapi.error_string import get_upload_not_found
+from lib.fastapi.utils import (
+    check_file_type,
+    check_file_size,
+    get_max_upload_size,
+    get_valid_image_formats_list,
+    get_valid_video_formats_list,
+)
+from src.domain.models import Media, User
+from src.domain.posts.media.services import MediaService, MediaBlobService, PendingDeletionService
+from src.domain.posts.services import PostService
+from src.domain.users.users.services import UserService
 from src.interface.posts.media.schemas import MediaSchema
 
+# content addressed media objects, see MediaAppService.upload_media
+BLOB_OBJECT_KEY_PREFIX = "media/"
+
+# shared by all requests so concurrent uploads per process stay bounded
+media_upload_executor = ThreadPoolExecutor(
+    max_workers=settings.MEDIA_UPLOAD_WORKERS, thread_name_prefix="media-upload"
+)
+
 
 class MediaAppService:
     """handle media application services"""
@@ -13,18 +45,549 @@ class MediaAppService:
     def __init__(self, session: Session):
         self.db_session = session
         self.media_service = MediaService(session=self.db_session)
+        # released blobs already queued for deletion with their release
+        self.queued_object_keys: Set[str] = set()
 
     def create_media(self, media: MediaSchema) -> Media:
         """create media"""
-        return self.media_service.create_media(media=media)
+        db_media = self.media_service.create_media(media=media)
+        self.schedule_media_variants(media=[db_media])
+        return db_media
+
+    def create_all_media(self, media: List[MediaSchema]) -> List[Media]:
+        """create all media of a post at once"""
+        db_media = self.media_service.create_all_media(media=media)
+        self.schedule_media_variants(media=db_media)
+        return db_media
+
+    @staticmethod
+    def schedule_media_variants(media: List[Media]) -> None:
+        """queue creating resized variants of image media"""
+        from src.application.posts.tasks import create_media_variants
+
+        for db_media in media:
+            if db_media.media_type not in get_valid_image_formats_list():
+                continue
+            try:
+                create_media_variants.delay(media_id=str(db_media.id))
+            except Exception:
+                # variants are optional, the original is served until they exist
+                pass
+
+    @staticmethod
+    def get_variant_object_key(object_key: str, width: int, image_format: ImageFormat) -> str:
+        """create object key of resized variant next to the original"""
+        return f"{object_key.rsplit('.', 1)[0]}_w{width}.{image_format.value}"
+
+    def store_stripped_original(self, db_media: Media, content: bytes) -> Media:
+        """
+        replace original of media by its copy without metadata, content addressed originals
+        are not overwritten since their object key is the hash of their content, the copy is
+        stored as a blob of its own and the media moves its reference to it
+        """
+        storage_service = get_storage_service()
+        if not db_media.media_url.startswith(BLOB_OBJECT_KEY_PREFIX):
+            storage_service.upload_file_from_memory(
+                object_key=db_media.media_url,
+                file_content=io.BytesIO(content),
+                file_type=db_media.media_type,
+            )
+            return db_media
+        sha256 = hashlib.sha256(content).hexdigest()
+        object_key = self.get_blob_object_key(sha256=sha256)
+        blob_service = MediaBlobService(session=self.db_session)
+        if not blob_service.acquire(sha256=sha256):
+            # a released blob may still be waiting for deletion, cancel it before uploading again
+            pending_deletion_service = PendingDeletionService(session=self.db_session)
+            pending_deletion_service.delete_all(object_keys=[object_key])
+            pending_deletion_service.commit()
+            storage_service.upload_file_from_memory(
+                object_key=object_key,
+                file_content=io.BytesIO(content),
+                file_type=db_media.media_type,
+            )
+            blob_service.create_or_acquire(
+                sha256=sha256,
+                object_key=object_key,
+                size=len(content),
+                content_type=db_media.media_type,
+            )
+        previous_object_key = db_media.media_url
+        db_media = self.media_service.update_media_url(db_media=db_media, media_url=object_key)
+        self.delete_media_object(object_key=previous_object_key)
+        return db_media
+
+    def create_media_variants(self, media_id: uuid.UUID) -> Optional[Media]:
+        """
+        create resized variants and placeholder of image media, the original is replaced
+        by a copy without metadata (EXIF) if it has any
+        """
+        db_media = self.media_service.get_media_by_id(id=media_id)
+        if (
+            not db_media
+            or db_media.variants is not None
+            or db_media.media_type not in get_valid_image_formats_list()
+        ):
+            return db_media
+        processed = self.media_service.get_processed_media_by_media_url(
+            media_url=db_media.media_url
+        )
+        if processed:
+            # same content addressed blob, variants are shared as well
+            return self.media_service.update_variants(
+                db_media=db_media, variants=processed.variants, placeholder=processed.placeholder
+            )
+        storage_service = get_storage_service()
+        buffer = io.BytesIO()
+        storage_service.download_file_into_memory(object_key=db_media.media_url, buffer=buffer)
+        try:
+            image = ImageService(content=buffer.getvalue())
+        except CustomValidationError:
+            # unreadable (e.g. heic), only the original is served
+            return self.media_service.update_variants(
+                db_media=db_media, variants=[], placeholder=None
+            )
+        stripped = image.get_stripped_original()
+        if stripped:
+            db_media = self.store_stripped_original(db_media=db_media, content=stripped)
+        variants = []
+        for width in sorted(set(settings.IMAGE_VARIANT_WIDTHS)):
+            if width >= image.width:
+                break
+            for image_format in settings.IMAGE_VARIANT_FORMATS:
+                image_format = ImageFormat(image_format)
+                variant_width, variant_height, content = image.create_variant(
+                    width=width, image_format=image_format
+                )
+                object_key = self.get_variant_object_key(
+                    object_key=db_media.media_url, width=width, image_format=image_format
+                )
+                storage_service.upload_file_from_memory(
+                    object_key=object_key,
+                    file_content=io.BytesIO(content),
+                    file_type=f"image/{image_format.value}",
+                )
+                variants.append(
+                    dict(
+                        width=variant_width,
+                        height=variant_height,
+                        format=image_format.value,
+                        object_key=object_key,
+                        size=len(content),
+                    )
+                )
+        return self.media_service.update_variants(
+            db_media=db_media, variants=variants, placeholder=image.create_placeholder()
+        )
+
+    @staticmethod
+    def get_blob_object_key(sha256: str) -> str:
+        """create object key of content addressed blob"""
+        return f"{BLOB_OBJECT_KEY_PREFIX}{sha256[:2]}/{sha256}"
+
+    @staticmethod
+    def get_content_hash(file: UploadFile) -> Tuple[str, int]:
+        """
+        get sha256 hex digest and size of uploaded file, the file is rewound for uploading
+
+        Returns:
+            Tuple[str, int]: sha256 hex digest and size in bytes
+        """
+        content_hash = hashlib.sha256()
+        size = 0
+        file.file.seek(0)
+        for chunk in iter(lambda: file.file.read(1024 * 1024), b""):
+            content_hash.update(chunk)
+            size += len(chunk)
+        file.file.seek(0)
+        return content_hash.hexdigest(), size
+
+    def upload_media(self, files: List[Tuple[UploadFile, str]]) -> List[str]:
+        """
+        upload (file, object_key) pairs and get object key of each file,
+        with MEDIA_CONTENT_ADDRESSED files are stored once per content under their hash
+        and content already stored is not uploaded again
+        """
+        if not settings.MEDIA_CONTENT_ADDRESSED:
+            self.handle_media_uploads(files=files)
+            return [object_key for _, object_key in files]
+        blob_service = MediaBlobService(session=self.db_session)
+        object_keys = []
+        acquired = []
+        uploads = {}
+        try:
+            for file, _ in files:
+                sha256, size = self.get_content_hash(file=file)
+                object_key = self.get_blob_object_key(sha256=sha256)
+                object_keys.append(object_key)
+                if object_key in uploads:
+                    uploads[object_key][1].append(size)
+                elif blob_service.acquire(sha256=sha256):
+                    acquired.append(object_key)
+                else:
+                    uploads[object_key] = (file, [size], sha256)
+            # a released blob may still be waiting for deletion, cancel it before uploading again
+            pending_deletion_service = PendingDeletionService(session=self.db_session)
+            pending_deletion_service.delete_all(object_keys=list(uploads))
+            pending_deletion_service.commit()
+            self.handle_media_uploads(
+                files=[(file, object_key) for object_key, (file, _, _) in uploads.items()]
+            )
+            for object_key, (file, sizes, sha256) in uploads.items():
+                # one reference per media using the blob
+                for size in sizes:
+                    blob_service.create_or_acquire(
+                        sha256=sha256,
+                        object_key=object_key,
+                        size=size,
+                        content_type=file.content_type,
+                    )
+                    acquired.append(object_key)
+        except Exception:
+            self.db_session.rollback()
+            for object_key in acquired:
+                self.delete_media_object(object_key=object_key)
+            raise
+        return object_keys
+
+    def release_media_object(self, object_key: str) -> bool:
+        """
+        release reference to content addressed blob
+
+        Returns:
+            bool: whether the object is no longer used and can be deleted
+        """
+        if object_key.startswith(BLOB_OBJECT_KEY_PREFIX):
+            ref_count = MediaBlobService(session=self.db_session).release(object_key=object_key)
+            if ref_count is not None and ref_count > 0:
+                return False
+            if ref_count is not None:
+                self.queued_object_keys.add(object_key)
+        return True
+
+    def release_media(self, media: Iterable[Media]) -> List[str]:
+        """release media objects and get object keys (with variants) that can be deleted"""
+        object_keys = []
+        for db_media in media:
+            if self.release_media_object(object_key=db_media.media_url):
+                object_keys.append(db_media.media_url)
+                object_keys.extend(variant["object_key"] for variant in db_media.variants or [])
+        return object_keys
+
+    def release_user_media(self, user: User) -> List[str]:
+        """release media of all posts and profile of user and get object keys that can be deleted"""
+        object_keys = self.release_media(media=self.media_service.get_media_by_user_id(user_id=user.id))
+        if user.profile and self.release_media_object(object_key=user.profile):
+            object_keys.append(user.profile)
+        return object_keys
+
+    def schedule_deletion(self, object_keys: List[str]) -> None:
+        """record objects to delete from storage and queue the deletion worker"""
+        from src.application.posts.tasks import drain_pending_deletions
+
+        if not object_keys:
+            return None
+        # queuing released blobs again could delete the same content uploaded again since the release
+        PendingDeletionService(session=self.db_session).add_all(
+            object_keys=[
+                object_key for object_key in object_keys if object_key not in self.queued_object_keys
+            ]
+        )
+        try:
+            drain_pending_deletions.delay()
+        except Exception:
+            # drained by the periodic task
+            pass
+
+    def delete_media_object(self, object_key: str) -> bool:
+        """
+        schedule deletion of media object, content addressed blobs are deleted
+        only when no other media or profile references them
+
+        Returns:
+            bool: whether the object will be deleted
+        """
+        if not self.release_media_object(object_key=object_key):
+            return False
+        self.schedule_deletion(object_keys=[object_key])
+        return True
+
+    def delete_media_objects(self, object_keys: List[str]) -> None:
+        """schedule deletion of media objects, used to undo a failed upload"""
+        try:
+            self.schedule_deletion(
+                object_keys=[
+                    object_key
+                    for object_key in object_keys
+                    if self.release_media_object(object_key=object_key)
+                ]
+            )
+        except Exception:
+            pass
+
+    def drain_pending_deletions(self) -> int:
+        """
+        delete pending objects from storage in batches of STORAGE_DELETE_BATCH_SIZE,
+        failed objects are retried by later runs up to STORAGE_DELETE_MAX_ATTEMPTS times
+
+        Returns:
+            int: number of deleted objects
+        """
+        pending_deletion_service = PendingDeletionService(session=self.db_session)
+        storage_service = get_storage_service()
+        deleted = 0
+        while True:
+            batch = pending_deletion_service.get_batch(
+                limit=settings.STORAGE_DELETE_BATCH_SIZE,
+                max_attempts=settings.STORAGE_DELETE_MAX_ATTEMPTS,
+            )
+            if not batch:
+                break
+            # content uploaded again after it was queued is kept, the locks make uploads of it wait
+            in_use = self._get_object_keys_in_use(object_keys=batch)
+            pending_deletion_service.delete_all(object_keys=list(in_use))
+            object_keys = [object_key for object_key in batch if object_key not in in_use]
+            errors = storage_service.delete_files(object_keys=object_keys) if object_keys else {}
+            pending_deletion_service.delete_all(
+                object_keys=[object_key for object_key in object_keys if object_key not in errors]
+            )
+            pending_deletion_service.record_failures(errors=errors)
+            pending_deletion_service.commit()
+            deleted += len(object_keys) - len(errors)
+            if errors or len(batch) < settings.STORAGE_DELETE_BATCH_SIZE:
+                break
+        return deleted
+
+    def _get_orphaned_object_keys(self, prefix: str, object_keys: List[str]) -> List[str]:
+        """get object keys under prefix not used by any post, profile or blob"""
+        if prefix == "posts/":
+            # posts/{user_id}/{post_id}/..., media and variants belong to the post
+            post_ids = {}
+            for object_key in object_keys:
+                try:
+                    post_ids[object_key] = uuid.UUID(object_key.split("/")[2])
+                except (IndexError, ValueError):
+                    continue
+            existing = PostService(session=self.db_session).get_existing_post_ids(
+                ids=list(post_ids.values())
+            )
+            return [object_key for object_key, post_id in post_ids.items() if post_id not in existing]
+        if prefix == "profiles/":
+            existing = UserService(session=self.db_session).get_existing_profiles(
+                profiles=object_keys
+            )
+            return [object_key for object_key in object_keys if object_key not in existing]
+        # media/{sha256[:2]}/{sha256}, variants add _w{width}.{format}
+        blob_keys = {object_key: object_key.split("_", 1)[0] for object_key in object_keys}
+        existing = MediaBlobService(session=self.db_session).get_existing_object_keys(
+            object_keys=list(set(blob_keys.values()))
+        )
+        return [object_key for object_key, blob_key in blob_keys.items() if blob_key not in existing]
+
+    def _get_object_keys_in_use(self, object_keys: List[str]) -> Set[str]:
+        """get content addressed and profile object keys among object_keys that are used again"""
+        in_use = set()
+        for prefix in ("profiles/", BLOB_OBJECT_KEY_PREFIX):
+            prefixed = [object_key for object_key in object_keys if object_key.startswith(prefix)]
+            if prefixed:
+                in_use.update(
+                    set(prefixed)
+                    - set(self._get_orphaned_object_keys(prefix=prefix, object_keys=prefixed))
+                )
+        return in_use
+
+    def reconcile_storage(self) -> int:
+        """
+        page through objects under posts/, profiles/ and media/ and schedule deletion of orphaned objects,
+        objects newer than STORAGE_ORPHAN_GRACE_SECONDS are skipped
+
+        Returns:
+            int: number of orphaned objects found
+        """
+        cutoff = datetime.now(tz=timezone.utc) - timedelta(
+            seconds=settings.STORAGE_ORPHAN_GRACE_SECONDS
+        )
+        pending_deletion_service = PendingDeletionService(session=self.db_session)
+        orphaned = 0
+        for prefix in ("posts/", "profiles/", BLOB_OBJECT_KEY_PREFIX):
+            for page in get_storage_service().list_files(prefix=prefix):
+                object_keys = [obj["Key"] for obj in page if obj["LastModified"] < cutoff]
+                if not object_keys:
+                    continue
+                orphaned_keys = self._get_orphaned_object_keys(prefix=prefix, object_keys=object_keys)
+                pending_deletion_service.add_all(object_keys=orphaned_keys)
+                orphaned += len(orphaned_keys)
+        return orphaned
+
+    @staticmethod
+    def abort_stale_multipart_uploads() -> int:
+        """
+        abort multipart uploads started more than STORAGE_ORPHAN_GRACE_SECONDS ago,
+        their parts are kept (and billed) by storage until the upload is completed or aborted
+
+        Returns:
+            int: number of aborted uploads
+        """
+        cutoff = datetime.now(tz=timezone.utc) - timedelta(
+            seconds=settings.STORAGE_ORPHAN_GRACE_SECONDS
+        )
+        storage_service = get_storage_service()
+        aborted = 0
+        for page in storage_service.list_multipart_uploads():
+            for upload in page:
+                if upload["Initiated"] >= cutoff:
+                    continue
+                try:
+                    storage_service.abort_multipart_upload(
+                        object_key=upload["Key"], upload_id=upload["UploadId"]
+                    )
+                except CustomException:
+                    # completed or aborted meanwhile
+                    continue
+                aborted += 1
+        return aborted
+
+    @staticmethod
+    def delete_uploaded_media(object_keys: List[str]) -> None:
+        """delete uploaded media objects, used to undo a failed post upload"""
+        for object_key in object_keys:
+            try:
+                get_storage_service().delete_file(object_key=object_key)
+            except Exception:
+                pass
+
+    @staticmethod
+    def handle_media_uploads(files: List[Tuple[UploadFile, str]]) -> None:
+        """
+        upload (file, object_key) pairs concurrently,
+        when any upload fails the uploaded files are deleted and the error is raised
+        """
+        futures = {
+            media_upload_executor.submit(
+                MediaAppService.handle_media_upload, file=file, object_key=object_key
+            ): object_key
+            for file, object_key in files
+        }
+        wait(futures)
+        failed = [future for future in futures if future.exception()]
+        if failed:
+            MediaAppService.delete_uploaded_media(
+                object_keys=[
+                    object_key
+                    for future, object_key in futures.items()
+                    if not future.exception()
+                ]
+            )
+            raise failed[0].exception()
 
     @staticmethod
     def handle_media_upload(file: UploadFile, object_key:str) -> None:
-        """create object key and handle media upload"""
-        Boto3Service().upload_file_from_memory(
+        """create object key and handle media upload, videos are uploaded in parts"""
+        if file.content_type in get_valid_video_formats_list():
+            part_size = settings.S3_MULTIPART_PART_SIZE
+            get_storage_service().upload_file_from_stream(
+                object_key=object_key,
+                chunks=iter(lambda: file.file.read(part_size), b""),
+                content_type=file.content_type,
+                max_size=settings.VIDEO_MAX_UPLOAD_SIZE,
+            )
+            return None
+        get_storage_service().upload_file_from_memory(
             object_key=object_key, file_content=file.file, file_type=file.content_type
         )
 
+    @staticmethod
+    async def handle_media_stream_upload(
+        chunks: AsyncIterator[bytes], object_key: str, content_type: str
+    ) -> Tuple[int, str]:
+        """
+        upload video while it is received, parts are sent as soon as they are full
+        and the upload is rejected once VIDEO_MAX_UPLOAD_SIZE is exceeded
+
+        Returns:
+            Tuple[int, str]: size in bytes and sha256 hex digest of the video
+        """
+        upload = await run_in_threadpool(
+            get_storage_service().create_multipart_upload,
+            object_key=object_key,
+            content_type=content_type,
+            max_size=settings.VIDEO_MAX_UPLOAD_SIZE,
+        )
+        try:
+            async for chunk in chunks:
+                # blocks only while too many parts are in flight
+                await run_in_threadpool(upload.write, chunk)
+            return await run_in_threadpool(upload.complete)
+        except BaseException:
+            try:
+                await run_in_threadpool(upload.abort)
+            except CustomException:
+                pass
+            raise
+
+    @staticmethod
+    def create_direct_upload(file: UploadFileSchema, object_key: str) -> DirectUploadSchema:
+        """
+        get presigned upload so the file is sent directly to storage,
+        videos larger than one part get a multipart upload with a presigned url per part
+        """
+        storage_service = get_storage_service()
+        part_size = settings.S3_MULTIPART_PART_SIZE
+        if file.content_type in get_valid_video_formats_list() and file.size > part_size:
+            upload = storage_service.create_multipart_upload(
+                object_key=object_key, content_type=file.content_type
+            )
+            return DirectUploadSchema(
+                object_key=object_key,
+                upload_id=upload.upload_id,
+                part_size=part_size,
+                part_urls=storage_service.get_presigned_part_urls(
+                    object_key=object_key,
+                    upload_id=upload.upload_id,
+                    part_count=math.ceil(file.size / part_size),
+                ),
+            )
+        form = storage_service.get_presigned_upload_post(
+            object_key=object_key,
+            content_type=file.content_type,
+            max_size=get_max_upload_size(content_type=file.content_type),
+        )
+        return DirectUploadSchema(object_key=object_key, url=form["url"], fields=form["fields"])
+
+    @staticmethod
+    def check_uploaded_media(uploaded: UploadedFileSchema, valid_types: List[str]) -> str:
+        """
+        complete multipart upload if needed and check uploaded file exists with valid type and size,
+        invalid file is deleted from storage
+
+        Returns:
+            str: content type of uploaded file
+        """
+        storage_service = get_storage_service()
+        head = storage_service.head_file(object_key=uploaded.object_key)
+        if not head and uploaded.upload_id:
+            parts = storage_service.list_parts(
+                object_key=uploaded.object_key, upload_id=uploaded.upload_id
+            )
+            if not parts:
+                raise BadRequestException(get_upload_not_found(object_key=uploaded.object_key))
+            storage_service.complete_multipart_upload(
+                object_key=uploaded.object_key, upload_id=uploaded.upload_id, parts=parts
+            )
+            head = storage_service.head_file(object_key=uploaded.object_key)
+        if not head:
+            raise BadRequestException(get_upload_not_found(object_key=uploaded.object_key))
+        try:
+            check_file_type(content_type=head["content_type"], valid_types=valid_types)
+            check_file_size(
+                size=head["size"],
+                max_size=get_max_upload_size(content_type=head["content_type"]),
+            )
+        except CustomException:
+            storage_service.delete_file(object_key=uploaded.object_key)
+            raise
+        return head["content_type"]
+
     # def delete_media(self, media:Media) -> None:
     #     """delete media"""
     #     return self.media_service.delete_media(media=media)
\ No newline at end of file
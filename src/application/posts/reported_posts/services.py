@@ -37,10 +37,11 @@ class ReportPostAppService:
             user_app_service = UserAppService(session=self.db_session)
             posted_by = user_app_service.get_user_by_id(id=post.posted_by)
             if posted_by.profile_type == ProfileType.PRIVATE.value:
-                followers_user_id = user_app_service.get_user_id_of_followers(user=posted_by)
                 if posted_by.id == report.reported_by:
                     raise BadRequestException(get_reporting_own_post())
-                if report.reported_by not in followers_user_id:
+                if not user_app_service.can_view_private_user(
+                    viewer_id=report.reported_by, author_id=posted_by.id
+                ):
                     raise ForbiddenException(get_user_is_private())
             # reported_by_list = [report.reported_by for report in post.report] #and report.reported_by not in reported_by_list
             return self.report_post_service.create(report=report)
@@ -1,20 +1,29 @@
 import uuid
-from typing import List, Optional, Sequence
+from typing import Iterable, List, Optional, Sequence
 
 from sqlmodel import Session
+from fastapi_pagination import Page, Params
 
 from src.domain.posts.services import PostService
+from src.application.posts.timeline.services import TimelineAppService
+from src.application.posts.media.services import MediaAppService
 from src.interface.posts.schemas import PostSchema
 from src.application.users.users.services import UserAppService
 from src.application.users.services import BaseUserAppService
+from src.application.identity_map import IdentityMap
 from src.domain.models import Post, BaseUser, User
 from lib.fastapi.custom_exceptions import NotFoundException, BadRequestException
-from lib.fastapi.error_string import get_post_not_found, get_user_not_found, get_post_not_reported
-from lib.fastapi.custom_enums import FilterDates, Environment
-from src.infrastructure.file_upload.services import Boto3Service
+from lib.fastapi.error_string import (
+    get_post_not_found,
+    get_user_not_found,
+    get_post_not_reported,
+    get_user_not_created,
+    get_fuzzy_search_disabled,
+)
+from lib.fastapi.custom_enums import FilterDates, Environment, Role
 from src.infrastructure.email_service.services import SendgridService
 from src.setup.config.settings import settings
-from lib.fastapi.utils import get_random_values_from_list
+from lib.fastapi.utils import get_cursor_page, decode_cursor, check_id
 
 
 class ReportedPostEmailService(SendgridService):
@@ -53,10 +62,16 @@ class PostAppService:
     def __init__(self, session: Session):
         self.db_session = session
         self.post_service = PostService(session=self.db_session)
+        self.identity_map = IdentityMap.for_session(session=self.db_session)
 
     def get_post_by_id(self, id: uuid.UUID) -> Optional[Post]:
-        """get post using post id"""
-        post = self.post_service.get_post_by_id(id=id)
+        """get post using post id, served from identity map when already loaded in the request"""
+        post = self.identity_map.get(
+            model=Post,
+            field="id",
+            value=id,
+            loader=lambda: self.post_service.get_post_by_id(id=id),
+        )
         if not post:
             # raise NotFoundException(get_post_not_found())
             return None
@@ -66,6 +81,15 @@ class PostAppService:
         """get all posts posted by the user"""
         return self.post_service.get_all_posts_by_user_id(user_id=user_id)
 
+    def _get_user_for_posts_access(self, current_user: dict, username: str) -> User:
+        """get user by username if current user is allowed to see their posts"""
+        user_app_service = UserAppService(session=self.db_session)
+        user = user_app_service.get_user_by_username(username=username)
+        if not user:
+            raise NotFoundException(get_user_not_found())
+        user_app_service.check_private_user(current_user=current_user, user=user)
+        return user
+
     def get_all_posts_by_username(
         self,
         current_user: dict,
@@ -74,15 +98,89 @@ class PostAppService:
         filter_by: Optional[FilterDates],
     ) -> Sequence[Post]:
         """get all posts by username"""
-        user_app_service = UserAppService(session=self.db_session)
-        user = user_app_service.get_user_by_username(username=username)
-        if not user:
-            raise NotFoundException(get_user_not_found())
-        user_app_service.check_private_user(current_user=current_user, user=user)
+        user = self._get_user_for_posts_access(current_user=current_user, username=username)
         return self.post_service.get_all_posts_by_user_id(
             user_id=user.id, search=search, filter_by=filter_by
         )
 
+    def get_paginated_posts_by_username(
+        self,
+        current_user: dict,
+        username: str,
+        params: Params,
+        search: Optional[str],
+        filter_by: Optional[FilterDates],
+    ) -> Page[Post]:
+        """get page of posts by username using page number"""
+        user = self._get_user_for_posts_access(current_user=current_user, username=username)
+        return self.post_service.get_paginated_posts_by_user_id(
+            user_id=user.id, params=params, search=search, filter_by=filter_by
+        )
+
+    def get_posts_by_username_with_cursor(
+        self,
+        current_user: dict,
+        username: str,
+        size: int,
+        cursor: Optional[str],
+        search: Optional[str],
+        filter_by: Optional[FilterDates],
+        include_total: bool = False,
+    ) -> dict:
+        """
+        get page of posts by username using keyset cursor
+        `Args`
+            cursor:
+                opaque next_cursor value returned with the previous page
+            include_total:
+                add approximate total of posts (planner estimate, not exact count)
+        `Returns`
+            [dict]:
+                items, size, next_cursor (None on last page) and total
+        """
+        user = self._get_user_for_posts_access(current_user=current_user, username=username)
+        posts = self.post_service.get_posts_by_user_id_after_cursor(
+            user_id=user.id,
+            size=size,
+            cursor=decode_cursor(cursor=cursor) if cursor else None,
+            search=search,
+            filter_by=filter_by,
+        )
+        page = get_cursor_page(rows=posts, size=size)
+        if include_total:
+            page["total"] = self.post_service.get_estimated_posts_count_by_user_id(
+                user_id=user.id, search=search, filter_by=filter_by
+            )
+        return page
+
+    def search_posts(
+        self, current_user: dict, search: str, params: Params, fuzzy: bool = False
+    ) -> Page[Post]:
+        """search posts by caption from all users that current user is allowed to see"""
+        if fuzzy and not settings.TRIGRAM_SEARCH_ENABLED:
+            raise BadRequestException(get_fuzzy_search_disabled())
+        viewer_id = None
+        if current_user.get("role") != Role.ADMIN.value:
+            user = UserAppService(session=self.db_session).get_user_by_base_user_id(
+                base_user_id=check_id(id=current_user.get("id"))
+            )
+            if not user:
+                raise NotFoundException(get_user_not_created())
+            viewer_id = user.id
+        return self.post_service.search_posts(
+            search=search, params=params, viewer_id=viewer_id, fuzzy=fuzzy
+        )
+
+    def get_post_for_user_access(self, current_user: dict, post_id: uuid.UUID) -> Post:
+        """get post by post_id if current user is allowed to see posts of its owner"""
+        post = self.get_post_by_id(id=post_id)
+        if not post:
+            raise NotFoundException(get_post_not_found())
+        user_app_service = UserAppService(session=self.db_session)
+        posted_by = user_app_service.get_user_by_id(id=post.posted_by)
+        user_app_service.check_private_user(current_user=current_user, user=posted_by)
+        return post
+
     def get_post_by_post_id_for_user(
         self, post_id: uuid.UUID, user_id: uuid.UUID
     ) -> Optional[Post]:
@@ -93,20 +191,21 @@ class PostAppService:
             return None
         return post
 
-    def get_all_posts_not_liked_by_user(self, user_id: uuid.UUID) -> Sequence[Post] | None:
+    def get_all_posts_not_liked_by_user(
+        self, user_id: uuid.UUID, limit: Optional[int] = None
+    ) -> Iterable[Post] | None:
         """get all posts not liked by user and posted from public users or user following"""
-        user_app_service = UserAppService(session=self.db_session)
-        user = user_app_service.get_user_by_id(id=user_id)
-        public_users = user_app_service.get_all_public_users()
+        user = UserAppService(session=self.db_session).get_user_by_id(id=user_id)
         if not user:
             return None
         return self.post_service.get_all_posts_not_liked_by_user(
-            user=user, public_users=public_users
+            user_id=user.id, limit=limit
         )
 
     def create_post(self, post: PostSchema) -> Post:
-        """create new post"""
+        """create new post and fan it out to followers' timelines"""
         db_post = self.post_service.create(post=post)
+        TimelineAppService(session=self.db_session).fan_out_post(post=db_post)
         return db_post
 
     def update_post(self, post_id: uuid.UUID, post: PostSchema) -> Post:
@@ -120,10 +219,14 @@ class PostAppService:
 
     def delete_post(self, db_post: Post) -> None:
         """delete post"""
-        # delete from minio
-        for file in db_post.media:
-            Boto3Service().delete_file(object_key=file.media_url)
+        # shared content addressed media is deleted only when no longer referenced
+        media_app_service = MediaAppService(session=self.db_session)
+        object_keys = media_app_service.release_media(media=db_post.media)
+        TimelineAppService(session=self.db_session).remove_post(post_id=db_post.id)
+        self.identity_map.discard(row=db_post)
         self.post_service.delete(db_post=db_post)
+        # removed from minio by the deletion worker
+        media_app_service.schedule_deletion(object_keys=object_keys)
 
     def delete_post_by_user(self, post_id: uuid.UUID, user_id: uuid.UUID) -> None:
         """delete post if user owns the post"""
@@ -153,11 +256,13 @@ class PostAppService:
 
     def get_posts_to_schedule(self, user_id: uuid.UUID) -> List[uuid.UUID]:
         """get randomly selected posts to schedule"""
-        posts = self.get_all_posts_not_liked_by_user(user_id=user_id)
-        random_post_ids = get_random_values_from_list(
-            var_list=[post.id for post in posts], count=settings.POST_COUNT_TO_NOTIFY
+        posts = self.post_service.get_all_posts_not_liked_by_user(
+            user_id=user_id,
+            limit=settings.POST_COUNT_TO_NOTIFY,
+            shuffle=True,
+            sample_percent=settings.POST_NOTIFICATION_SAMPLE_PERCENT,
         )
-        return random_post_ids
+        return [post.id for post in posts]
 
     def send_posts_in_email(self, user: User, post_ids: List[uuid.UUID]) -> None:
         """
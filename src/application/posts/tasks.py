@@ -1,8 +1,12 @@
+import uuid
 
 from src.infrastructure.scheduler.celery import app
 from src.application.users.services import UserAppService
 from src.application.posts.services import PostAppService
+from src.application.posts.media.services import MediaAppService
+from src.domain.posts.services import PostService
 from src.setup.config.database import get_session
+from src.setup.config.settings import settings
 
 @app.task
 def schedule_post_notifications():
@@ -22,4 +26,82 @@ def schedule_post_notifications():
         session.close()
         return "Notification task completed!"
     except Exception as e:
-        return f"ERROR:{e}"
\ No newline at end of file
+        return f"ERROR:{e}"
+
+@app.task
+def reconcile_post_counts():
+    """find drift of denormalized like and comment counts and queue its correction celery task"""
+    try:
+        sessions = get_session()
+        session = list(sessions)[0]
+        drifts = PostService(session=session).find_count_drifts()
+        session.close()
+        if drifts:
+            # api processes flush buffered counts every POST_COUNT_FLUSH_SECONDS, drifts still
+            # unchanged after that are not buffered changes
+            reconcile_post_count_drifts.apply_async(
+                kwargs=dict(
+                    drifts={
+                        str(post_id): list(drift) for post_id, drift in drifts.items()
+                    }
+                ),
+                countdown=3 * settings.POST_COUNT_FLUSH_SECONDS,
+            )
+        return f"Post count drift found for {len(drifts)} posts!"
+    except Exception as e:
+        return f"ERROR:{e}"
+
+@app.task
+def reconcile_post_count_drifts(drifts: dict):
+    """correct post count drifts unchanged since reconcile_post_counts found them celery task"""
+    try:
+        sessions = get_session()
+        session = list(sessions)[0]
+        count = PostService(session=session).reconcile_counts(
+            drifts={
+                uuid.UUID(post_id): tuple(drift) for post_id, drift in drifts.items()
+            }
+        )
+        session.close()
+        return f"Post counts reconciled for {count} posts!"
+    except Exception as e:
+        return f"ERROR:{e}"
+
+@app.task
+def create_media_variants(media_id: str):
+    """create resized variants and placeholder of uploaded image celery task"""
+    try:
+        sessions = get_session()
+        session = list(sessions)[0]
+        MediaAppService(session=session).create_media_variants(media_id=uuid.UUID(media_id))
+        session.close()
+        return "Media variants created!"
+    except Exception as e:
+        return f"ERROR:{e}"
+
+@app.task
+def drain_pending_deletions():
+    """delete pending storage objects in batches celery task"""
+    try:
+        sessions = get_session()
+        session = list(sessions)[0]
+        count = MediaAppService(session=session).drain_pending_deletions()
+        session.close()
+        return f"{count} storage objects deleted!"
+    except Exception as e:
+        return f"ERROR:{e}"
+
+@app.task
+def reconcile_storage_objects():
+    """find orphaned storage objects and schedule their deletion celery task"""
+    try:
+        sessions = get_session()
+        session = list(sessions)[0]
+        media_app_service = MediaAppService(session=session)
+        count = media_app_service.reconcile_storage()
+        media_app_service.drain_pending_deletions()
+        aborted = media_app_service.abort_stale_multipart_uploads()
+        session.close()
+        return f"{count} orphaned storage objects found, {aborted} stale multipart uploads aborted!"
+    except Exception as e:
+        return f"ERROR:{e}"
@@ -0,0 +1,77 @@
+import uuid
+from typing import List, Optional, Tuple
+
+from sqlmodel import Session
+
+from src.domain.posts.timeline.services import TimelineService
+from src.domain.posts.services import PostService
+from src.domain.users.users.follow_management.services import FollowService
+from src.domain.models import Post, User
+from src.setup.config.settings import settings
+from lib.fastapi.utils import get_cursor_page, decode_cursor
+
+
+class TimelineAppService:
+    """timeline application service for materialized home feed"""
+
+    def __init__(self, session: Session):
+        self.db_session = session
+        self.timeline_service = TimelineService(session=self.db_session)
+
+    def fan_out_post(self, post: Post) -> int:
+        """
+        write new post to follower timelines, posts of authors with more followers than
+        FEED_FAN_OUT_FOLLOWER_LIMIT are left for the read side to merge in
+        """
+        followers_count = FollowService(session=self.db_session).count_approved_followers(
+            user_id=post.posted_by, limit=settings.FEED_FAN_OUT_FOLLOWER_LIMIT + 1
+        )
+        if followers_count > settings.FEED_FAN_OUT_FOLLOWER_LIMIT:
+            return 0
+        return self.timeline_service.fan_out_post(post=post)
+
+    def add_author_posts(self, user_ids: List[uuid.UUID], posted_by: uuid.UUID) -> int:
+        """write recent posts of author to timelines of users whose follow was approved, not committed"""
+        return self.timeline_service.backfill_author_posts(
+            user_ids=user_ids, posted_by=posted_by, limit=settings.FEED_FOLLOW_BACKFILL_SIZE
+        )
+
+    def remove_post(self, post_id: uuid.UUID) -> None:
+        """remove post from all timelines"""
+        self.timeline_service.delete_by_post_id(post_id=post_id)
+
+    def remove_author_posts(self, user_id: uuid.UUID, posted_by: uuid.UUID) -> None:
+        """remove posts of author from user's timeline after unfollow"""
+        self.timeline_service.delete_by_user_id_and_posted_by(
+            user_id=user_id, posted_by=posted_by
+        )
+
+    def remove_followed_authors_posts(
+        self, pairs: List[Tuple[uuid.UUID, uuid.UUID]]
+    ) -> None:
+        """remove posts of authors from users' timelines for (user_id, posted_by) pairs of removed follows, not committed"""
+        self.timeline_service.delete_by_user_id_and_posted_by_pairs(pairs=pairs)
+
+    def get_feed(self, user: User, size: int, cursor: Optional[str]) -> dict:
+        """
+        get page of home feed using keyset cursor, timeline entries merged with
+        posts of followed authors that were not fanned out
+        `Returns`
+            [dict]:
+                items, size and next_cursor (None on last page)
+        """
+        after = decode_cursor(cursor=cursor) if cursor else None
+        posts = list(
+            self.timeline_service.get_posts_after_cursor(
+                user_id=user.id, size=size, cursor=after
+            )
+        )
+        posts.extend(
+            PostService(
+                session=self.db_session
+            ).get_not_fanned_out_posts_of_following_after_cursor(
+                follower_id=user.id, size=size, cursor=after
+            )
+        )
+        posts.sort(key=lambda post: (post.created_at, post.id), reverse=True)
+        return get_cursor_page(rows=posts, size=size)
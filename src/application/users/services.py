@@ -1,21 +1,26 @@
 import uuid
-from typing import Optional, Sequence
+from typing import Iterator, Optional, Sequence
 from datetime import datetime, timedelta
 
-from passlib.context import CryptContext
-# from cryptography.hazmat.primitives import hashes
-
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session
 
 
-from src.domain.models import BaseUser, Otp
-from src.domain.users.services import BaseUserService, OtpService
+from src.domain.models import BaseUser, Otp, User
+from src.domain.users.services import BaseUserService, OtpService, BASE_USER_EXPORT_FIELDS
+from src.domain.users.users.follow_management.services import FollowService
+from src.domain.users.users.follow_management.graph import FollowGraph
 from src.interface.auth.schemas import Login
 from src.interface.users.schemas import (
     CreateBaseUser,
 )
 from src.infrastructure.email_service.services import SendgridService
-from src.infrastructure.auth_service.services import JWTService
+from src.infrastructure.auth_service.services import (
+    JWTService,
+    PasswordHashPool,
+    bcrypt_hash,
+    bcrypt_verify,
+)
 from src.infrastructure.oauth_service.services import GithubOauthService
 from lib.fastapi.custom_exceptions import (
     UnauthorizedException,
@@ -31,33 +36,47 @@ from lib.fastapi.error_string import (
     get_otp_link_expired,
     get_invalid_otp_token,
 )
-from lib.fastapi.custom_enums import Role, Environment
+from lib.fastapi.custom_enums import Role, Environment, ProfileType, ExportFormat
 from src.setup.config.settings import settings
 from .tasks import delete_otp
-from lib.fastapi.utils import get_default_timezone
+from lib.fastapi.utils import (
+    get_default_timezone,
+    check_id,
+    decode_cursor,
+    get_cursor_page,
+    iter_export_chunks,
+)
 from src.application.users.users.services import UserAppService
+from src.application.identity_map import IdentityMap
+from src.application.posts.media.services import MediaAppService
 from src.application.users.admins.services import AdminAppService
 
 
 class PasswordService:
-    """services for password handling"""
+    """services for password handling, bcrypt runs in the password hash pool"""
 
     def __new__(cls):
         if not hasattr(cls, "instance"):
             cls.instance = super(PasswordService, cls).__new__(cls)
         return cls.instance
 
-    def __init__(self) -> None:
-        self.PASSWORD_CONTEXT = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        # self.PASSWORD_CONTEXT = hashes.hash(hashes.SHA256())
-
     def get_hashed_password(self, password: str) -> str:
         """create hashed password for the password string received by user"""
-        return self.PASSWORD_CONTEXT.hash(password)
+        return PasswordHashPool().run(bcrypt_hash, password, settings.PASSWORD_BCRYPT_ROUNDS)
 
     def verify_password(self, password: str, hashed_password: str) -> bool:
         """verify password string with the hashed_password"""
-        return self.PASSWORD_CONTEXT.verify(password, hashed_password)
+        return PasswordHashPool().run(bcrypt_verify, password, hashed_password)
+
+    async def get_hashed_password_async(self, password: str) -> str:
+        """create hashed password without holding a request thread"""
+        return await PasswordHashPool().run_async(
+            bcrypt_hash, password, settings.PASSWORD_BCRYPT_ROUNDS
+        )
+
+    async def verify_password_async(self, password: str, hashed_password: str) -> bool:
+        """verify password without holding a request thread"""
+        return await PasswordHashPool().run_async(bcrypt_verify, password, hashed_password)
 
 
 class ForgotPasswordService(SendgridService):
@@ -86,26 +105,75 @@ class BaseUserAppService:
     def __init__(self, session: Session):
         self.db_session = session
         self.base_user_service = BaseUserService(session=self.db_session)
+        self.identity_map = IdentityMap.for_session(session=self.db_session)
 
     def get_base_user_by_email(self, email: str) -> Optional[BaseUser]:
         """get base user by email value"""
         return self.base_user_service.get_base_user_by_email(email=email)
 
     def get_base_user_by_id(self, id: uuid.UUID) -> Optional[BaseUser]:
-        """get base user by id"""
-        return self.base_user_service.get_base_user_by_id(id=id)
+        """get base user by id, served from identity map when already loaded in the request"""
+        return self.identity_map.get(
+            model=BaseUser,
+            field="id",
+            value=id,
+            loader=lambda: self.base_user_service.get_base_user_by_id(id=id),
+        )
 
     def get_base_user_by_user_id(self, user_id: uuid.UUID) -> Optional[BaseUser]:
-        """get base user by user id"""
-        return self.base_user_service.get_base_user_by_user_id(user_id=user_id)
+        """get base user by user id, registered in identity map for later lookups by id"""
+        base_user = self.base_user_service.get_base_user_by_user_id(user_id=user_id)
+        if base_user:
+            self.identity_map.add(row=base_user)
+        return base_user
 
     def get_all_base_users(self) -> Sequence[BaseUser]:
         """returns list of all base users"""
         return self.base_user_service.get_all_base_users()
 
+    def get_base_users_page(self, size: int, cursor: Optional[str] = None) -> dict:
+        """get page of base users with their user and admin newest first using keyset cursor"""
+        base_users = self.base_user_service.get_base_users_after_cursor(
+            size=size, cursor=decode_cursor(cursor=cursor) if cursor else None
+        )
+        return get_cursor_page(rows=base_users, size=size)
+
+    def export_base_users(self, export_format: ExportFormat) -> Iterator[str]:
+        """
+        stream all base users as ndjson or csv chunks, rows are read in its own session
+        since the request session is closed before a streaming response is sent
+        """
+        bind = self.db_session.get_bind()
+
+        def iter_chunks() -> Iterator[str]:
+            with Session(bind) as session:
+                yield from iter_export_chunks(
+                    rows=BaseUserService(session=session).get_export_rows(
+                        batch_size=settings.EXPORT_BATCH_SIZE
+                    ),
+                    fields=BASE_USER_EXPORT_FIELDS,
+                    export_format=export_format,
+                    chunk_size=settings.EXPORT_BATCH_SIZE,
+                )
+
+        return iter_chunks()
+
     def create_base_user(self, base_user: CreateBaseUser) -> BaseUser:
         """create base user after hashing base user's password"""
         base_user.password = PasswordService().get_hashed_password(base_user.password)
+        return self.create_base_user_with_hashed_password(base_user=base_user)
+
+    async def create_base_user_async(self, base_user: CreateBaseUser) -> BaseUser:
+        """create base user, password is hashed without holding a request thread"""
+        base_user.password = await PasswordService().get_hashed_password_async(
+            base_user.password
+        )
+        return await run_in_threadpool(
+            self.create_base_user_with_hashed_password, base_user=base_user
+        )
+
+    def create_base_user_with_hashed_password(self, base_user: CreateBaseUser) -> BaseUser:
+        """create base user with its user or admin, password is already hashed"""
         db_base_user = self.base_user_service.create(base_user=base_user)
         if db_base_user.role == Role.ADMIN:
             admin_app_service = AdminAppService(session=self.db_session)
@@ -132,10 +200,29 @@ class BaseUserAppService:
             base_user=base_user, db_base_user=db_base_user
         )
 
-    def create_jwt_token_for_user(self, id: str, role: Role) -> str:
-        """create jwt token with base user id and role in payload"""
+    @staticmethod
+    def get_user_claims(user: Optional[User]) -> dict:
+        """claims of user embedded in access token when JWT_USER_CLAIMS is set"""
+        if not settings.JWT_USER_CLAIMS or not user:
+            return {}
+        return {
+            "user_id": str(user.id),
+            "username": user.username,
+            "profile_type": ProfileType(user.profile_type).value,
+            "claims_version": user.claims_version,
+        }
+
+    def create_jwt_token_for_user(
+        self, id: str, role: Role, user: Optional[User] = None
+    ) -> str:
+        """
+        create jwt token with base user id and role in payload,
+        access token also has user claims so handlers can skip the user lookup
+        """
         data = {"id": str(id), "role": role.value}
-        access_token = JWTService().create_access_token(data=data)
+        access_token = JWTService().create_access_token(
+            data={**data, **self.get_user_claims(user=user)}
+        )
         refresh_token = JWTService().create_refresh_token(data=data)
         return access_token, refresh_token
 
@@ -149,7 +236,25 @@ class BaseUserAppService:
         )
         if not verify:
             raise UnauthorizedException(get_incorrect_password())
-        access_token, refresh_token = self.create_jwt_token_for_user(id=db_user.id, role=db_user.role)
+        return self.get_login_response(db_user=db_user)
+
+    async def authenticate_user_async(self, user: Login) -> dict:
+        """authenticate user for email and password, password is verified without holding a request thread"""
+        db_user = await run_in_threadpool(self.get_base_user_by_email, email=user.email)
+        if not db_user:
+            raise UnauthorizedException(get_incorrect_password())
+        verify = await PasswordService().verify_password_async(
+            password=user.password, hashed_password=db_user.password
+        )
+        if not verify:
+            raise UnauthorizedException(get_incorrect_password())
+        return await run_in_threadpool(self.get_login_response, db_user=db_user)
+
+    def get_login_response(self, db_user: BaseUser) -> dict:
+        """login response with new access and refresh token of authenticated base user"""
+        access_token, refresh_token = self.create_jwt_token_for_user(
+            id=db_user.id, role=db_user.role, user=db_user.user
+        )
         return dict(
             id=db_user.id,
             email=db_user.email,
@@ -159,14 +264,43 @@ class BaseUserAppService:
         )
     
     def get_access_token_from_refresh(self, token:str) -> str:
-        access_token = JWTService().generate_access_token_from_refresh_token(token=token)
-        return access_token
+        """create access token from refresh token, user claims are read again so they are current"""
+        if not settings.JWT_USER_CLAIMS:
+            return JWTService().generate_access_token_from_refresh_token(token=token)
+        payload = JWTService().decode_refresh(token=token)
+        data = {"id": payload.get("id"), "role": payload.get("role")}
+        user = None
+        if payload.get("role") == Role.USER.value:
+            user = UserAppService(session=self.db_session).get_user_by_base_user_id(
+                base_user_id=check_id(id=payload.get("id"))
+            )
+        return JWTService().create_access_token(
+            data={**data, **self.get_user_claims(user=user)}
+        )
 
     def delete_base_user(self, id: uuid.UUID) -> None:
         db_base_user = self.get_base_user_by_id(id=id)
         if not db_base_user:
             return None
+        media_app_service = MediaAppService(session=self.db_session)
+        object_keys = (
+            media_app_service.release_user_media(user=db_base_user.user)
+            if db_base_user.user
+            else []
+        )
+        if db_base_user.user:
+            UserAppService.invalidate_claims(user=db_base_user.user)
+            self.identity_map.discard(row=db_base_user.user)
+            FollowService(session=self.db_session).release_follow_counts(
+                user_id=db_base_user.user.id
+            )
+        self.identity_map.discard(row=db_base_user)
+        user_id = db_base_user.user.id if db_base_user.user else None
         self.base_user_service.delete(db_base_user=db_base_user)
+        if user_id:
+            FollowGraph().remove_user(user_id=user_id)
+        # removed from minio by the deletion worker
+        media_app_service.schedule_deletion(object_keys=object_keys)
         return None
 
     def create_otp(self, user_id: uuid.UUID) -> Otp:
@@ -227,14 +361,33 @@ class BaseUserAppService:
 
     def set_new_password(self, user: BaseUser, new_password: str) -> BaseUser:
         """set new password for the given user"""
+        return self.set_hashed_password(
+            user=user, hashed_password=PasswordService().get_hashed_password(new_password)
+        )
+
+    def set_hashed_password(self, user: BaseUser, hashed_password: str) -> BaseUser:
+        """set already hashed new password for the given user"""
         db_user = user
-        user.password = PasswordService().get_hashed_password(new_password)
+        user.password = hashed_password
         self.base_user_service.update(base_user=user, db_base_user=db_user)
         self.delete_otp(user=user)
         return user
 
     def reset_password(self, otp_token: str, new_password: str) -> BaseUser:
         """reset password using otp_token"""
+        user = self.get_base_user_by_otp_token(otp_token=otp_token)
+        return self.set_new_password(user=user, new_password=new_password)
+
+    async def reset_password_async(self, otp_token: str, new_password: str) -> BaseUser:
+        """reset password using otp_token, password is hashed without holding a request thread"""
+        user = await run_in_threadpool(self.get_base_user_by_otp_token, otp_token=otp_token)
+        hashed_password = await PasswordService().get_hashed_password_async(new_password)
+        return await run_in_threadpool(
+            self.set_hashed_password, user=user, hashed_password=hashed_password
+        )
+
+    def get_base_user_by_otp_token(self, otp_token: str) -> BaseUser:
+        """get base user of valid, unused otp token"""
         payload = JWTService().decode(token=otp_token)
         if not payload.get("id") or not payload.get("otp") or not payload.get("exp"):
             raise BadRequestException(get_invalid_otp_token())
@@ -246,7 +399,7 @@ class BaseUserAppService:
         user = self.get_base_user_by_id(id=base_user_id)
         if user.otp is None:
             raise NotFoundException(get_otp_link_expired())
-        return self.set_new_password(user=user, new_password=new_password)
+        return user
 
     @staticmethod
     def get_git_auth_url() -> str:
@@ -1,11 +1,17 @@
 import uuid
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 
 from sqlmodel import Session
 
 from src.domain.models import FollowersModel, User
-from src.domain.users.users.follow_management.services import FollowService
+from src.domain.users.users.follow_management.graph import FollowGraph
+from src.domain.users.users.follow_management.services import (
+    FollowService,
+    CanViewCache,
+    FOLLOW_COUNT_FIELDS,
+)
 from src.application.users.users.services import UserAppService
+from src.application.posts.timeline.services import TimelineAppService
 from lib.fastapi.custom_exceptions import NotFoundException, CustomValidationError, BadRequestException
 from lib.fastapi.error_string import (
     get_user_not_created,
@@ -14,16 +20,20 @@ from lib.fastapi.error_string import (
     get_accept_request_for_no_follower,
     get_reject_request_for_no_follower
 )
-from lib.fastapi.custom_enums import StatusType, ProfileType
+from lib.fastapi.custom_enums import StatusType, ProfileType, BulkFollowResult
 from src.interface.users.users.follow_management.schemas import FollowRequest
+from src.interface.auth.schemas import UserClaims
+from lib.fastapi.utils import check_id, decode_cursor, get_cursor_page
 
 
 class FollowAppService:
     """services for follower model"""
 
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, current_user: Optional[dict] = None):
         self.db_session = session
         self.follow_service = FollowService(session=self.db_session)
+        # access token principal, its user claims replace the current user lookup
+        self.current_user = current_user
 
     def get_follow_by_follow_id(self, id: uuid.UUID) -> Optional[FollowersModel]:
         """get follow request using follow id"""
@@ -38,6 +48,24 @@ class FollowAppService:
             raise NotFoundException(get_user_not_created())
         return user
 
+    def get_current_user(self, base_user_id: uuid.UUID) -> User | UserClaims:
+        """
+        get current user from access token claims when given for base_user_id, else the user row,
+        raise NotFoundException if the user was deleted since follow rows referencing it are written
+        """
+        if (
+            self.current_user
+            and self.current_user.get("user_id")
+            and check_id(id=self.current_user.get("id")) == base_user_id
+        ):
+            user = UserAppService(session=self.db_session).get_current_user(
+                current_user=self.current_user, check_exists=True
+            )
+            if not user:
+                raise NotFoundException(get_user_not_created())
+            return user
+        return self.get_user_by_base_user_id(base_user_id=base_user_id)
+
     def get_user_by_username(self, username: str) -> User:
         """get user by username, raise NotFoundException if user not created"""
         user = UserAppService(session=self.db_session).get_user_by_username(
@@ -57,73 +85,197 @@ class FollowAppService:
         user = self.get_user_by_base_user_id(base_user_id=base_user_id)
         return user.following
 
-    def get_pending_requests_sent_to_user(
-        self, base_user_id: uuid.UUID
-    ) -> List[FollowersModel]:
-        """get pending requests sent to user"""
-        followers = self.get_all_followers(base_user_id=base_user_id)
-        return [
-            follower for follower in followers if follower.status == StatusType.PENDING
+    def _get_follow_page(
+        self,
+        user: User,
+        status: StatusType,
+        size: int,
+        cursor: Optional[str],
+        sent: bool = False,
+    ) -> dict:
+        """get keyset page of follow edges with status sent by or to the user, total is read from the user's follow counts"""
+        follows = self.follow_service.get_follows_after_cursor(
+            user_id=user.id,
+            status=status,
+            size=size,
+            cursor=decode_cursor(cursor=cursor) if cursor else None,
+            sent=sent,
+        )
+        page = get_cursor_page(rows=follows, size=size)
+        other_user = "following" if sent else "follower"
+        page["items"] = [
+            {other_user: follow.User, "status": follow.status} for follow in page["items"]
         ]
+        following_field, follower_field = FOLLOW_COUNT_FIELDS[status]
+        page["total"] = getattr(user, follower_field if sent else following_field)
+        return page
+
+    def get_pending_requests_sent_to_user(
+        self, base_user_id: uuid.UUID, size: int, cursor: Optional[str] = None
+    ) -> dict:
+        """get page of pending requests sent to user"""
+        user = self.get_user_by_base_user_id(base_user_id=base_user_id)
+        return self._get_follow_page(
+            user=user, status=StatusType.PENDING, size=size, cursor=cursor
+        )
 
     def get_pending_requests_sent_by_user(
-        self, base_user_id: uuid.UUID
-    ) -> List[FollowersModel]:
-        """get pending requests sent by user using"""
-        following_list = self.get_all_following_list(base_user_id=base_user_id)
-        return [
-            following
-            for following in following_list
-            if following.status == StatusType.PENDING
-        ]
+        self, base_user_id: uuid.UUID, size: int, cursor: Optional[str] = None
+    ) -> dict:
+        """get page of pending requests sent by user"""
+        user = self.get_user_by_base_user_id(base_user_id=base_user_id)
+        return self._get_follow_page(
+            user=user, status=StatusType.PENDING, size=size, cursor=cursor, sent=True
+        )
 
     def get_followers(
-        self, current_user: dict, username: str
-    ) -> List[FollowersModel]:
-        """get requests accepted by the user"""
+        self, current_user: dict, username: str, size: int, cursor: Optional[str] = None
+    ) -> dict:
+        """get page of requests accepted by the user"""
         user = self.get_user_by_username(username=username)
         user_app_service = UserAppService(session=self.db_session)
         user_app_service.check_private_user(current_user=current_user, user=user)
-        followers = self.get_all_followers(base_user_id=user.base_user_id)
-        return [
-            follower for follower in followers if follower.status == StatusType.APPROVED
-        ]
+        return self._get_follow_page(
+            user=user, status=StatusType.APPROVED, size=size, cursor=cursor
+        )
 
     def get_following(
-        self, current_user: dict, username: str
-    ) -> List[FollowersModel]:
-        """get sent requests accepted for the user"""
+        self, current_user: dict, username: str, size: int, cursor: Optional[str] = None
+    ) -> dict:
+        """get page of sent requests accepted for the user"""
         user = self.get_user_by_username(username=username)
         user_app_service = UserAppService(session=self.db_session)
         user_app_service.check_private_user(current_user=current_user, user=user)
-        following_list = self.get_all_following_list(base_user_id=user.base_user_id)
+        return self._get_follow_page(
+            user=user, status=StatusType.APPROVED, size=size, cursor=cursor, sent=True
+        )
+
+    @staticmethod
+    def _apply_to_follow_graph(follow: FollowRequest | FollowersModel) -> None:
+        """add approved follow edge to the follow graph, remove edges with other status"""
+        if follow.status == StatusType.APPROVED:
+            FollowGraph().add_edge(follower_id=follow.follower_id, following_id=follow.following_id)
+        else:
+            FollowGraph().remove_edge(follower_id=follow.follower_id, following_id=follow.following_id)
+
+    def _create_follow(self, follow: FollowRequest) -> FollowersModel:
+        """
+        create follow edge, invalidate cached privacy decision of the pair and update follow graph,
+        recent posts of the followed user are written to the follower's timeline for approved follows
+        """
+        if follow.status == StatusType.APPROVED:
+            self._add_to_timeline(follower_ids=[follow.follower_id], following_id=follow.following_id)
+        db_follow = self.follow_service.create(follow=follow)
+        CanViewCache().invalidate(viewer_id=follow.follower_id, author_id=follow.following_id)
+        self._apply_to_follow_graph(follow=follow)
+        return db_follow
+
+    def _update_follow(self, follow: FollowRequest, db_follow: FollowersModel) -> FollowersModel:
+        """
+        update follow edge, invalidate cached privacy decision of the pair and update follow graph,
+        recent posts of the followed user are written to the follower's timeline once approved
+        """
+        if follow.status == StatusType.APPROVED and db_follow.status != StatusType.APPROVED:
+            self._add_to_timeline(follower_ids=[follow.follower_id], following_id=follow.following_id)
+        db_follow = self.follow_service.update(follow=follow, db_follow=db_follow)
+        CanViewCache().invalidate(viewer_id=follow.follower_id, author_id=follow.following_id)
+        self._apply_to_follow_graph(follow=follow)
+        return db_follow
+
+    def _add_to_timeline(self, follower_ids: List[uuid.UUID], following_id: uuid.UUID) -> None:
+        """write recent posts of followed user to timelines of approved followers, committed with the follow change"""
+        TimelineAppService(session=self.db_session).add_author_posts(
+            user_ids=follower_ids, posted_by=following_id
+        )
+        return None
+
+    def _delete_follow(self, db_follow: FollowersModel) -> None:
+        """delete follow edge, invalidate cached privacy decision of the pair and update follow graph"""
+        follower_id, following_id = db_follow.follower_id, db_follow.following_id
+        self.follow_service.delete(db_follow=db_follow)
+        CanViewCache().invalidate(viewer_id=follower_id, author_id=following_id)
+        FollowGraph().remove_edge(follower_id=follower_id, following_id=following_id)
+        return None
+
+    def _get_follow_graph(self) -> FollowGraph:
+        """
+        get follow graph, loaded from approved follow edges when not loaded within its ttl,
+        edges are read in their own session since reloads run in a background thread
+        """
+        bind = self.db_session.get_bind()
+
+        def get_edges() -> Iterator[Tuple[uuid.UUID, uuid.UUID]]:
+            with Session(bind) as session:
+                yield from FollowService(session=session).get_approved_edges()
+
+        follow_graph = FollowGraph()
+        follow_graph.ensure_loaded(get_edges=get_edges)
+        return follow_graph
+
+    def get_relationships(self, current_user: dict, usernames: List[str]) -> List[dict]:
+        """get whether current user follows and is followed by each of the users, unknown usernames are left out"""
+        user_app_service = UserAppService(session=self.db_session)
+        user_id = user_app_service.get_current_user_id(current_user=current_user)
+        if not user_id:
+            raise NotFoundException(get_user_not_created())
+        users = user_app_service.get_users_by_usernames(usernames=usernames)
+        relationships = self._get_follow_graph().get_relationships(
+            user_id=user_id, other_ids=[user.id for user in users]
+        )
         return [
-            following
-            for following in following_list
-            if following.status == StatusType.APPROVED
+            dict(
+                username=user.username,
+                following=relationships[user.id][0],
+                followed_by=relationships[user.id][1],
+            )
+            for user in users
         ]
 
-    def send_request(self, follower: User, user: User) -> FollowersModel:
+    def get_mutual_followers(
+        self, current_user: dict, username: str, size: int
+    ) -> List[User]:
+        """get users the current user follows that follow the user"""
+        user = self.get_user_by_username(username=username)
+        user_app_service = UserAppService(session=self.db_session)
+        user_app_service.check_private_user(current_user=current_user, user=user)
+        user_id = user_app_service.get_current_user_id(current_user=current_user)
+        if not user_id:
+            raise NotFoundException(get_user_not_created())
+        mutual_ids = self._get_follow_graph().get_mutual_ids(
+            user_id=user_id, other_id=user.id
+        )[:size]
+        return user_app_service.get_users_by_ids(ids=mutual_ids)
+
+    def get_suggestions(self, current_user: dict, size: int) -> List[User]:
+        """get users followed by the users current user follows, most followed first"""
+        user_app_service = UserAppService(session=self.db_session)
+        user_id = user_app_service.get_current_user_id(current_user=current_user)
+        if not user_id:
+            raise NotFoundException(get_user_not_created())
+        suggested_ids = self._get_follow_graph().get_suggested_ids(user_id=user_id, size=size)
+        return user_app_service.get_users_by_ids(ids=suggested_ids)
+
+    def send_request(self, follower: User | UserClaims, user: User) -> FollowersModel:
         """send request to the user for private account"""
         follow = FollowRequest(
             follower_id=follower.id, following_id=user.id, status=StatusType.PENDING
         )
-        return self.follow_service.create(follow=follow)
+        return self._create_follow(follow=follow)
 
-    def create_follower(self, follower: User, user: User) -> FollowersModel:
+    def create_follower(self, follower: User | UserClaims, user: User) -> FollowersModel:
         """create follower of the user for public account"""
         follow = FollowRequest(
             follower_id=follower.id, following_id=user.id, status=StatusType.APPROVED
         )
-        return self.follow_service.create(follow=follow)
+        return self._create_follow(follow=follow)
 
     def create_follow_request(
         self, follower_base_user_id: uuid.UUID, username: str
     ) -> FollowersModel:
         """create follower request"""
-        follower = self.get_user_by_base_user_id(base_user_id=follower_base_user_id)
+        follower = self.get_current_user(base_user_id=follower_base_user_id)
         user = self.get_user_by_username(username=username)
-        if user.username == follower.username:
+        if user.id == follower.id:
             raise CustomValidationError(get_send_request_to_yourself())
         if user.profile_type == ProfileType.PRIVATE.value:
             return self.send_request(follower=follower, user=user)
@@ -133,7 +285,7 @@ class FollowAppService:
         self, base_user_id: uuid.UUID, accept_username: str
     ) -> Optional[FollowersModel]:
         """accept follow request"""
-        user = self.get_user_by_base_user_id(base_user_id=base_user_id)
+        user = self.get_current_user(base_user_id=base_user_id)
         follower = self.get_user_by_username(username=accept_username)
         db_follow = self.follow_service.get_follow_for_follower_and_following(
             follower_id=follower.id, following_id=user.id
@@ -143,52 +295,166 @@ class FollowAppService:
         follow = FollowRequest(
             follower_id=follower.id, following_id=user.id, status=StatusType.APPROVED
         )
-        return self.follow_service.update(follow=follow, db_follow=db_follow)
+        return self._update_follow(follow=follow, db_follow=db_follow)
 
     def reject_follow_request(
         self, base_user_id: uuid.UUID, reject_username: str
     ) -> None:
         """reject follow request"""
-        user = self.get_user_by_base_user_id(base_user_id=base_user_id)
+        user = self.get_current_user(base_user_id=base_user_id)
         rejected_user = self.get_user_by_username(username=reject_username)
         db_follow = self.follow_service.get_follow_for_follower_and_following(
             follower_id=rejected_user.id, following_id=user.id
         )
         if not db_follow or db_follow.status != StatusType.PENDING:
             raise BadRequestException(get_reject_request_for_no_follower())
-        return self.follow_service.delete(db_follow=db_follow)
+        return self._delete_follow(db_follow=db_follow)
 
     def cancel_follow_request(
         self, base_user_id: uuid.UUID, cancel_username: str
     ) -> None:
         """cancel follow request"""
-        user = self.get_user_by_base_user_id(base_user_id=base_user_id)
+        user = self.get_current_user(base_user_id=base_user_id)
         cancel_request_user = self.get_user_by_username(username=cancel_username)
         db_follow = self.follow_service.get_follow_for_follower_and_following(
             follower_id=user.id, following_id=cancel_request_user.id
         )
         if not db_follow or db_follow.status != StatusType.PENDING:
             return None
-        return self.follow_service.delete(db_follow=db_follow)
+        return self._delete_follow(db_follow=db_follow)
 
     def unfollow(self, base_user_id: uuid.UUID, unfollow_username: str) -> None:
         """unfollow user"""
-        user = self.get_user_by_base_user_id(base_user_id=base_user_id)
+        user = self.get_current_user(base_user_id=base_user_id)
         unfollow_user = self.get_user_by_username(username=unfollow_username)
         db_follow = self.follow_service.get_follow_for_follower_and_following(
             follower_id=user.id, following_id=unfollow_user.id
         )
         if not db_follow or db_follow.status != StatusType.APPROVED:
             return None
-        return self.follow_service.delete(db_follow=db_follow)
+        TimelineAppService(session=self.db_session).remove_author_posts(
+            user_id=user.id, posted_by=unfollow_user.id
+        )
+        return self._delete_follow(db_follow=db_follow)
 
     def remove_follower(self, base_user_id: uuid.UUID, remove_username: str) -> None:
         """remove follower"""
-        user = self.get_user_by_base_user_id(base_user_id=base_user_id)
+        user = self.get_current_user(base_user_id=base_user_id)
         remove_follower = self.get_user_by_username(username=remove_username)
         db_follow = self.follow_service.get_follow_for_follower_and_following(
             follower_id=remove_follower.id, following_id=user.id
         )
         if not db_follow or db_follow.status != StatusType.APPROVED:
             return None
-        return self.follow_service.delete(db_follow=db_follow)
+        TimelineAppService(session=self.db_session).remove_author_posts(
+            user_id=remove_follower.id, posted_by=user.id
+        )
+        return self._delete_follow(db_follow=db_follow)
+
+    @staticmethod
+    def _get_bulk_results(
+        usernames: Optional[List[str]], users: List[User], applied_ids: List[uuid.UUID]
+    ) -> List[dict]:
+        """result for each username, for each applied user when all pending requests were handled"""
+        if usernames is None:
+            return [
+                dict(username=user.username, result=BulkFollowResult.APPLIED)
+                for user in users
+            ]
+        applied_ids = set(applied_ids)
+        users_by_username = {user.username: user for user in users}
+        results = []
+        for username in dict.fromkeys(usernames):
+            user = users_by_username.get(username)
+            if not user:
+                result = BulkFollowResult.USER_NOT_FOUND
+            elif user.id in applied_ids:
+                result = BulkFollowResult.APPLIED
+            else:
+                result = BulkFollowResult.SKIPPED
+            results.append(dict(username=username, result=result))
+        return results
+
+    def bulk_accept_follow_requests(
+        self, base_user_id: uuid.UUID, usernames: Optional[List[str]] = None
+    ) -> List[dict]:
+        """accept pending requests from usernames, all pending requests when usernames is None, in one transaction"""
+        user = self.get_current_user(base_user_id=base_user_id)
+        user_app_service = UserAppService(session=self.db_session)
+        followers = (
+            None
+            if usernames is None
+            else user_app_service.get_users_by_usernames(usernames=usernames)
+        )
+        approved_ids = self.follow_service.approve_pending_requests(
+            user_id=user.id,
+            follower_ids=None if followers is None else [follower.id for follower in followers],
+        )
+        self._add_to_timeline(follower_ids=approved_ids, following_id=user.id)
+        self.db_session.commit()
+        for follower_id in approved_ids:
+            CanViewCache().invalidate(viewer_id=follower_id, author_id=user.id)
+            FollowGraph().add_edge(follower_id=follower_id, following_id=user.id)
+        if followers is None:
+            followers = user_app_service.get_users_by_ids(ids=approved_ids)
+        return self._get_bulk_results(
+            usernames=usernames, users=followers, applied_ids=approved_ids
+        )
+
+    def _bulk_delete_follows(
+        self,
+        base_user_id: uuid.UUID,
+        usernames: Optional[List[str]],
+        status: StatusType,
+        sent: bool,
+    ) -> List[dict]:
+        """delete follow edges with status sent by (sent=True) or to the user for usernames, all when None, in one transaction"""
+        user = self.get_current_user(base_user_id=base_user_id)
+        user_app_service = UserAppService(session=self.db_session)
+        others = (
+            None
+            if usernames is None
+            else user_app_service.get_users_by_usernames(usernames=usernames)
+        )
+        deleted_ids = self.follow_service.delete_follows(
+            user_id=user.id,
+            status=status,
+            other_ids=None if others is None else [other.id for other in others],
+            sent=sent,
+        )
+        # (follower_id, following_id) of deleted edges
+        follows = [
+            (user.id, other_id) if sent else (other_id, user.id) for other_id in deleted_ids
+        ]
+        if status == StatusType.APPROVED:
+            TimelineAppService(session=self.db_session).remove_followed_authors_posts(
+                pairs=follows
+            )
+        self.db_session.commit()
+        follow_graph = FollowGraph()
+        for follower_id, following_id in follows:
+            CanViewCache().invalidate(viewer_id=follower_id, author_id=following_id)
+            follow_graph.remove_edge(follower_id=follower_id, following_id=following_id)
+        if others is None:
+            others = user_app_service.get_users_by_ids(ids=deleted_ids)
+        return self._get_bulk_results(usernames=usernames, users=others, applied_ids=deleted_ids)
+
+    def bulk_reject_follow_requests(
+        self, base_user_id: uuid.UUID, usernames: Optional[List[str]] = None
+    ) -> List[dict]:
+        """reject pending requests from usernames, all pending requests when usernames is None, in one transaction"""
+        return self._bulk_delete_follows(
+            base_user_id=base_user_id, usernames=usernames, status=StatusType.PENDING, sent=False
+        )
+
+    def bulk_unfollow(self, base_user_id: uuid.UUID, usernames: List[str]) -> List[dict]:
+        """unfollow users by usernames in one transaction"""
+        return self._bulk_delete_follows(
+            base_user_id=base_user_id, usernames=usernames, status=StatusType.APPROVED, sent=True
+        )
+
+    def bulk_remove_followers(self, base_user_id: uuid.UUID, usernames: List[str]) -> List[dict]:
+        """remove followers by usernames in one transaction"""
+        return self._bulk_delete_follows(
+            base_user_id=base_user_id, usernames=usernames, status=StatusType.APPROVED, sent=False
+        )
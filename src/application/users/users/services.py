@@ -1,4 +1,4 @@
-from typing import Optional, List
+from typing import Iterator, Optional, List
 import uuid
 
 from sqlmodel import Session
@@ -6,13 +6,32 @@ from fastapi import UploadFile
 from faker import Faker
 
 from src.domain.models import User
-from src.domain.users.users.services import UserService
+from src.domain.users.users.services import UserService, USER_EXPORT_FIELDS
+from src.domain.users.users.follow_management.services import FollowService, CanViewCache
+from src.domain.users.users.follow_management.graph import FollowGraph
+from src.application.identity_map import IdentityMap
 from src.interface.users.users.schemas import UserWithProfile, UserWithBaseUserId
-from src.infrastructure.file_upload.services import Boto3Service
-from lib.fastapi.custom_enums import ProfileType, Role, StatusType
+from src.interface.auth.schemas import UserClaims
+from src.infrastructure.auth_service.services import ClaimsVersionCache
+from src.application.posts.media.services import MediaAppService, BLOB_OBJECT_KEY_PREFIX
+from src.application.posts.timeline.services import TimelineAppService
+from lib.fastapi.custom_enums import ProfileType, Role, ExportFormat
 from lib.fastapi.custom_exceptions import ForbiddenException, CustomValidationError, BadRequestException
-from lib.fastapi.error_string import get_user_is_private, get_user_not_created, get_admin_to_not_create_user
-from lib.fastapi.utils import check_id
+from lib.fastapi.custom_schemas import UploadFileSchema, DirectUploadSchema, UploadedFileSchema
+from lib.fastapi.error_string import (
+    get_user_is_private,
+    get_user_not_created,
+    get_admin_to_not_create_user,
+    get_invalid_object_key,
+)
+from lib.fastapi.utils import (
+    check_id,
+    get_valid_image_formats_list,
+    decode_cursor,
+    get_cursor_page,
+    iter_export_chunks,
+)
+from src.setup.config.settings import settings
 
 class UserAppService:
     """services for user model"""
@@ -20,23 +39,110 @@ class UserAppService:
     def __init__(self, session: Session):
         self.db_session = session
         self.user_service = UserService(session=self.db_session)
+        self.identity_map = IdentityMap.for_session(session=self.db_session)
 
     def get_user_by_username(self, username: str) -> Optional[User]:
-        """get user by username"""
-        return self.user_service.get_user_by_username(username=username)
+        """get user by username, served from identity map when already loaded in the request"""
+        return self.identity_map.get(
+            model=User,
+            field="username",
+            value=username,
+            loader=lambda: self.user_service.get_user_by_username(username=username),
+        )
 
     def get_user_by_id(self, id: uuid.UUID) -> Optional[User]:
-        """get user by id"""
-        return self.user_service.get_user_by_id(id=id)
+        """get user by id, served from identity map when already loaded in the request"""
+        return self.identity_map.get(
+            model=User,
+            field="id",
+            value=id,
+            loader=lambda: self.user_service.get_user_by_id(id=id),
+        )
 
     def get_user_by_base_user_id(self, base_user_id: uuid.UUID) -> Optional[User]:
-        """get user by base_user_id"""
-        return self.user_service.get_user_by_base_user_id(base_user_id=base_user_id)
+        """get user by base_user_id, served from identity map when already loaded in the request"""
+        return self.identity_map.get(
+            model=User,
+            field="base_user_id",
+            value=base_user_id,
+            loader=lambda: self.user_service.get_user_by_base_user_id(base_user_id=base_user_id),
+        )
+
+    def get_users_by_ids(self, ids: List[uuid.UUID]) -> List[User]:
+        """get users with any of the ids in the order of ids"""
+        users = {user.id: user for user in self.user_service.get_users_by_ids(ids=ids)}
+        for user in users.values():
+            self.identity_map.add(row=user)
+        return [users[id] for id in ids if id in users]
+
+    def get_users_by_usernames(self, usernames: List[str]) -> List[User]:
+        """get users with any of the usernames in the order of usernames"""
+        users = {
+            user.username: user
+            for user in self.user_service.get_users_by_usernames(usernames=usernames)
+        }
+        for user in users.values():
+            self.identity_map.add(row=user)
+        return [users[username] for username in dict.fromkeys(usernames) if username in users]
+
+    def get_current_user(
+        self, current_user: dict, check_exists: bool = False
+    ) -> Optional[User | UserClaims]:
+        """
+        get current user from access token claims, the user row is loaded only for tokens without claims,
+        check_exists makes sure the user was not deleted meanwhile before rows referencing it are written
+        """
+        if current_user.get("user_id"):
+            if check_exists and not self.user_service.exists(
+                id=check_id(id=current_user["user_id"])
+            ):
+                return None
+            return UserClaims(
+                id=check_id(id=current_user["user_id"]),
+                base_user_id=check_id(id=current_user["id"]),
+                username=current_user["username"],
+                profile_type=current_user["profile_type"],
+            )
+        return self.get_user_by_base_user_id(base_user_id=check_id(id=current_user.get("id")))
+
+    def get_current_user_id(self, current_user: dict) -> Optional[uuid.UUID]:
+        """get user id of current user from access token claims, looked up for tokens without claims"""
+        if current_user.get("user_id"):
+            return check_id(id=current_user["user_id"])
+        db_user = self.get_user_by_base_user_id(base_user_id=check_id(id=current_user.get("id")))
+        return db_user.id if db_user else None
 
     def get_all_users(self) -> List[User]:
         """get all users list"""
         return self.user_service.get_all_users()
 
+    def get_users_page(self, size: int, cursor: Optional[str] = None) -> dict:
+        """get page of users newest first using keyset cursor"""
+        users = self.user_service.get_users_after_cursor(
+            size=size, cursor=decode_cursor(cursor=cursor) if cursor else None
+        )
+        return get_cursor_page(rows=users, size=size)
+
+    def export_users(self, export_format: ExportFormat) -> Iterator[str]:
+        """
+        stream all users as ndjson or csv chunks, rows are read in its own session
+        since the request session is closed before a streaming response is sent
+        """
+        bind = self.db_session.get_bind()
+
+        def iter_chunks() -> Iterator[str]:
+            with Session(bind) as session:
+                yield from iter_export_chunks(
+                    rows=UserService(session=session).get_export_rows(
+                        batch_size=settings.EXPORT_BATCH_SIZE
+                    ),
+                    fields=USER_EXPORT_FIELDS,
+                    export_format=export_format,
+                    chunk_size=settings.EXPORT_BATCH_SIZE,
+                )
+
+        return iter_chunks()
+
     def get_all_public_users(self) -> List[User]:
         """get all public users list"""
         return self.user_service.get_all_public_users()
@@ -55,48 +161,106 @@ class UserAppService:
         db_user = self.get_user_by_base_user_id(base_user_id=user.base_user_id)
         if not db_user:
             raise CustomValidationError(get_user_not_created())
+        approved_follower_ids = []
         if user.profile_type == ProfileType.PUBLIC:
-            # get followers list with status type pending
-            followers = [follower for follower in db_user.followers]
-            # update all to status type approved
-            for follower in followers:
-                if follower.status == StatusType.PENDING:
-                    follower.status = StatusType.APPROVED
+            # pending requests are approved with the user update in one transaction
+            approved_follower_ids = FollowService(
+                session=self.db_session
+            ).approve_pending_requests(user_id=db_user.id)
+            # recent posts of the user are written to approved followers' timelines in the same transaction
+            TimelineAppService(session=self.db_session).add_author_posts(
+                user_ids=approved_follower_ids, posted_by=db_user.id
+            )
         # if user.profile:
             #delete db_user profile (not needed because it will override)
-        return self.user_service.update(user=user, db_user=db_user)
+        previous_profile = db_user.profile
+        claims_changed = (
+            user.username != db_user.username or user.profile_type != db_user.profile_type
+        )
+        if claims_changed:
+            # access tokens with the old username or profile type lose their claims
+            db_user.claims_version += 1
+        # username may change
+        self.identity_map.discard(row=db_user)
+        db_user = self.user_service.update(user=user, db_user=db_user)
+        self.identity_map.add(row=db_user)
+        if approved_follower_ids:
+            self._apply_approved_requests(user=db_user, follower_ids=approved_follower_ids)
+        if claims_changed:
+            ClaimsVersionCache().set(
+                base_user_id=str(db_user.base_user_id), version=db_user.claims_version
+            )
+        self._release_previous_profile(previous_profile=previous_profile, db_user=db_user)
+        return db_user
+
+    @staticmethod
+    def _apply_approved_requests(user: User, follower_ids: List[uuid.UUID]) -> None:
+        """update privacy decisions and follow graph after pending requests sent to the user were approved"""
+        CanViewCache().invalidate_author(author_id=user.id)
+        follow_graph = FollowGraph()
+        for follower_id in follower_ids:
+            follow_graph.add_edge(follower_id=follower_id, following_id=user.id)
+        return None
+
+    def _release_previous_profile(self, previous_profile: Optional[str], db_user: User) -> None:
+        """release replaced content addressed profile, other profiles are overridden in place"""
+        if (
+            previous_profile
+            and previous_profile != db_user.profile
+            and previous_profile.startswith(BLOB_OBJECT_KEY_PREFIX)
+        ):
+            MediaAppService(session=self.db_session).delete_media_object(
+                object_key=previous_profile
+            )
+
+    @staticmethod
+    def invalidate_claims(user: User) -> None:
+        """drop claims from access tokens of user being deleted so handlers look the user up and find none"""
+        ClaimsVersionCache().set(
+            base_user_id=str(user.base_user_id), version=user.claims_version + 1
+        )
 
     def delete_user(self, base_user_id: uuid.UUID) -> None:
         """delete user by base_user_id"""
         user = self.get_user_by_base_user_id(base_user_id=base_user_id)
         if not user:
             return None
+        self.invalidate_claims(user=user)
+        media_app_service = MediaAppService(session=self.db_session)
+        object_keys = media_app_service.release_user_media(user=user)
+        self.identity_map.discard(row=user)
+        FollowService(session=self.db_session).release_follow_counts(user_id=user.id)
         self.user_service.delete(user=user)
+        FollowGraph().remove_user(user_id=user.id)
+        # removed from minio by the deletion worker
+        media_app_service.schedule_deletion(object_keys=object_keys)
         return None
     
-    @staticmethod
-    def get_user_id_of_followers(user:User) -> List[uuid.UUID]:
-        """get list of user ids of all followers of user"""
-        return [
-            follower.follower.id
-            for follower in user.followers
-            if follower.status == StatusType.APPROVED
-        ]
+    def can_view_private_user(self, viewer_id: uuid.UUID, author_id: uuid.UUID) -> bool:
+        """
+        check viewer is an approved follower of private author with one indexed EXISTS query,
+        decisions are cached for CAN_VIEW_CACHE_TTL_SECONDS
+        """
+        cache = CanViewCache()
+        can_view = cache.get(viewer_id=viewer_id, author_id=author_id)
+        if can_view is None:
+            can_view = FollowService(session=self.db_session).is_approved_follower(
+                follower_id=viewer_id, following_id=author_id
+            )
+            cache.set(viewer_id=viewer_id, author_id=author_id, can_view=can_view)
+        return can_view
 
     def check_private_user(self, current_user: dict, user: User) -> None:
         """check if user is private and whether current user follows the user"""
         if current_user["role"] != Role.ADMIN.value:
-            current_user_id = check_id(id=current_user.get("id"))
-            db_user = self.get_user_by_base_user_id(base_user_id=current_user_id)
-            if db_user:
+            current_user_id = self.get_current_user_id(current_user=current_user)
+            if current_user_id:
                 if user.profile_type == ProfileType.PRIVATE.value:
-                    followers_user_id = self.get_user_id_of_followers(user=user)
-                    # print(user.followers)
-                    # print(followers_user_id)
-                    # print(db_user)
-                    if db_user.id == user.id:
+                    if current_user_id == user.id:
                         return None
-                    if db_user.id not in followers_user_id:
+                    if not self.can_view_private_user(
+                        viewer_id=current_user_id, author_id=user.id
+                    ):
                         raise ForbiddenException(get_user_is_private())
 
     def create_dummy_user(self, base_user_id: uuid.UUID) -> User:
@@ -112,16 +276,52 @@ class UserAppService:
         return db_user
 
     @staticmethod
-    def handle_profile_upload(profile: UploadFile, user: UserWithBaseUserId) -> str:
-        """create object key and handle file upload"""
-        get_file_extension = str(profile.filename).split(".")[-1]
-        object_key = (
-            f"profiles/{user.base_user_id}/{user.base_user_id}.{get_file_extension}"
+    def get_profile_object_key(base_user_id: uuid.UUID, filename: str) -> str:
+        """create object key for profile"""
+        get_file_extension = str(filename).split(".")[-1]
+        return f"profiles/{base_user_id}/{base_user_id}.{get_file_extension}"
+
+    def handle_profile_upload(self, profile: UploadFile, user: UserWithBaseUserId) -> str:
+        """create object key and handle file upload, returns object key the profile is stored under"""
+        object_key = UserAppService.get_profile_object_key(
+            base_user_id=user.base_user_id, filename=profile.filename
         )
-        boto3_service = Boto3Service()
-        boto3_service.upload_file_from_memory(
-            object_key=object_key,
-            file_content=profile.file,
-            file_type=profile.content_type,
+        return MediaAppService(session=self.db_session).upload_media(
+            files=[(profile, object_key)]
+        )[0]
+
+    @staticmethod
+    def create_profile_direct_upload(
+        profile: UploadFileSchema, base_user_id: uuid.UUID
+    ) -> DirectUploadSchema:
+        """get presigned upload to send profile directly to storage"""
+        return MediaAppService.create_direct_upload(
+            file=profile,
+            object_key=UserAppService.get_profile_object_key(
+                base_user_id=base_user_id, filename=profile.filename
+            ),
         )
-        return object_key
+
+    def finalize_profile_upload(
+        self, base_user_id: uuid.UUID, uploaded: UploadedFileSchema
+    ) -> User:
+        """check profile uploaded directly to storage and save it with the user"""
+        if not uploaded.object_key.startswith(f"profiles/{base_user_id}/"):
+            raise CustomValidationError(get_invalid_object_key())
+        db_user = self.get_user_by_base_user_id(base_user_id=base_user_id)
+        if not db_user:
+            raise CustomValidationError(get_user_not_created())
+        MediaAppService.check_uploaded_media(
+            uploaded=uploaded, valid_types=get_valid_image_formats_list()
+        )
+        user = UserWithProfile(
+            username=db_user.username,
+            bio=db_user.bio,
+            profile_type=db_user.profile_type,
+            base_user_id=db_user.base_user_id,
+            profile=uploaded.object_key,
+        )
+        previous_profile = db_user.profile
+        db_user = self.user_service.update(user=user, db_user=db_user)
+        self._release_previous_profile(previous_profile=previous_profile, db_user=db_user)
+        return db_user
@@ -6,8 +6,9 @@ from ..users.users.follow_management.models import FollowersModel
 from ..posts.models import Post
 from ..posts.likes.models import Likes
 from ..posts.comments.models import Comments
-from ..posts.media.models import Media
+from ..posts.media.models import Media, MediaBlob, PendingDeletion
 from ..posts.reported_posts.models import ReportPost
+from ..posts.timeline.models import Timeline
 
 from ..payments.subscription.models import Subscription
 from ..payments.transaction.models import Transaction
@@ -22,7 +23,10 @@ __all__ = [
     "Likes",
     "Comments",
     "Media",
+    "MediaBlob",
+    "PendingDeletion",
     "ReportPost",
+    "Timeline",
     "Subscription", 
     "Transaction"
 ]
@@ -1,7 +1,7 @@
 import uuid
 from typing import TYPE_CHECKING
 
-from sqlmodel import Field, Relationship
+from sqlmodel import Field, Relationship, Index
 
 from lib.fastapi.custom_models import BaseModel
 
@@ -12,6 +12,16 @@ if TYPE_CHECKING:
 class Comments(BaseModel, table=True):
     """:model: for post's comment management"""
 
+    __table_args__ = (
+        Index(
+            "ix_comments_post_id_created_at_id",
+            "post_id",
+            "created_at",
+            "id",
+            postgresql_include=["commented_by"],
+        ),
+    )
+
     commented_by: uuid.UUID = Field(foreign_key="user.id", ondelete="CASCADE")
     post_id: uuid.UUID = Field(foreign_key="post.id", ondelete="CASCADE")
     comment: str = Field(min_length=1, max_length=300)
@@ -1,11 +1,15 @@
 import uuid
-from typing import Optional
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
 
-from sqlmodel import Session
+from sqlmodel import Session, select, desc, col, tuple_
+from sqlalchemy import Row
 
 from .models import Comments
+from src.domain.models import User
 from src.interface.posts.comments.schemas import CommentPost
 from lib.fastapi.utils import db_session_value_create
+from src.domain.posts.services import PostCountBuffer
 
 class CommentService:
     """handle comment database operations"""
@@ -16,13 +20,49 @@ class CommentService:
         """get comment by comment id"""
         return self.db_session.get(Comments, id)
     
+    def get_comments_by_post_id_after_cursor(
+        self,
+        post_id: uuid.UUID,
+        size: int,
+        cursor: Optional[Tuple[datetime, uuid.UUID]] = None,
+    ) -> Sequence[Row]:
+        """
+        get comments on post with commenter's username ordered by (created_at, id) newest first after the keyset cursor,
+        one extra row is fetched to know if a next page exists
+        """
+        statement = (
+            select(
+                Comments.id,
+                Comments.created_at,
+                Comments.commented_by,
+                Comments.post_id,
+                Comments.comment,
+                User.username,
+            )
+            .join(User, col(User.id) == Comments.commented_by)
+            .where(Comments.post_id == post_id)
+        )
+        if cursor:
+            statement = statement.where(tuple_(Comments.created_at, Comments.id) < cursor)
+        statement = statement.order_by(
+            desc(Comments.created_at), desc(Comments.id)
+        ).limit(size + 1)
+        return self.db_session.exec(statement).all()
+
     def create(self, comment:CommentPost) -> Comments:
         """create comment on post"""
         db_comment = Comments.model_validate(comment)
         db_session_value_create(session=self.db_session, value=db_comment)
+        post_count_buffer = PostCountBuffer()
+        post_count_buffer.add(post_id=db_comment.post_id, comment_delta=1)
+        post_count_buffer.flush_if_due(session=self.db_session)
         return db_comment
 
     def delete(self, db_comment:Comments) -> None:
         """delete comment from the post"""
+        post_id = db_comment.post_id
         self.db_session.delete(db_comment)
-        self.db_session.commit()
\ No newline at end of file
+        self.db_session.commit()
+        post_count_buffer = PostCountBuffer()
+        post_count_buffer.add(post_id=post_id, comment_delta=-1)
+        post_count_buffer.flush_if_due(session=self.db_session)
\ No newline at end of file
@@ -1,7 +1,7 @@
 import uuid
 from typing import TYPE_CHECKING
 
-from sqlmodel import Field, Relationship, UniqueConstraint
+from sqlmodel import Field, Relationship, UniqueConstraint, Index
 
 from lib.fastapi.custom_models import BaseModel
 
@@ -12,7 +12,16 @@ if TYPE_CHECKING:
 class Likes(BaseModel, table=True):
     """:model: for post's like management"""
 
-    __table_args__ = (UniqueConstraint("liked_by", "post_id", name="LikedAlready"),)
+    __table_args__ = (
+        UniqueConstraint("liked_by", "post_id", name="LikedAlready"),
+        Index(
+            "ix_likes_post_id_created_at_id",
+            "post_id",
+            "created_at",
+            "id",
+            postgresql_include=["liked_by"],
+        ),
+    )
 
     liked_by: uuid.UUID = Field(foreign_key="user.id", ondelete="CASCADE")
     post_id: uuid.UUID = Field(foreign_key="post.id", ondelete="CASCADE")
@@ -1,10 +1,15 @@
 import uuid
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
 
-from sqlmodel import Session, select
+from sqlmodel import Session, select, desc, col, tuple_
+from sqlalchemy import Row
 
 from .models import Likes
+from src.domain.models import User
 from src.interface.posts.likes.schemas import LikePost
 from lib.fastapi.utils import db_session_value_create
+from src.domain.posts.services import PostCountBuffer
 
 class LikeService:
     """handle like database operations"""
@@ -19,13 +24,42 @@ class LikeService:
             .where(Likes.liked_by == liked_by)
         ).first()
     
+    def get_likes_by_post_id_after_cursor(
+        self,
+        post_id: uuid.UUID,
+        size: int,
+        cursor: Optional[Tuple[datetime, uuid.UUID]] = None,
+    ) -> Sequence[Row]:
+        """
+        get likes on post with liker's username ordered by (created_at, id) newest first after the keyset cursor,
+        one extra row is fetched to know if a next page exists
+        """
+        statement = (
+            select(Likes.id, Likes.created_at, Likes.liked_by, User.username)
+            .join(User, col(User.id) == Likes.liked_by)
+            .where(Likes.post_id == post_id)
+        )
+        if cursor:
+            statement = statement.where(tuple_(Likes.created_at, Likes.id) < cursor)
+        statement = statement.order_by(desc(Likes.created_at), desc(Likes.id)).limit(
+            size + 1
+        )
+        return self.db_session.exec(statement).all()
+
     def create(self, like:LikePost) -> Likes:
         """create like on post"""
         db_like = Likes.model_validate(like)
         db_session_value_create(session=self.db_session, value=db_like)
+        post_count_buffer = PostCountBuffer()
+        post_count_buffer.add(post_id=db_like.post_id, like_delta=1)
+        post_count_buffer.flush_if_due(session=self.db_session)
         return db_like
 
     def delete(self, db_like:Likes) -> None:
         """delete like from the post"""
+        post_id = db_like.post_id
         self.db_session.delete(db_like)
-        self.db_session.commit()
\ No newline at end of file
+        self.db_session.commit()
+        post_count_buffer = PostCountBuffer()
+        post_count_buffer.add(post_id=post_id, like_delta=-1)
+        post_count_buffer.flush_if_due(session=self.db_session)
\ No newline at end of file
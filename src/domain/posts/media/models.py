@@ -1,7 +1,8 @@
 import uuid
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, List, Optional
 
-from sqlmodel import Field, Relationship
+from sqlmodel import Field, Relationship, Column
+from sqlalchemy.dialects.postgresql import JSONB
 from lib.fastapi.custom_models import BaseModel
 
 if TYPE_CHECKING:
@@ -14,5 +15,27 @@ class Media(BaseModel, table=True):
     post_id: uuid.UUID = Field(foreign_key="post.id", ondelete="CASCADE")
     media_url: str = Field()
     media_type: str = Field()
+    # resized copies of images ({width, height, format, object_key, size}), set once processed
+    variants: Optional[List[dict]] = Field(default=None, sa_column=Column(JSONB(none_as_null=True)))
+    placeholder: Optional[str] = Field(default=None)
 
     post: "Post" = Relationship(back_populates="media")
+
+
+class MediaBlob(BaseModel, table=True):
+    """:model: for content addressed media stored once and shared by every media (and profile) with its object key"""
+
+    object_key: str = Field(unique=True)
+    sha256: str = Field(unique=True)
+    size: int = Field()
+    content_type: str = Field()
+    # number of media and profiles using the blob, the object is deleted when it reaches zero
+    ref_count: int = Field(default=1)
+
+
+class PendingDeletion(BaseModel, table=True):
+    """:model: for storage objects waiting to be deleted by the deletion worker"""
+
+    object_key: str = Field(unique=True)
+    attempts: int = Field(default=0)
+    last_error: Optional[str] = Field(default=None)
@@ -1,8 +1,13 @@
-from sqlmodel import Session
+import uuid
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlmodel import Session, select, update, delete, func
+from sqlalchemy.dialects.postgresql import insert
 
 from src.interface.posts.media.schemas import MediaSchema
 from lib.fastapi.utils import db_session_value_create
-from .models import Media
+from src.domain.posts.models import Post
+from .models import Media, MediaBlob, PendingDeletion
 
 
 class MediaService:
@@ -16,3 +21,178 @@ class MediaService:
         db_media = Media.model_validate(media)
         db_session_value_create(session=self.db_session, value=db_media)
         return db_media
+
+    def create_all_media(self, media: List[MediaSchema]) -> List[Media]:
+        """create all media rows of a post in a single transaction"""
+        db_media = [Media.model_validate(item) for item in media]
+        self.db_session.add_all(db_media)
+        self.db_session.commit()
+        return db_media
+
+    def get_media_by_id(self, id: uuid.UUID) -> Optional[Media]:
+        """get media by id"""
+        return self.db_session.get(Media, id)
+
+    def get_media_by_user_id(self, user_id: uuid.UUID) -> List[Media]:
+        """get media of all posts of user"""
+        return list(
+            self.db_session.scalars(
+                select(Media).join(Post, Post.id == Media.post_id).where(Post.posted_by == user_id)
+            ).all()
+        )
+
+    def get_processed_media_by_media_url(self, media_url: str) -> Optional[Media]:
+        """get media with same object whose variants are already created"""
+        return self.db_session.scalars(
+            select(Media).where(Media.media_url == media_url, Media.variants.is_not(None))
+        ).first()
+
+    def update_media_url(self, db_media: Media, media_url: str) -> Media:
+        """point media to another stored object"""
+        db_media.media_url = media_url
+        db_session_value_create(session=self.db_session, value=db_media)
+        return db_media
+
+    def update_variants(
+        self, db_media: Media, variants: List[dict], placeholder: Optional[str]
+    ) -> Media:
+        """save resized variants and placeholder of media"""
+        db_media.variants = variants
+        db_media.placeholder = placeholder
+        db_session_value_create(session=self.db_session, value=db_media)
+        return db_media
+
+
+class MediaBlobService:
+    """handle database tasks for reference counted content addressed blobs"""
+
+    def __init__(self, session: Session):
+        self.db_session = session
+
+    def get_blob_by_object_key(self, object_key: str) -> Optional[MediaBlob]:
+        """get blob by object_key"""
+        return self.db_session.scalars(
+            select(MediaBlob).where(MediaBlob.object_key == object_key)
+        ).first()
+
+    def get_existing_object_keys(self, object_keys: List[str]) -> Set[str]:
+        """get object keys of recorded blobs among object_keys"""
+        return set(
+            self.db_session.scalars(
+                select(MediaBlob.object_key).where(MediaBlob.object_key.in_(object_keys))
+            ).all()
+        )
+
+    def acquire(self, sha256: str) -> Optional[str]:
+        """add reference to existing blob with content hash, returns its object_key or None if not stored yet"""
+        object_key = self.db_session.scalar(
+            update(MediaBlob)
+            .where(MediaBlob.sha256 == sha256)
+            .values(ref_count=MediaBlob.ref_count + 1)
+            .returning(MediaBlob.object_key)
+        )
+        self.db_session.commit()
+        return object_key
+
+    def create_or_acquire(
+        self, sha256: str, object_key: str, size: int, content_type: str
+    ) -> None:
+        """record uploaded blob, adds a reference if the same content was recorded meanwhile"""
+        blob = MediaBlob(
+            sha256=sha256, object_key=object_key, size=size, content_type=content_type
+        )
+        self.db_session.execute(
+            insert(MediaBlob)
+            .values(**blob.model_dump())
+            .on_conflict_do_update(
+                index_elements=[MediaBlob.sha256],
+                set_={"ref_count": MediaBlob.ref_count + 1},
+            )
+        )
+        self.db_session.commit()
+
+    def release(self, object_key: str) -> Optional[int]:
+        """
+        remove reference to blob, the blob is deleted and its object queued for deletion
+        when no references are left
+
+        Returns:
+            Optional[int]: references left, None if object_key is not a blob
+        """
+        ref_count = self.db_session.scalar(
+            update(MediaBlob)
+            .where(MediaBlob.object_key == object_key)
+            .values(ref_count=MediaBlob.ref_count - 1)
+            .returning(MediaBlob.ref_count)
+        )
+        if ref_count is not None and ref_count <= 0:
+            self.db_session.execute(
+                delete(MediaBlob).where(
+                    MediaBlob.object_key == object_key, MediaBlob.ref_count <= 0
+                )
+            )
+            # queued in the release transaction so an upload of the same content after it cancels the deletion
+            self.db_session.execute(
+                insert(PendingDeletion)
+                .values(PendingDeletion(object_key=object_key).model_dump())
+                .on_conflict_do_nothing(index_elements=[PendingDeletion.object_key])
+            )
+        self.db_session.commit()
+        return ref_count
+
+
+class PendingDeletionService:
+    """handle database tasks for storage objects waiting to be deleted"""
+
+    def __init__(self, session: Session):
+        self.db_session = session
+
+    def add_all(self, object_keys: Iterable[str]) -> None:
+        """record objects to delete, objects already waiting are skipped"""
+        values = [PendingDeletion(object_key=object_key).model_dump() for object_key in set(object_keys)]
+        if not values:
+            return None
+        self.db_session.execute(
+            insert(PendingDeletion).values(values).on_conflict_do_nothing(
+                index_elements=[PendingDeletion.object_key]
+            )
+        )
+        self.db_session.commit()
+
+    def get_batch(self, limit: int, max_attempts: int) -> List[str]:
+        """
+        lock oldest objects to delete, rows locked by other workers are skipped,
+        locks are held until delete_all or record_failures commits
+        """
+        return list(
+            self.db_session.scalars(
+                select(PendingDeletion.object_key)
+                .where(PendingDeletion.attempts < max_attempts)
+                .order_by(PendingDeletion.created_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            ).all()
+        )
+
+    def delete_all(self, object_keys: List[str]) -> None:
+        """remove deleted objects"""
+        self.db_session.execute(
+            delete(PendingDeletion).where(PendingDeletion.object_key.in_(object_keys))
+        )
+
+    def record_failures(self, errors: Dict[str, str]) -> None:
+        """count failed attempt of objects that could not be deleted"""
+        for object_key, error in errors.items():
+            self.db_session.execute(
+                update(PendingDeletion)
+                .where(PendingDeletion.object_key == object_key)
+                .values(attempts=PendingDeletion.attempts + 1, last_error=error)
+            )
+
+    def commit(self) -> None:
+        """commit drained batch and release its locks"""
+        self.db_session.commit()
+
+    def count(self) -> int:
+        """count objects waiting to be deleted"""
+        return self.db_session.scalar(select(func.count(PendingDeletion.id)))
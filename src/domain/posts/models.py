@@ -1,10 +1,14 @@
 import uuid
 from typing import Optional, TYPE_CHECKING, List
 
-from sqlmodel import Field, Relationship
+from sqlmodel import Field, Relationship, Index, Column, Computed, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 
 from lib.fastapi.custom_models import BaseModel
 
+# text search configuration used for caption_search column and search queries
+CAPTION_SEARCH_CONFIG = "english"
+
 if TYPE_CHECKING:
     from .likes.models import Likes
     from .comments.models import Comments
@@ -15,8 +19,45 @@ if TYPE_CHECKING:
 class Post(BaseModel, table=True):
     """:model: for user's post management"""
 
+    __table_args__ = (
+        Index("ix_post_posted_by_created_at_id", "posted_by", "created_at", "id"),
+        Index("ix_post_caption_search", "caption_search", postgresql_using="gin"),
+        # posts merged into feeds at read time, see Timeline
+        Index(
+            "ix_post_posted_by_created_at_id_not_fanned_out",
+            "posted_by",
+            "created_at",
+            "id",
+            postgresql_where=text("NOT fanned_out"),
+        ),
+    )
+
     posted_by: uuid.UUID = Field(foreign_key="user.id", ondelete="CASCADE")
     caption: Optional[str] = Field(default=None)
+    # generated by postgres from caption, stays in sync on every insert and update,
+    # psycopg2 reads tsvector as its text form, only used in queries and never serialized
+    caption_search: Optional[str] = Field(
+        default=None,
+        exclude=True,
+        sa_column=Column(
+            TSVECTOR,
+            Computed(
+                f"to_tsvector('{CAPTION_SEARCH_CONFIG}'::regconfig, coalesce(caption, ''))",
+                persisted=True,
+            ),
+        ),
+    )
+    # True once the post is written to the timeline of every follower
+    fanned_out: bool = Field(
+        default=False, nullable=False, sa_column_kwargs={"server_default": text("false")}
+    )
+    # denormalized counts, kept up to date by PostCountBuffer and reconciled periodically
+    like_count: int = Field(
+        default=0, nullable=False, sa_column_kwargs={"server_default": text("0")}
+    )
+    comment_count: int = Field(
+        default=0, nullable=False, sa_column_kwargs={"server_default": text("0")}
+    )
 
     media: List["Media"] = Relationship(
         back_populates="post", sa_relationship_kwargs={"cascade": "delete"}
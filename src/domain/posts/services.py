@@ -1,13 +1,158 @@
 import uuid
-from typing import List, Optional, Sequence
+import time
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Set, Tuple
 
-from sqlmodel import Session, select, desc, col, and_, or_
-from sqlalchemy.orm import joinedload
+from sqlmodel import Session, select, desc, col, or_, tuple_, func, exists, update, bindparam
+from sqlmodel.sql.expression import Select
+from sqlalchemy import tablesample, Engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.engine import ScalarResult
+from sqlalchemy.orm import joinedload, selectinload, aliased
+from fastapi_pagination import Page, Params
+from fastapi_pagination.ext.sqlmodel import paginate
 
-from src.domain.models import Post, Likes, User
+from src.domain.models import Post, Likes, Comments, User, FollowersModel
+from src.domain.posts.models import CAPTION_SEARCH_CONFIG
 from src.interface.posts.schemas import PostSchema
+from src.setup.config.settings import settings
 from lib.fastapi.utils import db_session_value_create, get_after_date_from_enum
-from lib.fastapi.custom_enums import FilterDates
+from lib.fastapi.custom_enums import FilterDates, ProfileType, StatusType
+
+
+class ExplainJson(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) of a statement, compiled with the statement's bound parameters"""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(ExplainJson)
+def _compile_explain_json(element: ExplainJson, compiler, **kw) -> str:
+    """search text stays a bound parameter instead of being rendered into the sql"""
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+class PostCountBuffer:
+    """
+    in-process accumulator of like/comment count changes per post,
+    flushed to the post table in batches instead of one UPDATE per like or comment,
+    the flusher thread flushes changes of idle processes every POST_COUNT_FLUSH_SECONDS
+    """
+
+    def __new__(cls):
+        if not hasattr(cls, "instance"):
+            cls.instance = super(PostCountBuffer, cls).__new__(cls)
+            cls.instance._lock = threading.Lock()
+            cls.instance._deltas = defaultdict(lambda: [0, 0])
+            cls.instance._pending = 0
+            cls.instance._last_flush = time.monotonic()
+            cls.instance._stop_flusher = None
+        return cls.instance
+
+    def add(self, post_id: uuid.UUID, like_delta: int = 0, comment_delta: int = 0) -> None:
+        """add like and comment count change of the post"""
+        with self._lock:
+            deltas = self._deltas[post_id]
+            deltas[0] += like_delta
+            deltas[1] += comment_delta
+            self._pending += 1
+
+    def is_flush_due(self) -> bool:
+        """check if enough changes are pending or enough time has passed since last flush"""
+        return self._pending >= settings.POST_COUNT_FLUSH_SIZE or (
+            self._pending > 0
+            and time.monotonic() - self._last_flush >= settings.POST_COUNT_FLUSH_SECONDS
+        )
+
+    def get_pending_post_ids(self) -> Set[uuid.UUID]:
+        """ids of posts with changes not flushed yet"""
+        with self._lock:
+            return {
+                post_id for post_id, deltas in self._deltas.items() if deltas[0] or deltas[1]
+            }
+
+    def _take(self) -> Dict[uuid.UUID, list]:
+        """take pending changes leaving the buffer empty"""
+        with self._lock:
+            deltas = self._deltas
+            self._deltas = defaultdict(lambda: [0, 0])
+            self._pending = 0
+            self._last_flush = time.monotonic()
+        return deltas
+
+    def flush(self, session: Session) -> int:
+        """
+        apply pending changes with a single batched `UPDATE post SET like_count = like_count + d`
+        `Returns`
+            [int]:
+                number of posts updated
+        """
+        deltas = self._take()
+        rows = [
+            {"post_id": post_id, "like_delta": like_delta, "comment_delta": comment_delta}
+            for post_id, (like_delta, comment_delta) in deltas.items()
+            if like_delta or comment_delta
+        ]
+        if not rows:
+            return 0
+        post = Post.__table__
+        statement = (
+            update(post)
+            .where(post.c.id == bindparam("post_id"))
+            .values(
+                like_count=post.c.like_count + bindparam("like_delta"),
+                comment_count=post.c.comment_count + bindparam("comment_delta"),
+            )
+        )
+        try:
+            session.execute(statement, rows)
+            session.commit()
+        except Exception:
+            session.rollback()
+            # keep changes for the next flush
+            for row in rows:
+                self.add(row["post_id"], row["like_delta"], row["comment_delta"])
+            raise
+        return len(rows)
+
+    def flush_if_due(self, session: Session) -> int:
+        """flush pending changes when flush is due, failed flush is retried with the next one"""
+        if not self.is_flush_due():
+            return 0
+        try:
+            return self.flush(session=session)
+        except SQLAlchemyError:
+            return 0
+
+    def start_flusher(self, bind: Engine) -> None:
+        """start daemon thread flushing due changes in its own session, see lifespan"""
+        if self._stop_flusher:
+            return None
+        self._stop_flusher = threading.Event()
+
+        def run(stop: threading.Event) -> None:
+            while not stop.wait(settings.POST_COUNT_FLUSH_SECONDS):
+                if self.is_flush_due():
+                    with Session(bind) as session:
+                        self.flush_if_due(session=session)
+
+        threading.Thread(
+            target=run, args=(self._stop_flusher,), name="post-count-flusher", daemon=True
+        ).start()
+        return None
+
+    def stop_flusher(self) -> None:
+        """stop flusher thread, pending changes are left for a last flush"""
+        if self._stop_flusher:
+            self._stop_flusher.set()
+            self._stop_flusher = None
 
 
 class PostService:
@@ -20,6 +165,26 @@ class PostService:
         """get post by post id"""
         return self.db_session.get(Post, id)
 
+    @staticmethod
+    def _caption_search_clause(search: str):
+        """substring match of caption, served by the trigram index when pg_trgm is installed"""
+        return col(Post.caption).contains(search)
+
+    @staticmethod
+    def _get_posts_by_user_id_statement(
+        user_id: uuid.UUID,
+        search: Optional[str] = None,
+        filter_by: Optional[FilterDates] = None,
+    ) -> Select:
+        """build select statement for user's posts filtered by created at or search query in caption"""
+        statement = select(Post).where(Post.posted_by == user_id)
+        if search:
+            statement = statement.filter(PostService._caption_search_clause(search=search))
+        if filter_by:
+            after_date = get_after_date_from_enum(value=filter_by)
+            statement = statement.filter(Post.created_at >= after_date)
+        return statement
+
     def get_all_posts_by_user_id(
         self,
         user_id: uuid.UUID,
@@ -27,52 +192,272 @@ class PostService:
         filter_by: Optional[FilterDates] = None,
     ) -> Sequence[Post]:
         """get all posts posted by the user using user id all or filtered by created at or search query in caption from database"""
-        base = select(Post).where(Post.posted_by == user_id)
-        if search and filter_by:
-            after_date = get_after_date_from_enum(value=filter_by)
-            statement = base.filter(Post.caption.contains(search)).filter(
-                Post.created_at >= after_date
-            )
-        elif search:
-            statement = base.filter(Post.caption.contains(search))
-        elif filter_by:
-            after_date = get_after_date_from_enum(value=filter_by)
-            # print(after_date)
-            statement = base.filter(Post.created_at >= (after_date))
-        else:
-            statement = base
+        statement = self._get_posts_by_user_id_statement(
+            user_id=user_id, search=search, filter_by=filter_by
+        )
         posts = self.db_session.exec(statement.order_by(desc(Post.created_at))).all()
         return posts
 
+    def get_paginated_posts_by_user_id(
+        self,
+        user_id: uuid.UUID,
+        params: Params,
+        search: Optional[str] = None,
+        filter_by: Optional[FilterDates] = None,
+    ) -> Page[Post]:
+        """get a page of user's posts using LIMIT/OFFSET and COUNT in the database"""
+        statement = self._get_posts_by_user_id_statement(
+            user_id=user_id, search=search, filter_by=filter_by
+        )
+        return paginate(
+            self.db_session,
+            statement.options(selectinload(Post.media)).order_by(
+                desc(Post.created_at), desc(Post.id)
+            ),
+            params=params,
+        )
+
+    def get_posts_by_user_id_after_cursor(
+        self,
+        user_id: uuid.UUID,
+        size: int,
+        cursor: Optional[Tuple[datetime, uuid.UUID]] = None,
+        search: Optional[str] = None,
+        filter_by: Optional[FilterDates] = None,
+    ) -> Sequence[Post]:
+        """
+        get user's posts ordered by (created_at, id) newest first after the keyset cursor
+        `Args`
+            size:
+                page size, one extra row is fetched to know if a next page exists
+            cursor:
+                (created_at, id) of the last post of the previous page
+        """
+        statement = self._get_posts_by_user_id_statement(
+            user_id=user_id, search=search, filter_by=filter_by
+        )
+        if cursor:
+            statement = statement.where(tuple_(Post.created_at, Post.id) < cursor)
+        statement = (
+            statement.options(selectinload(Post.media))
+            .order_by(desc(Post.created_at), desc(Post.id))
+            .limit(size + 1)
+        )
+        return self.db_session.exec(statement).all()
+
+    def get_not_fanned_out_posts_of_following_after_cursor(
+        self,
+        follower_id: uuid.UUID,
+        size: int,
+        cursor: Optional[Tuple[datetime, uuid.UUID]] = None,
+    ) -> Sequence[Post]:
+        """
+        get posts that were not written to timelines, by users that follower follows,
+        ordered by (created_at, id) newest first after the keyset cursor
+        """
+        following_ids = select(FollowersModel.following_id).where(
+            FollowersModel.follower_id == follower_id,
+            FollowersModel.status == StatusType.APPROVED,
+        )
+        statement = select(Post).where(
+            col(Post.fanned_out).is_(False), col(Post.posted_by).in_(following_ids)
+        )
+        if cursor:
+            statement = statement.where(tuple_(Post.created_at, Post.id) < cursor)
+        statement = (
+            statement.options(selectinload(Post.media))
+            .order_by(desc(Post.created_at), desc(Post.id))
+            .limit(size + 1)
+        )
+        return self.db_session.exec(statement).all()
+
+    def get_estimated_posts_count_by_user_id(
+        self,
+        user_id: uuid.UUID,
+        search: Optional[str] = None,
+        filter_by: Optional[FilterDates] = None,
+    ) -> int:
+        """get planner's row estimate for user's posts instead of running COUNT(*)"""
+        statement = self._get_posts_by_user_id_statement(
+            user_id=user_id, search=search, filter_by=filter_by
+        )
+        plan = self.db_session.execute(ExplainJson(statement)).scalar()
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def search_posts(
+        self,
+        search: str,
+        params: Params,
+        viewer_id: Optional[uuid.UUID] = None,
+        fuzzy: bool = False,
+    ) -> Page[Post]:
+        """
+        search captions of all posts ranked by relevance
+        `Args`
+            viewer_id:
+                user searching, only posts by public users, own posts and approved followings are included,
+                None skips profile checks (admin)
+            fuzzy:
+                substring and similarity match using pg_trgm instead of full text match
+        """
+        if fuzzy:
+            rank = func.similarity(Post.caption, search)
+            clause = or_(
+                col(Post.caption).icontains(search, autoescape=True),
+                col(Post.caption).op("%")(search),
+            )
+        else:
+            query = func.websearch_to_tsquery(CAPTION_SEARCH_CONFIG, search)
+            rank = func.ts_rank(Post.caption_search, query)
+            clause = col(Post.caption_search).op("@@")(query)
+        statement = select(Post).where(clause)
+        if viewer_id:
+            statement = statement.join(User, col(User.id) == Post.posted_by).where(
+                or_(
+                    User.profile_type == ProfileType.PUBLIC,
+                    Post.posted_by == viewer_id,
+                    exists().where(
+                        FollowersModel.follower_id == viewer_id,
+                        FollowersModel.following_id == Post.posted_by,
+                        FollowersModel.status == StatusType.APPROVED,
+                    ),
+                )
+            )
+        return paginate(
+            self.db_session,
+            statement.options(selectinload(Post.media)).order_by(
+                desc(rank), desc(Post.created_at), desc(Post.id)
+            ),
+            params=params,
+        )
+
     # def get_post_by_post_id_for_user(self, post_id:uuid.UUID, user_id:uuid.UUID) -> Optional[Post]:
     #     """get post by post id that is posted by the user from the database"""
     #     return self.db_session.scalars(select(Post).where(Post.posted_by == user_id).where(Post.id == post_id))
 
     def get_all_posts_not_liked_by_user(
-        self, user: User, public_users: List[User]
-    ) -> List[Post]:
-        """get all posts from public users and from user following that aren't liked by user from the database"""
-        following_ids = [f.following.id for f in user.following]
-        # print(following_ids)
-        public_user_ids = [public_user.id for public_user in public_users]
-        recommend_from = following_ids + public_user_ids
-        posts = (
-            self.db_session.exec(
-                select(Post)
-                .join(Post.likes, isouter=True)
-                .where(or_(Likes.liked_by != user.id, ~Post.likes.any()))
-                # .filter(Likes.liked_by != user.id)
-                .where(
-                    and_(
-                        Post.posted_by != user.id,
-                        col(Post.posted_by).in_(recommend_from),
-                    )
-                )
+        self,
+        user_id: uuid.UUID,
+        limit: Optional[int] = None,
+        shuffle: bool = False,
+        sample_percent: Optional[float] = None,
+        batch_size: int = 500,
+    ) -> ScalarResult[Post]:
+        """
+        get posts from public users and from users that user follows which aren't liked by user,
+        streamed from the database in batches instead of loading all rows at once
+        `Args`
+            limit:
+                maximum number of posts to return
+            shuffle:
+                return posts in random order (with limit returns a random selection)
+            sample_percent:
+                scan only a random percent of post table pages (TABLESAMPLE SYSTEM)
+            batch_size:
+                rows fetched from the database cursor at a time
+        """
+        post = Post
+        if sample_percent:
+            post = aliased(
+                Post, tablesample(Post.__table__, func.system(sample_percent))
             )
-            .unique()
-            .all()
+        followed = exists().where(
+            FollowersModel.follower_id == user_id,
+            FollowersModel.following_id == post.posted_by,
+            FollowersModel.status == StatusType.APPROVED,
         )
-        return posts
+        liked = exists().where(Likes.post_id == post.id, Likes.liked_by == user_id)
+        statement = (
+            select(post)
+            .join(User, col(User.id) == post.posted_by)
+            .where(post.posted_by != user_id)
+            .where(or_(User.profile_type == ProfileType.PUBLIC, followed))
+            .where(~liked)
+        )
+        if shuffle:
+            statement = statement.order_by(func.random())
+        if limit:
+            statement = statement.limit(limit)
+        return self.db_session.exec(
+            statement.execution_options(yield_per=batch_size)
+        )
+
+    def get_count_drifts(
+        self, ids: Optional[Sequence[uuid.UUID]] = None
+    ) -> Dict[uuid.UUID, Tuple[int, int]]:
+        """get like_count and comment_count minus counted likes and comments of posts that drifted"""
+        like_count = (
+            select(func.count())
+            .where(Likes.post_id == Post.id)
+            .correlate(Post)
+            .scalar_subquery()
+        )
+        comment_count = (
+            select(func.count())
+            .where(Comments.post_id == Post.id)
+            .correlate(Post)
+            .scalar_subquery()
+        )
+        statement = select(
+            Post.id, Post.like_count - like_count, Post.comment_count - comment_count
+        ).where(or_(Post.like_count != like_count, Post.comment_count != comment_count))
+        if ids is not None:
+            statement = statement.where(col(Post.id).in_(ids))
+        return {
+            post_id: (like_drift, comment_drift)
+            for post_id, like_drift, comment_drift in self.db_session.execute(statement)
+        }
+
+    def find_count_drifts(self) -> Dict[uuid.UUID, Tuple[int, int]]:
+        """
+        flush this process's buffered count changes and get drifts of posts, changes other processes
+        still buffer look like drift until they are flushed, see reconcile_counts
+        """
+        PostCountBuffer().flush(session=self.db_session)
+        return self.get_count_drifts()
+
+    def reconcile_counts(
+        self, drifts: Optional[Dict[uuid.UUID, Tuple[int, int]]] = None
+    ) -> int:
+        """
+        correct like_count and comment_count of posts that drifted from their likes and comments,
+        given drifts found by find_count_drifts longer ago than other processes take to flush
+        only posts whose drift is unchanged since are corrected, without drifts every drift is corrected,
+        posts with changes pending in this process are skipped and
+        corrections are relative so changes buffered meanwhile still apply
+        `Returns`
+            [int]:
+                number of posts corrected
+        """
+        post_count_buffer = PostCountBuffer()
+        if drifts is None:
+            drifts = self.find_count_drifts()
+        elif drifts:
+            post_count_buffer.flush(session=self.db_session)
+            settled = self.get_count_drifts(ids=list(drifts))
+            drifts = {
+                post_id: drift for post_id, drift in drifts.items() if settled.get(post_id) == drift
+            }
+        pending = post_count_buffer.get_pending_post_ids()
+        rows = [
+            {"post_id": post_id, "like_drift": like_drift, "comment_drift": comment_drift}
+            for post_id, (like_drift, comment_drift) in drifts.items()
+            if post_id not in pending
+        ]
+        if not rows:
+            return 0
+        post = Post.__table__
+        self.db_session.execute(
+            update(post)
+            .where(post.c.id == bindparam("post_id"))
+            .values(
+                like_count=post.c.like_count - bindparam("like_drift"),
+                comment_count=post.c.comment_count - bindparam("comment_drift"),
+            ),
+            rows,
+        )
+        self.db_session.commit()
+        return len(rows)
 
     def create(self, post: PostSchema) -> Post:
         """create post in the database"""
@@ -86,6 +471,10 @@ class PostService:
         db_session_value_create(session=self.db_session, value=db_post)
         return db_post
 
+    def get_existing_post_ids(self, ids: Sequence[uuid.UUID]) -> set:
+        """get ids of posts that exist among ids"""
+        return set(self.db_session.scalars(select(Post.id).where(col(Post.id).in_(ids))).all())
+
     def delete(self, db_post: Post) -> None:
         """delete post from the database"""
         self.db_session.delete(db_post)
@@ -0,0 +1,25 @@
+import uuid
+from datetime import datetime
+
+from sqlmodel import Field, Index, UniqueConstraint
+
+from lib.fastapi.custom_models import BaseModel
+
+
+class Timeline(BaseModel, table=True):
+    """:model: materialized home feed entry, a post written to the feed of its author's follower"""
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "post_id", name="InTimelineAlready"),
+        Index(
+            "ix_timeline_user_id_post_created_at_post_id",
+            "user_id",
+            "post_created_at",
+            "post_id",
+        ),
+    )
+
+    user_id: uuid.UUID = Field(foreign_key="user.id", ondelete="CASCADE")
+    post_id: uuid.UUID = Field(foreign_key="post.id", ondelete="CASCADE")
+    posted_by: uuid.UUID = Field(foreign_key="user.id", ondelete="CASCADE")
+    post_created_at: datetime = Field(nullable=False)
@@ -0,0 +1,148 @@
+import uuid
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from sqlmodel import Session, select, desc, delete, insert, func, literal, tuple_, col, true
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import selectinload
+
+from .models import Timeline
+from src.domain.models import Post, FollowersModel, User
+from lib.fastapi.custom_enums import StatusType
+
+
+class TimelineService:
+    """handle timeline database operations"""
+
+    def __init__(self, session: Session):
+        self.db_session = session
+
+    def fan_out_post(self, post: Post) -> int:
+        """
+        write post to the timeline of every approved follower of its author with a single INSERT ... SELECT
+        and mark the post fanned out in the same transaction
+        `Returns`
+            [int]:
+                number of timelines the post is written to
+        """
+        followers = select(
+            func.gen_random_uuid(),
+            FollowersModel.follower_id,
+            literal(post.id),
+            literal(post.posted_by),
+            literal(post.created_at),
+            func.now(),
+        ).where(
+            FollowersModel.following_id == post.posted_by,
+            FollowersModel.status == StatusType.APPROVED,
+        )
+        result = self.db_session.execute(
+            insert(Timeline).from_select(
+                ["id", "user_id", "post_id", "posted_by", "post_created_at", "created_at"],
+                followers,
+            )
+        )
+        post.fanned_out = True
+        self.db_session.add(post)
+        self.db_session.commit()
+        self.db_session.refresh(post)
+        return result.rowcount
+
+    def backfill_author_posts(
+        self, user_ids: Sequence[uuid.UUID], posted_by: uuid.UUID, limit: int
+    ) -> int:
+        """
+        write the latest limit fanned out posts of an author to the timelines of users that started following
+        the author with a single INSERT ... SELECT, not committed so it is part of the caller's transaction,
+        posts not fanned out are merged in at read time and are skipped
+        `Returns`
+            [int]:
+                number of timeline entries written
+        """
+        if not user_ids or limit <= 0:
+            return 0
+        recent_posts = (
+            select(Post.id, Post.posted_by, Post.created_at)
+            .where(Post.posted_by == posted_by, col(Post.fanned_out).is_(True))
+            .order_by(desc(Post.created_at), desc(Post.id))
+            .limit(limit)
+            .subquery()
+        )
+        entries = (
+            select(
+                func.gen_random_uuid(),
+                User.id,
+                recent_posts.c.id,
+                recent_posts.c.posted_by,
+                recent_posts.c.created_at,
+                func.now(),
+            )
+            .join(recent_posts, true())
+            .where(col(User.id).in_(user_ids))
+        )
+        result = self.db_session.execute(
+            pg_insert(Timeline)
+            .from_select(
+                ["id", "user_id", "post_id", "posted_by", "post_created_at", "created_at"],
+                entries,
+            )
+            .on_conflict_do_nothing(constraint="InTimelineAlready")
+        )
+        return result.rowcount
+
+    def delete_by_post_id(self, post_id: uuid.UUID) -> None:
+        """remove post from every timeline"""
+        self.db_session.execute(delete(Timeline).where(Timeline.post_id == post_id))
+        self.db_session.commit()
+
+    def delete_by_user_id_and_posted_by(
+        self, user_id: uuid.UUID, posted_by: uuid.UUID
+    ) -> None:
+        """remove posts of an author from user's timeline"""
+        self.db_session.execute(
+            delete(Timeline)
+            .where(Timeline.user_id == user_id)
+            .where(Timeline.posted_by == posted_by)
+        )
+        self.db_session.commit()
+
+    def delete_by_user_id_and_posted_by_pairs(
+        self, pairs: Sequence[Tuple[uuid.UUID, uuid.UUID]]
+    ) -> None:
+        """remove posts of authors from users' timelines for (user_id, posted_by) pairs, not committed"""
+        if not pairs:
+            return None
+        self.db_session.execute(
+            delete(Timeline).where(tuple_(Timeline.user_id, Timeline.posted_by).in_(pairs))
+        )
+        return None
+
+    def get_posts_after_cursor(
+        self,
+        user_id: uuid.UUID,
+        size: int,
+        cursor: Optional[Tuple[datetime, uuid.UUID]] = None,
+    ) -> Sequence[Post]:
+        """
+        get posts in user's timeline ordered by (created_at, id) newest first after the keyset cursor
+        `Args`
+            size:
+                page size, one extra row is fetched to know if a next page exists
+            cursor:
+                (created_at, id) of the last post of the previous page
+        """
+        statement = (
+            select(Post)
+            .join(Timeline, Timeline.post_id == Post.id)
+            .where(Timeline.user_id == user_id)
+        )
+        if cursor:
+            statement = statement.where(
+                tuple_(Timeline.post_created_at, Timeline.post_id) < cursor
+            )
+        statement = (
+            statement.options(selectinload(Post.media))
+            .order_by(desc(Timeline.post_created_at), desc(Timeline.post_id))
+            .limit(size + 1)
+        )
+        return self.db_session.exec(statement).all()
@@ -1,7 +1,7 @@
 from typing import Optional, TYPE_CHECKING
 import uuid
 
-from sqlmodel import Field, Column, Enum, Relationship
+from sqlmodel import Field, Column, Enum, Relationship, Index
 
 # from src.domain.models import Admin, User
 from lib.fastapi.custom_models import BaseModel
@@ -17,6 +17,9 @@ class BaseUser(BaseModel, table=True):
     :model: base user model for login and role management
     """
 
+    # admin listing pages through base users newest first
+    __table_args__ = (Index("ix_baseuser_created_at_id", "created_at", "id"),)
+
     email: str = Field(index=True, unique=True, nullable=False)
     password: Optional[str] = Field(default=None)
     role: Role = Field(default=Role.USER, sa_column=Column(Enum(Role)))
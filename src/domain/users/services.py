@@ -1,13 +1,20 @@
-from typing import Optional, List
+from datetime import datetime
+from typing import Iterator, Optional, List, Sequence, Tuple
 import uuid
 
-from sqlmodel import Session, select
+from sqlalchemy import Row
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, select, desc, tuple_
 
 from src.interface.users.schemas import CreateBaseUser, BaseUserSchema, UpdateBaseUser
 from lib.fastapi.utils import db_session_value_create
 from src.domain.models import User, BaseUser, Otp
 
 
+# columns of base users written by exports, password is never exported
+BASE_USER_EXPORT_FIELDS = ("id", "email", "role", "is_active", "created_at")
+
+
 class BaseUserService:
     """base user service class to handle BaseUser database operations"""
 
@@ -35,6 +42,30 @@ class BaseUserService:
         users = self.db_session.exec(select(BaseUser)).all()
         return users
 
+    def get_base_users_after_cursor(
+        self, size: int, cursor: Optional[Tuple[datetime, uuid.UUID]] = None
+    ) -> Sequence[BaseUser]:
+        """
+        get base users with their user and admin ordered by (created_at, id) newest first after the keyset cursor,
+        one extra row is fetched to know if a next page exists
+        """
+        statement = select(BaseUser).options(
+            selectinload(BaseUser.user), selectinload(BaseUser.admin)
+        )
+        if cursor:
+            statement = statement.where(tuple_(BaseUser.created_at, BaseUser.id) < cursor)
+        statement = statement.order_by(desc(BaseUser.created_at), desc(BaseUser.id)).limit(
+            size + 1
+        )
+        return self.db_session.exec(statement).all()
+
+    def get_export_rows(self, batch_size: int) -> Iterator[Row]:
+        """stream BASE_USER_EXPORT_FIELDS of all base users oldest first with a server side cursor in batches"""
+        statement = select(
+            *[getattr(BaseUser, field) for field in BASE_USER_EXPORT_FIELDS]
+        ).order_by(BaseUser.created_at, BaseUser.id)
+        return self.db_session.exec(statement.execution_options(yield_per=batch_size))
+
     def create(self, base_user: CreateBaseUser | BaseUserSchema) -> BaseUser:
         """create base user in the database"""
         db_base_user = BaseUser.model_validate(base_user)
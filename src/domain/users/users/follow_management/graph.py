@@ -0,0 +1,332 @@
+import time
+import heapq
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+import uuid
+
+from src.setup.config.settings import settings
+
+
+class Adjacency:
+    """
+    compact CSR adjacency of integer user indexes: neighbours of user i are
+    targets[offsets[i]:offsets[i + 1]] sorted ascending
+    """
+
+    def __init__(self, num_users: int, edges: List[Tuple[int, int]]):
+        edges.sort()
+        self.offsets = array("q", bytes(8 * (num_users + 1)))
+        for source, _ in edges:
+            self.offsets[source + 1] += 1
+        for index in range(num_users):
+            self.offsets[index + 1] += self.offsets[index]
+        self.targets = array("q", (target for _, target in edges))
+
+    def _bounds(self, index: int) -> Tuple[int, int]:
+        """start and end of neighbours of index in targets, empty for users added after build"""
+        if index + 1 >= len(self.offsets):
+            return 0, 0
+        return self.offsets[index], self.offsets[index + 1]
+
+    def neighbours(self, index: int) -> array:
+        start, end = self._bounds(index)
+        return self.targets[start:end]
+
+    def contains(self, index: int, target: int) -> bool:
+        start, end = self._bounds(index)
+        position = bisect_left(self.targets, target, start, end)
+        return position < end and self.targets[position] == target
+
+
+class FollowGraph:
+    """
+    in-process index of approved follow edges as CSR arrays of integer user indexes,
+    FollowAppService applies its follow changes incrementally on top of the arrays
+    which are rebuilt once FOLLOW_GRAPH_COMPACT_SIZE changes piled up,
+    changes made by other processes are seen after the graph is reloaded every FOLLOW_GRAPH_TTL_SECONDS,
+    loads and rebuilds happen outside the lock and replay the changes made meanwhile
+    """
+
+    def __new__(cls):
+        if not hasattr(cls, "instance"):
+            cls.instance = super(FollowGraph, cls).__new__(cls)
+            cls.instance._lock = threading.RLock()
+            # held by the one load or compaction running
+            cls.instance._rebuild_lock = threading.Lock()
+            # held by the caller loading the graph on first use
+            cls.instance._load_lock = threading.Lock()
+            cls.instance._loaded_at = None
+            cls.instance._reloading = False
+            # (added, follower_id, following_id) changes made while a load or compaction runs
+            cls.instance._journal = None
+            cls.instance._swap(user_ids=[], arrays=cls._create_arrays(num_users=0, edges=[]))
+        return cls.instance
+
+    @staticmethod
+    def _create_arrays(num_users: int, edges: List[Tuple[int, int]]) -> Tuple[Adjacency, Adjacency]:
+        """following and followers adjacency of edges between user indexes"""
+        return (
+            Adjacency(num_users=num_users, edges=edges),
+            Adjacency(num_users=num_users, edges=[(target, source) for source, target in edges]),
+        )
+
+    def _swap(self, user_ids: List[uuid.UUID], arrays: Tuple[Adjacency, Adjacency]) -> None:
+        """replace arrays with ones built for user_ids and drop pending changes"""
+        self._ids = user_ids
+        self._indexes = {user_id: index for index, user_id in enumerate(user_ids)}
+        self._following, self._followers = arrays
+        # changes applied after the arrays were built
+        self._added_following: Dict[int, Set[int]] = defaultdict(set)
+        self._added_followers: Dict[int, Set[int]] = defaultdict(set)
+        self._removed: Set[Tuple[int, int]] = set()
+        self._changes = 0
+
+    def _replay(self) -> None:
+        """apply changes recorded while the arrays were built and stop recording"""
+        journal, self._journal = self._journal or [], None
+        for added, follower_id, following_id in journal:
+            if added:
+                self._add_edge(follower_id=follower_id, following_id=following_id)
+            else:
+                self._remove_edge(follower_id=follower_id, following_id=following_id)
+
+    def is_loaded(self) -> bool:
+        """graph was loaded within the ttl"""
+        return (
+            self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < settings.FOLLOW_GRAPH_TTL_SECONDS
+        )
+
+    def load(self, edges: Iterable[Tuple[uuid.UUID, uuid.UUID]]) -> None:
+        """build graph from (follower_id, following_id) of all approved follow edges"""
+        with self._rebuild_lock:
+            with self._lock:
+                self._journal = []
+            try:
+                user_ids: List[uuid.UUID] = []
+                indexes: Dict[uuid.UUID, int] = {}
+                index_edges = []
+                for follower_id, following_id in edges:
+                    for user_id in (follower_id, following_id):
+                        if user_id not in indexes:
+                            indexes[user_id] = len(user_ids)
+                            user_ids.append(user_id)
+                    index_edges.append((indexes[follower_id], indexes[following_id]))
+                arrays = self._create_arrays(num_users=len(user_ids), edges=index_edges)
+            except BaseException:
+                with self._lock:
+                    self._journal = None
+                raise
+            with self._lock:
+                self._swap(user_ids=user_ids, arrays=arrays)
+                self._replay()
+                self._loaded_at = time.monotonic()
+
+    def ensure_loaded(self, get_edges: Callable[[], Iterable[Tuple[uuid.UUID, uuid.UUID]]]) -> None:
+        """
+        load graph with edges from get_edges, on first use one caller loads while the others wait,
+        once the ttl passed one background thread reloads it while the current graph keeps serving
+        """
+        if self.is_loaded():
+            return None
+        if self._loaded_at is None:
+            with self._load_lock:
+                if self._loaded_at is None:
+                    self.load(edges=get_edges())
+            return None
+        with self._lock:
+            if self._reloading:
+                return None
+            self._reloading = True
+
+        def reload() -> None:
+            try:
+                self.load(edges=get_edges())
+            except Exception:
+                # current graph keeps serving, the next request after the ttl retries
+                pass
+            finally:
+                with self._lock:
+                    self._reloading = False
+
+        threading.Thread(target=reload, name="follow-graph-reload", daemon=True).start()
+        return None
+
+    def clear(self) -> None:
+        """forget graph, it is loaded again on next use"""
+        with self._lock:
+            self._swap(user_ids=[], arrays=self._create_arrays(num_users=0, edges=[]))
+            self._loaded_at = None
+
+    def _get_index(self, user_id: uuid.UUID, create: bool = False) -> Optional[int]:
+        index = self._indexes.get(user_id)
+        if index is None and create:
+            index = self._indexes[user_id] = len(self._ids)
+            self._ids.append(user_id)
+        return index
+
+    def _has_edge(self, follower: int, following: int) -> bool:
+        if (follower, following) in self._removed:
+            return False
+        return following in self._added_following.get(follower, ()) or (
+            self._following.contains(follower, following)
+        )
+
+    def _get_following(self, index: int) -> Set[int]:
+        following = {
+            target
+            for target in self._following.neighbours(index)
+            if (index, target) not in self._removed
+        }
+        return following | self._added_following.get(index, set())
+
+    def _get_followers(self, index: int) -> Set[int]:
+        followers = {
+            source
+            for source in self._followers.neighbours(index)
+            if (source, index) not in self._removed
+        }
+        return followers | self._added_followers.get(index, set())
+
+    def _add_edge(self, follower_id: uuid.UUID, following_id: uuid.UUID) -> bool:
+        """add edge on top of the arrays, returns whether the graph changed"""
+        follower = self._get_index(user_id=follower_id, create=True)
+        following = self._get_index(user_id=following_id, create=True)
+        if self._has_edge(follower, following):
+            return False
+        self._removed.discard((follower, following))
+        if not self._following.contains(follower, following):
+            self._added_following[follower].add(following)
+            self._added_followers[following].add(follower)
+        self._changes += 1
+        return True
+
+    def _remove_edge(self, follower_id: uuid.UUID, following_id: uuid.UUID) -> bool:
+        """remove edge on top of the arrays, returns whether the graph changed"""
+        follower = self._get_index(user_id=follower_id)
+        following = self._get_index(user_id=following_id)
+        if follower is None or following is None or not self._has_edge(follower, following):
+            return False
+        self._added_following.get(follower, set()).discard(following)
+        self._added_followers.get(following, set()).discard(follower)
+        if self._following.contains(follower, following):
+            self._removed.add((follower, following))
+        self._changes += 1
+        return True
+
+    def _change(self, added: bool, follower_id: uuid.UUID, following_id: uuid.UUID) -> None:
+        """apply change, record it for a running load or compaction and compact once enough piled up"""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append((added, follower_id, following_id))
+            if self._loaded_at is None:
+                return None
+            if added:
+                self._add_edge(follower_id=follower_id, following_id=following_id)
+            else:
+                self._remove_edge(follower_id=follower_id, following_id=following_id)
+            compact = self._changes >= settings.FOLLOW_GRAPH_COMPACT_SIZE
+        if compact:
+            self.compact()
+        return None
+
+    def compact(self) -> None:
+        """
+        rebuild arrays with pending changes outside the lock so readers are not blocked,
+        skipped while another load or compaction runs
+        """
+        if not self._rebuild_lock.acquire(blocking=False):
+            return None
+        try:
+            with self._lock:
+                if self._loaded_at is None:
+                    return None
+                user_ids = list(self._ids)
+                following = self._following
+                added_following = {index: set(added) for index, added in self._added_following.items()}
+                removed = set(self._removed)
+                self._journal = []
+            edges = []
+            for index in range(len(user_ids)):
+                targets = {
+                    target
+                    for target in following.neighbours(index)
+                    if (index, target) not in removed
+                }
+                edges.extend((index, target) for target in targets | added_following.get(index, set()))
+            arrays = self._create_arrays(num_users=len(user_ids), edges=edges)
+            with self._lock:
+                self._swap(user_ids=user_ids, arrays=arrays)
+                self._replay()
+        finally:
+            self._rebuild_lock.release()
+        return None
+
+    def add_edge(self, follower_id: uuid.UUID, following_id: uuid.UUID) -> None:
+        """add approved follow edge, ignored until the graph is loaded"""
+        self._change(added=True, follower_id=follower_id, following_id=following_id)
+
+    def remove_edge(self, follower_id: uuid.UUID, following_id: uuid.UUID) -> None:
+        """remove approved follow edge, e.g. after unfollow, remove follower or user deletion"""
+        self._change(added=False, follower_id=follower_id, following_id=following_id)
+
+    def remove_user(self, user_id: uuid.UUID) -> None:
+        """remove all edges of deleted user"""
+        with self._lock:
+            index = self._get_index(user_id=user_id)
+            if index is None:
+                return None
+            edges = [(user_id, self._ids[following]) for following in self._get_following(index)]
+            edges.extend((self._ids[follower], user_id) for follower in self._get_followers(index))
+        for follower_id, following_id in edges:
+            self.remove_edge(follower_id=follower_id, following_id=following_id)
+        return None
+
+    def get_relationships(
+        self, user_id: uuid.UUID, other_ids: Iterable[uuid.UUID]
+    ) -> Dict[uuid.UUID, Tuple[bool, bool]]:
+        """get (user follows other, other follows user) for each of other_ids"""
+        with self._lock:
+            index = self._get_index(user_id=user_id)
+            relationships = {}
+            for other_id in other_ids:
+                other = self._get_index(user_id=other_id)
+                if index is None or other is None:
+                    relationships[other_id] = (False, False)
+                    continue
+                relationships[other_id] = (
+                    self._has_edge(index, other),
+                    self._has_edge(other, index),
+                )
+            return relationships
+
+    def get_mutual_ids(self, user_id: uuid.UUID, other_id: uuid.UUID) -> List[uuid.UUID]:
+        """get users the user follows that follow other user"""
+        with self._lock:
+            index = self._get_index(user_id=user_id)
+            other = self._get_index(user_id=other_id)
+            if index is None or other is None:
+                return []
+            mutuals = self._get_following(index) & self._get_followers(other)
+            return [self._ids[mutual] for mutual in sorted(mutuals)]
+
+    def get_suggested_ids(self, user_id: uuid.UUID, size: int) -> List[uuid.UUID]:
+        """
+        get users followed by most of the users the user follows, not followed by the user yet,
+        ordered by number of those followers
+        """
+        with self._lock:
+            index = self._get_index(user_id=user_id)
+            if index is None:
+                return []
+            following = self._get_following(index)
+            counts = Counter()
+            for followed in following:
+                counts.update(self._get_following(followed))
+            for known in following | {index}:
+                counts.pop(known, None)
+            suggested = heapq.nlargest(size, counts.items(), key=lambda item: (item[1], -item[0]))
+            return [self._ids[suggestion] for suggestion, _ in suggested]
@@ -1,7 +1,7 @@
 import uuid
 from typing import TYPE_CHECKING
 
-from sqlmodel import Field, Column, Enum, Relationship, UniqueConstraint
+from sqlmodel import Field, Column, Enum, Relationship, UniqueConstraint, Index
 
 from lib.fastapi.custom_models import BaseModel
 from lib.fastapi.custom_enums import StatusType
@@ -17,6 +17,28 @@ class FollowersModel(BaseModel, table=True):
 
     __table_args__ = (
         UniqueConstraint("follower_id", "following_id", name="RequestSent"),
+        # privacy checks look up one (author, viewer) edge with its status
+        Index(
+            "ix_followersmodel_following_id_follower_id_status",
+            "following_id",
+            "follower_id",
+            "status",
+        ),
+        # follow lists page through one user's edges with a status newest first
+        Index(
+            "ix_followersmodel_following_id_status_created_at_id",
+            "following_id",
+            "status",
+            "created_at",
+            "id",
+        ),
+        Index(
+            "ix_followersmodel_follower_id_status_created_at_id",
+            "follower_id",
+            "status",
+            "created_at",
+            "id",
+        ),
     )
 
     follower_id: uuid.UUID = Field(foreign_key="user.id", ondelete="CASCADE")
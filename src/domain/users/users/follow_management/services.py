@@ -1,11 +1,81 @@
-from typing import Optional
+import time
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 import uuid
 
-from sqlmodel import Session, select
+from sqlalchemy import Row
+from sqlmodel import Session, select, func, exists, update, delete, col, desc, tuple_
 
-from src.domain.models import FollowersModel
+from src.domain.models import FollowersModel, User
 from src.interface.users.users.follow_management.schemas import FollowRequest
 from lib.fastapi.utils import db_session_value_create
+from lib.fastapi.custom_enums import StatusType
+from src.setup.config.settings import settings
+
+
+class CanViewCache:
+    """
+    in-process TTL cache of (viewer, author) -> can_view decisions for private authors,
+    follow changes in FollowAppService invalidate the pair, other processes see them after the ttl
+    """
+
+    def __new__(cls):
+        if not hasattr(cls, "instance"):
+            cls.instance = super(CanViewCache, cls).__new__(cls)
+            cls.instance._lock = threading.Lock()
+            cls.instance._decisions = OrderedDict()
+            cls.instance._viewers = defaultdict(set)
+        return cls.instance
+
+    def get(self, viewer_id: uuid.UUID, author_id: uuid.UUID) -> Optional[bool]:
+        """get cached decision, None if not cached or expired"""
+        with self._lock:
+            cached = self._decisions.get((viewer_id, author_id))
+            if cached and cached[1] > time.monotonic():
+                return cached[0]
+        return None
+
+    def set(self, viewer_id: uuid.UUID, author_id: uuid.UUID, can_view: bool) -> None:
+        """cache decision evicting least recently stored decisions"""
+        with self._lock:
+            key = (viewer_id, author_id)
+            self._decisions[key] = (
+                can_view,
+                time.monotonic() + settings.CAN_VIEW_CACHE_TTL_SECONDS,
+            )
+            self._decisions.move_to_end(key)
+            self._viewers[author_id].add(viewer_id)
+            while len(self._decisions) > settings.CAN_VIEW_CACHE_SIZE:
+                self._discard(self._decisions.popitem(last=False)[0])
+
+    def _discard(self, key: Tuple[uuid.UUID, uuid.UUID]) -> None:
+        """forget author's viewer of evicted decision"""
+        viewers = self._viewers.get(key[1])
+        if viewers is not None:
+            viewers.discard(key[0])
+            if not viewers:
+                del self._viewers[key[1]]
+
+    def invalidate(self, viewer_id: uuid.UUID, author_id: uuid.UUID) -> None:
+        """remove decision after follow edge between viewer and author changed"""
+        with self._lock:
+            if self._decisions.pop((viewer_id, author_id), None):
+                self._discard((viewer_id, author_id))
+
+    def invalidate_author(self, author_id: uuid.UUID) -> None:
+        """remove decisions of all viewers of author, e.g. after many of its follow requests changed"""
+        with self._lock:
+            for viewer_id in self._viewers.pop(author_id, set()):
+                self._decisions.pop((viewer_id, author_id), None)
+
+
+# (count of the followed user, count of the follower) kept per status of their follow edge
+FOLLOW_COUNT_FIELDS = {
+    StatusType.APPROVED: ("followers_count", "following_count"),
+    StatusType.PENDING: ("requests_received_count", "requests_sent_count"),
+}
 
 
 class FollowService:
@@ -28,20 +98,252 @@ class FollowService:
             .where(FollowersModel.following_id == following_id)
         ).first()
     
+    def is_approved_follower(self, follower_id: uuid.UUID, following_id: uuid.UUID) -> bool:
+        """check approved follow edge with an EXISTS query on the (following_id, follower_id, status) index"""
+        return self.db_session.scalar(
+            select(
+                exists()
+                .where(FollowersModel.following_id == following_id)
+                .where(FollowersModel.follower_id == follower_id)
+                .where(FollowersModel.status == StatusType.APPROVED)
+            )
+        )
+
+    def get_approved_edges(self, batch_size: int = 10000) -> Iterator[Tuple[uuid.UUID, uuid.UUID]]:
+        """stream (follower_id, following_id) of all approved follow edges in batches"""
+        statement = select(FollowersModel.follower_id, FollowersModel.following_id).where(
+            FollowersModel.status == StatusType.APPROVED
+        )
+        for follower_id, following_id in self.db_session.exec(
+            statement.execution_options(yield_per=batch_size)
+        ):
+            yield follower_id, following_id
+
+    def count_approved_followers(
+        self, user_id: uuid.UUID, limit: Optional[int] = None
+    ) -> int:
+        """count approved followers of the user, stops counting at limit when given"""
+        followers = (
+            select(FollowersModel.id)
+            .where(FollowersModel.following_id == user_id)
+            .where(FollowersModel.status == StatusType.APPROVED)
+            .limit(limit)
+            .subquery()
+        )
+        return self.db_session.exec(select(func.count()).select_from(followers)).one()
+
+    def get_follows_after_cursor(
+        self,
+        user_id: uuid.UUID,
+        status: StatusType,
+        size: int,
+        cursor: Optional[Tuple[datetime, uuid.UUID]] = None,
+        sent: bool = False,
+    ) -> Sequence[Row]:
+        """
+        get follow edges with status sent by (sent=True) or to the user joined with the other user of the edge,
+        ordered by (created_at, id) newest first after the keyset cursor, one extra row is fetched to know if a next page exists
+        """
+        user_column, other_column = (
+            (FollowersModel.follower_id, FollowersModel.following_id)
+            if sent
+            else (FollowersModel.following_id, FollowersModel.follower_id)
+        )
+        statement = (
+            select(FollowersModel.id, FollowersModel.created_at, FollowersModel.status, User)
+            .join(User, col(User.id) == other_column)
+            .where(user_column == user_id)
+            .where(FollowersModel.status == status)
+        )
+        if cursor:
+            statement = statement.where(
+                tuple_(FollowersModel.created_at, FollowersModel.id) < cursor
+            )
+        statement = statement.order_by(
+            desc(FollowersModel.created_at), desc(FollowersModel.id)
+        ).limit(size + 1)
+        return self.db_session.exec(statement).all()
+
+    def _update_counts(
+        self, follower_id: uuid.UUID, following_id: uuid.UUID, status: StatusType, delta: int
+    ) -> None:
+        """add delta to the follow counts of both users of an edge with status, committed with the edge change"""
+        fields = FOLLOW_COUNT_FIELDS.get(StatusType(status))
+        if not fields:
+            return None
+        for user_id, field in zip((following_id, follower_id), fields):
+            self.db_session.execute(
+                update(User)
+                .where(col(User.id) == user_id)
+                .values({field: getattr(User, field) + delta})
+            )
+        return None
+
+    def release_follow_counts(self, user_id: uuid.UUID) -> None:
+        """decrease follow counts of the other users of all edges of the user before it is deleted"""
+        for status, (following_field, follower_field) in FOLLOW_COUNT_FIELDS.items():
+            for others, field in (
+                (
+                    select(FollowersModel.following_id)
+                    .where(FollowersModel.follower_id == user_id)
+                    .where(FollowersModel.status == status),
+                    following_field,
+                ),
+                (
+                    select(FollowersModel.follower_id)
+                    .where(FollowersModel.following_id == user_id)
+                    .where(FollowersModel.status == status),
+                    follower_field,
+                ),
+            ):
+                self.db_session.execute(
+                    update(User)
+                    .where(col(User.id).in_(others))
+                    .values({field: getattr(User, field) - 1})
+                    .execution_options(synchronize_session=False)
+                )
+        return None
+
+    def _update_bulk_counts(
+        self,
+        user_id: uuid.UUID,
+        other_ids: Sequence[uuid.UUID],
+        user_deltas: Dict[str, int],
+        other_deltas: Dict[str, int],
+    ) -> None:
+        """add deltas once per edge to the follow counts of the user and once to the counts of each other user"""
+        self.db_session.execute(
+            update(User)
+            .where(col(User.id) == user_id)
+            .values(
+                {
+                    field: getattr(User, field) + delta * len(other_ids)
+                    for field, delta in user_deltas.items()
+                }
+            )
+        )
+        self.db_session.execute(
+            update(User)
+            .where(col(User.id).in_(other_ids))
+            .values(
+                {field: getattr(User, field) + delta for field, delta in other_deltas.items()}
+            )
+        )
+        return None
+
+    def approve_pending_requests(
+        self, user_id: uuid.UUID, follower_ids: Optional[Sequence[uuid.UUID]] = None
+    ) -> List[uuid.UUID]:
+        """
+        approve pending requests sent to the user, only those of follower_ids when given, with one UPDATE
+        and move the follow counts of both sides, not committed so the changes are part of the caller's transaction
+        `Returns`
+            [List[uuid.UUID]]:
+                ids of the users whose requests were approved
+        """
+        if follower_ids is not None and not follower_ids:
+            return []
+        statement = (
+            update(FollowersModel)
+            .where(FollowersModel.following_id == user_id)
+            .where(FollowersModel.status == StatusType.PENDING)
+        )
+        if follower_ids is not None:
+            statement = statement.where(col(FollowersModel.follower_id).in_(follower_ids))
+        approved_ids = self.db_session.execute(
+            statement.values(status=StatusType.APPROVED).returning(FollowersModel.follower_id)
+        ).scalars().all()
+        if not approved_ids:
+            return []
+        self._update_bulk_counts(
+            user_id=user_id,
+            other_ids=approved_ids,
+            user_deltas={"requests_received_count": -1, "followers_count": 1},
+            other_deltas={"requests_sent_count": -1, "following_count": 1},
+        )
+        return approved_ids
+
+    def delete_follows(
+        self,
+        user_id: uuid.UUID,
+        status: StatusType,
+        other_ids: Optional[Sequence[uuid.UUID]] = None,
+        sent: bool = False,
+    ) -> List[uuid.UUID]:
+        """
+        delete follow edges with status sent by (sent=True) or to the user, only those with other_ids when given,
+        with one DELETE and decrease the follow counts of both sides, not committed so the changes are part of the caller's transaction
+        `Returns`
+            [List[uuid.UUID]]:
+                ids of the other users of deleted edges
+        """
+        if other_ids is not None and not other_ids:
+            return []
+        user_column, other_column = (
+            (FollowersModel.follower_id, FollowersModel.following_id)
+            if sent
+            else (FollowersModel.following_id, FollowersModel.follower_id)
+        )
+        statement = (
+            delete(FollowersModel)
+            .where(user_column == user_id)
+            .where(FollowersModel.status == status)
+        )
+        if other_ids is not None:
+            statement = statement.where(col(other_column).in_(other_ids))
+        deleted_ids = self.db_session.execute(
+            statement.returning(other_column)
+        ).scalars().all()
+        if not deleted_ids:
+            return []
+        following_field, follower_field = FOLLOW_COUNT_FIELDS[status]
+        user_field, other_field = (
+            (follower_field, following_field) if sent else (following_field, follower_field)
+        )
+        self._update_bulk_counts(
+            user_id=user_id,
+            other_ids=deleted_ids,
+            user_deltas={user_field: -1},
+            other_deltas={other_field: -1},
+        )
+        return deleted_ids
+
     def create(self, follow:FollowRequest) -> FollowersModel:
         """create follow request in the database"""
         db_follow = FollowersModel.model_validate(follow)
+        self._update_counts(
+            follower_id=db_follow.follower_id,
+            following_id=db_follow.following_id,
+            status=db_follow.status,
+            delta=1,
+        )
         db_session_value_create(session=self.db_session, value=db_follow)
         return db_follow
 
 
     def update(self, follow: FollowRequest, db_follow:FollowersModel) -> FollowersModel:
         """updating follow request in the database"""
+        previous = (db_follow.follower_id, db_follow.following_id, db_follow.status)
         db_follow.sqlmodel_update(follow)
+        current = (db_follow.follower_id, db_follow.following_id, db_follow.status)
+        if current != previous:
+            for (follower_id, following_id, status), delta in ((previous, -1), (current, 1)):
+                self._update_counts(
+                    follower_id=follower_id,
+                    following_id=following_id,
+                    status=status,
+                    delta=delta,
+                )
         db_session_value_create(session=self.db_session, value=db_follow)
         return db_follow
     
     def delete(self, db_follow: FollowersModel) -> None:
         """deleting follow request for rejected status"""
+        self._update_counts(
+            follower_id=db_follow.follower_id,
+            following_id=db_follow.following_id,
+            status=db_follow.status,
+            delta=-1,
+        )
         self.db_session.delete(db_follow)
         self.db_session.commit()
\ No newline at end of file
@@ -1,6 +1,6 @@
 from typing import TYPE_CHECKING, Optional, List
 import uuid
-from sqlmodel import Field, Relationship, Column, Enum
+from sqlmodel import Field, Relationship, Column, Enum, Index, text
 
 from lib.fastapi.custom_models import BaseModel
 from lib.fastapi.custom_enums import ProfileType
@@ -14,6 +14,9 @@ class User(BaseModel, table=True):
     :model: for regular user management (app users without admin rights)
     """
 
+    # admin listing pages through users newest first
+    __table_args__ = (Index("ix_user_created_at_id", "created_at", "id"),)
+
     base_user_id: uuid.UUID = Field(
         index=True, foreign_key="baseuser.id", ondelete="CASCADE", unique=True
     )
@@ -24,6 +27,21 @@ class User(BaseModel, table=True):
     profile_type: ProfileType = Field(
         default=ProfileType.PUBLIC, sa_column=Column(Enum(ProfileType))
     )
+    # increased when username or profile type changes, access tokens with older claims are not trusted
+    claims_version: int = Field(default=0, nullable=False)
+    # denormalized follow edge counts by status, kept up to date by FollowService
+    followers_count: int = Field(
+        default=0, nullable=False, sa_column_kwargs={"server_default": text("0")}
+    )
+    following_count: int = Field(
+        default=0, nullable=False, sa_column_kwargs={"server_default": text("0")}
+    )
+    requests_received_count: int = Field(
+        default=0, nullable=False, sa_column_kwargs={"server_default": text("0")}
+    )
+    requests_sent_count: int = Field(
+        default=0, nullable=False, sa_column_kwargs={"server_default": text("0")}
+    )
 
     base_user: "BaseUser" = Relationship(
         sa_relationship_kwargs={"uselist": False}, back_populates="user"
@@ -1,7 +1,9 @@
-from typing import Optional, Sequence
+from datetime import datetime
+from typing import Iterator, Optional, Sequence, Tuple
 import uuid
 
-from sqlmodel import Session, select
+from sqlalchemy import Row, exists
+from sqlmodel import Session, select, col, desc, tuple_
 
 from src.interface.users.users.schemas import UserWithProfile, UserWithBaseUserId
 from .models import User
@@ -9,6 +11,19 @@ from lib.fastapi.utils import db_session_value_create
 from lib.fastapi.custom_enums import ProfileType
 
 
+# columns of users written by exports
+USER_EXPORT_FIELDS = (
+    "id",
+    "base_user_id",
+    "username",
+    "profile_type",
+    "is_verified",
+    "followers_count",
+    "following_count",
+    "created_at",
+)
+
+
 class UserService:
     """user service for managing database operations for User Model"""
 
@@ -31,10 +46,44 @@ class UserService:
             select(User).where(User.base_user_id == base_user_id)
         ).first()
 
+    def get_users_by_ids(self, ids: Sequence[uuid.UUID]) -> Sequence[User]:
+        """get users with any of the ids from the database"""
+        if not ids:
+            return []
+        return self.db_session.exec(select(User).where(col(User.id).in_(ids))).all()
+
+    def get_users_by_usernames(self, usernames: Sequence[str]) -> Sequence[User]:
+        """get users with any of the usernames from the database"""
+        if not usernames:
+            return []
+        return self.db_session.exec(
+            select(User).where(col(User.username).in_(usernames))
+        ).all()
+
     def get_all_users(self) -> Sequence[User]:
         """get all users from the database"""
         return self.db_session.exec(select(User)).all()
 
+    def get_users_after_cursor(
+        self, size: int, cursor: Optional[Tuple[datetime, uuid.UUID]] = None
+    ) -> Sequence[User]:
+        """
+        get users ordered by (created_at, id) newest first after the keyset cursor,
+        one extra row is fetched to know if a next page exists
+        """
+        statement = select(User)
+        if cursor:
+            statement = statement.where(tuple_(User.created_at, User.id) < cursor)
+        statement = statement.order_by(desc(User.created_at), desc(User.id)).limit(size + 1)
+        return self.db_session.exec(statement).all()
+
+    def get_export_rows(self, batch_size: int) -> Iterator[Row]:
+        """stream USER_EXPORT_FIELDS of all users oldest first with a server side cursor in batches"""
+        statement = select(*[getattr(User, field) for field in USER_EXPORT_FIELDS]).order_by(
+            User.created_at, User.id
+        )
+        return self.db_session.exec(statement.execution_options(yield_per=batch_size))
+
     def get_all_public_users(self) -> Sequence[User]:
         """get all users with profile type public from the database"""
         return self.db_session.exec(
@@ -53,6 +102,16 @@ class UserService:
         db_session_value_create(session=self.db_session, value=db_user)
         return db_user
 
+    def exists(self, id: uuid.UUID) -> bool:
+        """check user with id exists"""
+        return self.db_session.scalar(select(exists().where(User.id == id)))
+
+    def get_existing_profiles(self, profiles: Sequence[str]) -> set:
+        """get profile object keys used by users among profiles"""
+        return set(
+            self.db_session.scalars(select(User.profile).where(User.profile.in_(profiles))).all()
+        )
+
     def delete(self, user: User) -> None:
         """delete user in the database"""
         self.db_session.delete(user)
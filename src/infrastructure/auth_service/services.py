@@ -1,14 +1,253 @@
+import time
+import asyncio
+import hashlib
+import statistics
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
 
 import jwt
+import redis
+from fastapi.concurrency import run_in_threadpool
 from jwt.exceptions import InvalidTokenError
+from passlib.context import CryptContext
 
-from lib.fastapi.error_string import get_invalid_token
-from lib.fastapi.custom_exceptions import UnauthorizedException
+from lib.fastapi.error_string import get_invalid_token, get_password_hash_pool_busy
+from lib.fastapi.custom_exceptions import UnauthorizedException, ServiceUnavailableException
 from src.setup.config.settings import settings
 from lib.fastapi.utils import get_default_timezone
 
 
+class ClaimsVersionCache:
+    """
+    latest claims version of users whose username or profile type changed, with optional shared redis tier,
+    versions are kept for the access token lifetime since older tokens have expired by then
+    """
+
+    def __new__(cls):
+        if not hasattr(cls, "instance"):
+            cls.instance = super(ClaimsVersionCache, cls).__new__(cls)
+            cls.instance._lock = threading.Lock()
+            cls.instance._versions = OrderedDict()
+            cls.instance._redis = (
+                redis.Redis.from_url(settings.CLAIMS_VERSION_REDIS_URL)
+                if settings.CLAIMS_VERSION_REDIS_URL
+                else None
+            )
+        return cls.instance
+
+    @staticmethod
+    def get_ttl() -> float:
+        """seconds a version is kept"""
+        return timedelta(**settings.ACCESS_TOKEN_LIFETIME).total_seconds()
+
+    def get(self, base_user_id: str) -> Optional[int]:
+        """get latest claims version of user, None if it didn't change while tokens are valid"""
+        with self._lock:
+            cached = self._versions.get(base_user_id)
+            if cached and cached[1] > time.time():
+                return cached[0]
+        if self._redis:
+            try:
+                version = self._redis.get(f"claims_version:{base_user_id}")
+            except redis.RedisError:
+                return None
+            if version is not None:
+                return int(version)
+        return None
+
+    def set(self, base_user_id: str, version: int) -> None:
+        """store latest claims version of user evicting oldest versions"""
+        with self._lock:
+            self._versions[base_user_id] = (version, time.time() + self.get_ttl())
+            self._versions.move_to_end(base_user_id)
+            while len(self._versions) > settings.CLAIMS_VERSION_CACHE_SIZE:
+                self._versions.popitem(last=False)
+        if self._redis:
+            try:
+                self._redis.set(
+                    f"claims_version:{base_user_id}", version, ex=int(self.get_ttl())
+                )
+            except redis.RedisError:
+                pass
+
+
+class VerifiedTokenCache:
+    """
+    decoded payloads of access tokens with verified signature, keyed by token digest and kept until
+    the token expires, least recently used tokens are evicted beyond VERIFIED_TOKEN_CACHE_SIZE,
+    discard or flush tokens to revoke them before they expire
+    """
+
+    def __new__(cls):
+        if not hasattr(cls, "instance"):
+            cls.instance = super(VerifiedTokenCache, cls).__new__(cls)
+            cls.instance._lock = threading.Lock()
+            cls.instance._payloads = OrderedDict()
+            # lookups served from and missed by the cache, for monitoring
+            cls.instance.hits = 0
+            cls.instance.misses = 0
+        return cls.instance
+
+    @staticmethod
+    def get_key(token: str) -> bytes:
+        """digest of token, tokens themselves are not kept in memory"""
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        """get copy of decoded payload of token, None if it was not verified yet or has expired"""
+        key = self.get_key(token=token)
+        with self._lock:
+            cached = self._payloads.get(key)
+            if cached and cached[1] > time.time():
+                self._payloads.move_to_end(key)
+                self.hits += 1
+                return dict(cached[0])
+            self._payloads.pop(key, None)
+            self.misses += 1
+        return None
+
+    def set(self, token: str, payload: dict) -> None:
+        """store decoded payload of verified token until its exp evicting least recently used tokens"""
+        expires_at = payload.get("exp")
+        if not isinstance(expires_at, (int, float)):
+            return None
+        with self._lock:
+            key = self.get_key(token=token)
+            self._payloads[key] = (dict(payload), expires_at)
+            self._payloads.move_to_end(key)
+            while len(self._payloads) > settings.VERIFIED_TOKEN_CACHE_SIZE:
+                self._payloads.popitem(last=False)
+        return None
+
+    def discard(self, token: str) -> None:
+        """forget token so its signature and expiry are verified again on next use"""
+        with self._lock:
+            self._payloads.pop(self.get_key(token=token), None)
+
+    def flush(self) -> None:
+        """forget all tokens, e.g. after rotating JWT_SECRET_KEY"""
+        with self._lock:
+            self._payloads.clear()
+
+
+@lru_cache(maxsize=None)
+def get_password_context(rounds: int) -> CryptContext:
+    """bcrypt context, built once per process and cost"""
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+def bcrypt_hash(password: str, rounds: int) -> str:
+    """hash password with bcrypt, runs in password hash pool processes"""
+    return get_password_context(rounds=rounds).hash(password)
+
+
+def bcrypt_verify(password: str, hashed_password: str) -> bool:
+    """verify password with its bcrypt hash, runs in password hash pool processes"""
+    return get_password_context(rounds=settings.PASSWORD_BCRYPT_ROUNDS).verify(
+        password, hashed_password
+    )
+
+
+class PasswordHashPool:
+    """
+    process pool running bcrypt away from the request threads with at most PASSWORD_HASH_WORKERS processes,
+    hashes beyond PASSWORD_HASH_QUEUE_SIZE waiting or running are rejected with 503,
+    PASSWORD_HASH_WORKERS=0 runs bcrypt in the calling thread
+    """
+
+    def __new__(cls):
+        if not hasattr(cls, "instance"):
+            cls.instance = super(PasswordHashPool, cls).__new__(cls)
+            cls.instance._lock = threading.Lock()
+            cls.instance._executor = None
+            # hashes waiting or running in the pool, highest depth seen and rejected hashes, for monitoring
+            cls.instance.queue_depth = 0
+            cls.instance.max_queue_depth = 0
+            cls.instance.rejected = 0
+        return cls.instance
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """start pool processes on first use, spawned since forking a threaded server is unsafe"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _done(self, future: Future) -> None:
+        with self._lock:
+            self.queue_depth -= 1
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """queue fn in the pool, a pool broken by a crashed process is replaced"""
+        with self._lock:
+            if self.queue_depth >= settings.PASSWORD_HASH_QUEUE_SIZE:
+                self.rejected += 1
+                raise ServiceUnavailableException(get_password_hash_pool_busy())
+            try:
+                future = self._get_executor().submit(fn, *args)
+            except BrokenProcessPool:
+                self._executor = None
+                future = self._get_executor().submit(fn, *args)
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        future.add_done_callback(self._done)
+        return future
+
+    def run(self, fn: Callable, *args):
+        """run fn in the pool and wait for its result"""
+        if not settings.PASSWORD_HASH_WORKERS:
+            return fn(*args)
+        return self.submit(fn, *args).result()
+
+    async def run_async(self, fn: Callable, *args):
+        """run fn in the pool without holding a thread while it waits"""
+        if not settings.PASSWORD_HASH_WORKERS:
+            return await run_in_threadpool(fn, *args)
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def get_queue_depth(self) -> int:
+        """hashes waiting or running in the pool"""
+        return self.queue_depth
+
+    def shutdown(self) -> None:
+        """stop pool processes, started again on next use"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown()
+
+
+def calibrate_bcrypt_rounds(
+    target_ms: float, min_rounds: int = 10, max_rounds: int = 16, samples: int = 3
+) -> Tuple[int, List[Tuple[int, float]]]:
+    """
+    time bcrypt verify on this host for increasing cost and pick the highest cost whose median
+    verify time meets target_ms (min_rounds at least), returns (rounds, [(rounds, median ms)])
+    """
+    timings = []
+    rounds = min_rounds
+    for cost in range(min_rounds, max_rounds + 1):
+        hashed_password = bcrypt_hash(password="calibration", rounds=cost)
+        durations = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            get_password_context(rounds=cost).verify("calibration", hashed_password)
+            durations.append((time.perf_counter() - start) * 1000)
+        timings.append((cost, statistics.median(durations)))
+        if timings[-1][1] > target_ms:
+            break
+        rounds = cost
+    return rounds, timings
+
+
 class JWTService:
     """services for jwt token handling"""
 
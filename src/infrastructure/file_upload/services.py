@@ -1,18 +1,391 @@
-from datetime import timedelta
-from typing import IO, Optional
+import os
+import re
+import logging
+import hmac
+import json
+import mmap
+import time
+import uuid
+import shutil
+import hashlib
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path, PurePosixPath
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import quote, urlencode
 
 import boto3
+import redis
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 from src.setup.config.settings import settings
-from lib.fastapi.custom_enums import Environment
-from lib.fastapi.custom_exceptions import CustomException
+from lib.fastapi.custom_enums import Environment, StorageBackend
+from lib.fastapi.custom_exceptions import (
+    CustomException,
+    BadRequestException,
+    ForbiddenException,
+    NotFoundException,
+    PayloadTooLargeException,
+)
+from lib.fastapi.error_string import (
+    get_file_too_large,
+    get_invalid_object_key,
+    get_upload_not_found,
+    get_storage_file_not_found,
+    get_invalid_storage_signature,
+)
 
+logger = logging.getLogger(__name__)
 
+# shared by all multipart uploads of the process, parts of one upload are bounded by S3_MULTIPART_CONCURRENCY
+multipart_upload_executor = ThreadPoolExecutor(
+    max_workers=settings.S3_MULTIPART_WORKERS, thread_name_prefix="s3-multipart"
+)
 
-class Boto3Service:
+
+class PresignedUrlCache:
+    """
+    in-process LRU cache of presigned urls with optional shared redis tier,
+    a url is reused for the whole time window it was signed in so repeated requests get identical urls
+    """
+
+    def __new__(cls):
+        if not hasattr(cls, "instance"):
+            cls.instance = super(PresignedUrlCache, cls).__new__(cls)
+            cls.instance._lock = threading.Lock()
+            cls.instance._urls = OrderedDict()
+            cls.instance._redis = (
+                redis.Redis.from_url(settings.PRESIGNED_URL_REDIS_URL)
+                if settings.PRESIGNED_URL_REDIS_URL
+                else None
+            )
+        return cls.instance
+
+    @staticmethod
+    def get_window() -> Tuple[int, float]:
+        """get current time window number and seconds left in it"""
+        now = time.time()
+        window = int(now // settings.PRESIGNED_URL_WINDOW_SECONDS)
+        return window, (window + 1) * settings.PRESIGNED_URL_WINDOW_SECONDS - now
+
+    def get(self, key: str, window: int) -> Optional[str]:
+        """get url cached for key in the window"""
+        with self._lock:
+            cached = self._urls.get(key)
+            if cached and cached[0] == window:
+                self._urls.move_to_end(key)
+                return cached[1]
+        if self._redis:
+            try:
+                cached = self._redis.get(f"presigned:{key}")
+            except redis.RedisError:
+                return None
+            if cached:
+                cached_window, url = cached.decode().split("|", 1)
+                if int(cached_window) == window:
+                    self._set_local(key=key, window=window, url=url)
+                    return url
+        return None
+
+    def _set_local(self, key: str, window: int, url: str) -> None:
+        """store url in in-process cache evicting least recently used urls"""
+        with self._lock:
+            self._urls[key] = (window, url)
+            self._urls.move_to_end(key)
+            while len(self._urls) > settings.PRESIGNED_URL_CACHE_SIZE:
+                self._urls.popitem(last=False)
+
+    def set(self, key: str, window: int, url: str, ttl: float) -> None:
+        """store url for key in the window, ttl is seconds left in the window"""
+        self._set_local(key=key, window=window, url=url)
+        if self._redis:
+            try:
+                self._redis.set(f"presigned:{key}", f"{window}|{url}", px=int(ttl * 1000))
+            except redis.RedisError:
+                pass
+
+    def invalidate(self, key: str) -> None:
+        """remove cached url of deleted or replaced object"""
+        with self._lock:
+            self._urls.pop(key, None)
+        if self._redis:
+            try:
+                self._redis.delete(f"presigned:{key}")
+            except redis.RedisError:
+                pass
+
+
+class MultipartUpload:
+    """
+    write a stream of chunks to one object as multipart upload of any storage backend,
+    full parts are uploaded in parallel while next chunks are written and the content hash and size
+    are computed in the same pass, writing blocks while S3_MULTIPART_CONCURRENCY parts are in flight
+    """
+
+    def __init__(
+        self,
+        storage_service: "StorageService",
+        object_key: str,
+        upload_id: str,
+        part_size: int,
+        max_size: Optional[int] = None,
+    ) -> None:
+        self.storage_service = storage_service
+        self.object_key = object_key
+        self.upload_id = upload_id
+        self.part_size = part_size
+        self.max_size = max_size
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._buffer = bytearray()
+        self._parts: List[Future] = []
+        self._in_flight = threading.BoundedSemaphore(settings.S3_MULTIPART_CONCURRENCY)
+
+    @property
+    def sha256(self) -> str:
+        """hex digest of content written so far"""
+        return self._hash.hexdigest()
+
+    def _upload_part(self, part_number: int, body: bytes) -> dict:
+        """upload one part and release its in flight slot"""
+        try:
+            return self.storage_service.upload_part(
+                object_key=self.object_key,
+                upload_id=self.upload_id,
+                part_number=part_number,
+                body=body,
+            )
+        finally:
+            self._in_flight.release()
+
+    def _submit_part(self, body: bytes) -> None:
+        """queue part upload, blocks until an in flight slot is free"""
+        for part in self._parts:
+            if part.done() and part.exception():
+                raise part.exception()
+        self._in_flight.acquire()
+        self._parts.append(
+            multipart_upload_executor.submit(
+                self._upload_part, part_number=len(self._parts) + 1, body=body
+            )
+        )
+
+    def write(self, chunk: bytes) -> None:
+        """
+        write chunk, raise PayloadTooLargeException as soon as max_size is exceeded
+
+        the upload is left open, call abort on any error
+        """
+        self.size += len(chunk)
+        if self.max_size is not None and self.size > self.max_size:
+            raise PayloadTooLargeException(get_file_too_large(max_size=self.max_size))
+        self._hash.update(chunk)
+        self._buffer.extend(chunk)
+        while len(self._buffer) >= self.part_size:
+            self._submit_part(bytes(self._buffer[: self.part_size]))
+            del self._buffer[: self.part_size]
+
+    def complete(self) -> Tuple[int, str]:
+        """
+        upload remaining bytes and complete the upload
+
+        Returns:
+            Tuple[int, str]: size in bytes and sha256 hex digest of the object
+        """
+        if self._buffer or not self._parts:
+            self._submit_part(bytes(self._buffer))
+            self._buffer.clear()
+        parts = [part.result() for part in self._parts]
+        self.storage_service.complete_multipart_upload(
+            object_key=self.object_key, upload_id=self.upload_id, parts=parts
+        )
+        return self.size, self.sha256
+
+    def abort(self) -> None:
+        """cancel queued parts and abort the upload so uploaded parts are not kept in storage"""
+        for part in self._parts:
+            part.cancel()
+        wait(self._parts)
+        self._buffer.clear()
+        self.storage_service.abort_multipart_upload(
+            object_key=self.object_key, upload_id=self.upload_id
+        )
+
+
+class StorageService(ABC):
+    """
+    storage backend for media files, Boto3Service (s3) and LocalStorageService (local disk)
+    are selected with STORAGE_BACKEND, see get_storage_service
+    """
+
+    def _init_latency_stats(self) -> None:
+        """start recording latency of storage operations"""
+        self._latency_lock = threading.Lock()
+        self._latency = {}
+
+    @property
+    def bucket_name(self) -> str:
+        """bucket for current environment"""
+        if settings.ENVIRONMENT != Environment.TESTING.value:
+            return settings.AWS_BUCKET_NAME
+        return settings.TEST_AWS_BUCKET_NAME
+
+    @contextmanager
+    def _timed(self, operation: str):
+        """record latency of storage operation"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._latency_lock:
+                stats = self._latency.setdefault(
+                    operation, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+                )
+                stats["count"] += 1
+                stats["total_seconds"] += elapsed
+                stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+
+    def get_latency_stats(self) -> Dict[str, dict]:
+        """get count, total and max seconds per storage operation"""
+        with self._latency_lock:
+            return {operation: dict(stats) for operation, stats in self._latency.items()}
+
+    @abstractmethod
+    def upload_file_from_source(
+        self, object_key: str, source_file: str, content_type: str
+    ) -> None:
+        """upload file from source"""
+
+    @abstractmethod
+    def upload_file_from_memory(
+        self, object_key: str, file_content: IO, file_type: str
+    ) -> None:
+        """upload file using IO buffer"""
+
+    @abstractmethod
+    def create_multipart_upload(
+        self,
+        object_key: str,
+        content_type: str,
+        part_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+    ) -> MultipartUpload:
+        """start multipart upload, part_size defaults to S3_MULTIPART_PART_SIZE"""
+
+    @abstractmethod
+    def upload_part(
+        self, object_key: str, upload_id: str, part_number: int, body: bytes
+    ) -> dict:
+        """upload one part of multipart upload, returns part for completing the upload"""
+
+    @abstractmethod
+    def complete_multipart_upload(
+        self, object_key: str, upload_id: str, parts: List[dict]
+    ) -> None:
+        """complete multipart upload from its uploaded parts"""
+
+    @abstractmethod
+    def abort_multipart_upload(self, object_key: str, upload_id: str) -> None:
+        """abort multipart upload and discard its uploaded parts"""
+
+    @abstractmethod
+    def list_parts(self, object_key: str, upload_id: str) -> List[dict]:
+        """list uploaded parts of multipart upload for completing the upload"""
+
+    @abstractmethod
+    def list_multipart_uploads(self) -> Iterator[List[dict]]:
+        """list incomplete multipart uploads a page at a time, each upload with Key, UploadId and Initiated"""
+
+    @abstractmethod
+    def get_presigned_upload_post(
+        self, object_key: str, content_type: str, max_size: int
+    ) -> dict:
+        """get presigned POST form (url and fields) to upload file of content_type up to max_size directly"""
+
+    @abstractmethod
+    def get_presigned_part_urls(
+        self, object_key: str, upload_id: str, part_count: int
+    ) -> List[str]:
+        """get presigned PUT url for each part of multipart upload"""
+
+    @abstractmethod
+    def head_file(self, object_key: str) -> Optional[dict]:
+        """get size and content type of file, None if file doesn't exist"""
+
+    def upload_file_from_stream(
+        self,
+        object_key: str,
+        chunks: Iterable[bytes],
+        content_type: str,
+        max_size: Optional[int] = None,
+    ) -> Tuple[int, str]:
+        """
+        upload chunks as multipart upload without holding the whole file in memory,
+        the upload is aborted on any error
+
+        Returns:
+            Tuple[int, str]: size in bytes and sha256 hex digest of the object
+        """
+        upload = self.create_multipart_upload(
+            object_key=object_key, content_type=content_type, max_size=max_size
+        )
+        try:
+            for chunk in chunks:
+                upload.write(chunk)
+            return upload.complete()
+        except BaseException:
+            try:
+                upload.abort()
+            except CustomException:
+                pass
+            raise
+
+    @abstractmethod
+    def download_file(self, object_key: str, download_path: str) -> None:
+        """download file to source path"""
+
+    @abstractmethod
+    def download_file_into_memory(self, object_key: str, buffer):
+        """download file into memory"""
+
+    @abstractmethod
+    def delete_file(self, object_key: str) -> None:
+        """delete file using object_key"""
+
+    @abstractmethod
+    def delete_files(self, object_keys: List[str]) -> Dict[str, str]:
+        """
+        delete files in batches
+
+        Returns:
+            Dict[str, str]: error of each object_key that could not be deleted
+        """
+
+    @abstractmethod
+    def list_files(self, prefix: str) -> Iterator[List[dict]]:
+        """list files under prefix a page (up to 1000 files) at a time, each file with Key and LastModified"""
+
+    @abstractmethod
+    def get_presigned_url(self, object_key: str) -> Optional[str]:
+        """get temporary url to read the file"""
+
+    @abstractmethod
+    def delete_bucket(self, bucket_name: str) -> None:
+        """delete bucket after emptying its content"""
+
+
+class Boto3Service(StorageService):
     """upload files to AWS Bucket using boto3"""
 
+    _lock = threading.Lock()
+
     def __new__(cls):
         if not settings.AWS_S3_ENDPOINT_URL:
             raise CustomException(detail="Storage endpoint url not found!")
@@ -22,32 +395,48 @@ class Boto3Service:
             raise CustomException(detail="AWS access_key not found!")
         if not settings.AWS_SECRET_KEY_ID:
             raise CustomException(detail="AWS secret_key not found!")
-        if not hasattr(cls, "instance"):
-            cls.instance = super(Boto3Service, cls).__new__(cls)
+        with cls._lock:
+            if not hasattr(cls, "instance"):
+                cls.instance = super(Boto3Service, cls).__new__(cls)
         return cls.instance
 
     def __init__(self) -> None:
-        self.__client = boto3.client(
-            "s3",
-            endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_KEY_ID,
-            verify=False,
-            # region_name=settings.AWS_S3_REGION_NAME,
-        )
-        if settings.ENVIRONMENT != Environment.TESTING.value:
-            self.bucket_name = settings.AWS_BUCKET_NAME
-        else:
-            self.bucket_name = settings.TEST_AWS_BUCKET_NAME
+        if hasattr(self, "_Boto3Service__client"):
+            return
+        with self._lock:
+            if hasattr(self, "_Boto3Service__client"):
+                return
+            self._bucket_lock = threading.Lock()
+            self._existing_buckets = set()
+            self._init_latency_stats()
+            # one client per process, boto3 clients are thread safe
+            self.__client = boto3.client(
+                "s3",
+                endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.AWS_SECRET_KEY_ID,
+                verify=False,
+                config=Config(
+                    max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                    tcp_keepalive=settings.S3_TCP_KEEPALIVE,
+                ),
+                # region_name=settings.AWS_S3_REGION_NAME,
+            )
 
     def _create_bucket(self, bucket_name: str) -> None:
-        """create bucket if doesn't exist or prints a list of buckets in existence"""
-        bucket_names = [
-            bucket["Name"] for bucket in self.__client.list_buckets()["Buckets"]
-        ]
-        if bucket_name not in bucket_names:
-            self.__client.create_bucket(Bucket=bucket_name)
-        # print(bucket_names)
+        """create bucket if doesn't exist, checked once per process and then cached"""
+        if bucket_name in self._existing_buckets:
+            return None
+        with self._bucket_lock:
+            if bucket_name in self._existing_buckets:
+                return None
+            try:
+                with self._timed("head_bucket"):
+                    self.__client.head_bucket(Bucket=bucket_name)
+            except ClientError:
+                with self._timed("create_bucket"):
+                    self.__client.create_bucket(Bucket=bucket_name)
+            self._existing_buckets.add(bucket_name)
         return None
 
     def upload_file_from_source(
@@ -56,12 +445,14 @@ class Boto3Service:
         """upload file from source"""
         try:
             self._create_bucket(self.bucket_name)
-            self.__client.upload_file(
-                Filename=source_file,
-                Bucket=self.bucket_name,
-                Key=object_key,
-                ExtraArgs={"ContentType": content_type},
-            )
+            with self._timed("upload_file"):
+                self.__client.upload_file(
+                    Filename=source_file,
+                    Bucket=self.bucket_name,
+                    Key=object_key,
+                    ExtraArgs={"ContentType": content_type},
+                )
+            PresignedUrlCache().invalidate(key=f"{self.bucket_name}/{object_key}")
         except ClientError as e:
             raise CustomException(detail=f"Client Error in Boto3: {e}")
 
@@ -72,48 +463,266 @@ class Boto3Service:
         try:
             self._create_bucket(self.bucket_name)
             # print(object_key, file_content, file_type)
-            self.__client.put_object(
-                Body=file_content,
-                Bucket=self.bucket_name,
-                Key=object_key,
-                ContentType=file_type,
-            )
+            with self._timed("put_object"):
+                self.__client.put_object(
+                    Body=file_content,
+                    Bucket=self.bucket_name,
+                    Key=object_key,
+                    ContentType=file_type,
+                )
+            PresignedUrlCache().invalidate(key=f"{self.bucket_name}/{object_key}")
+        except ClientError as e:
+            raise CustomException(detail=f"Client Error in Boto3: {e}")
+
+    def create_multipart_upload(
+        self,
+        object_key: str,
+        content_type: str,
+        part_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+    ) -> MultipartUpload:
+        """start multipart upload, part_size defaults to S3_MULTIPART_PART_SIZE"""
+        try:
+            self._create_bucket(self.bucket_name)
+            with self._timed("create_multipart_upload"):
+                response = self.__client.create_multipart_upload(
+                    Bucket=self.bucket_name, Key=object_key, ContentType=content_type
+                )
+        except ClientError as e:
+            raise CustomException(detail=f"Client Error in Boto3: {e}")
+        return MultipartUpload(
+            storage_service=self,
+            object_key=object_key,
+            upload_id=response["UploadId"],
+            part_size=part_size or settings.S3_MULTIPART_PART_SIZE,
+            max_size=max_size,
+        )
+
+    def upload_part(
+        self, object_key: str, upload_id: str, part_number: int, body: bytes
+    ) -> dict:
+        """upload one part of multipart upload, returns part for completing the upload"""
+        try:
+            with self._timed("upload_part"):
+                response = self.__client.upload_part(
+                    Body=body,
+                    Bucket=self.bucket_name,
+                    Key=object_key,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                )
+        except ClientError as e:
+            raise CustomException(detail=f"Client Error in Boto3: {e}")
+        return {"ETag": response["ETag"], "PartNumber": part_number}
+
+    def complete_multipart_upload(
+        self, object_key: str, upload_id: str, parts: List[dict]
+    ) -> None:
+        """complete multipart upload from its uploaded parts"""
+        try:
+            with self._timed("complete_multipart_upload"):
+                self.__client.complete_multipart_upload(
+                    Bucket=self.bucket_name,
+                    Key=object_key,
+                    UploadId=upload_id,
+                    MultipartUpload={"Parts": parts},
+                )
+            PresignedUrlCache().invalidate(key=f"{self.bucket_name}/{object_key}")
+        except ClientError as e:
+            raise CustomException(detail=f"Client Error in Boto3: {e}")
+
+    def abort_multipart_upload(self, object_key: str, upload_id: str) -> None:
+        """abort multipart upload and discard its uploaded parts"""
+        try:
+            with self._timed("abort_multipart_upload"):
+                self.__client.abort_multipart_upload(
+                    Bucket=self.bucket_name, Key=object_key, UploadId=upload_id
+                )
         except ClientError as e:
             raise CustomException(detail=f"Client Error in Boto3: {e}")
 
+    def list_parts(self, object_key: str, upload_id: str) -> List[dict]:
+        """list uploaded parts of multipart upload for completing the upload"""
+        parts = []
+        try:
+            paginator = self.__client.get_paginator("list_parts")
+            with self._timed("list_parts"):
+                for page in paginator.paginate(
+                    Bucket=self.bucket_name, Key=object_key, UploadId=upload_id
+                ):
+                    parts.extend(
+                        {"ETag": part["ETag"], "PartNumber": part["PartNumber"]}
+                        for part in page.get("Parts", [])
+                    )
+        except ClientError as e:
+            raise CustomException(detail=f"Client Error in Boto3: {e}")
+        return parts
+
+    def list_multipart_uploads(self) -> Iterator[List[dict]]:
+        """list incomplete multipart uploads a page at a time, each upload with Key, UploadId and Initiated"""
+        try:
+            paginator = self.__client.get_paginator("list_multipart_uploads")
+            for page in paginator.paginate(Bucket=self.bucket_name):
+                yield [
+                    {
+                        "Key": upload["Key"],
+                        "UploadId": upload["UploadId"],
+                        "Initiated": upload["Initiated"],
+                    }
+                    for upload in page.get("Uploads", [])
+                ]
+        except ClientError as e:
+            raise CustomException(detail=f"Client Error in Boto3: {e}")
+
+    def get_presigned_upload_post(
+        self, object_key: str, content_type: str, max_size: int
+    ) -> dict:
+        """get presigned POST form (url and fields) to upload file of content_type up to max_size directly"""
+        try:
+            self._create_bucket(self.bucket_name)
+            with self._timed("generate_presigned_post"):
+                return self.__client.generate_presigned_post(
+                    Bucket=self.bucket_name,
+                    Key=object_key,
+                    Fields={"Content-Type": content_type},
+                    Conditions=[
+                        {"Content-Type": content_type},
+                        ["content-length-range", 1, max_size],
+                    ],
+                    ExpiresIn=settings.UPLOAD_URL_EXPIRES_SECONDS,
+                )
+        except ClientError as e:
+            raise CustomException(detail=f"Client Error in Boto3: {e}")
+
+    def get_presigned_part_urls(
+        self, object_key: str, upload_id: str, part_count: int
+    ) -> List[str]:
+        """get presigned PUT url for each part of multipart upload"""
+        try:
+            with self._timed("generate_presigned_url"):
+                return [
+                    self.__client.generate_presigned_url(
+                        ClientMethod="upload_part",
+                        Params={
+                            "Bucket": self.bucket_name,
+                            "Key": object_key,
+                            "UploadId": upload_id,
+                            "PartNumber": part_number,
+                        },
+                        ExpiresIn=settings.UPLOAD_URL_EXPIRES_SECONDS,
+                    )
+                    for part_number in range(1, part_count + 1)
+                ]
+        except ClientError as e:
+            raise CustomException(detail=f"Client Error in Boto3: {e}")
+
+    def head_file(self, object_key: str) -> Optional[dict]:
+        """get size and content type of file, None if file doesn't exist"""
+        try:
+            with self._timed("head_object"):
+                response = self.__client.head_object(
+                    Bucket=self.bucket_name, Key=object_key
+                )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise CustomException(detail=f"Client Error in Boto3: {e}")
+        return {
+            "size": response["ContentLength"],
+            "content_type": response.get("ContentType"),
+        }
+
     def download_file(self, object_key: str, download_path: str) -> None:
         """download file to source path"""
         try:
-            self.__client.download_file(
-                Bucket=self.bucket_name, Key=object_key, Filename=download_path
-            )
+            with self._timed("download_file"):
+                self.__client.download_file(
+                    Bucket=self.bucket_name, Key=object_key, Filename=download_path
+                )
         except ClientError as e:
             raise CustomException(detail=f"Client Error in Boto3: {e}")
 
     def download_file_into_memory(self, object_key: str, buffer):
         """download file into memory"""
         try:
-            self.__client.download_fileobj(
-                Bucket=self.bucket_name, Key=object_key, Fileobj=buffer
-            )
+            with self._timed("download_fileobj"):
+                self.__client.download_fileobj(
+                    Bucket=self.bucket_name, Key=object_key, Fileobj=buffer
+                )
         except ClientError as e:
             print(e)
 
     def delete_file(self, object_key: str) -> None:
         """delete file using object_key"""
         try:
-            self.__client.delete_object(Bucket=self.bucket_name, Key=object_key)
+            with self._timed("delete_object"):
+                self.__client.delete_object(Bucket=self.bucket_name, Key=object_key)
+            PresignedUrlCache().invalidate(key=f"{self.bucket_name}/{object_key}")
+        except ClientError as e:
+            raise CustomException(detail=f"Client Error in Boto3: {e}")
+
+    def delete_files(self, object_keys: List[str]) -> Dict[str, str]:
+        """
+        delete files with delete_objects in batches of up to 1000 keys
+
+        Returns:
+            Dict[str, str]: error of each object_key that could not be deleted
+        """
+        errors = {}
+        for i in range(0, len(object_keys), 1000):
+            batch = object_keys[i : i + 1000]
+            try:
+                with self._timed("delete_objects"):
+                    response = self.__client.delete_objects(
+                        Bucket=self.bucket_name,
+                        Delete={
+                            "Objects": [{"Key": object_key} for object_key in batch],
+                            "Quiet": True,
+                        },
+                    )
+            except ClientError as e:
+                errors.update({object_key: str(e) for object_key in batch})
+                continue
+            for error in response.get("Errors", []):
+                errors[error["Key"]] = f"{error.get('Code')}: {error.get('Message')}"
+            for object_key in batch:
+                PresignedUrlCache().invalidate(key=f"{self.bucket_name}/{object_key}")
+        return errors
+
+    def list_files(self, prefix: str) -> Iterator[List[dict]]:
+        """list files under prefix a page (up to 1000 files) at a time, each file with Key and LastModified"""
+        try:
+            paginator = self.__client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+                yield [
+                    {"Key": obj["Key"], "LastModified": obj["LastModified"]}
+                    for obj in page.get("Contents", [])
+                ]
         except ClientError as e:
             raise CustomException(detail=f"Client Error in Boto3: {e}")
 
     def get_presigned_url(self, object_key: str) -> Optional[str]:
-        """get temporary url"""
+        """
+        get temporary url, cached for the current time window and valid for
+        PRESIGNED_URL_TIME after the window ends
+        """
+        cache = PresignedUrlCache()
+        key = f"{self.bucket_name}/{object_key}"
+        window, seconds_left = cache.get_window()
+        url = cache.get(key=key, window=window)
+        if url:
+            return url
         try:
-            url = self.__client.generate_presigned_url(
-                ClientMethod="get_object",
-                Params={"Bucket": self.bucket_name, "Key": object_key},
-                ExpiresIn=timedelta(**settings.PRESIGNED_URL_TIME).total_seconds(),
-            )
+            with self._timed("generate_presigned_url"):
+                url = self.__client.generate_presigned_url(
+                    ClientMethod="get_object",
+                    Params={"Bucket": self.bucket_name, "Key": object_key},
+                    ExpiresIn=int(
+                        seconds_left
+                        + timedelta(**settings.PRESIGNED_URL_TIME).total_seconds()
+                    ),
+                )
+            cache.set(key=key, window=window, url=url, ttl=seconds_left)
             return url
         except ClientError as e:
             raise CustomException(detail=f"Client Error in Boto3: {e}")
@@ -126,8 +735,418 @@ class Boto3Service:
             ]
             if bucket_name in bucket_names:
                 objects = self.__client.list_objects_v2(Bucket=bucket_name)
-                for obj in objects["Contents"]:
+                for obj in objects.get("Contents", []):
                     self.__client.delete_object(Bucket=bucket_name, Key=obj["Key"])
                 self.__client.delete_bucket(Bucket=bucket_name)
+                self._existing_buckets.discard(bucket_name)
         except ClientError as e:
-            raise CustomException(detail=f"Client Error in Boto3: {e}")
\ No newline at end of file
+            raise CustomException(detail=f"Client Error in Boto3: {e}")
+
+class LocalStorageService(StorageService):
+    """
+    store files on local disk under LOCAL_STORAGE_PATH, files are read through memory maps
+    and urls are HMAC signed links to the storage router
+    """
+
+    _lock = threading.Lock()
+    chunk_size = 1024 * 1024
+    page_size = 1000
+
+    def __new__(cls):
+        if not settings.LOCAL_STORAGE_PATH:
+            raise CustomException(detail="Local storage path not found!")
+        if not settings.LOCAL_STORAGE_SECRET:
+            raise CustomException(detail="Local storage secret not found!")
+        with cls._lock:
+            if not hasattr(cls, "instance"):
+                cls.instance = super(LocalStorageService, cls).__new__(cls)
+                cls.instance._init_latency_stats()
+        return cls.instance
+
+    @property
+    def root(self) -> Path:
+        """folder of current bucket"""
+        return Path(settings.LOCAL_STORAGE_PATH) / self.bucket_name
+
+    def _get_path(self, object_key: str, folder: str = "objects") -> Path:
+        """path of object_key inside folder of the bucket, keys leaving the folder are rejected"""
+        if (
+            not object_key
+            or object_key.startswith("/")
+            or "\\" in object_key
+            or "\x00" in object_key
+            or any(part in ("", ".", "..") for part in object_key.split("/"))
+        ):
+            raise BadRequestException(get_invalid_object_key())
+        return self.root / folder / PurePosixPath(object_key)
+
+    def _get_meta_path(self, object_key: str) -> Path:
+        """path of json file with content type of the object"""
+        path = self._get_path(object_key=object_key, folder="meta")
+        return path.with_name(f"{path.name}.json")
+
+    @staticmethod
+    def _write_atomic(path: Path, chunks: Iterable[bytes], max_size: Optional[int] = None) -> int:
+        """
+        write chunks to a temporary file next to path and move it in place,
+        readers never see partially written files
+
+        Returns:
+            int: size of written file
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        raise PayloadTooLargeException(get_file_too_large(max_size=max_size))
+                    temp_file.write(chunk)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        return size
+
+    @staticmethod
+    def _read_chunks(file: IO, chunk_size: int) -> Iterator[bytes]:
+        """read file object in chunks"""
+        return iter(lambda: file.read(chunk_size), b"")
+
+    @staticmethod
+    @contextmanager
+    def _open_mmap(path: Path):
+        """memory map file for reading, empty files are mapped to empty bytes"""
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                yield b""
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+    def save_file(
+        self,
+        object_key: str,
+        chunks: Iterable[bytes],
+        content_type: str,
+        max_size: Optional[int] = None,
+    ) -> int:
+        """
+        write object and its content type, raise PayloadTooLargeException once max_size is exceeded
+
+        Returns:
+            int: size of the object
+        """
+        path = self._get_path(object_key=object_key)
+        with self._timed("write_file"):
+            size = self._write_atomic(path=path, chunks=chunks, max_size=max_size)
+            self._write_atomic(
+                path=self._get_meta_path(object_key=object_key),
+                chunks=[json.dumps({"content_type": content_type}).encode()],
+            )
+        return size
+
+    def upload_file_from_source(
+        self, object_key: str, source_file: str, content_type: str
+    ) -> None:
+        """upload file from source"""
+        with open(source_file, "rb") as file:
+            self.save_file(
+                object_key=object_key,
+                chunks=self._read_chunks(file=file, chunk_size=self.chunk_size),
+                content_type=content_type,
+            )
+
+    def upload_file_from_memory(
+        self, object_key: str, file_content: Union[IO, bytes], file_type: str
+    ) -> None:
+        """upload file using IO buffer"""
+        if isinstance(file_content, (bytes, bytearray)):
+            chunks = [bytes(file_content)]
+        else:
+            chunks = self._read_chunks(file=file_content, chunk_size=self.chunk_size)
+        self.save_file(object_key=object_key, chunks=chunks, content_type=file_type)
+
+    def _get_upload_path(self, object_key: str, upload_id: str) -> Path:
+        """folder with parts of multipart upload of object_key"""
+        if not re.fullmatch(r"[0-9a-f]{32}", upload_id or ""):
+            raise BadRequestException(get_upload_not_found(object_key=object_key))
+        upload_path = self.root / "uploads" / upload_id
+        try:
+            upload = json.loads((upload_path / "upload.json").read_text())
+        except FileNotFoundError:
+            raise BadRequestException(get_upload_not_found(object_key=object_key))
+        if upload["object_key"] != object_key:
+            raise BadRequestException(get_upload_not_found(object_key=object_key))
+        return upload_path
+
+    def create_multipart_upload(
+        self,
+        object_key: str,
+        content_type: str,
+        part_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+    ) -> MultipartUpload:
+        """start multipart upload, parts are kept in an uploads folder until completed"""
+        self._get_path(object_key=object_key)
+        upload_id = uuid.uuid4().hex
+        self._write_atomic(
+            path=self.root / "uploads" / upload_id / "upload.json",
+            chunks=[json.dumps({"object_key": object_key, "content_type": content_type}).encode()],
+        )
+        return MultipartUpload(
+            storage_service=self,
+            object_key=object_key,
+            upload_id=upload_id,
+            part_size=part_size or settings.S3_MULTIPART_PART_SIZE,
+            max_size=max_size,
+        )
+
+    def upload_part(
+        self, object_key: str, upload_id: str, part_number: int, body: bytes
+    ) -> dict:
+        """upload one part of multipart upload, returns part for completing the upload"""
+        upload_path = self._get_upload_path(object_key=object_key, upload_id=upload_id)
+        with self._timed("upload_part"):
+            self._write_atomic(path=upload_path / f"{part_number:05d}.part", chunks=[body])
+        return {"ETag": f'"{hashlib.md5(body).hexdigest()}"', "PartNumber": part_number}
+
+    def complete_multipart_upload(
+        self, object_key: str, upload_id: str, parts: List[dict]
+    ) -> None:
+        """concatenate uploaded parts into the object and remove the upload"""
+        upload_path = self._get_upload_path(object_key=object_key, upload_id=upload_id)
+        content_type = json.loads((upload_path / "upload.json").read_text())["content_type"]
+        part_paths = [
+            upload_path / f"{part['PartNumber']:05d}.part"
+            for part in sorted(parts, key=lambda part: part["PartNumber"])
+        ]
+        if not part_paths or not all(path.exists() for path in part_paths):
+            raise BadRequestException(get_upload_not_found(object_key=object_key))
+
+        def chunks():
+            for path in part_paths:
+                with open(path, "rb") as file:
+                    yield from self._read_chunks(file=file, chunk_size=self.chunk_size)
+
+        self.save_file(object_key=object_key, chunks=chunks(), content_type=content_type)
+        shutil.rmtree(upload_path, ignore_errors=True)
+
+    def abort_multipart_upload(self, object_key: str, upload_id: str) -> None:
+        """abort multipart upload and discard its uploaded parts"""
+        upload_path = self._get_upload_path(object_key=object_key, upload_id=upload_id)
+        shutil.rmtree(upload_path, ignore_errors=True)
+
+    def list_parts(self, object_key: str, upload_id: str) -> List[dict]:
+        """list uploaded parts of multipart upload for completing the upload"""
+        upload_path = self._get_upload_path(object_key=object_key, upload_id=upload_id)
+        parts = []
+        for path in sorted(upload_path.glob("*.part")):
+            with self._open_mmap(path) as content:
+                etag = hashlib.md5(content).hexdigest()
+            parts.append({"ETag": f'"{etag}"', "PartNumber": int(path.stem)})
+        return parts
+
+    def list_multipart_uploads(self) -> Iterator[List[dict]]:
+        """list incomplete multipart uploads a page at a time, each upload with Key, UploadId and Initiated"""
+        page = []
+        for upload_file in (self.root / "uploads").glob("*/upload.json"):
+            try:
+                upload = json.loads(upload_file.read_text())
+                initiated = upload_file.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            page.append(
+                {
+                    "Key": upload["object_key"],
+                    "UploadId": upload_file.parent.name,
+                    "Initiated": datetime.fromtimestamp(initiated, tz=timezone.utc),
+                }
+            )
+            if len(page) == self.page_size:
+                yield page
+                page = []
+        if page:
+            yield page
+
+    def _sign(self, *values) -> str:
+        """HMAC-SHA256 of values with LOCAL_STORAGE_SECRET"""
+        message = "\n".join(str(value) for value in (self.bucket_name, *values))
+        return hmac.new(
+            settings.LOCAL_STORAGE_SECRET.encode(), message.encode(), hashlib.sha256
+        ).hexdigest()
+
+    def verify_signature(self, signature: str, expires: int, *values) -> None:
+        """raise ForbiddenException for expired url or signature not matching the signed values"""
+        if expires < time.time() or not hmac.compare_digest(
+            signature, self._sign(expires, *values)
+        ):
+            raise ForbiddenException(get_invalid_storage_signature())
+
+    @staticmethod
+    def _get_url(object_key: str, **params) -> str:
+        """url of object_key on the storage router"""
+        return f"{settings.BASE_URL}storage/{quote(object_key)}?{urlencode(params)}"
+
+    def get_presigned_upload_post(
+        self, object_key: str, content_type: str, max_size: int
+    ) -> dict:
+        """get signed POST form (url and fields) to upload file of content_type up to max_size directly"""
+        self._get_path(object_key=object_key)
+        expires = int(time.time()) + settings.UPLOAD_URL_EXPIRES_SECONDS
+        return {
+            "url": f"{settings.BASE_URL}storage/{quote(object_key)}",
+            "fields": {
+                "Content-Type": content_type,
+                "max_size": str(max_size),
+                "expires": str(expires),
+                "signature": self._sign(expires, "POST", object_key, content_type, max_size),
+            },
+        }
+
+    def get_presigned_part_urls(
+        self, object_key: str, upload_id: str, part_count: int
+    ) -> List[str]:
+        """get signed PUT url for each part of multipart upload"""
+        expires = int(time.time()) + settings.UPLOAD_URL_EXPIRES_SECONDS
+        return [
+            self._get_url(
+                object_key,
+                uploadId=upload_id,
+                partNumber=part_number,
+                expires=expires,
+                signature=self._sign(expires, "PUT", object_key, upload_id, part_number),
+            )
+            for part_number in range(1, part_count + 1)
+        ]
+
+    def head_file(self, object_key: str) -> Optional[dict]:
+        """get size and content type of file, None if file doesn't exist"""
+        try:
+            size = self._get_path(object_key=object_key).stat().st_size
+        except FileNotFoundError:
+            return None
+        try:
+            meta = json.loads(self._get_meta_path(object_key=object_key).read_text())
+        except FileNotFoundError:
+            meta = {}
+        return {
+            "size": size,
+            "content_type": meta.get("content_type", "application/octet-stream"),
+        }
+
+    def iter_file(
+        self, object_key: str, start: int = 0, end: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """
+        read bytes start to end (inclusive) of the file through a memory map in chunks,
+        raise NotFoundException if file doesn't exist
+        """
+        path = self._get_path(object_key=object_key)
+        if not path.is_file():
+            raise NotFoundException(get_storage_file_not_found(object_key=object_key))
+
+        def chunks():
+            with self._open_mmap(path) as content:
+                stop = len(content) if end is None else min(end + 1, len(content))
+                for offset in range(start, stop, self.chunk_size):
+                    yield content[offset : min(offset + self.chunk_size, stop)]
+
+        return chunks()
+
+    def download_file(self, object_key: str, download_path: str) -> None:
+        """download file to source path"""
+        with self._timed("download_file"):
+            self._write_atomic(path=Path(download_path), chunks=self.iter_file(object_key=object_key))
+
+    def download_file_into_memory(self, object_key: str, buffer):
+        """download file into memory"""
+        try:
+            with self._timed("download_fileobj"):
+                for chunk in self.iter_file(object_key=object_key):
+                    buffer.write(chunk)
+        except NotFoundException as e:
+            logger.warning(e.detail)
+
+    def delete_file(self, object_key: str) -> None:
+        """delete file using object_key"""
+        with self._timed("delete_object"):
+            for path in (
+                self._get_path(object_key=object_key),
+                self._get_meta_path(object_key=object_key),
+            ):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def delete_files(self, object_keys: List[str]) -> Dict[str, str]:
+        """
+        delete files one by one, missing files are not errors
+
+        Returns:
+            Dict[str, str]: error of each object_key that could not be deleted
+        """
+        errors = {}
+        for object_key in object_keys:
+            try:
+                self.delete_file(object_key=object_key)
+            except (OSError, CustomException) as e:
+                errors[object_key] = str(getattr(e, "detail", e))
+        return errors
+
+    def list_files(self, prefix: str) -> Iterator[List[dict]]:
+        """list files under prefix a page (up to 1000 files) at a time, each file with Key and LastModified"""
+        objects_path = self.root / "objects"
+        page = []
+        for directory, _, filenames in os.walk(objects_path):
+            for filename in sorted(filenames):
+                if filename.startswith(".tmp-"):
+                    continue
+                path = Path(directory) / filename
+                object_key = path.relative_to(objects_path).as_posix()
+                if not object_key.startswith(prefix):
+                    continue
+                page.append(
+                    {
+                        "Key": object_key,
+                        "LastModified": datetime.fromtimestamp(
+                            path.stat().st_mtime, tz=timezone.utc
+                        ),
+                    }
+                )
+                if len(page) == self.page_size:
+                    yield page
+                    page = []
+        if page:
+            yield page
+
+    def get_presigned_url(self, object_key: str) -> Optional[str]:
+        """
+        get signed url, identical for the current time window and valid for
+        PRESIGNED_URL_TIME after the window ends
+        """
+        window, _ = PresignedUrlCache.get_window()
+        expires = int(
+            (window + 1) * settings.PRESIGNED_URL_WINDOW_SECONDS
+            + timedelta(**settings.PRESIGNED_URL_TIME).total_seconds()
+        )
+        return self._get_url(
+            object_key, expires=expires, signature=self._sign(expires, "GET", object_key)
+        )
+
+    def delete_bucket(self, bucket_name: str) -> None:
+        """delete bucket folder with its content"""
+        shutil.rmtree(Path(settings.LOCAL_STORAGE_PATH) / bucket_name, ignore_errors=True)
+
+
+def get_storage_service() -> StorageService:
+    """get storage backend selected with STORAGE_BACKEND"""
+    if settings.STORAGE_BACKEND == StorageBackend.LOCAL.value:
+        return LocalStorageService()
+    return Boto3Service()
@@ -0,0 +1,84 @@
+import io
+import base64
+from typing import Optional, Tuple
+
+from PIL import Image, ImageFilter, ImageOps, UnidentifiedImageError
+
+from src.setup.config.settings import settings
+from lib.fastapi.custom_enums import ImageFormat
+from lib.fastapi.custom_exceptions import CustomValidationError
+from lib.fastapi.error_string import get_invalid_image
+
+
+class ImageService:
+    """create resized variants and placeholder of an image using pillow, metadata (EXIF) is never copied"""
+
+    def __init__(self, content: bytes) -> None:
+        try:
+            image = Image.open(io.BytesIO(content))
+            self.format = image.format
+            self.has_metadata = bool(image.getexif()) or any(
+                key in image.info for key in ("exif", "xmp", "icc_profile")
+            )
+            # apply EXIF orientation before it is stripped
+            self.image = ImageOps.exif_transpose(image)
+        except (UnidentifiedImageError, OSError):
+            raise CustomValidationError(get_invalid_image())
+
+    @property
+    def width(self) -> int:
+        return self.image.width
+
+    def _encode(self, image: Image.Image, image_format: ImageFormat, quality: int) -> bytes:
+        """encode image without metadata"""
+        buffer = io.BytesIO()
+        if image_format == ImageFormat.JPEG and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(
+            buffer,
+            format=image_format.value.upper(),
+            quality=quality,
+            optimize=True,
+            **({"progressive": True} if image_format == ImageFormat.JPEG else {}),
+        )
+        return buffer.getvalue()
+
+    def _resize(self, width: int) -> Image.Image:
+        """resize keeping aspect ratio, never upscales"""
+        if width >= self.image.width:
+            return self.image
+        height = max(1, round(self.image.height * width / self.image.width))
+        return self.image.resize((width, height), Image.Resampling.LANCZOS)
+
+    def create_variant(self, width: int, image_format: ImageFormat) -> Tuple[int, int, bytes]:
+        """
+        create resized variant
+
+        Returns:
+            Tuple[int, int, bytes]: width, height and encoded variant
+        """
+        image = self._resize(width=width)
+        return (
+            image.width,
+            image.height,
+            self._encode(image=image, image_format=image_format, quality=settings.IMAGE_VARIANT_QUALITY),
+        )
+
+    def create_placeholder(self) -> str:
+        """create tiny blurred image as data uri to show while media loads"""
+        image = self._resize(width=settings.IMAGE_PLACEHOLDER_WIDTH).filter(
+            ImageFilter.GaussianBlur(radius=1)
+        )
+        content = self._encode(image=image, image_format=ImageFormat.WEBP, quality=30)
+        return f"data:image/webp;base64,{base64.b64encode(content).decode()}"
+
+    def get_stripped_original(self) -> Optional[bytes]:
+        """get original re-encoded without metadata, None if original has no metadata or unknown format"""
+        if not self.has_metadata or self.format not in ("JPEG", "PNG", "WEBP"):
+            return None
+        buffer = io.BytesIO()
+        image = self.image
+        if self.format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(buffer, format=self.format, quality=95)
+        return buffer.getvalue()
@@ -19,5 +19,18 @@ app.conf.update(beat_schedule={
     'add_everyday_at_10':{
         'task': 'src.application.posts.tasks.schedule_post_notifications',
         'schedule': crontab(minute="51", hour="17"),
-    }
+    },
+    'reconcile_post_counts_hourly':{
+        'task': 'src.application.posts.tasks.reconcile_post_counts',
+        'schedule': crontab(minute="0"),
+    },
+    # retries failed deletions and drains deletions whose worker task was not queued
+    'drain_pending_deletions_every_minute':{
+        'task': 'src.application.posts.tasks.drain_pending_deletions',
+        'schedule': crontab(),
+    },
+    'reconcile_storage_objects_daily':{
+        'task': 'src.application.posts.tasks.reconcile_storage_objects',
+        'schedule': crontab(minute="30", hour="3"),
+    },
 })
\ No newline at end of file
@@ -1,5 +1,4 @@
 from typing import Annotated
-from datetime import datetime
 
 from fastapi import Depends, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
@@ -8,17 +7,43 @@ from fastapi.exceptions import HTTPException
 from starlette.status import HTTP_401_UNAUTHORIZED
 
 from src.application.users.services import JWTService
-from lib.fastapi.error_string import get_access_token_expired
-from lib.fastapi.utils import get_default_timezone
+from src.infrastructure.auth_service.services import ClaimsVersionCache, VerifiedTokenCache
+from src.interface.auth.schemas import Principal, USER_CLAIMS
+from src.setup.config.settings import settings
 
 
 class CustomHTTPBearer(HTTPBearer):
-    """custom http bearer to return user role when authenticated"""
+    """
+    custom http bearer to return principal (base user id, role and user claims) when authenticated,
+    verified tokens are served from VerifiedTokenCache unless use_cache is off
+    """
 
-    def __init__(self):
+    def __init__(self, use_cache: bool = True):
         super().__init__()
+        self.use_cache = use_cache
 
-    async def __call__(self, request: Request):
+    def decode(self, token: str) -> dict:
+        """decode and verify token, payloads of tokens verified before are read from the cache"""
+        if not self.use_cache or not settings.VERIFIED_TOKEN_CACHE_SIZE:
+            return JWTService().decode(token)
+        cache = VerifiedTokenCache()
+        payload = cache.get(token=token)
+        if payload is None:
+            payload = JWTService().decode(token)
+            cache.set(token=token, payload=payload)
+        return payload
+
+    @staticmethod
+    def get_principal(payload: dict) -> Principal:
+        """drop user claims older than the latest claims version of the user"""
+        if payload.get("user_id"):
+            version = ClaimsVersionCache().get(base_user_id=payload["id"])
+            if version is not None and version != payload.get("claims_version"):
+                for claim in USER_CLAIMS:
+                    payload.pop(claim, None)
+        return payload
+
+    async def __call__(self, request: Request) -> Principal:
         authorization = request.headers.get("Authorization")
         scheme, credentials = get_authorization_scheme_param(authorization)
         if not (authorization and scheme and credentials):
@@ -40,22 +65,16 @@ class CustomHTTPBearer(HTTPBearer):
             else:
                 return None
         token = HTTPAuthorizationCredentials(scheme=scheme, credentials=credentials)
-        payload = JWTService().decode(token.credentials)
+        # exp is checked by JWTService().decode, cached payloads are dropped once it passes
+        payload = self.decode(token=token.credentials)
         if not payload.get("id") or not payload.get("role") or not payload.get("exp"):
             raise HTTPException(
                 status_code=HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        if datetime.fromtimestamp(
-            payload.get("exp"), tz=get_default_timezone()
-        ) < datetime.now(tz=get_default_timezone()):
-            raise HTTPException(
-                status_code=HTTP_401_UNAUTHORIZED,
-                detail=get_access_token_expired(),
-            )
-        return payload
+        return self.get_principal(payload=payload)
 
 
 http_bearer = CustomHTTPBearer()
-AuthDep = Annotated[HTTPAuthorizationCredentials, Depends(http_bearer)]
+AuthDep = Annotated[Principal, Depends(http_bearer)]
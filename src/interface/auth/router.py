@@ -28,9 +28,9 @@ router = APIRouter(tags=["auth"], route_class=UniqueConstraintErrorRoute)
     response_model=BaseUserResponseData,
 )
 @limiter.limit("10/minute", override_defaults=True)
-def register(request: Request, user: CreateBaseUser, session: SessionDep):
+async def register(request: Request, user: CreateBaseUser, session: SessionDep):
     """create base user for site access"""
-    db_user = BaseUserAppService(session).create_base_user(user)
+    db_user = await BaseUserAppService(session).create_base_user_async(user)
     return {
         "message": "New user created successfully",
         "success": True,
@@ -39,10 +39,10 @@ def register(request: Request, user: CreateBaseUser, session: SessionDep):
 
 
 @router.post("/login/", status_code=HTTP_200_OK, response_model=LoginResponseData)
-def login(user: Login, session: SessionDep):
+async def login(user: Login, session: SessionDep):
     """login using base user credentials, use response access_token to login from HTTPBearer"""
     base_user_app_service = BaseUserAppService(session)
-    response = base_user_app_service.authenticate_user(user)
+    response = await base_user_app_service.authenticate_user_async(user)
     return {"data": response}
 
 
@@ -83,10 +83,10 @@ def verify_otp(data: VerifyOtp, session: SessionDep):
     status_code=HTTP_200_OK,
     response_model=ResetPasswordResponseData,
 )
-def reset_password(data: ResetPassword, session: SessionDep):
+async def reset_password(data: ResetPassword, session: SessionDep):
     """reset password for user"""
     base_user_app_service = BaseUserAppService(session)
-    base_user_app_service.reset_password(
+    await base_user_app_service.reset_password_async(
         otp_token=data.otp_token, new_password=data.new_password
     )
     return {}
@@ -115,7 +115,7 @@ def git_callback(code: str, session: SessionDep):
         user = base_user_app_service.create_base_user_without_password(email=email)
     # get access_token
     access_token = base_user_app_service.create_jwt_token_for_user(
-        id=str(user.id), role=user.role
+        id=str(user.id), role=user.role, user=user.user
     )
 
     # provide user with access_token
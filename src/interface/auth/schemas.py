@@ -1,15 +1,44 @@
 import uuid
 import re
-from typing import Optional
+from typing import Optional, TypedDict
 
 from pydantic import BaseModel, EmailStr, field_validator, HttpUrl
 
 from lib.fastapi.custom_schemas import BaseResponseSchema, BaseResponseNoDataSchema
 from lib.fastapi.error_string import get_password_value_error
+from lib.fastapi.custom_enums import ProfileType
 
 from src.setup.config.settings import settings
 
 
+class Principal(TypedDict, total=False):
+    """
+    payload of verified access token, user claims (user_id, username, profile_type, claims_version)
+    are present for users when embedded in the token and still current
+    """
+
+    id: str
+    role: str
+    exp: int
+    user_id: str
+    username: str
+    profile_type: str
+    claims_version: int
+
+
+# claims of the user row embedded in access tokens, see BaseUserAppService.get_user_claims
+USER_CLAIMS = ("user_id", "username", "profile_type", "claims_version")
+
+
+class UserClaims(BaseModel):
+    """current user built from access token claims, used where the user row isn't needed"""
+
+    id: uuid.UUID
+    base_user_id: uuid.UUID
+    username: str
+    profile_type: ProfileType
+
+
 class Login(BaseModel):
     """login schema for base user login"""
 
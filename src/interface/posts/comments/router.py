@@ -1,9 +1,12 @@
+from typing import Optional
+
 from fastapi import APIRouter
 from starlette.status import HTTP_200_OK
 
 from src.interface.auth.dependencies import AuthDep
 from src.setup.config.database import SessionDep
-from .schemas import CommentPostSchema, CommentPost, CommentPostResponseData, CommentDeleteResponseData
+from src.setup.config.settings import settings
+from .schemas import CommentPostSchema, CommentPost, CommentPostResponseData, CommentDeleteResponseData, CommentListResponseData
 from src.application.posts.comments.services import CommentAppService
 from lib.fastapi.custom_routes import UniqueConstraintErrorRoute
 from lib.fastapi.utils import check_id
@@ -11,6 +14,18 @@ from ..utils import check_permission_to_post
 
 router = APIRouter(prefix="/comment", tags=["posts"], route_class=UniqueConstraintErrorRoute)
 
+@router.get("/{post_id}/", status_code=HTTP_200_OK, response_model=CommentListResponseData)
+def list_comments(current_user:AuthDep, post_id:str, session:SessionDep, cursor:Optional[str]=None):
+    """list comments on the post newest first, send back `next_cursor` as `cursor` for the next page"""
+    comment_app_service = CommentAppService(session=session)
+    comments = comment_app_service.get_comments_by_post_id(
+        current_user=current_user,
+        post_id=check_id(id=post_id),
+        size=settings.POST_PAGINATION_SIZE,
+        cursor=cursor,
+    )
+    return {"data": comments}
+
 @router.post("/{post_id}/", status_code=HTTP_200_OK, response_model=CommentPostResponseData)
 def comment_post(current_user:AuthDep, post_id:str, post:CommentPostSchema, session:SessionDep):
     """comment on post by post_id"""
@@ -1,9 +1,10 @@
 import uuid
+from datetime import datetime
 from typing import Optional, Annotated
 
 from pydantic import BaseModel, StringConstraints
 
-from lib.fastapi.custom_schemas import BaseResponseNoDataSchema, BaseResponseSchema
+from lib.fastapi.custom_schemas import BaseResponseNoDataSchema, BaseResponseSchema, CursorPage
 
 
 class CommentPostSchema(BaseModel):
@@ -25,6 +26,19 @@ class CommentPostResponse(CommentPost):
     id: uuid.UUID
 
 
+class CommentResponse(CommentPostResponse):
+    """comment on post with username of the user that commented"""
+
+    username: str
+    created_at: datetime
+
+
+class CommentListResponseData(BaseResponseSchema):
+    """comment list response data with data attribute to include cursor page of CommentResponse"""
+
+    data: CursorPage[CommentResponse]
+
+
 class CommentPostResponseData(BaseResponseSchema):
     """comment post response data with message attribute set to static string value"""
 
@@ -1,9 +1,12 @@
+from typing import Optional
+
 from fastapi import APIRouter
 from starlette.status import HTTP_200_OK
 
 from src.interface.auth.dependencies import AuthDep
 from src.setup.config.database import SessionDep
-from .schemas import LikePost, LikePostResponseData, LikeDeleteResponseData
+from src.setup.config.settings import settings
+from .schemas import LikePost, LikePostResponseData, LikeDeleteResponseData, LikeListResponseData
 from src.application.posts.likes.services import LikeAppService
 from lib.fastapi.custom_routes import UniqueConstraintErrorRoute
 from lib.fastapi.utils import check_id
@@ -11,6 +14,18 @@ from ..utils import check_permission_to_post
 
 router = APIRouter(prefix="/like", tags=["posts"], route_class=UniqueConstraintErrorRoute)
 
+@router.get("/{post_id}/list/", status_code=HTTP_200_OK, response_model=LikeListResponseData)
+def list_likes(current_user:AuthDep, post_id:str, session:SessionDep, cursor:Optional[str]=None):
+    """list users that liked the post newest first, send back `next_cursor` as `cursor` for the next page"""
+    like_app_service = LikeAppService(session=session)
+    likes = like_app_service.get_likes_by_post_id(
+        current_user=current_user,
+        post_id=check_id(id=post_id),
+        size=settings.POST_PAGINATION_SIZE,
+        cursor=cursor,
+    )
+    return {"data": likes}
+
 @router.get("/{post_id}/", status_code=HTTP_200_OK, response_model=LikePostResponseData)
 def like_post(current_user:AuthDep, post_id:str, session:SessionDep):
     """like post by post_id"""
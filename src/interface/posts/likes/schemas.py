@@ -1,8 +1,9 @@
 from typing import Optional
 import uuid
+from datetime import datetime
 from pydantic import BaseModel
 
-from lib.fastapi.custom_schemas import BaseResponseNoDataSchema
+from lib.fastapi.custom_schemas import BaseResponseNoDataSchema, BaseResponseSchema, CursorPage
 
 # class LikePostSchema(BaseModel):
 #     """schema to like post"""
@@ -22,4 +23,16 @@ class LikePostResponseData(BaseResponseNoDataSchema):
 class LikeDeleteResponseData(BaseResponseNoDataSchema):
     """like delete response data with message attribute set to static string value"""
 
-    message: Optional[str] = "Post Unliked!"
\ No newline at end of file
+    message: Optional[str] = "Post Unliked!"
+
+class LikeResponse(BaseModel):
+    """like on post with username of the user that liked"""
+    id: uuid.UUID
+    liked_by: uuid.UUID
+    username: str
+    created_at: datetime
+
+class LikeListResponseData(BaseResponseSchema):
+    """like list response data with data attribute to include cursor page of LikeResponse"""
+
+    data: CursorPage[LikeResponse]
@@ -0,0 +1,18 @@
+from typing import Optional
+
+from fastapi import Query
+
+from lib.fastapi.custom_enums import ImageFormat
+from .schemas import requested_media_width
+
+
+async def set_media_width(
+    media_width: Optional[int] = Query(None, gt=0),
+    media_format: ImageFormat = ImageFormat.WEBP,
+) -> None:
+    """
+    serve the smallest image variant at least media_width wide for media in the response,
+    async so the value is set in the context the response is serialized in
+    """
+    if media_width:
+        requested_media_width.set((media_width, media_format))
@@ -1,8 +1,26 @@
 import uuid
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
 
-from pydantic import BaseModel, field_serializer
+from pydantic import BaseModel, Field, field_serializer
 
-from src.infrastructure.file_upload.services import Boto3Service
+from src.infrastructure.file_upload.services import get_storage_service
+from lib.fastapi.custom_enums import ImageFormat
+
+# (width, format) requested for media of current request, see set_media_width dependency
+requested_media_width: ContextVar[Optional[Tuple[int, ImageFormat]]] = ContextVar(
+    "requested_media_width", default=None
+)
+
+
+class MediaVariant(BaseModel):
+    """resized copy of image media"""
+
+    width: int
+    height: int
+    format: ImageFormat
+    object_key: str
+    size: int
 
 
 class MediaSchema(BaseModel):
@@ -11,11 +29,29 @@ class MediaSchema(BaseModel):
     post_id: uuid.UUID
     media_url: str
     media_type: str
+    variants: Optional[List[MediaVariant]] = Field(default=None, exclude=True)
+    placeholder: Optional[str] = None
+
+    def get_object_key_for_width(self, width: int, image_format: ImageFormat) -> str:
+        """get smallest variant at least width wide, original if no variant is wide enough"""
+        fitting = [
+            variant
+            for variant in self.variants or []
+            if variant.format == image_format and variant.width >= width
+        ]
+        if not fitting:
+            return self.media_url
+        return min(fitting, key=lambda variant: variant.width).object_key
 
     @field_serializer('media_url')
     def serialize_media_url(self, media_url: str):
         if media_url:
-            boto3_service = Boto3Service()
-            presigned_url = boto3_service.get_presigned_url(object_key=media_url)
+            requested = requested_media_width.get()
+            if requested:
+                media_url = self.get_object_key_for_width(
+                    width=requested[0], image_format=requested[1]
+                )
+            storage_service = get_storage_service()
+            presigned_url = storage_service.get_presigned_url(object_key=media_url)
             return presigned_url
         return None
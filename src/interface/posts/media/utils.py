@@ -1,20 +1,111 @@
-from typing import List
+from typing import AsyncIterator, List
 import uuid
 
 from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session
 
 from src.application.posts.media.services import MediaAppService
+from lib.fastapi.custom_exceptions import CustomValidationError
+from lib.fastapi.custom_schemas import UploadFileSchema, UploadedFileSchema
+from lib.fastapi.error_string import get_invalid_object_key
+from lib.fastapi.utils import (
+    check_file_type,
+    check_file_size,
+    get_max_upload_size,
+    get_valid_post_formats_list,
+)
 from .schemas import MediaSchema
 
+
+def get_media_object_key(user_id: uuid.UUID, post_id: uuid.UUID, index: int, filename: str) -> str:
+    """create object_key for post media"""
+    get_file_extension = str(filename).split(".")[-1]
+    return f"posts/{user_id}/{post_id}/post_{index}.{get_file_extension}"
+
+
+def save_uploaded_media(media_schemas: List[MediaSchema], session: Session) -> None:
+    """save urls and types of uploaded media, uploaded files are deleted if saving fails"""
+    media_app_service = MediaAppService(session=session)
+    try:
+        media_app_service.create_all_media(media=media_schemas)
+    except Exception:
+        session.rollback()
+        media_app_service.delete_media_objects(
+            object_keys=[media.media_url for media in media_schemas]
+        )
+        raise
+
+
 def handle_media_file_upload(user_id:uuid.UUID, post_id:uuid.UUID, media:List[UploadFile], session:Session) -> None:
-    """handle posts media files upload"""
-
-    for i, file in enumerate(media):
-        get_file_extension = str(file.filename).split(".")[-1]
-        # create object_key and upload media
-        object_key = f"posts/{user_id}/{post_id}/post_{i}.{get_file_extension}"
-        MediaAppService.handle_media_upload(file=file, object_key=object_key)
-        media_schema = MediaSchema(post_id=post_id, media_url=object_key, media_type=file.content_type)
-        # save urls and types to media
-        MediaAppService(session=session).create_media(media=media_schema)
\ No newline at end of file
+    """handle posts media files upload, files are uploaded concurrently and saved in one transaction"""
+
+    files = [
+        (file, get_media_object_key(user_id=user_id, post_id=post_id, index=i, filename=file.filename))
+        for i, file in enumerate(media)
+    ]
+    object_keys = MediaAppService(session=session).upload_media(files=files)
+    media_schemas = [
+        MediaSchema(post_id=post_id, media_url=object_key, media_type=file.content_type)
+        for (file, _), object_key in zip(files, object_keys)
+    ]
+    save_uploaded_media(media_schemas=media_schemas, session=session)
+
+
+def handle_media_direct_upload(user_id: uuid.UUID, files: List[UploadFileSchema]) -> dict:
+    """
+    start posts media upload directly to storage, the post id is assigned now
+    so object keys are the same as for files uploaded through the api
+    """
+    for file in files:
+        # check file type and size
+        check_file_type(content_type=file.content_type, valid_types=get_valid_post_formats_list())
+        check_file_size(size=file.size, max_size=get_max_upload_size(content_type=file.content_type))
+    post_id = uuid.uuid4()
+    uploads = [
+        MediaAppService.create_direct_upload(
+            file=file,
+            object_key=get_media_object_key(
+                user_id=user_id, post_id=post_id, index=i, filename=file.filename
+            ),
+        )
+        for i, file in enumerate(files)
+    ]
+    return dict(post_id=post_id, uploads=uploads)
+
+
+def check_media_direct_uploads(
+    user_id: uuid.UUID, post_id: uuid.UUID, uploads: List[UploadedFileSchema]
+) -> List[MediaSchema]:
+    """check media uploaded directly to storage belongs to the post and exists with valid type and size"""
+    prefix = f"posts/{user_id}/{post_id}/"
+    if any(not uploaded.object_key.startswith(prefix) for uploaded in uploads):
+        raise CustomValidationError(get_invalid_object_key())
+    return [
+        MediaSchema(
+            post_id=post_id,
+            media_url=uploaded.object_key,
+            media_type=MediaAppService.check_uploaded_media(
+                uploaded=uploaded, valid_types=get_valid_post_formats_list()
+            ),
+        )
+        for uploaded in uploads
+    ]
+
+
+async def handle_video_stream_upload(
+    user_id: uuid.UUID,
+    post_id: uuid.UUID,
+    chunks: AsyncIterator[bytes],
+    content_type: str,
+    session: Session,
+) -> None:
+    """handle video post upload streamed from request body, the video is uploaded in parts while received"""
+
+    # create object_key for media
+    object_key = f"posts/{user_id}/{post_id}/post_0.{content_type.split('/')[-1]}"
+    await MediaAppService.handle_media_stream_upload(
+        chunks=chunks, object_key=object_key, content_type=content_type
+    )
+    media_schema = MediaSchema(post_id=post_id, media_url=object_key, media_type=content_type)
+    await run_in_threadpool(save_uploaded_media, media_schemas=[media_schema], session=session)
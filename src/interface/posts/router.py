@@ -1,13 +1,20 @@
-from typing import List, Optional
+from typing import List, Optional, Annotated
 
-from fastapi import APIRouter, UploadFile, File, Form
+from fastapi import APIRouter, UploadFile, File, Form, Query, Request, Depends
+from fastapi.concurrency import run_in_threadpool
 from starlette.status import HTTP_201_CREATED, HTTP_200_OK
-from fastapi_pagination import Page, set_page, paginate, Params
+from fastapi_pagination import Page, set_page, Params
 
 from src.setup.config.database import SessionDep
 from src.interface.auth.dependencies import AuthDep
-from lib.fastapi.utils import check_id, check_file_type, get_valid_post_formats_list
-from lib.fastapi.custom_enums import FilterDates
+from lib.fastapi.utils import (
+    check_id,
+    check_file_type,
+    check_file_size,
+    get_valid_post_formats_list,
+    get_valid_video_formats_list,
+)
+from lib.fastapi.custom_enums import FilterDates, PaginationType
 from src.application.posts.services import PostAppService
 from src.application.payments.subscription.services import SubscriptionAppService
 from .schemas import (
@@ -16,12 +23,40 @@ from .schemas import (
     PostDeleteResponseData,
     PostListResponseData,
     PostResponse,
+    PostUploadSchema,
+    PostUploadResponseData,
+    PostUploadFinalizeSchema,
+)
+from .media.utils import (
+    handle_media_file_upload,
+    handle_video_stream_upload,
+    handle_media_direct_upload,
 )
-from .media.utils import handle_media_file_upload
-from .utils import check_permission_to_post
+from .media.dependencies import set_media_width
+from .utils import check_permission_to_post, create_post_from_direct_upload
 from src.setup.config.settings import settings
 
-router = APIRouter(prefix="/post", tags=["posts"])
+router = APIRouter(prefix="/post", tags=["posts"], dependencies=[Depends(set_media_width)])
+
+
+@router.get("/search/", status_code=HTTP_200_OK, response_model=PostListResponseData)
+def search_posts(
+    current_user: AuthDep,
+    session: SessionDep,
+    search: Annotated[str, Query(min_length=1, max_length=300)],
+    page: int = 1,
+    fuzzy: bool = False,
+):
+    """search captions of all posts ranked by relevance, private user posts are included only for their followers"""
+    post_app_service = PostAppService(session=session)
+    set_page(Page[PostResponse])
+    paginated_response = post_app_service.search_posts(
+        current_user=current_user,
+        search=search,
+        params=Params(page=page, size=settings.POST_PAGINATION_SIZE),
+        fuzzy=fuzzy,
+    )
+    return dict(data=paginated_response)
 
 
 @router.get("s/{username}/", status_code=HTTP_200_OK, response_model=PostListResponseData)
@@ -30,22 +65,38 @@ def list_posts(
     username: str,
     session: SessionDep,
     page: int = 1,
+    pagination: PaginationType = PaginationType.PAGE,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     search: Optional[str] = None,
     filter_by: Optional[FilterDates] = None,
 ):
-    """list all posts by username, admin has permission to access all private and public account posts"""
+    """
+    list all posts by username, admin has permission to access all private and public account posts
+
+    use `pagination=cursor` (or pass `cursor`) for keyset pagination, send back `next_cursor` as `cursor` for the next page,
+    `include_total` adds an approximate total to cursor pages
+    """
     post_app_service = PostAppService(session=session)
-    posts = post_app_service.get_all_posts_by_username(
+    if pagination == PaginationType.CURSOR or cursor:
+        paginated_response = post_app_service.get_posts_by_username_with_cursor(
+            current_user=current_user,
+            username=username,
+            size=settings.POST_PAGINATION_SIZE,
+            cursor=cursor,
+            search=search,
+            filter_by=filter_by,
+            include_total=include_total,
+        )
+        return dict(data=paginated_response)
+    set_page(Page[PostResponse])
+    paginated_response = post_app_service.get_paginated_posts_by_username(
         current_user=current_user,
         username=username,
+        params=Params(page=page, size=settings.POST_PAGINATION_SIZE),
         search=search,
         filter_by=filter_by,
     )
-    set_page(Page[PostResponse])
-    paginated_response = paginate(
-        sequence=[post for post in posts],
-        params=Params(page=page, size=settings.POST_PAGINATION_SIZE),
-    )
     return dict(data=paginated_response)
 
 
@@ -65,6 +116,8 @@ def create_post(
         check_file_type(
             content_type=file.content_type, valid_types=get_valid_post_formats_list()
         )
+        if file.content_type in get_valid_video_formats_list():
+            check_file_size(size=file.size, max_size=settings.VIDEO_MAX_UPLOAD_SIZE)
 
     # create post
     post = PostSchema(posted_by=user.id, caption=caption)
@@ -79,6 +132,70 @@ def create_post(
     return dict(data=db_post)
 
 
+@router.post("/video/", status_code=HTTP_201_CREATED, response_model=PostResponseData)
+async def create_video_post(
+    request: Request,
+    current_user: AuthDep,
+    session: SessionDep,
+    caption: Optional[str] = None,
+):
+    """
+    create post with one video sent as raw request body (Content-Type video/mp4 or video/mpeg),
+    the video is uploaded to storage in parts while it is received and rejected with 413
+    as soon as it exceeds the maximum size
+    """
+    content_type = request.headers.get("content-type")
+    check_file_type(content_type=content_type, valid_types=get_valid_video_formats_list())
+    check_file_size(
+        size=request.headers.get("content-length"), max_size=settings.VIDEO_MAX_UPLOAD_SIZE
+    )
+    user = await run_in_threadpool(
+        check_permission_to_post, current_user=current_user, session=session
+    )
+
+    # create post
+    post = PostSchema(posted_by=user.id, caption=caption)
+    post_app_service = PostAppService(session=session)
+    db_post = await run_in_threadpool(post_app_service.create_post, post=post)
+    post_id = db_post.id
+    try:
+        await handle_video_stream_upload(
+            user_id=user.id,
+            post_id=post_id,
+            chunks=request.stream(),
+            content_type=content_type,
+            session=session,
+        )
+    except BaseException:
+        await run_in_threadpool(post_app_service.delete_post, db_post=db_post)
+        raise
+    db_post = await run_in_threadpool(post_app_service.get_post_by_id, id=post_id)
+    return dict(data=db_post)
+
+
+@router.post("/upload/", status_code=HTTP_201_CREATED, response_model=PostUploadResponseData)
+def create_post_upload(current_user: AuthDep, session: SessionDep, upload: PostUploadSchema):
+    """
+    start post upload, returns post id and presigned uploads to send media directly to storage,
+    then create the post with `POST /post/upload/{post_id}/`
+    """
+    user = check_permission_to_post(current_user=current_user, session=session)
+    return dict(data=handle_media_direct_upload(user_id=user.id, files=upload.files))
+
+
+@router.post("/upload/{id}/", status_code=HTTP_201_CREATED, response_model=PostResponseData)
+def finalize_post_upload(
+    current_user: AuthDep, session: SessionDep, id: str, post: PostUploadFinalizeSchema
+):
+    """create post after its media is uploaded directly to storage"""
+    user = check_permission_to_post(current_user=current_user, session=session)
+    post_id = check_id(id=id)
+    db_post = create_post_from_direct_upload(
+        user=user, post_id=post_id, post=post, session=session
+    )
+    return dict(data=db_post)
+
+
 @router.put("/{id}/", status_code=HTTP_200_OK, response_model=PostResponseData)
 def update_post(current_user: AuthDep, session: SessionDep, id:str, caption:str):
     """update post by current user (only caption)"""
@@ -116,6 +233,8 @@ def create_ad(
         check_file_type(
             content_type=file.content_type, valid_types=get_valid_post_formats_list()
         )
+        if file.content_type in get_valid_video_formats_list():
+            check_file_size(size=file.size, max_size=settings.VIDEO_MAX_UPLOAD_SIZE)
 
     # create post
     post = PostSchema(posted_by=user.id, caption=caption)
@@ -128,4 +247,25 @@ def create_ad(
     )
     db_post = post_app_service.get_post_by_id(id=post_id)
     return dict(data=db_post)
-    
+
+
+@router.post("/ad/upload/", status_code=HTTP_201_CREATED, response_model=PostUploadResponseData)
+def create_ad_upload(current_user: AuthDep, session: SessionDep, upload: PostUploadSchema):
+    """start ad upload, same as post upload for users with paid subscription"""
+    user = check_permission_to_post(current_user=current_user, session=session)
+    SubscriptionAppService(session=session).check_if_user_paid(user=user)
+    return dict(data=handle_media_direct_upload(user_id=user.id, files=upload.files))
+
+
+@router.post("/ad/upload/{id}/", status_code=HTTP_201_CREATED, response_model=PostResponseData)
+def finalize_ad_upload(
+    current_user: AuthDep, session: SessionDep, id: str, post: PostUploadFinalizeSchema
+):
+    """create ad after its media is uploaded directly to storage"""
+    user = check_permission_to_post(current_user=current_user, session=session)
+    SubscriptionAppService(session=session).check_if_user_paid(user=user)
+    post_id = check_id(id=id)
+    db_post = create_post_from_direct_upload(
+        user=user, post_id=post_id, post=post, session=session
+    )
+    return dict(data=db_post)
@@ -1,11 +1,18 @@
 import uuid
-from typing import List, Optional, Annotated
+from typing import List, Optional, Annotated, Union
 
-from pydantic import BaseModel, StringConstraints
+from pydantic import BaseModel, StringConstraints, Field
 from fastapi_pagination import Page
 
 from src.interface.posts.media.schemas import MediaSchema
-from lib.fastapi.custom_schemas import BaseResponseSchema, BaseResponseNoDataSchema
+from lib.fastapi.custom_schemas import (
+    BaseResponseSchema,
+    BaseResponseNoDataSchema,
+    CursorPage,
+    UploadFileSchema,
+    DirectUploadSchema,
+    UploadedFileSchema,
+)
 
 
 # class CreatePostSchema(BaseModel):
@@ -23,6 +30,40 @@ class PostSchema(BaseModel):
     ] = None
 
 
+class PostWithIdSchema(PostSchema):
+    """post schema with id assigned before the post is created"""
+
+    id: uuid.UUID
+
+
+class PostUploadSchema(BaseModel):
+    """media files of post to upload directly to storage"""
+
+    files: List[UploadFileSchema] = Field(min_length=1)
+
+
+class PostUploadResponse(BaseModel):
+    """post id and presigned uploads of its media files"""
+
+    post_id: uuid.UUID
+    uploads: List[DirectUploadSchema]
+
+
+class PostUploadResponseData(BaseResponseSchema):
+    """post upload response data with data attribute to include PostUploadResponse"""
+
+    data: PostUploadResponse
+
+
+class PostUploadFinalizeSchema(BaseModel):
+    """caption and media files uploaded directly to storage to create post"""
+
+    caption: Annotated[
+        Optional[str], StringConstraints(strip_whitespace=True, max_length=300)
+    ] = None
+    uploads: List[UploadedFileSchema] = Field(min_length=1)
+
+
 # class UpdatePostSchema(BaseModel):
 #     """update post schema for validating update post fields"""
 
@@ -34,6 +75,8 @@ class PostResponse(PostSchema):
 
     id: uuid.UUID
     media: List[MediaSchema]
+    like_count: int = 0
+    comment_count: int = 0
 
 
 class PostResponseData(BaseResponseSchema):
@@ -49,6 +92,8 @@ class PostDeleteResponseData(BaseResponseNoDataSchema):
 
 
 class PostListResponseData(BaseResponseSchema):
-    """post list response data with data attribute to include List of PostResponse"""
+    """post list response data with data attribute to include page or cursor page of PostResponse"""
 
-    data: Page[PostResponse]
+    data: Union[Page[PostResponse], CursorPage[PostResponse]] = Field(
+        union_mode="left_to_right"
+    )
@@ -0,0 +1,31 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends
+from starlette.status import HTTP_200_OK
+
+from src.interface.auth.dependencies import AuthDep
+from src.setup.config.database import SessionDep
+from src.setup.config.settings import settings
+from .schemas import FeedResponseData
+from src.application.posts.timeline.services import TimelineAppService
+from ..media.dependencies import set_media_width
+from ..utils import check_permission_to_post
+
+router = APIRouter(prefix="/feed", tags=["posts"], dependencies=[Depends(set_media_width)])
+
+
+@router.get("/", status_code=HTTP_200_OK, response_model=FeedResponseData)
+def get_feed(current_user: AuthDep, session: SessionDep, cursor: Optional[str] = None):
+    """
+    home feed of posts by users current user follows, newest first
+
+    send back `next_cursor` as `cursor` for the next page
+    """
+    user = check_permission_to_post(
+        current_user=current_user, session=session, check_exists=False
+    )
+    timeline_app_service = TimelineAppService(session=session)
+    feed = timeline_app_service.get_feed(
+        user=user, size=settings.POST_PAGINATION_SIZE, cursor=cursor
+    )
+    return dict(data=feed)
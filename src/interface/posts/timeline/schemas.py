@@ -0,0 +1,8 @@
+from src.interface.posts.schemas import PostResponse
+from lib.fastapi.custom_schemas import BaseResponseSchema, CursorPage
+
+
+class FeedResponseData(BaseResponseSchema):
+    """feed response data with data attribute to include cursor page of PostResponse"""
+
+    data: CursorPage[PostResponse]
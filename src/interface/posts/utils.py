@@ -1,16 +1,47 @@
+import uuid
+
 from sqlmodel import Session
 
-from lib.fastapi.custom_exceptions import NotFoundException
-from lib.fastapi.error_string import get_user_not_created
+from lib.fastapi.custom_exceptions import NotFoundException, CustomUniqueConstraintError
+from lib.fastapi.error_string import get_user_not_created, get_post_created
 from lib.fastapi.utils import check_id, only_user_access
 from src.application.users.users.services import UserAppService
+from src.application.posts.services import PostAppService
+from src.domain.models import User, Post
+from src.interface.auth.schemas import UserClaims
+from .schemas import PostWithIdSchema, PostUploadFinalizeSchema
+from .media.utils import check_media_direct_uploads, save_uploaded_media
 
 
-def check_permission_to_post(current_user:dict, session:Session):
-    """check if the user is allowed to perform post operations"""
+def check_permission_to_post(
+    current_user: dict, session: Session, check_exists: bool = True
+) -> User | UserClaims:
+    """
+    check if the user is allowed to perform post operations, user row is loaded only for tokens without claims,
+    check_exists can be turned off for reads that write no rows referencing the user
+    """
     only_user_access(current_user=current_user)
-    
-    user = UserAppService(session=session).get_user_by_base_user_id(base_user_id=check_id(current_user.get("id")))
+
+    user = UserAppService(session=session).get_current_user(
+        current_user=current_user, check_exists=check_exists
+    )
     if not user:
         raise NotFoundException(get_user_not_created())
-    return user
\ No newline at end of file
+    return user
+
+
+def create_post_from_direct_upload(
+    user: User | UserClaims, post_id: uuid.UUID, post: PostUploadFinalizeSchema, session: Session
+) -> Post:
+    """create post with media uploaded directly to storage after checking uploaded files"""
+    post_app_service = PostAppService(session=session)
+    if post_app_service.get_post_by_id(id=post_id):
+        raise CustomUniqueConstraintError(get_post_created())
+    media_schemas = check_media_direct_uploads(
+        user_id=user.id, post_id=post_id, uploads=post.uploads
+    )
+    post_app_service.create_post(
+        post=PostWithIdSchema(id=post_id, posted_by=user.id, caption=post.caption)
+    )
+    save_uploaded_media(media_schemas=media_schemas, session=session)
+    return post_app_service.get_post_by_id(id=post_id)
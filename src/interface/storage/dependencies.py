@@ -0,0 +1,17 @@
+from typing import Annotated
+
+from fastapi import Depends
+
+from src.infrastructure.file_upload.services import LocalStorageService, get_storage_service
+from lib.fastapi.custom_exceptions import NotFoundException
+
+
+def get_local_storage_service() -> LocalStorageService:
+    """storage router only serves files of the local storage backend"""
+    storage_service = get_storage_service()
+    if not isinstance(storage_service, LocalStorageService):
+        raise NotFoundException()
+    return storage_service
+
+
+LocalStorageDep = Annotated[LocalStorageService, Depends(get_local_storage_service)]
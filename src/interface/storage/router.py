@@ -0,0 +1,122 @@
+import re
+from typing import Optional
+
+from fastapi import APIRouter, UploadFile, File, Form, Header, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.status import HTTP_200_OK, HTTP_204_NO_CONTENT, HTTP_206_PARTIAL_CONTENT
+
+from lib.fastapi.custom_exceptions import NotFoundException, PayloadTooLargeException
+from lib.fastapi.error_string import get_file_too_large, get_storage_file_not_found
+from src.setup.config.limiter import limiter
+from src.setup.config.settings import settings
+from .dependencies import LocalStorageDep
+
+router = APIRouter(prefix="/storage", tags=["storage"])
+
+
+def get_byte_range(range_header: Optional[str], size: int) -> Optional[tuple]:
+    """first and last byte of single range header, None to send the whole file"""
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", range_header or "")
+    if not match or not any(match.groups()) or not size:
+        return None
+    start, end = match.groups()
+    if not start:
+        return max(size - int(end), 0), size - 1
+    end = min(int(end), size - 1) if end else size - 1
+    if int(start) > end:
+        return None
+    return int(start), end
+
+
+@router.get("/{object_key:path}")
+@limiter.exempt
+def get_file(
+    object_key: str,
+    storage_service: LocalStorageDep,
+    expires: int = Query(),
+    signature: str = Query(),
+    range_header: Optional[str] = Header(None, alias="Range"),
+):
+    """stream file of signed url from memory map, single byte ranges are supported for videos"""
+    storage_service.verify_signature(signature, expires, "GET", object_key)
+    head = storage_service.head_file(object_key=object_key)
+    if not head:
+        raise NotFoundException(get_storage_file_not_found(object_key=object_key))
+    headers = {"Accept-Ranges": "bytes", "Cache-Control": "private, max-age=3600"}
+    byte_range = get_byte_range(range_header=range_header, size=head["size"])
+    if not byte_range:
+        return StreamingResponse(
+            storage_service.iter_file(object_key=object_key),
+            status_code=HTTP_200_OK,
+            media_type=head["content_type"],
+            headers={**headers, "Content-Length": str(head["size"])},
+        )
+    start, end = byte_range
+    return StreamingResponse(
+        storage_service.iter_file(object_key=object_key, start=start, end=end),
+        status_code=HTTP_206_PARTIAL_CONTENT,
+        media_type=head["content_type"],
+        headers={
+            **headers,
+            "Content-Length": str(end - start + 1),
+            "Content-Range": f"bytes {start}-{end}/{head['size']}",
+        },
+    )
+
+
+@router.post("/{object_key:path}", status_code=HTTP_204_NO_CONTENT)
+@limiter.exempt
+async def upload_file(
+    object_key: str,
+    storage_service: LocalStorageDep,
+    file: UploadFile = File(),
+    content_type: str = Form(alias="Content-Type"),
+    max_size: int = Form(),
+    expires: int = Form(),
+    signature: str = Form(),
+):
+    """upload file with the signed form of a direct upload, like s3 presigned POST"""
+    storage_service.verify_signature(
+        signature, expires, "POST", object_key, content_type, max_size
+    )
+    await run_in_threadpool(
+        storage_service.save_file,
+        object_key=object_key,
+        chunks=iter(lambda: file.file.read(storage_service.chunk_size), b""),
+        content_type=content_type,
+        max_size=max_size,
+    )
+    return Response(status_code=HTTP_204_NO_CONTENT)
+
+
+@router.put("/{object_key:path}")
+@limiter.exempt
+async def upload_part(
+    request: Request,
+    object_key: str,
+    storage_service: LocalStorageDep,
+    upload_id: str = Query(alias="uploadId"),
+    part_number: int = Query(alias="partNumber", gt=0),
+    expires: int = Query(),
+    signature: str = Query(),
+):
+    """upload one part of a direct multipart upload with its signed url, the ETag header identifies the part"""
+    storage_service.verify_signature(
+        signature, expires, "PUT", object_key, upload_id, part_number
+    )
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > settings.S3_MULTIPART_PART_SIZE:
+            raise PayloadTooLargeException(
+                get_file_too_large(max_size=settings.S3_MULTIPART_PART_SIZE)
+            )
+    part = await run_in_threadpool(
+        storage_service.upload_part,
+        object_key=object_key,
+        upload_id=upload_id,
+        part_number=part_number,
+        body=bytes(body),
+    )
+    return Response(status_code=HTTP_200_OK, headers={"ETag": part["ETag"]})
@@ -1,32 +1,54 @@
-from typing import Annotated
+from typing import Annotated, Optional
 import uuid
 
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 from starlette.status import HTTP_200_OK
 
 from .schemas import GetBaseUser, BaseUserResponseData, BaseUserListResponseData, DeleteBaseUserResponseData
 from ..auth.dependencies import AuthDep
 from src.setup.config.database import SessionDep
 from src.application.users.services import BaseUserAppService
-from lib.fastapi.custom_enums import Role
+from lib.fastapi.custom_enums import Role, ExportFormat
 from lib.fastapi.custom_exceptions import NotFoundException
 from lib.fastapi.custom_routes import UniqueConstraintErrorRoute
 from lib.fastapi.error_string import get_user_not_found
-from lib.fastapi.utils import check_id, only_admin_access
+from lib.fastapi.utils import check_id, only_admin_access, get_export_media_type
+from src.setup.config.settings import settings
 
 
 router = APIRouter(prefix="/base-user", tags=["base-user"], route_class=UniqueConstraintErrorRoute)
 
 @router.get("s/", status_code=HTTP_200_OK, response_model=BaseUserListResponseData)
-def list_base_users(current_user:AuthDep, session:SessionDep):
-    """list all base users"""
+def list_base_users(current_user:AuthDep, session:SessionDep, cursor: Optional[str] = None):
+    """list base users newest first (own base user for non admins), send back `next_cursor` as `cursor` for the next page"""
     base_user_app_service = BaseUserAppService(session)
     if current_user.get("role") != Role.ADMIN.value:
-        users = [base_user_app_service.get_base_user_by_id(id=uuid.UUID(current_user.get("id")))]
-    else:
-        users = base_user_app_service.get_all_base_users()
+        user = base_user_app_service.get_base_user_by_id(id=uuid.UUID(current_user.get("id")))
+        return {"data": dict(items=[user], size=1)}
+    users = base_user_app_service.get_base_users_page(
+        size=settings.USER_PAGINATION_SIZE, cursor=cursor
+    )
     return {"data": users}
 
+
+@router.get("s/export/", status_code=HTTP_200_OK, response_class=StreamingResponse)
+def export_base_users(
+    current_user: AuthDep,
+    session: SessionDep,
+    export_format: ExportFormat = ExportFormat.NDJSON,
+):
+    """stream all base users as ndjson or csv - only Admin access"""
+    only_admin_access(current_user=current_user)
+    chunks = BaseUserAppService(session).export_base_users(export_format=export_format)
+    return StreamingResponse(
+        chunks,
+        media_type=get_export_media_type(export_format=export_format),
+        headers={
+            "Content-Disposition": f'attachment; filename="base-users.{export_format.value}"'
+        },
+    )
+
 @router.get(
     "/{id}/",
     status_code=HTTP_200_OK,
@@ -1,11 +1,11 @@
 import re
 import uuid
-from typing import List, Optional
+from typing import Optional
 
 from pydantic import BaseModel, EmailStr, field_validator
 
 from lib.fastapi.custom_enums import Role
-from lib.fastapi.custom_schemas import BaseResponseSchema, BaseResponseNoDataSchema
+from lib.fastapi.custom_schemas import BaseResponseSchema, BaseResponseNoDataSchema, CursorPage
 from lib.fastapi.error_string import get_password_value_error
 from src.setup.config.settings import settings
 from src.interface.users.users.schemas import UserResponse
@@ -47,9 +47,9 @@ class BaseUserResponseData(BaseResponseSchema):
 
 
 class BaseUserListResponseData(BaseResponseSchema):
-    """response schema for base user list with data attribute to include List[BaseUserResponse]"""
+    """response schema for base user list with data attribute to include cursor page of BaseUserResponse"""
 
-    data: List[BaseUserResponse]
+    data: CursorPage[BaseUserResponse]
 
 
 class GetBaseUser(BaseModel):
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from fastapi import APIRouter
 
 from starlette.status import HTTP_201_CREATED, HTTP_200_OK
@@ -5,6 +7,7 @@ from starlette.status import HTTP_201_CREATED, HTTP_200_OK
 from lib.fastapi.custom_routes import UniqueConstraintErrorRoute
 from src.interface.auth.dependencies import AuthDep
 from src.setup.config.database import SessionDep
+from src.setup.config.settings import settings
 from lib.fastapi.utils import check_id, only_user_access
 from .schemas import (
     FollowRequestSchema,
@@ -16,7 +19,13 @@ from .schemas import (
     FollowRequestCancelledResponseData,
     UnfollowResponseData,
     RemoveFollowerResponseData,
+    FollowStatusSchema,
+    FollowStatusListResponseData,
+    BulkFollowSchema,
+    BulkFollowRequestSchema,
+    BulkFollowResponseData,
 )
+from src.interface.users.users.schemas import UserListResponseData
 from src.application.users.users.follow_management.services import FollowAppService
 
 
@@ -30,12 +39,16 @@ router = APIRouter(
     status_code=HTTP_200_OK,
     response_model=FollowRequestListReceivedResponseData,
 )
-def list_received_requests(current_user: AuthDep, session: SessionDep):
-    """list pending requests sent to the user"""
+def list_received_requests(
+    current_user: AuthDep, session: SessionDep, cursor: Optional[str] = None
+):
+    """list pending requests sent to the user newest first, send back `next_cursor` as `cursor` for the next page"""
     only_user_access(current_user=current_user)
     follow_app_service = FollowAppService(session=session)
     follow_list = follow_app_service.get_pending_requests_sent_to_user(
-        base_user_id=check_id(id=current_user.get("id"))
+        base_user_id=check_id(id=current_user.get("id")),
+        size=settings.POST_PAGINATION_SIZE,
+        cursor=cursor,
     )
     return dict(data=follow_list)
 
@@ -45,12 +58,16 @@ def list_received_requests(current_user: AuthDep, session: SessionDep):
     status_code=HTTP_200_OK,
     response_model=FollowRequestListSentResponseData,
 )
-def list_sent_requests(current_user: AuthDep, session: SessionDep):
-    """list pending requests sent by the user"""
+def list_sent_requests(
+    current_user: AuthDep, session: SessionDep, cursor: Optional[str] = None
+):
+    """list pending requests sent by the user newest first, send back `next_cursor` as `cursor` for the next page"""
     only_user_access(current_user=current_user)
     follow_app_service = FollowAppService(session=session)
     follow_list = follow_app_service.get_pending_requests_sent_by_user(
-        base_user_id=check_id(id=current_user.get("id"))
+        base_user_id=check_id(id=current_user.get("id")),
+        size=settings.POST_PAGINATION_SIZE,
+        cursor=cursor,
     )
     return dict(data=follow_list)
 
@@ -60,11 +77,19 @@ def list_sent_requests(current_user: AuthDep, session: SessionDep):
     status_code=HTTP_200_OK,
     response_model=FollowRequestListReceivedResponseData,
 )
-def list_followers(current_user: AuthDep, user: FollowRequestSchema, session: SessionDep):
-    """list all followers of the user"""
+def list_followers(
+    current_user: AuthDep,
+    user: FollowRequestSchema,
+    session: SessionDep,
+    cursor: Optional[str] = None,
+):
+    """list followers of the user newest first, send back `next_cursor` as `cursor` for the next page"""
     follow_app_service = FollowAppService(session=session)
     followers = follow_app_service.get_followers(
-        current_user=current_user, username=user.username
+        current_user=current_user,
+        username=user.username,
+        size=settings.POST_PAGINATION_SIZE,
+        cursor=cursor,
     )
     return dict(data=followers)
 
@@ -72,22 +97,73 @@ def list_followers(current_user: AuthDep, user: FollowRequestSchema, session: Se
 @router.post(
     "ing/", status_code=HTTP_200_OK, response_model=FollowRequestListSentResponseData
 )
-def list_following(current_user: AuthDep, user: FollowRequestSchema, session: SessionDep):
-    """list all users that the user follows"""
+def list_following(
+    current_user: AuthDep,
+    user: FollowRequestSchema,
+    session: SessionDep,
+    cursor: Optional[str] = None,
+):
+    """list users that the user follows newest first, send back `next_cursor` as `cursor` for the next page"""
     follow_app_service = FollowAppService(session=session)
     following_list = follow_app_service.get_following(
-        current_user=current_user, username=user.username
+        current_user=current_user,
+        username=user.username,
+        size=settings.POST_PAGINATION_SIZE,
+        cursor=cursor,
     )
     return dict(data=following_list)
 
 
+@router.post(
+    "/status/", status_code=HTTP_200_OK, response_model=FollowStatusListResponseData
+)
+def list_follow_status(
+    current_user: AuthDep, users: FollowStatusSchema, session: SessionDep
+):
+    """whether current user follows and is followed by each of the mentioned users"""
+    only_user_access(current_user=current_user)
+    follow_app_service = FollowAppService(session=session)
+    relationships = follow_app_service.get_relationships(
+        current_user=current_user, usernames=users.usernames
+    )
+    return dict(data=relationships)
+
+
+@router.post("/mutual/", status_code=HTTP_200_OK, response_model=UserListResponseData)
+def list_mutual_followers(
+    current_user: AuthDep, user: FollowRequestSchema, session: SessionDep
+):
+    """list followers of the mentioned user that the current user follows"""
+    only_user_access(current_user=current_user)
+    follow_app_service = FollowAppService(session=session)
+    mutual_followers = follow_app_service.get_mutual_followers(
+        current_user=current_user,
+        username=user.username,
+        size=settings.POST_PAGINATION_SIZE,
+    )
+    return dict(data=mutual_followers)
+
+
+@router.get(
+    "/suggestions/", status_code=HTTP_200_OK, response_model=UserListResponseData
+)
+def list_suggestions(current_user: AuthDep, session: SessionDep):
+    """list users followed by the users current user follows, most followed first"""
+    only_user_access(current_user=current_user)
+    follow_app_service = FollowAppService(session=session)
+    suggestions = follow_app_service.get_suggestions(
+        current_user=current_user, size=settings.POST_PAGINATION_SIZE
+    )
+    return dict(data=suggestions)
+
+
 @router.post(
     "/send/", status_code=HTTP_201_CREATED, response_model=FollowRequestSentResponseData
 )
 def send_request(current_user: AuthDep, user: FollowRequestSchema, session: SessionDep):
     """send request to mentioned user by username"""
     only_user_access(current_user=current_user)
-    follow_app_service = FollowAppService(session=session)
+    follow_app_service = FollowAppService(session=session, current_user=current_user)
     db_follow = follow_app_service.create_follow_request(
         follower_base_user_id=check_id(current_user.get("id")), username=user.username
     )
@@ -102,7 +178,7 @@ def send_request(current_user: AuthDep, user: FollowRequestSchema, session: Sess
 def accept_request(current_user: AuthDep, user: FollowRequestSchema, session: SessionDep):
     """accept request sent from the mentioned user"""
     only_user_access(current_user=current_user)
-    follow_app_service = FollowAppService(session=session)
+    follow_app_service = FollowAppService(session=session, current_user=current_user)
     follow_app_service.accept_follow_request(
         base_user_id=check_id(id=current_user.get("id")), accept_username=user.username
     )
@@ -117,7 +193,7 @@ def accept_request(current_user: AuthDep, user: FollowRequestSchema, session: Se
 def reject_request(current_user: AuthDep, user: FollowRequestSchema, session: SessionDep):
     """reject request sent from the mentioned user"""
     only_user_access(current_user=current_user)
-    follow_app_service = FollowAppService(session=session)
+    follow_app_service = FollowAppService(session=session, current_user=current_user)
     follow_app_service.reject_follow_request(
         base_user_id=check_id(id=current_user.get("id")), reject_username=user.username
     )
@@ -132,7 +208,7 @@ def reject_request(current_user: AuthDep, user: FollowRequestSchema, session: Se
 def cancel_request(current_user: AuthDep, user: FollowRequestSchema, session: SessionDep):
     """cancel request sent to the mentioned user"""
     only_user_access(current_user=current_user)
-    follow_app_service = FollowAppService(session=session)
+    follow_app_service = FollowAppService(session=session, current_user=current_user)
     follow_app_service.cancel_follow_request(
         base_user_id=check_id(id=current_user.get("id")), cancel_username=user.username
     )
@@ -145,7 +221,7 @@ def cancel_request(current_user: AuthDep, user: FollowRequestSchema, session: Se
 def unfollow(current_user: AuthDep, user: FollowRequestSchema, session: SessionDep):
     """unfollow mentioned user by current_user"""
     only_user_access(current_user=current_user)
-    follow_app_service = FollowAppService(session=session)
+    follow_app_service = FollowAppService(session=session, current_user=current_user)
     follow_app_service.unfollow(
         base_user_id=check_id(id=current_user.get("id")),
         unfollow_username=user.username,
@@ -163,9 +239,71 @@ def remove_follower(
 ):
     """remove follower of current user"""
     only_user_access(current_user=current_user)
-    follow_app_service = FollowAppService(session=session)
+    follow_app_service = FollowAppService(session=session, current_user=current_user)
     follow_app_service.remove_follower(
         base_user_id=check_id(id=current_user.get("id")),
         remove_username=user.username,
     )
     return {}
+
+
+@router.post(
+    "/accept/bulk/", status_code=HTTP_200_OK, response_model=BulkFollowResponseData
+)
+def bulk_accept_requests(
+    current_user: AuthDep, users: BulkFollowRequestSchema, session: SessionDep
+):
+    """accept requests sent from the mentioned users, or all pending requests, with a result per username"""
+    only_user_access(current_user=current_user)
+    follow_app_service = FollowAppService(session=session, current_user=current_user)
+    results = follow_app_service.bulk_accept_follow_requests(
+        base_user_id=check_id(id=current_user.get("id")),
+        usernames=None if users.all_pending else users.usernames,
+    )
+    return dict(data=results)
+
+
+@router.post(
+    "/reject/bulk/", status_code=HTTP_200_OK, response_model=BulkFollowResponseData
+)
+def bulk_reject_requests(
+    current_user: AuthDep, users: BulkFollowRequestSchema, session: SessionDep
+):
+    """reject requests sent from the mentioned users, or all pending requests, with a result per username"""
+    only_user_access(current_user=current_user)
+    follow_app_service = FollowAppService(session=session, current_user=current_user)
+    results = follow_app_service.bulk_reject_follow_requests(
+        base_user_id=check_id(id=current_user.get("id")),
+        usernames=None if users.all_pending else users.usernames,
+    )
+    return dict(data=results)
+
+
+@router.post(
+    "/unfollow/bulk/", status_code=HTTP_200_OK, response_model=BulkFollowResponseData
+)
+def bulk_unfollow(current_user: AuthDep, users: BulkFollowSchema, session: SessionDep):
+    """unfollow mentioned users with a result per username"""
+    only_user_access(current_user=current_user)
+    follow_app_service = FollowAppService(session=session, current_user=current_user)
+    results = follow_app_service.bulk_unfollow(
+        base_user_id=check_id(id=current_user.get("id")), usernames=users.usernames
+    )
+    return dict(data=results)
+
+
+@router.post(
+    "/remove-follower/bulk/",
+    status_code=HTTP_200_OK,
+    response_model=BulkFollowResponseData,
+)
+def bulk_remove_followers(
+    current_user: AuthDep, users: BulkFollowSchema, session: SessionDep
+):
+    """remove mentioned followers of current user with a result per username"""
+    only_user_access(current_user=current_user)
+    follow_app_service = FollowAppService(session=session, current_user=current_user)
+    results = follow_app_service.bulk_remove_followers(
+        base_user_id=check_id(id=current_user.get("id")), usernames=users.usernames
+    )
+    return dict(data=results)
@@ -1,11 +1,13 @@
-from typing import List, Optional
+from typing import Annotated, List, Optional
 import uuid
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 
-from lib.fastapi.custom_enums import StatusType
-from lib.fastapi.custom_schemas import BaseResponseSchema, BaseResponseNoDataSchema
+from lib.fastapi.custom_enums import StatusType, BulkFollowResult
+from lib.fastapi.error_string import get_bulk_follow_usernames_required
+from lib.fastapi.custom_schemas import BaseResponseSchema, BaseResponseNoDataSchema, CursorPage
 from src.interface.users.users.schemas import UserResponse, UsernameSchema
+from src.setup.config.settings import settings
 
 
 class FollowRequestSchema(UsernameSchema):
@@ -38,15 +40,15 @@ class FollowRequestReceivedResponse(BaseModel):
 
 
 class FollowRequestListReceivedResponseData(BaseResponseSchema):
-    """Follow Request List Received Response data with data attribute to include list of follow request received"""
+    """Follow Request List Received Response data with data attribute to include cursor page of follow request received"""
 
-    data: List[FollowRequestReceivedResponse]
+    data: CursorPage[FollowRequestReceivedResponse]
 
 
 class FollowRequestListSentResponseData(BaseResponseSchema):
-    """Follow Request List Sent Response data with data attribute to include list of follow request sent"""
+    """Follow Request List Sent Response data with data attribute to include cursor page of follow request sent"""
 
-    data: List[FollowRequestSentResponse]
+    data: CursorPage[FollowRequestSentResponse]
 
 
 class FollowRequest(BaseModel):
@@ -85,3 +87,64 @@ class RemoveFollowerResponseData(BaseResponseNoDataSchema):
     """Remove Follower Response data with message attribute set to optional static string"""
 
     message: Optional[str] = "Follower Removed!!"
+
+
+class FollowStatusSchema(BaseModel):
+    """usernames to get follow status of current user with"""
+
+    usernames: Annotated[
+        List[str], Field(min_length=1, max_length=settings.FOLLOW_STATUS_MAX_USERNAMES)
+    ]
+
+
+class FollowStatusResponse(BaseModel):
+    """whether current user follows and is followed by the user"""
+
+    username: str
+    following: bool
+    followed_by: bool
+
+
+class FollowStatusListResponseData(BaseResponseSchema):
+    """Follow Status List Response data with data attribute to include list of FollowStatusResponse"""
+
+    data: List[FollowStatusResponse]
+
+
+class BulkFollowSchema(BaseModel):
+    """usernames for bulk unfollow and remove follower"""
+
+    usernames: Annotated[
+        List[str], Field(min_length=1, max_length=settings.FOLLOW_BULK_MAX_USERNAMES)
+    ]
+
+
+class BulkFollowRequestSchema(BaseModel):
+    """usernames, or all_pending for all pending requests, for bulk accept and reject"""
+
+    usernames: Optional[
+        Annotated[
+            List[str],
+            Field(min_length=1, max_length=settings.FOLLOW_BULK_MAX_USERNAMES),
+        ]
+    ] = None
+    all_pending: bool = False
+
+    @model_validator(mode="after")
+    def usernames_or_all_pending(self) -> "BulkFollowRequestSchema":
+        if not self.all_pending and not self.usernames:
+            raise ValueError(get_bulk_follow_usernames_required())
+        return self
+
+
+class BulkFollowResponse(BaseModel):
+    """result of bulk follow operation for username"""
+
+    username: str
+    result: BulkFollowResult
+
+
+class BulkFollowResponseData(BaseResponseSchema):
+    """Bulk Follow Response data with data attribute to include list of BulkFollowResponse"""
+
+    data: List[BulkFollowResponse]
@@ -2,6 +2,7 @@ from typing import Annotated, Optional
 import uuid
 
 from fastapi import APIRouter, UploadFile, Depends, File, Form
+from fastapi.responses import StreamingResponse
 from starlette.status import HTTP_200_OK
 
 from src.setup.config.database import SessionDep
@@ -12,15 +13,27 @@ from .schemas import (
     UserResponseData,
     GetUser,
     DeleteUserResponseData,
-    UserListResponseData,
+    UserPageResponseData,
+    ProfileUploadResponseData,
 )
 from .utils import handle_user_create_with_profile_upload
 from lib.fastapi.custom_routes import UniqueConstraintErrorRoute
-from lib.fastapi.utils import check_id, only_own_access, only_user_access
+from src.setup.config.settings import settings
+from lib.fastapi.custom_schemas import UploadFileSchema, UploadedFileSchema
+from lib.fastapi.utils import (
+    check_id,
+    only_own_access,
+    only_user_access,
+    check_file_type,
+    check_file_size,
+    get_valid_image_formats_list,
+    only_admin_access,
+    get_export_media_type,
+)
 from lib.fastapi.custom_exceptions import (
     NotFoundException,
 )
-from lib.fastapi.custom_enums import Role, ProfileType
+from lib.fastapi.custom_enums import Role, ProfileType, ExportFormat
 from lib.fastapi.error_string import (
     get_user_not_found,
 )
@@ -30,21 +43,39 @@ router = APIRouter(
 )
 
 
-@router.get("s/", status_code=HTTP_200_OK, response_model=UserListResponseData)
-def list_users(current_user: AuthDep, session: SessionDep):
-    """list all base users"""
+@router.get("s/", status_code=HTTP_200_OK, response_model=UserPageResponseData)
+def list_users(current_user: AuthDep, session: SessionDep, cursor: Optional[str] = None):
+    """list users newest first (own user for non admins), send back `next_cursor` as `cursor` for the next page"""
     user_app_service = UserAppService(session)
     if current_user.get("role") != Role.ADMIN.value:
-        users = [
-            user_app_service.get_user_by_base_user_id(
-                base_user_id=uuid.UUID(current_user.get("id"))
-            )
-        ]
-    else:
-        users = user_app_service.get_all_users()
+        user = user_app_service.get_user_by_base_user_id(
+            base_user_id=uuid.UUID(current_user.get("id"))
+        )
+        return {"data": dict(items=[user], size=1)}
+    users = user_app_service.get_users_page(
+        size=settings.USER_PAGINATION_SIZE, cursor=cursor
+    )
     return {"data": users}
 
 
+@router.get("s/export/", status_code=HTTP_200_OK, response_class=StreamingResponse)
+def export_users(
+    current_user: AuthDep,
+    session: SessionDep,
+    export_format: ExportFormat = ExportFormat.NDJSON,
+):
+    """stream all users as ndjson or csv - only Admin access"""
+    only_admin_access(current_user=current_user)
+    chunks = UserAppService(session).export_users(export_format=export_format)
+    return StreamingResponse(
+        chunks,
+        media_type=get_export_media_type(export_format=export_format),
+        headers={
+            "Content-Disposition": f'attachment; filename="users.{export_format.value}"'
+        },
+    )
+
+
 # NOT NEEDED because dummy user is created while registration
 # @router.post(
 #     "/create/",
@@ -124,7 +155,9 @@ def update_user(
     )
 
     if profile and profile != "":
-        user = handle_user_create_with_profile_upload(user=user, profile=profile)
+        user = handle_user_create_with_profile_upload(
+            user=user, profile=profile, session=session
+        )
 
     db_user = user_app_service.update_user(user=user)
 
@@ -134,6 +167,34 @@ def update_user(
     }
 
 
+@router.post("/profile/upload/", status_code=HTTP_200_OK, response_model=ProfileUploadResponseData)
+def create_profile_upload(current_user: AuthDep, profile: UploadFileSchema):
+    """
+    start profile upload, returns presigned upload to send profile directly to storage,
+    then save it with `PUT /user/profile/`
+    """
+    only_user_access(current_user=current_user)
+    # check file type and size
+    check_file_type(content_type=profile.content_type, valid_types=get_valid_image_formats_list())
+    check_file_size(size=profile.size, max_size=settings.IMAGE_MAX_UPLOAD_SIZE)
+    upload = UserAppService.create_profile_direct_upload(
+        profile=profile, base_user_id=check_id(id=current_user.get("id"))
+    )
+    return {"data": upload}
+
+
+@router.put("/profile/", status_code=HTTP_200_OK, response_model=UserResponseData)
+def finalize_profile_upload(
+    current_user: AuthDep, session: SessionDep, uploaded: UploadedFileSchema
+):
+    """save profile uploaded directly to storage"""
+    only_user_access(current_user=current_user)
+    db_user = UserAppService(session=session).finalize_profile_upload(
+        base_user_id=check_id(id=current_user.get("id")), uploaded=uploaded
+    )
+    return {"message": "User Updated!", "data": db_user}
+
+
 @router.delete("/{base_user_id}/", status_code=HTTP_200_OK, response_model=DeleteUserResponseData)
 def delete_user(current_user: AuthDep, base_user_id: str, session: SessionDep):
     """delete existing user"""
@@ -4,11 +4,11 @@ from typing import Optional, List, Annotated
 
 from pydantic import BaseModel, field_validator, field_serializer, StringConstraints
 
-from lib.fastapi.custom_schemas import BaseResponseSchema, BaseResponseNoDataSchema
+from lib.fastapi.custom_schemas import BaseResponseSchema, BaseResponseNoDataSchema, DirectUploadSchema, CursorPage
 from lib.fastapi.custom_enums import ProfileType
 from lib.fastapi.error_string import get_username_value_error
 from src.setup.config.settings import settings
-from src.infrastructure.file_upload.services import Boto3Service
+from src.infrastructure.file_upload.services import get_storage_service
 
 
 class UsernameSchema(BaseModel):
@@ -52,8 +52,8 @@ class UserResponse(UserSchema):
     @field_serializer("profile")
     def serialize_profile(self, profile: str):
         if profile:
-            boto3_service = Boto3Service()
-            presigned_url = boto3_service.get_presigned_url(object_key=profile)
+            storage_service = get_storage_service()
+            presigned_url = storage_service.get_presigned_url(object_key=profile)
             return presigned_url
         return None
 
@@ -70,6 +70,18 @@ class UserListResponseData(BaseResponseSchema):
     data: List[UserResponse]
 
 
+class UserPageResponseData(BaseResponseSchema):
+    """user page response data with data attribute to include cursor page of UserResponse"""
+
+    data: CursorPage[UserResponse]
+
+
+class ProfileUploadResponseData(BaseResponseSchema):
+    """profile upload response data with data attribute to include presigned upload"""
+
+    data: DirectUploadSchema
+
+
 class GetUser(UsernameSchema):
     """information required to get user"""
 
@@ -1,3 +1,6 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.openapi.utils import get_openapi
 from fastapi_pagination.utils import disable_installed_extensions_check
@@ -14,19 +17,47 @@ from src.interface.posts.router import router as post_router
 from src.interface.posts.likes.router import router as likes_router
 from src.interface.posts.comments.router import router as comments_router
 from src.interface.posts.reported_posts.router import router as report_post_router
+from src.interface.posts.timeline.router import router as feed_router
 from src.interface.payments.subscription.router import router as subscription_router
+from src.interface.storage.router import router as storage_router
 from lib.fastapi.custom_middlewares import HandleExceptionMiddleware, CustomTrustedHostMiddleware
 from lib.fastapi.custom_exceptions import rate_limit_exceeded_handler
 from lib.fastapi.utils import get_pydantic_error_response
+from src.domain.posts.services import PostCountBuffer
+from src.infrastructure.auth_service.services import PasswordHashPool
 # from src.setup.config.logs import get_logger
 from src.setup.config.settings import settings
 from src.setup.config.limiter import limiter
+from src.setup.config.database import get_session, engine
 
 # logger = get_logger(__name__)
 
 disable_installed_extensions_check()
 
-app = FastAPI()
+
+def check_user_claims_settings() -> None:
+    """warn when user claims are embedded without redis shared by the worker processes"""
+    if settings.JWT_USER_CLAIMS and not settings.CLAIMS_VERSION_REDIS_URL:
+        logging.getLogger(__name__).warning(
+            "JWT_USER_CLAIMS is enabled without CLAIMS_VERSION_REDIS_URL, claims changes are only "
+            "seen by the worker process that made them until the access token expires"
+        )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    check_user_claims_settings()
+    PostCountBuffer().start_flusher(bind=engine)
+    yield
+    # write like/comment counts still pending in this process
+    PostCountBuffer().stop_flusher()
+    session = list(get_session())[0]
+    PostCountBuffer().flush(session=session)
+    session.close()
+    PasswordHashPool().shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 app.state.limiter = limiter
 
 def pydantic_exception_handler(request: Request, exc: RequestValidationError):
@@ -50,7 +81,9 @@ app.include_router(post_router)
 app.include_router(likes_router)
 app.include_router(comments_router)
 app.include_router(report_post_router)
+app.include_router(feed_router)
 app.include_router(subscription_router)
+app.include_router(storage_router)
 
 
 def custom_openapi():
@@ -1,6 +1,6 @@
 import os
 import ast
-from typing import List
+from typing import List, Optional
 
 from dotenv import load_dotenv
 
@@ -44,6 +44,23 @@ class Config(BaseSettings):
     JWT_REFRESH_SECRET: str = os.getenv("JWT_REFRESH_SECRET")
     ACCESS_TOKEN_LIFETIME: dict = ast.literal_eval(os.getenv("ACCESS_TOKEN_EXPIRATION"))
     REFRESH_TOKEN_LIFETIME: dict = ast.literal_eval(os.getenv("REFRESH_TOKEN_EXPIRATION"))
+    # redis shared by all processes for user claims versions, e.g. redis://localhost:6379/2
+    CLAIMS_VERSION_REDIS_URL: Optional[str] = os.getenv("CLAIMS_VERSION_REDIS_URL")
+    # embed user_id, username and profile_type in access tokens so handlers can skip the user lookup,
+    # needs CLAIMS_VERSION_REDIS_URL when running several workers to see each other's claims changes
+    JWT_USER_CLAIMS: bool = os.getenv("JWT_USER_CLAIMS", "false").lower() == "true"
+    CLAIMS_VERSION_CACHE_SIZE: int = int(os.getenv("CLAIMS_VERSION_CACHE_SIZE", "100000"))
+    # access tokens kept verified in memory until they expire, 0 verifies the signature on every request
+    VERIFIED_TOKEN_CACHE_SIZE: int = int(os.getenv("VERIFIED_TOKEN_CACHE_SIZE", "10000"))
+
+    # bcrypt cost of new password hashes, pick it for this host with calibrate_bcrypt_rounds.py
+    PASSWORD_BCRYPT_ROUNDS: int = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12"))
+    # processes hashing and verifying passwords, 0 runs bcrypt in the request thread,
+    # more hashes waiting or running than the queue size are rejected with 503
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_QUEUE_SIZE: int = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "64"))
+    # verify latency calibrate_bcrypt_rounds.py aims for
+    PASSWORD_VERIFY_TARGET_MS: int = int(os.getenv("PASSWORD_VERIFY_TARGET_MS", "250"))
 
     STARLETTE_CSRF_SECRET: str = os.getenv("STARLETTE_CSRF_SECRET")
 
@@ -73,9 +90,80 @@ class Config(BaseSettings):
     AWS_S3_REGION_NAME: str = os.getenv("AWS_S3_REGION_NAME")
     PRESIGNED_URL_TIME: dict = ast.literal_eval(os.getenv("PRESIGNED_URL_TIME"))
     TEST_AWS_BUCKET_NAME: str = os.getenv("TEST_AWS_BUCKET_NAME")
+    # "s3" stores media with boto3, "local" on disk under LOCAL_STORAGE_PATH served by the storage router
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "s3")
+    LOCAL_STORAGE_PATH: str = os.getenv("LOCAL_STORAGE_PATH", "storage")
+    # signs local storage urls, required by the local backend and kept apart from the jwt keys
+    LOCAL_STORAGE_SECRET: Optional[str] = os.getenv("LOCAL_STORAGE_SECRET")
+    # connection pool of the process wide s3 client
+    S3_MAX_POOL_CONNECTIONS: int = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "50"))
+    S3_TCP_KEEPALIVE: bool = os.getenv("S3_TCP_KEEPALIVE", "true").lower() == "true"
+    # threads uploading post media files concurrently per process
+    MEDIA_UPLOAD_WORKERS: int = int(os.getenv("MEDIA_UPLOAD_WORKERS", "8"))
+    # videos are uploaded to storage in parts of this many bytes (s3 minimum is 5 MiB),
+    # at most S3_MULTIPART_CONCURRENCY parts of one upload are held in memory and sent in parallel
+    S3_MULTIPART_PART_SIZE: int = max(
+        int(os.getenv("S3_MULTIPART_PART_SIZE", str(8 * 1024 * 1024))), 5 * 1024 * 1024
+    )
+    S3_MULTIPART_CONCURRENCY: int = int(os.getenv("S3_MULTIPART_CONCURRENCY", "4"))
+    S3_MULTIPART_WORKERS: int = int(os.getenv("S3_MULTIPART_WORKERS", "16"))
+    VIDEO_MAX_UPLOAD_SIZE: int = int(os.getenv("VIDEO_MAX_UPLOAD_SIZE", str(1024 * 1024 * 1024)))
+    IMAGE_MAX_UPLOAD_SIZE: int = int(os.getenv("IMAGE_MAX_UPLOAD_SIZE", str(20 * 1024 * 1024)))
+    # store form uploaded media and profiles once per content under its sha256, see MediaBlob
+    MEDIA_CONTENT_ADDRESSED: bool = os.getenv("MEDIA_CONTENT_ADDRESSED", "false").lower() == "true"
+    # deleted media is removed from storage by a worker in delete_objects batches (s3 maximum is 1000 keys)
+    STORAGE_DELETE_BATCH_SIZE: int = min(int(os.getenv("STORAGE_DELETE_BATCH_SIZE", "1000")), 1000)
+    STORAGE_DELETE_MAX_ATTEMPTS: int = int(os.getenv("STORAGE_DELETE_MAX_ATTEMPTS", "5"))
+    # objects younger than this are never treated as orphans (e.g. direct uploads not finalized yet)
+    STORAGE_ORPHAN_GRACE_SECONDS: int = int(os.getenv("STORAGE_ORPHAN_GRACE_SECONDS", "86400"))
+    # widths of resized image variants created after upload, each in IMAGE_VARIANT_FORMATS
+    IMAGE_VARIANT_WIDTHS: List[int] = [
+        int(width) for width in os.getenv("IMAGE_VARIANT_WIDTHS", "320,640,1080").split(",")
+    ]
+    IMAGE_VARIANT_FORMATS: List[str] = os.getenv("IMAGE_VARIANT_FORMATS", "webp,jpeg").split(",")
+    IMAGE_VARIANT_QUALITY: int = int(os.getenv("IMAGE_VARIANT_QUALITY", "80"))
+    IMAGE_PLACEHOLDER_WIDTH: int = int(os.getenv("IMAGE_PLACEHOLDER_WIDTH", "16"))
+    # presigned urls for uploading directly to storage are valid for this many seconds
+    UPLOAD_URL_EXPIRES_SECONDS: int = int(os.getenv("UPLOAD_URL_EXPIRES_SECONDS", "3600"))
+    # presigned urls are reused within a window of this many seconds, 0 cache size disables in-process cache
+    PRESIGNED_URL_WINDOW_SECONDS: int = int(os.getenv("PRESIGNED_URL_WINDOW_SECONDS", "600"))
+    PRESIGNED_URL_CACHE_SIZE: int = int(os.getenv("PRESIGNED_URL_CACHE_SIZE", "10000"))
+    # optional redis shared by all processes, e.g. redis://localhost:6379/1
+    PRESIGNED_URL_REDIS_URL: Optional[str] = os.getenv("PRESIGNED_URL_REDIS_URL")
+
+    # (viewer, author) decisions whether viewer follows private author are cached for this many seconds
+    CAN_VIEW_CACHE_TTL_SECONDS: int = int(os.getenv("CAN_VIEW_CACHE_TTL_SECONDS", "30"))
+    CAN_VIEW_CACHE_SIZE: int = int(os.getenv("CAN_VIEW_CACHE_SIZE", "100000"))
+    # in-process follow graph is reloaded from the database after this many seconds,
+    # its arrays are rebuilt after this many incremental follow changes
+    FOLLOW_GRAPH_TTL_SECONDS: int = int(os.getenv("FOLLOW_GRAPH_TTL_SECONDS", "300"))
+    FOLLOW_GRAPH_COMPACT_SIZE: int = int(os.getenv("FOLLOW_GRAPH_COMPACT_SIZE", "10000"))
+    # most usernames accepted by one bulk follow status request
+    FOLLOW_STATUS_MAX_USERNAMES: int = int(os.getenv("FOLLOW_STATUS_MAX_USERNAMES", "100"))
+    # most usernames accepted by one bulk accept, reject, unfollow or remove follower request
+    FOLLOW_BULK_MAX_USERNAMES: int = int(os.getenv("FOLLOW_BULK_MAX_USERNAMES", "500"))
 
     POST_PAGINATION_SIZE: int = int(os.getenv("POST_PAGINATION_SIZE"))
+    # admin user and base user listings page size
+    USER_PAGINATION_SIZE: int = int(os.getenv("USER_PAGINATION_SIZE", "50"))
+    # exports are read with a server side cursor and written in chunks of this many rows
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
     POST_COUNT_TO_NOTIFY: int = int(os.getenv("POST_COUNT_TO_NOTIFY"))
+    # percent of post table to sample when picking posts to notify, unset scans all candidate posts
+    POST_NOTIFICATION_SAMPLE_PERCENT: Optional[float] = (
+        float(os.getenv("POST_NOTIFICATION_SAMPLE_PERCENT"))
+        if os.getenv("POST_NOTIFICATION_SAMPLE_PERCENT")
+        else None
+    )
+    # pending like/comment count changes are written to post table after this many changes or seconds
+    POST_COUNT_FLUSH_SIZE: int = int(os.getenv("POST_COUNT_FLUSH_SIZE", "100"))
+    POST_COUNT_FLUSH_SECONDS: int = int(os.getenv("POST_COUNT_FLUSH_SECONDS", "5"))
+    # authors with more approved followers are merged into feeds at read time instead of fan-out on write
+    FEED_FAN_OUT_FOLLOWER_LIMIT: int = int(os.getenv("FEED_FAN_OUT_FOLLOWER_LIMIT", "5000"))
+    # latest posts of an author written to the timeline of a new approved follower
+    FEED_FOLLOW_BACKFILL_SIZE: int = int(os.getenv("FEED_FOLLOW_BACKFILL_SIZE", "50"))
+    # requires pg_trgm extension (see post caption search migration)
+    TRIGRAM_SEARCH_ENABLED: bool = os.getenv("TRIGRAM_SEARCH_ENABLED", "false").lower() == "true"
 
     STRIPE_API_KEY: str = os.getenv("STRIPE_API_KEY")
     # STRIPE_WEBHOOK_SECRET:str = os.getenv("STRIPE_WEBHOOK_SECRET")
@@ -0,0 +1,282 @@
+import io
+import uuid
+import hashlib
+
+import httpx
+import pytest
+from botocore.exceptions import ClientError
+from PIL import Image
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+from sqlmodel import select
+
+from src.tests.test_client import setup_database
+from src.tests.test_fixtures import (
+    before_create_post,
+    before_create_normal_user,
+    before_create_base_user,
+)
+from src.tests.test_data import create_public_user
+from src.tests.test_utils import create_session
+from src.domain.models import Media
+from src.interface.posts.media.schemas import MediaSchema, requested_media_width
+from lib.fastapi.custom_enums import ImageFormat
+from src.application.posts.media.services import MediaAppService
+from src.application.posts.services import PostAppService
+from src.domain.posts.media.services import PendingDeletionService
+from src.infrastructure.file_upload.services import Boto3Service
+from src.setup.config.settings import settings
+from lib.fastapi.custom_schemas import UploadFileSchema, UploadedFileSchema
+from lib.fastapi.custom_exceptions import CustomValidationError
+
+
+class BrokenFile(io.BytesIO):
+    def read(self, *args, **kwargs):
+        raise OSError("broken upload")
+
+
+def get_upload_file(file: io.BytesIO) -> UploadFile:
+    return UploadFile(
+        file=file, filename="post.jpeg", headers=Headers({"content-type": "image/jpeg"})
+    )
+
+
+def object_exists(object_key: str) -> bool:
+    boto3_service = Boto3Service()
+    try:
+        boto3_service._Boto3Service__client.head_object(
+            Bucket=boto3_service.bucket_name, Key=object_key
+        )
+        return True
+    except ClientError:
+        return False
+
+
+def test_handle_media_uploads():
+    files = [
+        (get_upload_file(io.BytesIO(b"media")), f"tests/uploads/post_{i}.jpeg")
+        for i in range(4)
+    ]
+    MediaAppService.handle_media_uploads(files=files)
+    assert all(object_exists(object_key) for _, object_key in files)
+
+
+def test_handle_media_uploads_deletes_uploaded_files_on_failure():
+    files = [
+        (get_upload_file(io.BytesIO(b"media")), "tests/uploads/post_0.jpeg"),
+        (get_upload_file(BrokenFile(b"media")), "tests/uploads/post_1.jpeg"),
+        (get_upload_file(io.BytesIO(b"media")), "tests/uploads/post_2.jpeg"),
+    ]
+    with pytest.raises(OSError):
+        MediaAppService.handle_media_uploads(files=files)
+    assert not any(object_exists(object_key) for _, object_key in files)
+
+
+def test_direct_multipart_upload_of_video():
+    object_key = "tests/direct_upload.mp4"
+    content = b"v" * (settings.S3_MULTIPART_PART_SIZE + 1024)
+    upload = MediaAppService.create_direct_upload(
+        file=UploadFileSchema(filename="post.mp4", content_type="video/mp4", size=len(content)),
+        object_key=object_key,
+    )
+    assert upload.upload_id is not None
+    assert len(upload.part_urls) == 2
+    for i, part_url in enumerate(upload.part_urls):
+        part = content[i * upload.part_size : (i + 1) * upload.part_size]
+        assert httpx.put(part_url, content=part).status_code == 200
+    content_type = MediaAppService.check_uploaded_media(
+        uploaded=UploadedFileSchema(object_key=object_key, upload_id=upload.upload_id),
+        valid_types=["video/mp4"],
+    )
+    assert content_type == "video/mp4"
+    assert object_exists(object_key=object_key)
+
+
+def test_check_uploaded_media_with_invalid_type_deletes_file():
+    object_key = "tests/direct_upload.txt"
+    Boto3Service().upload_file_from_memory(
+        object_key=object_key, file_content=io.BytesIO(b"test"), file_type="text/plain"
+    )
+    with pytest.raises(CustomValidationError):
+        MediaAppService.check_uploaded_media(
+            uploaded=UploadedFileSchema(object_key=object_key), valid_types=["image/jpeg"]
+        )
+    assert not object_exists(object_key=object_key)
+
+
+def test_create_media_variants(before_create_post, monkeypatch):
+    monkeypatch.setattr(settings, "IMAGE_VARIANT_WIDTHS", [320, 640, 1080])
+    session = create_session()
+    post = before_create_post(session=session, user_dict=create_public_user())
+    db_media = session.scalars(
+        select(Media).where(Media.post_id == post.id, Media.media_url.endswith("post_0.jpeg"))
+    ).first()
+    db_media = MediaAppService(session=session).create_media_variants(media_id=db_media.id)
+    # test image is 640px wide, only smaller variants are created
+    assert [(variant["width"], variant["format"]) for variant in db_media.variants] == [
+        (320, "webp"),
+        (320, "jpeg"),
+    ]
+    assert db_media.placeholder.startswith("data:image/webp;base64,")
+    assert all(object_exists(variant["object_key"]) for variant in db_media.variants)
+    media = MediaSchema.model_validate(db_media, from_attributes=True)
+    assert media.get_object_key_for_width(width=200, image_format=ImageFormat.WEBP).endswith(
+        "post_0_w320.webp"
+    )
+    assert media.get_object_key_for_width(width=1000, image_format=ImageFormat.JPEG) == db_media.media_url
+    token = requested_media_width.set((200, ImageFormat.WEBP))
+    data = media.model_dump()
+    requested_media_width.reset(token)
+    assert "post_0_w320.webp" in data["media_url"]
+    assert "variants" not in data
+    session.close()
+
+
+def test_create_media_variants_keeps_content_addressed_key_true_to_content(
+    before_create_post, monkeypatch
+):
+    monkeypatch.setattr(settings, "MEDIA_CONTENT_ADDRESSED", True)
+    session = create_session()
+    post = before_create_post(session=session, user_dict=create_public_user())
+    image = Image.new("RGB", (64, 32), color=(uuid.uuid4().int % 256, 100, 50))
+    exif = Image.Exif()
+    exif[0x010F] = "camera maker"
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", exif=exif)
+    media_app_service = MediaAppService(session=session)
+    [object_key] = media_app_service.upload_media(
+        files=[(get_upload_file(io.BytesIO(buffer.getvalue())), "tests/uploads/post_0.jpeg")]
+    )
+    db_media = media_app_service.create_media(
+        media=MediaSchema(post_id=post.id, media_url=object_key, media_type="image/jpeg")
+    )
+    db_media = media_app_service.create_media_variants(media_id=db_media.id)
+    # the copy without metadata is a blob of its own
+    assert db_media.media_url != object_key
+    stored = io.BytesIO()
+    Boto3Service().download_file_into_memory(object_key=db_media.media_url, buffer=stored)
+    assert db_media.media_url == MediaAppService.get_blob_object_key(
+        sha256=hashlib.sha256(stored.getvalue()).hexdigest()
+    )
+    assert not Image.open(stored).getexif()
+    # the original is no longer referenced
+    media_app_service.drain_pending_deletions()
+    assert not object_exists(object_key=object_key)
+    session.close()
+
+
+def test_upload_media_content_addressed(monkeypatch):
+    monkeypatch.setattr(settings, "MEDIA_CONTENT_ADDRESSED", True)
+    session = create_session()
+    media_app_service = MediaAppService(session=session)
+    files = [
+        (get_upload_file(io.BytesIO(b"same content")), "tests/uploads/post_0.jpeg"),
+        (get_upload_file(io.BytesIO(b"same content")), "tests/uploads/post_1.jpeg"),
+    ]
+    object_keys = media_app_service.upload_media(files=files)
+    assert object_keys[0] == object_keys[1]
+    assert object_keys[0].startswith("media/")
+    assert object_exists(object_key=object_keys[0])
+    # re-upload of stored content is not sent to storage
+    put_count = Boto3Service().get_latency_stats()["put_object"]["count"]
+    assert media_app_service.upload_media(
+        files=[(get_upload_file(io.BytesIO(b"same content")), "tests/uploads/post_2.jpeg")]
+    ) == [object_keys[0]]
+    assert Boto3Service().get_latency_stats()["put_object"]["count"] == put_count
+    # deleted only when the last reference is released
+    assert not media_app_service.delete_media_object(object_key=object_keys[0])
+    assert not media_app_service.delete_media_object(object_key=object_keys[0])
+    assert object_exists(object_key=object_keys[0])
+    assert media_app_service.delete_media_object(object_key=object_keys[0])
+    media_app_service.drain_pending_deletions()
+    assert not object_exists(object_key=object_keys[0])
+    session.close()
+
+
+def test_pending_deletion_of_content_uploaded_again_is_skipped(monkeypatch):
+    monkeypatch.setattr(settings, "MEDIA_CONTENT_ADDRESSED", True)
+    session = create_session()
+    media_app_service = MediaAppService(session=session)
+    content = uuid.uuid4().bytes
+    [object_key] = media_app_service.upload_media(
+        files=[(get_upload_file(io.BytesIO(content)), "tests/uploads/post_0.jpeg")]
+    )
+    # released blob is queued with the release
+    assert media_app_service.release_media_object(object_key=object_key)
+    assert PendingDeletionService(session=session).get_batch(limit=100, max_attempts=5).count(
+        object_key
+    ) == 1
+    session.commit()
+    # same content uploaded again before the worker ran, then the release is scheduled late
+    assert MediaAppService(session=session).upload_media(
+        files=[(get_upload_file(io.BytesIO(content)), "tests/uploads/post_1.jpeg")]
+    ) == [object_key]
+    media_app_service.schedule_deletion(object_keys=[object_key])
+    # queued by another path, dropped by the worker since the blob is used again
+    PendingDeletionService(session=session).add_all(object_keys=[object_key])
+    media_app_service.drain_pending_deletions()
+    assert object_exists(object_key=object_key)
+    assert object_key not in PendingDeletionService(session=session).get_batch(
+        limit=100, max_attempts=5
+    )
+    session.commit()
+    session.close()
+
+
+def test_delete_post_deletes_media_by_worker(before_create_post):
+    session = create_session()
+    post = before_create_post(session=session, user_dict=create_public_user())
+    object_keys = [media.media_url for media in post.media]
+    PostAppService(session=session).delete_post(db_post=post)
+    # deleted from storage after the post, by the deletion worker
+    assert all(object_exists(object_key) for object_key in object_keys)
+    assert MediaAppService(session=session).drain_pending_deletions() >= len(object_keys)
+    assert not any(object_exists(object_key) for object_key in object_keys)
+    assert PendingDeletionService(session=session).count() == 0
+    session.close()
+
+
+def test_drain_pending_deletions_in_batches(monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_DELETE_BATCH_SIZE", 2)
+    session = create_session()
+    object_keys = [f"tests/deletions/file_{i}.txt" for i in range(5)]
+    for object_key in object_keys:
+        Boto3Service().upload_file_from_memory(
+            object_key=object_key, file_content=io.BytesIO(b"test"), file_type="text/plain"
+        )
+    media_app_service = MediaAppService(session=session)
+    media_app_service.schedule_deletion(object_keys=object_keys)
+    assert media_app_service.drain_pending_deletions() == 5
+    assert not any(object_exists(object_key) for object_key in object_keys)
+    session.close()
+
+
+def test_reconcile_storage_finds_orphaned_objects(before_create_post, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_ORPHAN_GRACE_SECONDS", -60)
+    session = create_session()
+    post = before_create_post(session=session, user_dict=create_public_user())
+    orphaned_key = f"posts/{post.posted_by}/{uuid.uuid4()}/post_0.jpeg"
+    Boto3Service().upload_file_from_memory(
+        object_key=orphaned_key, file_content=io.BytesIO(b"test"), file_type="image/jpeg"
+    )
+    media_app_service = MediaAppService(session=session)
+    assert media_app_service.reconcile_storage() >= 1
+    media_app_service.drain_pending_deletions()
+    assert not object_exists(object_key=orphaned_key)
+    assert all(object_exists(media.media_url) for media in post.media)
+    session.close()
+
+
+def test_abort_stale_multipart_uploads(monkeypatch):
+    upload = Boto3Service().create_multipart_upload(
+        object_key=f"tests/uploads/{uuid.uuid4()}.mp4", content_type="video/mp4"
+    )
+    monkeypatch.setattr(settings, "STORAGE_ORPHAN_GRACE_SECONDS", -60)
+    assert MediaAppService.abort_stale_multipart_uploads() >= 1
+    upload_ids = {
+        stale["UploadId"]
+        for page in Boto3Service().list_multipart_uploads()
+        for stale in page
+    }
+    assert upload.upload_id not in upload_ids
@@ -0,0 +1,81 @@
+from sqlalchemy import event
+
+from src.application.identity_map import IdentityMap
+from src.application.users.users.services import UserAppService
+from src.application.users.services import BaseUserAppService
+from src.tests.test_utils import create_session
+from src.tests.test_fixtures import before_create_base_user, before_create_normal_user
+from src.tests.test_client import setup_database
+from src.tests.test_data import create_public_user, get_user_dict_from_user
+from src.interface.users.users.schemas import UserWithBaseUserId
+
+
+def count_queries(session) -> list:
+    queries = []
+    event.listen(
+        session.connection(),
+        "before_cursor_execute",
+        lambda *args, **kwargs: queries.append(args[2]),
+    )
+    return queries
+
+
+def test_repeated_user_lookups_are_served_from_memory(before_create_normal_user):
+    session = create_session()
+    db_user = before_create_normal_user(session=session, user_dict=create_public_user())
+    session.expunge_all()
+    user_app_service = UserAppService(session=session)
+    queries = count_queries(session=session)
+    user = user_app_service.get_user_by_base_user_id(base_user_id=db_user.base_user_id)
+    assert len(queries) == 1
+    total_saved = IdentityMap.get_total_saved()
+    # any key of the same row is served from memory, also to other app services of the session
+    assert user_app_service.get_user_by_id(id=db_user.id) is user
+    assert UserAppService(session=session).get_user_by_username(username=db_user.username) is user
+    assert user_app_service.get_user_by_base_user_id(base_user_id=str(db_user.base_user_id)) is user
+    assert len(queries) == 1
+    assert user_app_service.identity_map.saved == 3
+    assert IdentityMap.get_total_saved() == total_saved + 3
+    # base user is loaded once as well
+    base_user_app_service = BaseUserAppService(session=session)
+    base_user = base_user_app_service.get_base_user_by_id(id=db_user.base_user_id)
+    assert base_user_app_service.get_base_user_by_id(id=db_user.base_user_id) is base_user
+    assert len(queries) == 2
+    session.close()
+
+
+def test_lookup_of_expired_row_is_not_counted_as_saved(before_create_normal_user):
+    session = create_session()
+    db_user = before_create_normal_user(session=session, user_dict=create_public_user())
+    session.expunge_all()
+    user_app_service = UserAppService(session=session)
+    user = user_app_service.get_user_by_id(id=db_user.id)
+    # committing expires the row, reading it again refreshes it
+    session.commit()
+    queries = count_queries(session=session)
+    assert user_app_service.get_user_by_username(username=db_user.username) is user
+    assert len(queries) == 1
+    assert user_app_service.identity_map.saved == 0
+    assert user_app_service.get_user_by_id(id=db_user.id) is user
+    assert len(queries) == 1
+    assert user_app_service.identity_map.saved == 1
+    session.close()
+
+
+def test_identity_map_after_username_update_and_delete(before_create_normal_user):
+    session = create_session()
+    db_user = before_create_normal_user(session=session, user_dict=create_public_user())
+    user_app_service = UserAppService(session=session)
+    old_username = db_user.username
+    user_app_service.get_user_by_username(username=old_username)
+    user = UserWithBaseUserId(
+        **{**get_user_dict_from_user(user=db_user), "username": "identity_map_user"},
+        base_user_id=db_user.base_user_id,
+    )
+    user_app_service.update_user(user=user)
+    assert user_app_service.get_user_by_username(username=old_username) is None
+    assert user_app_service.get_user_by_username(username="identity_map_user").id == db_user.id
+    user_app_service.delete_user(base_user_id=db_user.base_user_id)
+    assert user_app_service.get_user_by_id(id=db_user.id) is None
+    assert user_app_service.get_user_by_base_user_id(base_user_id=db_user.base_user_id) is None
+    session.close()
@@ -6,6 +6,10 @@ import pytest
 from src.domain.models import FollowersModel, User
 from src.application.users.services import JWTService
 from src.application.users.users.follow_management.services import FollowAppService
+from src.domain.users.users.follow_management.graph import FollowGraph
+from src.application.users.users.services import UserAppService
+from src.interface.users.users.schemas import UserWithBaseUserId
+from src.application.posts.timeline.services import TimelineAppService
 from src.tests.test_utils import create_session
 from src.tests.test_fixtures import (
     before_create_base_user,
@@ -18,9 +22,15 @@ from src.tests.test_fixtures import (
     before_create_private_user_with_following,
     before_create_public_user_with_following,
     before_create_private_user_login_cred,
+    before_create_post,
 )
 from src.tests.test_client import setup_database
-from src.tests.test_data import create_public_user, create_private_user, get_username
+from src.tests.test_data import (
+    create_public_user,
+    create_private_user,
+    get_username,
+    get_user_dict_from_user,
+)
 from lib.fastapi.custom_enums import StatusType, ProfileType
 from lib.fastapi.custom_exceptions import NotFoundException, ForbiddenException
 
@@ -113,12 +123,12 @@ def test_get_pending_requests_sent_to_user(
         session=session, follower_id=user1.id, following_id=user2.id
     )
     output = FollowAppService(session=session).get_pending_requests_sent_to_user(
-        base_user_id=user2.base_user_id
+        base_user_id=user2.base_user_id, size=5
     )
-    assert len(output) == 1
-    assert isinstance(output[0], FollowersModel)
-    assert output[0].following_id == user2.id
-    assert output[0].status == StatusType.PENDING.value
+    assert len(output["items"]) == 1
+    assert output["items"][0]["follower"].id == user1.id
+    assert output["items"][0]["status"] == StatusType.PENDING.value
+    assert output["total"] == 1
     session.close()
 
 
@@ -132,12 +142,12 @@ def test_get_pending_requests_sent_by_user(
         session=session, follower_id=user1.id, following_id=user2.id
     )
     output = FollowAppService(session=session).get_pending_requests_sent_by_user(
-        base_user_id=user1.base_user_id
+        base_user_id=user1.base_user_id, size=5
     )
-    assert len(output) == 1
-    assert isinstance(output[0], FollowersModel)
-    assert output[0].follower_id == user1.id
-    assert output[0].status == StatusType.PENDING.value
+    assert len(output["items"]) == 1
+    assert output["items"][0]["following"].id == user2.id
+    assert output["items"][0]["status"] == StatusType.PENDING.value
+    assert output["total"] == 1
     session.close()
 
 
@@ -163,12 +173,12 @@ def test_get_followers(
     )
     # own
     output = FollowAppService(session=session).get_followers(
-        current_user=payload, username=db_user.username
+        current_user=payload, username=db_user.username, size=5
     )
-    assert len(output) == 1
-    assert isinstance(output[0], FollowersModel)
-    assert output[0].following_id == db_user.id
-    assert output[0].status == StatusType.APPROVED.value
+    assert len(output["items"]) == 1
+    assert output["items"][0]["follower"].id == user1.id
+    assert output["items"][0]["status"] == StatusType.APPROVED.value
+    assert output["total"] == 1
     session.close()
 
 
@@ -187,7 +197,7 @@ def test_get_followers_for_private_user_not_followed(
     )
     with pytest.raises(ForbiddenException):
         FollowAppService(session=session).get_followers(
-            current_user=payload, username=user2.username
+            current_user=payload, username=user2.username, size=5
         )
     session.close()
 
@@ -214,14 +224,55 @@ def test_get_following(
     )
     # own
     output = FollowAppService(session=session).get_following(
-        current_user=payload, username=db_user.username
+        current_user=payload, username=db_user.username, size=5
     )
-    assert len(output) == 1
-    assert isinstance(output[0], FollowersModel)
-    assert output[0].follower_id == db_user.id
-    assert output[0].status == StatusType.APPROVED.value
+    assert len(output["items"]) == 1
+    assert output["items"][0]["following"].id == user1.id
+    assert output["items"][0]["status"] == StatusType.APPROVED.value
+    assert output["total"] == 1
+    session.close()
+
+def test_get_followers_next_page_with_cursor(
+    before_create_private_user_login_cred,
+    before_create_normal_user,
+    before_create_approved_follow_requests,
+):
+    session = create_session()
+    token = before_create_private_user_login_cred(session=session)
+    payload = JWTService().decode(token=token)
+    db_user = session.scalars(
+        select(User).where(User.base_user_id == payload.get("id"))
+    ).first()
+    follower_ids = set()
+    for _ in range(3):
+        follower = before_create_normal_user(
+            session=session, user_dict=create_private_user()
+        )
+        before_create_approved_follow_requests(
+            session=session, follower_id=follower.id, following_id=db_user.id
+        )
+        follower_ids.add(follower.id)
+    follow_app_service = FollowAppService(session=session)
+    first_page = follow_app_service.get_followers(
+        current_user=payload, username=db_user.username, size=2
+    )
+    assert len(first_page["items"]) == 2
+    assert first_page["total"] == 3
+    assert first_page["next_cursor"]
+    last_page = follow_app_service.get_followers(
+        current_user=payload,
+        username=db_user.username,
+        size=2,
+        cursor=first_page["next_cursor"],
+    )
+    assert len(last_page["items"]) == 1
+    assert last_page["next_cursor"] is None
+    assert {
+        item["follower"].id for item in first_page["items"] + last_page["items"]
+    } == follower_ids
     session.close()
 
+
 def test_get_following_for_private_user_not_followed(
     before_create_private_user_login_cred,
     before_create_normal_user,
@@ -237,7 +288,7 @@ def test_get_following_for_private_user_not_followed(
     )
     with pytest.raises(ForbiddenException):
         FollowAppService(session=session).get_followers(
-            current_user=payload, username=user1.username
+            current_user=payload, username=user1.username, size=5
         )
     session.close()
 
@@ -363,6 +414,57 @@ def test_unfollow(before_create_normal_user, before_create_approved_follow_reque
     session.close()
 
 
+def test_unfollow_removes_posts_from_timeline(
+    before_create_normal_user, before_create_approved_follow_requests, before_create_post
+):
+    session = create_session()
+    user1 = before_create_normal_user(session=session, user_dict=create_private_user())
+    user2 = before_create_normal_user(session=session, user_dict=create_private_user())
+    before_create_approved_follow_requests(
+        session=session, follower_id=user1.id, following_id=user2.id
+    )
+    post = before_create_post(session=session, user_dict=get_user_dict_from_user(user=user2))
+    timeline_app_service = TimelineAppService(session=session)
+    timeline_app_service.fan_out_post(post=post)
+    assert len(timeline_app_service.get_feed(user=user1, size=5, cursor=None)["items"]) == 1
+    FollowAppService(session=session).unfollow(
+        base_user_id=user1.base_user_id, unfollow_username=user2.username
+    )
+    assert timeline_app_service.get_feed(user=user1, size=5, cursor=None)["items"] == []
+    session.close()
+
+
+def test_approved_follows_get_earlier_posts_in_timeline(
+    before_create_normal_user, before_create_follow_request, before_create_post
+):
+    session = create_session()
+    author = before_create_normal_user(session=session, user_dict=create_private_user())
+    post = before_create_post(session=session, user_dict=get_user_dict_from_user(user=author))
+    timeline_app_service = TimelineAppService(session=session)
+    timeline_app_service.fan_out_post(post=post)
+    followers = [
+        before_create_normal_user(session=session, user_dict=create_public_user())
+        for i in range(3)
+    ]
+    for follower in followers:
+        before_create_follow_request(
+            session=session, follower_id=follower.id, following_id=author.id
+        )
+    follow_app_service = FollowAppService(session=session)
+    follow_app_service.accept_follow_request(
+        base_user_id=author.base_user_id, accept_username=followers[0].username
+    )
+    follow_app_service.bulk_accept_follow_requests(
+        base_user_id=author.base_user_id, usernames=[followers[1].username]
+    )
+    for follower in followers[:2]:
+        items = timeline_app_service.get_feed(user=follower, size=5, cursor=None)["items"]
+        assert [item.id for item in items] == [post.id]
+    # still pending
+    assert timeline_app_service.get_feed(user=followers[2], size=5, cursor=None)["items"] == []
+    session.close()
+
+
 def test_remove_follower(
     before_create_normal_user, before_create_approved_follow_requests
 ):
@@ -383,3 +485,104 @@ def test_remove_follower(
     ).first()
     assert db_follow is None
     session.close()
+
+
+def test_can_view_private_user_cache_invalidated_by_follow_changes(
+    before_create_normal_user, before_create_follow_request
+):
+    session = create_session()
+    user1 = before_create_normal_user(session=session, user_dict=create_private_user())
+    user2 = before_create_normal_user(session=session, user_dict=create_private_user())
+    user_app_service = UserAppService(session=session)
+    current_user = {"role": "user", "user_id": str(user1.id)}
+    before_create_follow_request(session=session, follower_id=user1.id, following_id=user2.id)
+    with pytest.raises(ForbiddenException):
+        user_app_service.check_private_user(current_user=current_user, user=user2)
+    follow_app_service = FollowAppService(session=session)
+    follow_app_service.accept_follow_request(
+        base_user_id=user2.base_user_id, accept_username=user1.username
+    )
+    assert user_app_service.check_private_user(current_user=current_user, user=user2) is None
+    follow_app_service.remove_follower(
+        base_user_id=user2.base_user_id, remove_username=user1.username
+    )
+    with pytest.raises(ForbiddenException):
+        user_app_service.check_private_user(current_user=current_user, user=user2)
+    session.close()
+
+
+def test_follow_graph_updated_by_follow_changes(before_create_normal_user):
+    session = create_session()
+    user1 = before_create_normal_user(session=session, user_dict=create_public_user())
+    user2 = before_create_normal_user(session=session, user_dict=create_private_user())
+    follow_app_service = FollowAppService(session=session)
+    follow_graph = FollowGraph()
+    follow_graph.clear()
+    follow_app_service._get_follow_graph()
+    follow_app_service.create_follow_request(
+        follower_base_user_id=user1.base_user_id, username=user2.username
+    )
+    # pending requests are not in the graph
+    assert follow_graph.get_relationships(user_id=user1.id, other_ids=[user2.id]) == {
+        user2.id: (False, False)
+    }
+    follow_app_service.accept_follow_request(
+        base_user_id=user2.base_user_id, accept_username=user1.username
+    )
+    assert follow_graph.get_relationships(user_id=user1.id, other_ids=[user2.id]) == {
+        user2.id: (True, False)
+    }
+    follow_app_service.remove_follower(
+        base_user_id=user2.base_user_id, remove_username=user1.username
+    )
+    assert follow_graph.get_relationships(user_id=user1.id, other_ids=[user2.id]) == {
+        user2.id: (False, False)
+    }
+    follow_graph.clear()
+    session.close()
+
+
+def test_update_user_to_public_approves_pending_requests(
+    before_create_normal_user, before_create_follow_request, before_create_post
+):
+    session = create_session()
+    user = before_create_normal_user(session=session, user_dict=create_private_user())
+    post = before_create_post(session=session, user_dict=get_user_dict_from_user(user=user))
+    timeline_app_service = TimelineAppService(session=session)
+    timeline_app_service.fan_out_post(post=post)
+    followers = [
+        before_create_normal_user(session=session, user_dict=create_public_user())
+        for _ in range(2)
+    ]
+    for follower in followers:
+        before_create_follow_request(
+            session=session, follower_id=follower.id, following_id=user.id
+        )
+    follow_graph = FollowGraph()
+    follow_graph.clear()
+    FollowAppService(session=session)._get_follow_graph()
+    UserAppService(session=session).update_user(
+        user=UserWithBaseUserId(
+            username=user.username,
+            bio=user.bio or "",
+            profile_type=ProfileType.PUBLIC,
+            base_user_id=user.base_user_id,
+        )
+    )
+    statuses = session.scalars(
+        select(FollowersModel.status).where(FollowersModel.following_id == user.id)
+    ).all()
+    assert statuses == [StatusType.APPROVED, StatusType.APPROVED]
+    session.refresh(user)
+    assert (user.followers_count, user.requests_received_count) == (2, 0)
+    for follower in followers:
+        session.refresh(follower)
+        assert (follower.following_count, follower.requests_sent_count) == (1, 0)
+    assert follow_graph.get_relationships(
+        user_id=user.id, other_ids=[follower.id for follower in followers]
+    ) == {follower.id: (False, True) for follower in followers}
+    for follower in followers:
+        items = timeline_app_service.get_feed(user=follower, size=5, cursor=None)["items"]
+        assert [item.id for item in items] == [post.id]
+    follow_graph.clear()
+    session.close()
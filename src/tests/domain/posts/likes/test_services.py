@@ -0,0 +1,43 @@
+from src.tests.test_client import setup_database
+from src.tests.test_fixtures import (
+    before_create_base_user,
+    before_create_normal_user,
+    before_create_post,
+)
+from src.tests.test_utils import create_session
+from src.tests.test_data import create_public_user
+from src.domain.posts.likes.services import LikeService
+from src.domain.posts.services import PostCountBuffer
+from src.interface.posts.likes.schemas import LikePost
+from src.setup.config.settings import settings
+
+
+def test_create_and_delete_update_like_count(
+    before_create_normal_user, before_create_post, monkeypatch
+):
+    session = create_session()
+    post = before_create_post(session=session, user_dict=create_public_user())
+    users = [
+        before_create_normal_user(session=session, user_dict=create_public_user())
+        for i in range(3)
+    ]
+    monkeypatch.setattr(settings, "POST_COUNT_FLUSH_SIZE", 3)
+    monkeypatch.setattr(settings, "POST_COUNT_FLUSH_SECONDS", 3600)
+    PostCountBuffer().flush(session=session)
+    like_service = LikeService(session=session)
+    likes = [
+        like_service.create(like=LikePost(liked_by=user.id, post_id=post.id))
+        for user in users[:2]
+    ]
+    # buffered until the third change
+    session.refresh(post)
+    assert post.like_count == 0
+    like_service.create(like=LikePost(liked_by=users[2].id, post_id=post.id))
+    session.refresh(post)
+    assert post.like_count == 3
+    for like in likes:
+        like_service.delete(db_like=like)
+    assert PostCountBuffer().flush(session=session) == 1
+    session.refresh(post)
+    assert post.like_count == 1
+    session.close()
@@ -0,0 +1,52 @@
+from src.tests.test_client import setup_database
+from src.tests.test_fixtures import (
+    before_create_base_user,
+    before_create_normal_user,
+    before_create_post,
+)
+from src.tests.test_utils import create_session
+from src.tests.test_data import create_public_user
+from src.domain.posts.media.services import MediaService, MediaBlobService
+from src.interface.posts.media.schemas import MediaSchema
+
+
+def test_create_all_media(before_create_post):
+    session = create_session()
+    post = before_create_post(session=session, user_dict=create_public_user())
+    media_count = len(post.media)
+    db_media = MediaService(session=session).create_all_media(
+        media=[
+            MediaSchema(
+                post_id=post.id,
+                media_url=f"posts/{post.posted_by}/{post.id}/post_{i}.jpeg",
+                media_type="image/jpeg",
+            )
+            for i in range(3)
+        ]
+    )
+    assert len(db_media) == 3
+    session.refresh(post)
+    assert len(post.media) == media_count + 3
+    session.close()
+
+
+def test_media_blob_reference_count():
+    session = create_session()
+    blob_service = MediaBlobService(session=session)
+    sha256 = "a" * 64
+    assert blob_service.acquire(sha256=sha256) is None
+    blob_service.create_or_acquire(
+        sha256=sha256, object_key="media/aa/blob", size=4, content_type="image/jpeg"
+    )
+    # recorded again by a concurrent upload of the same content
+    blob_service.create_or_acquire(
+        sha256=sha256, object_key="media/aa/blob", size=4, content_type="image/jpeg"
+    )
+    assert blob_service.acquire(sha256=sha256) == "media/aa/blob"
+    assert blob_service.get_blob_by_object_key(object_key="media/aa/blob").ref_count == 3
+    assert blob_service.release(object_key="media/aa/blob") == 2
+    assert blob_service.release(object_key="media/aa/blob") == 1
+    assert blob_service.release(object_key="media/aa/blob") == 0
+    assert blob_service.get_blob_by_object_key(object_key="media/aa/blob") is None
+    assert blob_service.release(object_key="posts/not/a/blob.jpeg") is None
+    session.close()
@@ -0,0 +1,114 @@
+from sqlmodel import select
+
+from src.tests.test_client import setup_database
+from src.tests.test_fixtures import (
+    before_create_base_user,
+    before_create_normal_user,
+    before_create_post,
+    before_create_follow_request,
+    before_create_approved_follow_requests,
+)
+from src.tests.test_utils import create_session
+from src.tests.test_data import (
+    create_private_user,
+    create_public_user,
+    get_user_dict_from_user,
+)
+from src.domain.posts.timeline.services import TimelineService
+from src.domain.models import Timeline
+
+
+def test_fan_out_post(
+    before_create_normal_user,
+    before_create_post,
+    before_create_follow_request,
+    before_create_approved_follow_requests,
+):
+    session = create_session()
+    author = before_create_normal_user(session=session, user_dict=create_private_user())
+    follower = before_create_normal_user(session=session, user_dict=create_public_user())
+    requested = before_create_normal_user(session=session, user_dict=create_public_user())
+    before_create_approved_follow_requests(
+        session=session, follower_id=follower.id, following_id=author.id
+    )
+    # pending request does not get the post
+    before_create_follow_request(
+        session=session, follower_id=requested.id, following_id=author.id
+    )
+    post = before_create_post(session=session, user_dict=get_user_dict_from_user(user=author))
+    assert TimelineService(session=session).fan_out_post(post=post) == 1
+    assert post.fanned_out
+    entries = session.exec(select(Timeline).where(Timeline.post_id == post.id)).all()
+    assert [entry.user_id for entry in entries] == [follower.id]
+    assert entries[0].post_created_at == post.created_at
+
+
+def test_get_posts_after_cursor(
+    before_create_normal_user, before_create_post, before_create_approved_follow_requests
+):
+    session = create_session()
+    author = before_create_normal_user(session=session, user_dict=create_public_user())
+    follower = before_create_normal_user(session=session, user_dict=create_public_user())
+    before_create_approved_follow_requests(
+        session=session, follower_id=follower.id, following_id=author.id
+    )
+    timeline_service = TimelineService(session=session)
+    for i in range(5):
+        post = before_create_post(
+            session=session, user_dict=get_user_dict_from_user(user=author)
+        )
+        timeline_service.fan_out_post(post=post)
+    posts = timeline_service.get_posts_after_cursor(user_id=follower.id, size=3)
+    assert len(posts) == 4
+    last = posts[2]
+    next_posts = timeline_service.get_posts_after_cursor(
+        user_id=follower.id, size=3, cursor=(last.created_at, last.id)
+    )
+    assert len(next_posts) == 2
+    assert len({post.id for post in posts[:3] + list(next_posts)}) == 5
+
+
+def test_delete_by_post_id(
+    before_create_normal_user, before_create_post, before_create_approved_follow_requests
+):
+    session = create_session()
+    author = before_create_normal_user(session=session, user_dict=create_public_user())
+    follower = before_create_normal_user(session=session, user_dict=create_public_user())
+    before_create_approved_follow_requests(
+        session=session, follower_id=follower.id, following_id=author.id
+    )
+    post = before_create_post(session=session, user_dict=get_user_dict_from_user(user=author))
+    timeline_service = TimelineService(session=session)
+    timeline_service.fan_out_post(post=post)
+    timeline_service.delete_by_post_id(post_id=post.id)
+    assert timeline_service.get_posts_after_cursor(user_id=follower.id, size=3) == []
+
+
+def test_backfill_author_posts(before_create_normal_user, before_create_post):
+    session = create_session()
+    author = before_create_normal_user(session=session, user_dict=create_public_user())
+    followers = [
+        before_create_normal_user(session=session, user_dict=create_public_user())
+        for i in range(2)
+    ]
+    timeline_service = TimelineService(session=session)
+    posts = []
+    for i in range(3):
+        post = before_create_post(session=session, user_dict=get_user_dict_from_user(user=author))
+        timeline_service.fan_out_post(post=post)
+        posts.append(post)
+    # not fanned out, merged in at read time
+    before_create_post(session=session, user_dict=get_user_dict_from_user(user=author))
+    user_ids = [follower.id for follower in followers]
+    assert timeline_service.backfill_author_posts(
+        user_ids=user_ids, posted_by=author.id, limit=2
+    ) == 4
+    # entries already written are skipped
+    assert timeline_service.backfill_author_posts(
+        user_ids=user_ids, posted_by=author.id, limit=3
+    ) == 2
+    session.commit()
+    for follower in followers:
+        timeline = timeline_service.get_posts_after_cursor(user_id=follower.id, size=5)
+        assert [post.id for post in timeline] == [post.id for post in reversed(posts)]
+    session.close()
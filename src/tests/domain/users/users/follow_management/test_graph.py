@@ -0,0 +1,134 @@
+import time
+import uuid
+import threading
+
+import pytest
+
+from src.domain.users.users.follow_management.graph import FollowGraph
+from src.setup.config.settings import settings
+
+
+@pytest.fixture(scope="function")
+def follow_graph():
+    follow_graph = FollowGraph()
+    follow_graph.clear()
+    yield follow_graph
+    follow_graph.clear()
+
+
+def test_load_and_get_relationships(follow_graph):
+    user1, user2, user3 = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    follow_graph.load(edges=[(user1, user2), (user2, user1), (user3, user1)])
+    assert follow_graph.is_loaded()
+    relationships = follow_graph.get_relationships(
+        user_id=user1, other_ids=[user2, user3, uuid.uuid4()]
+    )
+    assert relationships[user2] == (True, True)
+    assert relationships[user3] == (False, True)
+    assert list(relationships.values())[2] == (False, False)
+
+
+def test_add_and_remove_edge(follow_graph, monkeypatch):
+    monkeypatch.setattr(settings, "FOLLOW_GRAPH_COMPACT_SIZE", 2)
+    user1, user2, user3 = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    follow_graph.load(edges=[(user1, user2)])
+    follow_graph.add_edge(follower_id=user1, following_id=user3)
+    follow_graph.remove_edge(follower_id=user1, following_id=user2)
+    # second change rebuilt the arrays
+    assert follow_graph.get_relationships(user_id=user1, other_ids=[user2, user3]) == {
+        user2: (False, False),
+        user3: (True, False),
+    }
+    follow_graph.add_edge(follower_id=user2, following_id=user3)
+    follow_graph.remove_user(user_id=user3)
+    assert follow_graph.get_mutual_ids(user_id=user1, other_id=user3) == []
+    assert follow_graph.get_relationships(user_id=user2, other_ids=[user3]) == {
+        user3: (False, False)
+    }
+
+
+def test_add_edge_before_load_is_ignored(follow_graph):
+    user1, user2 = uuid.uuid4(), uuid.uuid4()
+    follow_graph.add_edge(follower_id=user1, following_id=user2)
+    assert not follow_graph.is_loaded()
+    assert follow_graph.get_relationships(user_id=user1, other_ids=[user2]) == {
+        user2: (False, False)
+    }
+
+
+def test_get_mutual_ids(follow_graph):
+    user1, user2, user3, user4 = (uuid.uuid4() for _ in range(4))
+    follow_graph.load(
+        edges=[(user1, user2), (user1, user3), (user2, user4), (user3, user4)]
+    )
+    assert set(follow_graph.get_mutual_ids(user_id=user1, other_id=user4)) == {
+        user2,
+        user3,
+    }
+
+
+def test_get_suggested_ids(follow_graph):
+    user1, user2, user3, user4, user5 = (uuid.uuid4() for _ in range(5))
+    follow_graph.load(
+        edges=[
+            (user1, user2),
+            (user1, user3),
+            (user2, user4),
+            (user3, user4),
+            (user3, user5),
+            (user2, user1),
+            (user2, user3),
+        ]
+    )
+    # followed users and the user itself are never suggested
+    assert follow_graph.get_suggested_ids(user_id=user1, size=5) == [user4, user5]
+    assert follow_graph.get_suggested_ids(user_id=user1, size=1) == [user4]
+
+
+def test_changes_made_while_loading_are_replayed(follow_graph):
+    user1, user2, user3 = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    follow_graph.load(edges=[(user1, user2)])
+
+    def get_edges():
+        yield user1, user2
+        # committed after the edges were read
+        follow_graph.add_edge(follower_id=user1, following_id=user3)
+        follow_graph.remove_edge(follower_id=user1, following_id=user2)
+
+    follow_graph.load(edges=get_edges())
+    assert follow_graph.get_relationships(user_id=user1, other_ids=[user2, user3]) == {
+        user2: (False, False),
+        user3: (True, False),
+    }
+
+
+def test_ensure_loaded_loads_once(follow_graph, monkeypatch):
+    user1, user2 = uuid.uuid4(), uuid.uuid4()
+    loads = []
+
+    def get_edges():
+        loads.append(1)
+        time.sleep(0.1)
+        return [(user1, user2)]
+
+    threads = [
+        threading.Thread(target=follow_graph.ensure_loaded, kwargs={"get_edges": get_edges})
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+    assert follow_graph.get_relationships(user_id=user1, other_ids=[user2]) == {
+        user2: (True, False)
+    }
+    # reloaded in the background after the ttl while the current graph keeps serving
+    monkeypatch.setattr(settings, "FOLLOW_GRAPH_TTL_SECONDS", 0)
+    follow_graph.ensure_loaded(get_edges=get_edges)
+    follow_graph.ensure_loaded(get_edges=get_edges)
+    assert follow_graph.get_relationships(user_id=user1, other_ids=[user2]) == {
+        user2: (True, False)
+    }
+    time.sleep(0.3)
+    assert len(loads) == 2
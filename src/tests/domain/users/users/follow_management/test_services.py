@@ -18,6 +18,7 @@ from src.tests.test_fixtures import (
 from src.tests.test_data import create_private_user
 from lib.fastapi.custom_enums import StatusType
 from src.domain.models import FollowersModel
+from src.interface.users.users.follow_management.schemas import FollowRequest
 
 
 def test_get_follow_by_follow_id(
@@ -240,3 +241,100 @@ def test_delete(before_create_normal_user, before_create_follow_request):
     FollowService(session=session).delete(db_follow=db_follow)
     follow = session.get(FollowersModel, db_follow.id)
     assert follow is None
+
+
+def test_is_approved_follower(
+    before_create_normal_user, before_create_follow_request, before_create_approved_follow_requests
+):
+    session = create_session()
+    user1 = before_create_normal_user(session=session, user_dict=create_private_user())
+    user2 = before_create_normal_user(session=session, user_dict=create_private_user())
+    user3 = before_create_normal_user(session=session, user_dict=create_private_user())
+    before_create_approved_follow_requests(
+        session=session, follower_id=user1.id, following_id=user2.id
+    )
+    before_create_follow_request(session=session, follower_id=user3.id, following_id=user2.id)
+    follow_service = FollowService(session=session)
+    assert follow_service.is_approved_follower(follower_id=user1.id, following_id=user2.id)
+    # pending request and opposite direction are not approved follows
+    assert not follow_service.is_approved_follower(follower_id=user3.id, following_id=user2.id)
+    assert not follow_service.is_approved_follower(follower_id=user2.id, following_id=user1.id)
+    session.close()
+
+
+def test_follow_counts(before_create_normal_user):
+    session = create_session()
+    user1 = before_create_normal_user(session=session, user_dict=create_private_user())
+    user2 = before_create_normal_user(session=session, user_dict=create_private_user())
+    user3 = before_create_normal_user(session=session, user_dict=create_private_user())
+    follow_service = FollowService(session=session)
+    db_follow = follow_service.create(
+        follow=FollowRequest(
+            follower_id=user1.id, following_id=user2.id, status=StatusType.PENDING
+        )
+    )
+    follow_service.create(
+        follow=FollowRequest(
+            follower_id=user2.id, following_id=user3.id, status=StatusType.APPROVED
+        )
+    )
+    session.refresh(user1)
+    session.refresh(user2)
+    assert user1.requests_sent_count == 1
+    assert user2.requests_received_count == 1
+    follow_service.update(
+        follow=FollowRequest(
+            follower_id=user1.id, following_id=user2.id, status=StatusType.APPROVED
+        ),
+        db_follow=db_follow,
+    )
+    session.refresh(user1)
+    session.refresh(user2)
+    assert (user1.requests_sent_count, user1.following_count) == (0, 1)
+    assert (user2.requests_received_count, user2.followers_count) == (0, 1)
+    # counts of the other users are released before user2 is deleted
+    follow_service.release_follow_counts(user_id=user2.id)
+    session.commit()
+    session.refresh(user1)
+    session.refresh(user3)
+    assert user1.following_count == 0
+    assert user3.followers_count == 0
+    follow_service.delete(db_follow=db_follow)
+    session.refresh(user2)
+    assert user2.followers_count == 0
+    session.close()
+
+
+def test_approve_pending_requests_and_delete_follows(
+    before_create_normal_user, before_create_follow_request
+):
+    session = create_session()
+    user = before_create_normal_user(session=session, user_dict=create_private_user())
+    followers = [
+        before_create_normal_user(session=session, user_dict=create_private_user())
+        for _ in range(3)
+    ]
+    for follower in followers:
+        before_create_follow_request(
+            session=session, follower_id=follower.id, following_id=user.id
+        )
+    follow_service = FollowService(session=session)
+    approved_ids = follow_service.approve_pending_requests(
+        user_id=user.id, follower_ids=[followers[0].id, followers[1].id]
+    )
+    session.commit()
+    assert set(approved_ids) == {followers[0].id, followers[1].id}
+    session.refresh(user)
+    assert (user.followers_count, user.requests_received_count) == (2, 1)
+    deleted_ids = follow_service.delete_follows(
+        user_id=followers[0].id, status=StatusType.APPROVED, sent=True
+    )
+    rejected_ids = follow_service.delete_follows(user_id=user.id, status=StatusType.PENDING)
+    session.commit()
+    assert deleted_ids == [user.id]
+    assert rejected_ids == [followers[2].id]
+    session.refresh(user)
+    session.refresh(followers[0])
+    assert (user.followers_count, user.requests_received_count) == (1, 0)
+    assert followers[0].following_count == 0
+    session.close()
@@ -91,6 +91,33 @@ def test_get_all_users_when_no_user_is_created():
     assert len(users) == 0
 
 
+def test_get_users_after_cursor(before_create_normal_user):
+    session = create_session()
+    created = [
+        before_create_normal_user(session=session, user_dict=create_public_user())
+        for _ in range(3)
+    ]
+    user_service = UserService(session=session)
+    first_page = user_service.get_users_after_cursor(size=2)
+    # one extra row tells that a next page exists
+    assert len(first_page) == 3
+    assert [user.id for user in first_page] == [user.id for user in reversed(created)]
+    last_page = user_service.get_users_after_cursor(
+        size=2, cursor=(first_page[1].created_at, first_page[1].id)
+    )
+    assert [user.id for user in last_page] == [created[0].id]
+    session.close()
+
+
+def test_get_export_rows(before_create_normal_user):
+    session = create_session()
+    user = before_create_normal_user(session=session, user_dict=create_public_user())
+    rows = list(UserService(session=session).get_export_rows(batch_size=1))
+    assert len(rows) == 1
+    assert rows[0].username == user.username
+    session.close()
+
+
 def test_get_all_public_users(before_create_normal_user):
     session = create_session()
     before_create_normal_user(session=session, user_dict=create_private_user())
@@ -0,0 +1,92 @@
+import time
+import asyncio
+
+import pytest
+
+from src.infrastructure.auth_service.services import (
+    PasswordHashPool,
+    VerifiedTokenCache,
+    bcrypt_hash,
+    bcrypt_verify,
+    calibrate_bcrypt_rounds,
+)
+from src.setup.config.settings import settings
+from lib.fastapi.custom_exceptions import ServiceUnavailableException
+
+
+def test_password_hash_pool_hashes_and_verifies():
+    pool = PasswordHashPool()
+    hashed_password = pool.run(bcrypt_hash, "Password@123", 4)
+    assert hashed_password.startswith("$2b$04$")
+    assert pool.run(bcrypt_verify, "Password@123", hashed_password)
+    assert not pool.run(bcrypt_verify, "Password@1234", hashed_password)
+    assert pool.get_queue_depth() == 0
+
+
+def test_password_hash_pool_async():
+    pool = PasswordHashPool()
+
+    async def hash_and_verify():
+        hashed_passwords = await asyncio.gather(
+            *(pool.run_async(bcrypt_hash, f"Password@{index}", 4) for index in range(4))
+        )
+        return await pool.run_async(bcrypt_verify, "Password@2", hashed_passwords[2])
+
+    assert asyncio.run(hash_and_verify())
+    assert pool.get_queue_depth() == 0
+    assert pool.max_queue_depth >= 1
+
+
+def test_password_hash_pool_rejects_when_queue_is_full(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASH_QUEUE_SIZE", 0)
+    pool = PasswordHashPool()
+    rejected = pool.rejected
+    with pytest.raises(ServiceUnavailableException):
+        pool.run(bcrypt_hash, "Password@123", 4)
+    assert pool.rejected == rejected + 1
+
+
+def test_password_hash_pool_without_workers(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", 0)
+    hashed_password = PasswordHashPool().run(bcrypt_hash, "Password@123", 4)
+    assert bcrypt_verify("Password@123", hashed_password)
+
+
+def test_calibrate_bcrypt_rounds():
+    rounds, timings = calibrate_bcrypt_rounds(target_ms=10000, min_rounds=4, max_rounds=6, samples=1)
+    assert rounds == 6
+    assert [cost for cost, _ in timings] == [4, 5, 6]
+    rounds, timings = calibrate_bcrypt_rounds(target_ms=0, min_rounds=4, max_rounds=6, samples=1)
+    assert rounds == 4
+    assert len(timings) == 1
+
+
+def test_verified_token_cache_until_exp():
+    cache = VerifiedTokenCache()
+    cache.flush()
+    hits, misses = cache.hits, cache.misses
+    cache.set(token="valid-token", payload={"id": "1", "exp": time.time() + 60})
+    cache.set(token="expired-token", payload={"id": "2", "exp": time.time() - 1})
+    payload = cache.get(token="valid-token")
+    assert payload["id"] == "1"
+    # callers get a copy they can change
+    payload.pop("id")
+    assert cache.get(token="valid-token")["id"] == "1"
+    assert cache.get(token="expired-token") is None
+    assert cache.get(token="unknown-token") is None
+    assert (cache.hits - hits, cache.misses - misses) == (2, 2)
+    cache.discard(token="valid-token")
+    assert cache.get(token="valid-token") is None
+
+
+def test_verified_token_cache_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(settings, "VERIFIED_TOKEN_CACHE_SIZE", 2)
+    cache = VerifiedTokenCache()
+    cache.flush()
+    for token in ("first", "second"):
+        cache.set(token=token, payload={"exp": time.time() + 60})
+    cache.get(token="first")
+    cache.set(token="third", payload={"exp": time.time() + 60})
+    assert cache.get(token="second") is None
+    assert cache.get(token="first") is not None
+    assert cache.get(token="third") is not None
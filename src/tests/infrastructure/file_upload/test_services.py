@@ -0,0 +1,211 @@
+import io
+import time
+import hashlib
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+from src.tests.test_client import setup_database
+from src.infrastructure.file_upload.services import (
+    Boto3Service,
+    LocalStorageService,
+    PresignedUrlCache,
+    get_storage_service,
+)
+from src.setup.config.settings import settings
+from lib.fastapi.custom_enums import StorageBackend
+from lib.fastapi.custom_exceptions import (
+    BadRequestException,
+    CustomException,
+    ForbiddenException,
+    PayloadTooLargeException,
+)
+
+
+def upload_test_file(object_key: str) -> None:
+    Boto3Service().upload_file_from_memory(
+        object_key=object_key, file_content=io.BytesIO(b"test"), file_type="text/plain"
+    )
+
+
+def test_get_presigned_url_is_reused_in_window():
+    object_key = "tests/presigned_url.txt"
+    upload_test_file(object_key=object_key)
+    boto3_service = Boto3Service()
+    url = boto3_service.get_presigned_url(object_key=object_key)
+    assert boto3_service.get_presigned_url(object_key=object_key) == url
+    # valid for at least PRESIGNED_URL_TIME
+    expires = int(parse_qs(urlparse(url).query)["Expires"][0])
+    assert expires >= time.time() + timedelta(**settings.PRESIGNED_URL_TIME).total_seconds() - 1
+
+
+def test_get_presigned_url_after_replace_and_delete():
+    object_key = "tests/presigned_url_replace.txt"
+    upload_test_file(object_key=object_key)
+    boto3_service = Boto3Service()
+    cache = PresignedUrlCache()
+    key = f"{boto3_service.bucket_name}/{object_key}"
+    window, seconds_left = cache.get_window()
+    boto3_service.get_presigned_url(object_key=object_key)
+    assert cache.get(key=key, window=window) is not None
+    upload_test_file(object_key=object_key)
+    assert cache.get(key=key, window=window) is None
+    boto3_service.get_presigned_url(object_key=object_key)
+    boto3_service.delete_file(object_key=object_key)
+    assert cache.get(key=key, window=window) is None
+
+
+def test_boto3_service_reuses_client_and_records_latency():
+    boto3_service = Boto3Service()
+    client = boto3_service._Boto3Service__client
+    upload_test_file(object_key="tests/latency.txt")
+    upload_test_file(object_key="tests/latency.txt")
+    assert Boto3Service()._Boto3Service__client is client
+    stats = boto3_service.get_latency_stats()
+    assert stats["put_object"]["count"] >= 2
+    # bucket existence is cached after the first upload
+    assert boto3_service.bucket_name in boto3_service._existing_buckets
+
+
+def test_upload_file_from_stream_in_parts():
+    object_key = "tests/multipart_video.mp4"
+    content = bytes(range(256)) * (11 * 1024 * 4)  # 11 MiB, more than one part
+    chunks = (content[i : i + 64 * 1024] for i in range(0, len(content), 64 * 1024))
+    boto3_service = Boto3Service()
+    size, sha256 = boto3_service.upload_file_from_stream(
+        object_key=object_key, chunks=chunks, content_type="video/mp4"
+    )
+    assert size == len(content)
+    assert sha256 == hashlib.sha256(content).hexdigest()
+    assert boto3_service.get_latency_stats()["upload_part"]["count"] >= 2
+    buffer = io.BytesIO()
+    boto3_service.download_file_into_memory(object_key=object_key, buffer=buffer)
+    assert buffer.getvalue() == content
+
+
+def test_upload_file_from_stream_larger_than_max_size():
+    object_key = "tests/multipart_too_large.mp4"
+    boto3_service = Boto3Service()
+    chunks = iter([b"video" * 1024] * 4)
+    with pytest.raises(PayloadTooLargeException):
+        boto3_service.upload_file_from_stream(
+            object_key=object_key, chunks=chunks, content_type="video/mp4", max_size=10 * 1024
+        )
+    # rejected before reading the rest of the stream
+    assert next(chunks, None) is not None
+    assert boto3_service.get_latency_stats()["abort_multipart_upload"]["count"] >= 1
+
+
+def test_delete_files_and_list_files():
+    object_keys = [f"tests/list/file_{i}.txt" for i in range(3)]
+    for object_key in object_keys:
+        upload_test_file(object_key=object_key)
+    boto3_service = Boto3Service()
+    listed = [obj["Key"] for page in boto3_service.list_files(prefix="tests/list/") for obj in page]
+    assert sorted(listed) == object_keys
+    # missing keys are not errors
+    assert boto3_service.delete_files(object_keys=object_keys + ["tests/list/missing.txt"]) == {}
+    assert [obj for page in boto3_service.list_files(prefix="tests/list/") for obj in page] == []
+
+
+@pytest.fixture
+def local_storage(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", StorageBackend.LOCAL.value)
+    monkeypatch.setattr(settings, "LOCAL_STORAGE_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "LOCAL_STORAGE_SECRET", "local-storage-test-secret")
+    return get_storage_service()
+
+
+def test_get_storage_service_for_backend(local_storage):
+    assert isinstance(local_storage, LocalStorageService)
+    assert local_storage is LocalStorageService()
+
+
+def test_local_storage_requires_its_own_secret(local_storage, monkeypatch):
+    monkeypatch.setattr(settings, "LOCAL_STORAGE_SECRET", None)
+    with pytest.raises(CustomException):
+        get_storage_service()
+
+
+def test_local_storage_upload_read_and_delete(local_storage):
+    object_key = "tests/local/file.txt"
+    local_storage.upload_file_from_memory(
+        object_key=object_key, file_content=io.BytesIO(b"local test"), file_type="text/plain"
+    )
+    assert local_storage.head_file(object_key=object_key) == {
+        "size": 10,
+        "content_type": "text/plain",
+    }
+    buffer = io.BytesIO()
+    local_storage.download_file_into_memory(object_key=object_key, buffer=buffer)
+    assert buffer.getvalue() == b"local test"
+    assert b"".join(local_storage.iter_file(object_key=object_key, start=6, end=9)) == b"test"
+    listed = [obj["Key"] for page in local_storage.list_files(prefix="tests/") for obj in page]
+    assert listed == [object_key]
+    assert local_storage.delete_files(object_keys=[object_key, "tests/missing.txt"]) == {}
+    assert local_storage.head_file(object_key=object_key) is None
+
+
+def test_local_storage_rejects_keys_outside_bucket(local_storage):
+    for object_key in ("../secret.txt", "/etc/passwd", "tests/../../secret.txt"):
+        with pytest.raises(BadRequestException):
+            local_storage.head_file(object_key=object_key)
+
+
+def test_local_storage_upload_from_stream_in_parts(local_storage):
+    object_key = "tests/local/video.mp4"
+    content = bytes(range(256)) * (11 * 1024 * 4)
+    chunks = (content[i : i + 64 * 1024] for i in range(0, len(content), 64 * 1024))
+    size, sha256 = local_storage.upload_file_from_stream(
+        object_key=object_key, chunks=chunks, content_type="video/mp4"
+    )
+    assert size == len(content)
+    assert sha256 == hashlib.sha256(content).hexdigest()
+    assert b"".join(local_storage.iter_file(object_key=object_key)) == content
+    # parts are removed once completed
+    assert list((local_storage.root / "uploads").iterdir()) == []
+
+
+def test_local_storage_upload_from_stream_larger_than_max_size(local_storage):
+    object_key = "tests/local/too_large.mp4"
+    with pytest.raises(PayloadTooLargeException):
+        local_storage.upload_file_from_stream(
+            object_key=object_key,
+            chunks=iter([b"video" * 1024] * 4),
+            content_type="video/mp4",
+            max_size=10 * 1024,
+        )
+    assert local_storage.head_file(object_key=object_key) is None
+    assert list((local_storage.root / "uploads").iterdir()) == []
+
+
+def test_local_storage_list_multipart_uploads(local_storage):
+    upload = local_storage.create_multipart_upload(
+        object_key="tests/local/incomplete.mp4", content_type="video/mp4"
+    )
+    uploads = [upload for page in local_storage.list_multipart_uploads() for upload in page]
+    assert [(upload["Key"], upload["UploadId"]) for upload in uploads] == [
+        ("tests/local/incomplete.mp4", upload.upload_id)
+    ]
+    assert uploads[0]["Initiated"] > datetime.now(tz=timezone.utc) - timedelta(minutes=1)
+    local_storage.abort_multipart_upload(
+        object_key=upload.object_key, upload_id=upload.upload_id
+    )
+    assert list(local_storage.list_multipart_uploads()) == []
+
+
+def test_local_storage_signed_url(local_storage):
+    object_key = "tests/local/signed.txt"
+    url = local_storage.get_presigned_url(object_key=object_key)
+    assert url.startswith(f"{settings.BASE_URL}storage/{object_key}?")
+    # identical within the time window
+    assert local_storage.get_presigned_url(object_key=object_key) == url
+    query = parse_qs(urlparse(url).query)
+    expires, signature = int(query["expires"][0]), query["signature"][0]
+    assert expires >= time.time() + timedelta(**settings.PRESIGNED_URL_TIME).total_seconds() - 1
+    local_storage.verify_signature(signature, expires, "GET", object_key)
+    with pytest.raises(ForbiddenException):
+        local_storage.verify_signature(signature, expires, "GET", "tests/local/other.txt")
+    with pytest.raises(ForbiddenException):
+        local_storage.verify_signature(signature, expires + 1, "GET", object_key)
@@ -0,0 +1,51 @@
+import io
+
+import pytest
+from PIL import Image
+
+from src.infrastructure.image_processing.services import ImageService
+from lib.fastapi.custom_enums import ImageFormat
+from lib.fastapi.custom_exceptions import CustomValidationError
+
+
+def get_image_with_exif(width: int = 800, height: int = 400) -> bytes:
+    image = Image.new("RGB", (width, height), color=(200, 100, 50))
+    exif = Image.Exif()
+    exif[0x010F] = "camera maker"
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+def test_create_variant_keeps_aspect_ratio_without_exif():
+    image = ImageService(content=get_image_with_exif())
+    for image_format in ImageFormat:
+        width, height, content = image.create_variant(width=320, image_format=image_format)
+        assert (width, height) == (320, 160)
+        variant = Image.open(io.BytesIO(content))
+        assert variant.format == image_format.value.upper()
+        assert not variant.getexif()
+
+
+def test_create_variant_does_not_upscale():
+    image = ImageService(content=get_image_with_exif(width=200, height=100))
+    width, height, _ = image.create_variant(width=640, image_format=ImageFormat.WEBP)
+    assert (width, height) == (200, 100)
+
+
+def test_create_placeholder():
+    placeholder = ImageService(content=get_image_with_exif()).create_placeholder()
+    assert placeholder.startswith("data:image/webp;base64,")
+    assert len(placeholder) < 1000
+
+
+def test_get_stripped_original():
+    image = ImageService(content=get_image_with_exif())
+    stripped = Image.open(io.BytesIO(image.get_stripped_original()))
+    assert stripped.size == (800, 400)
+    assert not stripped.getexif()
+
+
+def test_invalid_image():
+    with pytest.raises(CustomValidationError):
+        ImageService(content=b"not an image")
@@ -0,0 +1,97 @@
+import uuid
+
+import pytest
+from src.tests.test_client import client, setup_database
+from src.tests.test_fixtures import before_create_base_user, before_create_normal_user
+from src.tests.test_data import create_public_user, get_username
+from src.tests.test_utils import create_session, get_auth_header
+from src.application.users.services import BaseUserAppService, JWTService
+from src.interface.auth.dependencies import CustomHTTPBearer
+from src.application.users.users.services import UserAppService
+from src.infrastructure.auth_service.services import VerifiedTokenCache, ClaimsVersionCache
+from lib.fastapi.error_string import get_user_not_created
+from src.setup.config.settings import settings
+from lib.fastapi.custom_enums import Role, ProfileType
+
+
+@pytest.fixture(autouse=True)
+def enable_user_claims(monkeypatch):
+    monkeypatch.setattr(settings, "JWT_USER_CLAIMS", True)
+
+
+def create_token_with_claims(session, db_user) -> str:
+    access_token, _ = BaseUserAppService(session=session).create_jwt_token_for_user(
+        id=db_user.base_user_id, role=Role.USER, user=db_user
+    )
+    return access_token
+
+
+def test_access_token_with_user_claims(before_create_normal_user):
+    session = create_session()
+    db_user = before_create_normal_user(session=session, user_dict=create_public_user())
+    token = create_token_with_claims(session=session, db_user=db_user)
+    principal = CustomHTTPBearer.get_principal(payload=JWTService().decode(token))
+    assert principal["user_id"] == str(db_user.id)
+    assert principal["username"] == db_user.username
+    assert principal["profile_type"] == ProfileType.PUBLIC.value
+    # handlers work from the claims
+    response = client.get("/feed/", headers=get_auth_header(token))
+    assert response.status_code == 200
+    session.close()
+
+
+def test_user_claims_dropped_after_username_change(before_create_normal_user):
+    session = create_session()
+    db_user = before_create_normal_user(session=session, user_dict=create_public_user())
+    token = create_token_with_claims(session=session, db_user=db_user)
+    response = client.put(
+        "/user/", headers=get_auth_header(token), data={"username": get_username()}
+    )
+    assert response.status_code == 200
+    principal = CustomHTTPBearer.get_principal(payload=JWTService().decode(token))
+    assert "user_id" not in principal
+    assert "username" not in principal
+    assert principal["id"] == str(db_user.base_user_id)
+    # token stays valid, the user is looked up instead
+    response = client.get("/feed/", headers=get_auth_header(token))
+    assert response.status_code == 200
+    session.close()
+
+
+def test_verified_token_served_from_cache(before_create_normal_user):
+    session = create_session()
+    db_user = before_create_normal_user(session=session, user_dict=create_public_user())
+    token = create_token_with_claims(session=session, db_user=db_user)
+    cache = VerifiedTokenCache()
+    cache.flush()
+    hits = cache.hits
+    for _ in range(2):
+        response = client.get("/follow/suggestions/", headers=get_auth_header(token))
+        assert response.status_code == 200
+    assert cache.hits == hits + 1
+    assert CustomHTTPBearer().decode(token=token)["id"] == str(db_user.base_user_id)
+    # bypassing the cache verifies the token again
+    hits = cache.hits
+    assert CustomHTTPBearer(use_cache=False).decode(token=token)["id"] == str(db_user.base_user_id)
+    assert cache.hits == hits
+    cache.flush()
+    assert cache.get(token=token) is None
+    session.close()
+
+
+def test_token_of_deleted_user_cannot_write(before_create_normal_user):
+    session = create_session()
+    db_user = before_create_normal_user(session=session, user_dict=create_public_user())
+    token = create_token_with_claims(session=session, db_user=db_user)
+    base_user_id = str(db_user.base_user_id)
+    UserAppService(session=session).delete_user(base_user_id=db_user.base_user_id)
+    principal = CustomHTTPBearer.get_principal(payload=JWTService().decode(token))
+    assert "user_id" not in principal
+    response = client.get(f"/like/{uuid.uuid4()}/", headers=get_auth_header(token))
+    assert response.status_code == 404
+    assert response.json()["message"] == get_user_not_created()
+    # a process that did not see the claims change still checks the user exists before writing
+    ClaimsVersionCache()._versions.pop(base_user_id, None)
+    response = client.get(f"/like/{uuid.uuid4()}/", headers=get_auth_header(token))
+    assert response.status_code == 404
+    session.close()
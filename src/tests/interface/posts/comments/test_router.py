@@ -11,6 +11,8 @@ from src.tests.test_fixtures import (
 )
 from src.tests.test_utils import create_session, get_auth_header, get_user_by_token
 from src.tests.test_data import create_private_user, create_public_user
+from src.domain.posts.comments.services import CommentService
+from src.interface.posts.comments.schemas import CommentPost
 
 
 def test_comment_post(before_create_private_user_login_cred, before_create_post):
@@ -122,3 +124,46 @@ def test_comment_post_of_private_user_followed(
     session.refresh(post)
     assert len(post.comments) == 1
     session.close()
+
+
+def test_list_comments(
+    before_create_private_user_login_cred, before_create_normal_user, before_create_post
+):
+    session = create_session()
+    token = before_create_private_user_login_cred(session=session)
+    post = before_create_post(session=session, user_dict=create_public_user())
+    post_id = post.id
+    usernames = []
+    for i in range(6):
+        user = before_create_normal_user(session=session, user_dict=create_public_user())
+        CommentService(session=session).create(
+            comment=CommentPost(commented_by=user.id, post_id=post_id, comment=f"comment {i}")
+        )
+        usernames.append(user.username)
+    session.close()
+    response = client.get(f"/comment/{post_id}/", headers=get_auth_header(token=token))
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data["next_cursor"] is not None
+    next_response = client.get(
+        f"/comment/{post_id}/?cursor={data['next_cursor']}",
+        headers=get_auth_header(token=token),
+    )
+    next_data = next_response.json()["data"]
+    assert next_data["next_cursor"] is None
+    comments = data["items"] + next_data["items"]
+    # newest first
+    assert [comment["username"] for comment in comments] == list(reversed(usernames))
+    assert comments[0]["comment"] == "comment 5"
+
+
+def test_list_comments_of_private_user_not_followed(
+    before_create_private_user_login_cred, before_create_post
+):
+    session = create_session()
+    token = before_create_private_user_login_cred(session=session)
+    post = before_create_post(session=session, user_dict=create_private_user())
+    post_id = post.id
+    session.close()
+    response = client.get(f"/comment/{post_id}/", headers=get_auth_header(token=token))
+    assert response.status_code == 403
@@ -11,6 +11,8 @@ from src.tests.test_fixtures import (
 )
 from src.tests.test_utils import create_session, get_auth_header, get_user_by_token
 from src.tests.test_data import create_private_user, create_public_user
+from src.domain.posts.likes.services import LikeService
+from src.interface.posts.likes.schemas import LikePost
 
 
 def test_like_post(before_create_private_user_login_cred, before_create_post):
@@ -75,3 +77,29 @@ def test_like_post_of_private_user_followed(
     session.refresh(post)
     assert len(post.likes) == 1
     session.close()
+
+
+def test_list_likes(
+    before_create_private_user_login_cred, before_create_normal_user, before_create_post
+):
+    session = create_session()
+    token = before_create_private_user_login_cred(session=session)
+    post = before_create_post(session=session, user_dict=create_public_user())
+    post_id = post.id
+    usernames = []
+    for i in range(6):
+        user = before_create_normal_user(session=session, user_dict=create_public_user())
+        LikeService(session=session).create(like=LikePost(liked_by=user.id, post_id=post_id))
+        usernames.append(user.username)
+    session.close()
+    response = client.get(f"/like/{post_id}/list/", headers=get_auth_header(token=token))
+    assert response.status_code == 200
+    data = response.json()["data"]
+    next_response = client.get(
+        f"/like/{post_id}/list/?cursor={data['next_cursor']}",
+        headers=get_auth_header(token=token),
+    )
+    next_data = next_response.json()["data"]
+    assert next_data["next_cursor"] is None
+    likes = data["items"] + next_data["items"]
+    assert [like["username"] for like in likes] == list(reversed(usernames))
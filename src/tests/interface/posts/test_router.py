@@ -1,5 +1,6 @@
 import uuid
 
+import httpx
 from sqlmodel import select
 
 from src.tests.test_client import client, setup_database
@@ -19,6 +20,7 @@ from src.tests.test_utils import create_session, get_auth_header, get_user_by_to
 from src.domain.models import BaseUser, User, Post
 from src.application.users.services import JWTService
 from src.setup.config.settings import settings
+from lib.fastapi.error_string import get_invalid_content_length
 
 
 def test_list_posts_unauthorized_access_not_allowed():
@@ -96,6 +98,107 @@ def test_list_posts_pagination(
     session.close()
 
 
+def test_list_posts_cursor_pagination(
+    before_create_public_user_login_cred, before_create_post
+):
+    session = create_session()
+    token = before_create_public_user_login_cred(session=session)
+    user = create_public_user()
+    for i in range(8):
+        before_create_post(session=session, user_dict=user)
+    response = client.get(
+        f"/posts/{user['username']}/?pagination=cursor",
+        headers=get_auth_header(token=token),
+    )
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert len(data["items"]) == settings.POST_PAGINATION_SIZE
+    assert data["next_cursor"] is not None
+    assert data["total"] is None
+    first_page_ids = [item["id"] for item in data["items"]]
+
+    response = client.get(
+        f"/posts/{user['username']}/?cursor={data['next_cursor']}",
+        headers=get_auth_header(token=token),
+    )
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert len(data["items"]) == 8 - settings.POST_PAGINATION_SIZE
+    assert data["next_cursor"] is None
+    assert not set(first_page_ids) & {item["id"] for item in data["items"]}
+    session.close()
+
+
+def test_list_posts_cursor_pagination_with_total(
+    before_create_public_user_login_cred, before_create_post
+):
+    session = create_session()
+    token = before_create_public_user_login_cred(session=session)
+    user = create_public_user()
+    before_create_post(session=session, user_dict=user)
+    response = client.get(
+        f"/posts/{user['username']}/?pagination=cursor&include_total=true",
+        headers=get_auth_header(token=token),
+    )
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert len(data["items"]) == 1
+    assert data["total"] is not None
+    session.close()
+
+
+def test_list_posts_cursor_pagination_with_invalid_cursor(
+    before_create_public_user_login_cred, before_create_post
+):
+    session = create_session()
+    token = before_create_public_user_login_cred(session=session)
+    user = create_public_user()
+    before_create_post(session=session, user_dict=user)
+    response = client.get(
+        f"/posts/{user['username']}/?cursor=invalid",
+        headers=get_auth_header(token=token),
+    )
+    assert response.status_code == 422
+    session.close()
+
+
+def test_search_posts_unauthorized_access_not_allowed():
+    response = client.get("/post/search/?search=search")
+    assert response.status_code == 401
+
+
+def test_search_posts(
+    before_create_private_user_login_cred,
+    before_create_post,
+    before_create_post_caption_search,
+):
+    session = create_session()
+    token = before_create_private_user_login_cred(session=session)
+    post = before_create_post_caption_search(
+        session=session, user_dict=create_public_user()
+    )
+    post_id = str(post.id)
+    before_create_post(session=session, user_dict=create_public_user())
+    session.close()
+    response = client.get(
+        "/post/search/?search=search", headers=get_auth_header(token=token)
+    )
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data["total"] == 1
+    assert data["items"][0]["id"] == post_id
+
+
+def test_search_posts_fuzzy_when_disabled(before_create_private_user_login_cred):
+    session = create_session()
+    token = before_create_private_user_login_cred(session=session)
+    session.close()
+    response = client.get(
+        "/post/search/?search=search&fuzzy=true", headers=get_auth_header(token=token)
+    )
+    assert response.status_code == 400
+
+
 def test_list_posts_filter_by_dates(
     before_create_public_user_login_cred,
     before_create_post,
@@ -172,6 +275,113 @@ def test_create_post(before_create_public_user_login_cred):
     session.close()
 
 
+def test_create_video_post(before_create_public_user_login_cred):
+    session = create_session()
+    token = before_create_public_user_login_cred(session=session)
+    response = client.post(
+        "post/video/",
+        headers={**get_auth_header(token), "Content-Type": "video/mp4"},
+        params={"caption": "caption for video"},
+        content=b"video" * 1024,
+    )
+    data = response.json()["data"]
+    assert response.status_code == 201
+    assert data["caption"] == "caption for video"
+    assert len(data["media"]) == 1
+    assert data["media"][0]["media_type"] == "video/mp4"
+    session.close()
+
+
+def test_create_video_post_too_large(before_create_public_user_login_cred, monkeypatch):
+    session = create_session()
+    token = before_create_public_user_login_cred(session=session)
+    user_id = get_user_by_token(token=token, session=session).id
+    monkeypatch.setattr(settings, "VIDEO_MAX_UPLOAD_SIZE", 1024)
+    response = client.post(
+        "post/video/",
+        headers={**get_auth_header(token), "Content-Type": "video/mp4"},
+        content=b"video" * 1024,
+    )
+    assert response.status_code == 413
+    assert session.exec(select(Post).where(Post.posted_by == user_id)).first() is None
+    session.close()
+
+
+def test_create_video_post_with_invalid_content_length(before_create_public_user_login_cred):
+    session = create_session()
+    token = before_create_public_user_login_cred(session=session)
+    user_id = get_user_by_token(token=token, session=session).id
+    response = client.post(
+        "post/video/",
+        headers={
+            **get_auth_header(token),
+            "Content-Type": "video/mp4",
+            "Content-Length": "not-a-number",
+        },
+        content=b"video",
+    )
+    assert response.status_code == 400
+    assert response.json()["message"] == get_invalid_content_length()
+    assert session.exec(select(Post).where(Post.posted_by == user_id)).first() is None
+    session.close()
+
+
+def test_create_post_with_direct_upload(before_create_public_user_login_cred):
+    session = create_session()
+    token = before_create_public_user_login_cred(session=session)
+    response = client.post(
+        "post/upload/",
+        headers=get_auth_header(token),
+        json={"files": [{"filename": "post.jpeg", "content_type": "image/jpeg", "size": 4}]},
+    )
+    assert response.status_code == 201
+    data = response.json()["data"]
+    upload = data["uploads"][0]
+    # media is sent to storage, not to the api
+    storage_response = httpx.post(
+        upload["url"], data=upload["fields"], files={"file": ("post.jpeg", b"test")}
+    )
+    assert storage_response.status_code in (200, 201, 204)
+    response = client.post(
+        f"post/upload/{data['post_id']}/",
+        headers=get_auth_header(token),
+        json={"caption": "caption for post", "uploads": [{"object_key": upload["object_key"]}]},
+    )
+    assert response.status_code == 201
+    post = response.json()["data"]
+    assert post["id"] == data["post_id"]
+    assert len(post["media"]) == 1
+    assert post["media"][0]["media_type"] == "image/jpeg"
+    session.close()
+
+
+def test_finalize_post_upload_without_uploaded_media(before_create_public_user_login_cred):
+    session = create_session()
+    token = before_create_public_user_login_cred(session=session)
+    user_id = get_user_by_token(token=token, session=session).id
+    post_id = uuid.uuid4()
+    response = client.post(
+        f"post/upload/{post_id}/",
+        headers=get_auth_header(token),
+        json={"uploads": [{"object_key": f"posts/{user_id}/{post_id}/post_0.jpeg"}]},
+    )
+    assert response.status_code == 400
+    assert session.get(Post, post_id) is None
+    session.close()
+
+
+def test_finalize_post_upload_with_other_object_key(before_create_public_user_login_cred):
+    session = create_session()
+    token = before_create_public_user_login_cred(session=session)
+    response = client.post(
+        f"post/upload/{uuid.uuid4()}/",
+        headers=get_auth_header(token),
+        json={"uploads": [{"object_key": f"posts/{uuid.uuid4()}/{uuid.uuid4()}/post_0.jpeg"}]},
+    )
+    assert response.status_code == 422
+    session.close()
+
+
 def test_create_post_with_unauthorized_access():
     response = client.post(
         "post/",
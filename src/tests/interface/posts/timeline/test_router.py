@@ -0,0 +1,102 @@
+from src.tests.test_client import client, setup_database
+from src.tests.test_fixtures import (
+    before_create_base_user,
+    before_create_normal_user,
+    before_create_public_user_login_cred,
+    before_create_post,
+    before_create_approved_follow_requests,
+)
+from src.tests.test_data import create_public_user, get_user_dict_from_user
+from src.tests.test_utils import create_session, get_auth_header, get_user_by_token
+from src.application.posts.timeline.services import TimelineAppService
+from src.application.users.users.follow_management.services import FollowAppService
+from src.setup.config.settings import settings
+
+
+def test_get_feed_unauthorized_access_not_allowed():
+    response = client.get("/feed/")
+    assert response.status_code == 401
+
+
+def test_get_feed(
+    before_create_public_user_login_cred,
+    before_create_normal_user,
+    before_create_post,
+    before_create_approved_follow_requests,
+    monkeypatch,
+):
+    session = create_session()
+    token = before_create_public_user_login_cred(session=session)
+    user = get_user_by_token(session=session, token=token)
+    author = before_create_normal_user(session=session, user_dict=create_public_user())
+    popular_author = before_create_normal_user(
+        session=session, user_dict=create_public_user()
+    )
+    for following in [author, popular_author]:
+        before_create_approved_follow_requests(
+            session=session, follower_id=user.id, following_id=following.id
+        )
+    # not followed
+    before_create_post(session=session, user_dict=create_public_user())
+    timeline_app_service = TimelineAppService(session=session)
+    post_ids = []
+    for i in range(4):
+        post = before_create_post(
+            session=session, user_dict=get_user_dict_from_user(user=author)
+        )
+        assert timeline_app_service.fan_out_post(post=post) == 1
+        post_ids.append(post.id)
+    monkeypatch.setattr(settings, "FEED_FAN_OUT_FOLLOWER_LIMIT", 0)
+    for i in range(3):
+        post = before_create_post(
+            session=session, user_dict=get_user_dict_from_user(user=popular_author)
+        )
+        # above the limit, merged in on read
+        assert timeline_app_service.fan_out_post(post=post) == 0
+        post_ids.append(post.id)
+    session.close()
+    response = client.get("/feed/", headers=get_auth_header(token=token))
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert len(data["items"]) == settings.POST_PAGINATION_SIZE
+    assert data["next_cursor"] is not None
+    next_response = client.get(
+        f"/feed/?cursor={data['next_cursor']}", headers=get_auth_header(token=token)
+    )
+    next_data = next_response.json()["data"]
+    assert next_data["next_cursor"] is None
+    feed_ids = [post["id"] for post in data["items"] + next_data["items"]]
+    # newest first
+    assert feed_ids == [str(post_id) for post_id in reversed(post_ids)]
+
+
+
+def test_get_feed_after_following_author_with_posts(
+    before_create_public_user_login_cred,
+    before_create_normal_user,
+    before_create_post,
+    monkeypatch,
+):
+    session = create_session()
+    token = before_create_public_user_login_cred(session=session)
+    user = get_user_by_token(session=session, token=token)
+    author = before_create_normal_user(session=session, user_dict=create_public_user())
+    timeline_app_service = TimelineAppService(session=session)
+    post_ids = []
+    for i in range(3):
+        post = before_create_post(
+            session=session, user_dict=get_user_dict_from_user(user=author)
+        )
+        timeline_app_service.fan_out_post(post=post)
+        post_ids.append(post.id)
+    monkeypatch.setattr(settings, "FEED_FOLLOW_BACKFILL_SIZE", 2)
+    # follow routes are rate limited and covered by their own tests
+    FollowAppService(session=session).create_follow_request(
+        follower_base_user_id=user.base_user_id, username=author.username
+    )
+    session.close()
+    response = client.get("/feed/", headers=get_auth_header(token=token))
+    assert response.status_code == 200
+    feed_ids = [post["id"] for post in response.json()["data"]["items"]]
+    # latest FEED_FOLLOW_BACKFILL_SIZE posts, newest first
+    assert feed_ids == [str(post_id) for post_id in reversed(post_ids)][:2]
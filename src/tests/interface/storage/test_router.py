@@ -0,0 +1,96 @@
+from urllib.parse import urlparse
+
+import pytest
+
+from src.tests.test_client import client, setup_database
+from src.infrastructure.file_upload.services import get_storage_service
+from src.setup.config.settings import settings
+from lib.fastapi.custom_enums import StorageBackend
+
+
+@pytest.fixture
+def local_storage(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", StorageBackend.LOCAL.value)
+    monkeypatch.setattr(settings, "LOCAL_STORAGE_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "LOCAL_STORAGE_SECRET", "local-storage-test-secret")
+    return get_storage_service()
+
+
+def get_path(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.path}?{parsed.query}" if parsed.query else parsed.path
+
+
+def test_get_file_with_signed_url(local_storage):
+    object_key = "tests/router/file.txt"
+    local_storage.upload_file_from_memory(
+        object_key=object_key, file_content=b"local file", file_type="text/plain"
+    )
+    url = local_storage.get_presigned_url(object_key=object_key)
+    response = client.get(get_path(url))
+    assert response.status_code == 200
+    assert response.content == b"local file"
+    assert response.headers["content-type"].startswith("text/plain")
+    response = client.get(get_path(url), headers={"Range": "bytes=6-"})
+    assert response.status_code == 206
+    assert response.content == b"file"
+    assert response.headers["content-range"] == "bytes 6-9/10"
+
+
+def test_get_file_with_invalid_signature(local_storage):
+    object_key = "tests/router/file.txt"
+    local_storage.upload_file_from_memory(
+        object_key=object_key, file_content=b"local file", file_type="text/plain"
+    )
+    url = local_storage.get_presigned_url(object_key=object_key)
+    response = client.get(get_path(url).replace("file.txt", "other.txt"))
+    assert response.status_code == 403
+
+
+def test_get_file_not_served_for_s3_backend():
+    response = client.get("storage/tests/file.txt?expires=1&signature=invalid")
+    assert response.status_code == 404
+
+
+def test_upload_file_with_signed_form(local_storage):
+    object_key = "tests/router/upload.jpeg"
+    form = local_storage.get_presigned_upload_post(
+        object_key=object_key, content_type="image/jpeg", max_size=8
+    )
+    response = client.post(
+        get_path(form["url"]), data=form["fields"], files={"file": ("upload.jpeg", b"test")}
+    )
+    assert response.status_code == 204
+    assert local_storage.head_file(object_key=object_key) == {
+        "size": 4,
+        "content_type": "image/jpeg",
+    }
+    # signed fields can't be changed
+    response = client.post(
+        get_path(form["url"]),
+        data={**form["fields"], "max_size": "1024"},
+        files={"file": ("upload.jpeg", b"test")},
+    )
+    assert response.status_code == 403
+    response = client.post(
+        get_path(form["url"]), data=form["fields"], files={"file": ("upload.jpeg", b"too large")}
+    )
+    assert response.status_code == 413
+
+
+def test_upload_parts_with_signed_urls(local_storage):
+    object_key = "tests/router/video.mp4"
+    upload = local_storage.create_multipart_upload(object_key=object_key, content_type="video/mp4")
+    part_urls = local_storage.get_presigned_part_urls(
+        object_key=object_key, upload_id=upload.upload_id, part_count=2
+    )
+    for part_url, body in zip(part_urls, (b"first ", b"second")):
+        response = client.put(get_path(part_url), content=body)
+        assert response.status_code == 200
+        assert response.headers["etag"]
+    parts = local_storage.list_parts(object_key=object_key, upload_id=upload.upload_id)
+    assert [part["PartNumber"] for part in parts] == [1, 2]
+    local_storage.complete_multipart_upload(
+        object_key=object_key, upload_id=upload.upload_id, parts=parts
+    )
+    assert b"".join(local_storage.iter_file(object_key=object_key)) == b"first second"
@@ -1,3 +1,5 @@
+import csv
+import io
 import uuid
 
 from sqlmodel import select
@@ -16,7 +18,7 @@ def test_list_base_users(before_admin_login_cred, before_create_base_user):
     data = response.json()["data"]
     session.close()
     assert response.status_code == 200
-    assert len(data) == 2
+    assert len(data["items"]) == 2
 
 def test_list_base_users_with_user_login(before_user_login_cred, before_create_base_user):
     session = create_session()
@@ -27,7 +29,22 @@ def test_list_base_users_with_user_login(before_user_login_cred, before_create_b
     data = response.json()["data"]
     session.close()
     assert response.status_code == 200
-    assert len(data) == 1
+    assert len(data["items"]) == 1
+
+def test_export_base_users(before_admin_login_cred, before_create_base_user):
+    session = create_session()
+    token = before_admin_login_cred(session)
+    base_user = before_create_base_user(session=session, user_dict=create_user())
+    email = base_user.email
+    session.close()
+    response = client.get(
+        "/base-users/export/?export_format=csv", headers=get_auth_header(token)
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert email in [row["email"] for row in rows]
+    assert "password" not in rows[0]
 
 def test_get_base_user(before_admin_login_cred, before_create_base_user):
     session = create_session()
@@ -18,7 +18,8 @@ from src.tests.test_utils import create_session, get_auth_header, get_user_by_to
 from src.tests.test_data import create_private_user, create_public_user, get_username
 from src.application.users.services import JWTService
 from src.domain.models import BaseUser, User, FollowersModel
-from lib.fastapi.custom_enums import StatusType
+from src.domain.users.users.follow_management.graph import FollowGraph
+from lib.fastapi.custom_enums import StatusType, BulkFollowResult
 
 
 def test_list_received_requests(
@@ -43,7 +44,8 @@ def test_list_received_requests(
     )
     data = response.json()["data"]
     assert response.status_code == 200
-    assert len(data) == 2
+    assert len(data["items"]) == 2
+    assert data["total"] == 2
     session.close()
 
 
@@ -84,7 +86,8 @@ def test_list_sent_requests(
     )
     data = response.json()["data"]
     assert response.status_code == 200
-    assert len(data) == 2
+    assert len(data["items"]) == 2
+    assert data["total"] == 2
 
 
 def test_list_sent_requests_with_unauthorized_access():
@@ -121,7 +124,8 @@ def test_list_own_followers(
     )
     data = response.json()["data"]
     assert response.status_code == 200
-    assert len(data) == 1
+    assert len(data["items"]) == 1
+    assert data["total"] == 1
 
 
 def test_list_followers_with_unauthorized_access():
@@ -197,7 +201,8 @@ def test_list_own_following(
     )
     data = response.json()["data"]
     assert response.status_code == 200
-    assert len(data) == 1
+    assert len(data["items"]) == 1
+    assert data["total"] == 1
 
 
 def test_list_following_with_unauthorized_access():
@@ -253,6 +258,103 @@ def test_list_following_of_private_user_that_is_followed(
     assert response.status_code == 200
 
 
+def test_list_follow_status(
+    before_create_public_user_login_cred,
+    before_create_normal_user,
+    before_create_approved_follow_requests,
+):
+    session = create_session()
+    FollowGraph().clear()
+    token = before_create_public_user_login_cred(session=session)
+    user1 = before_create_normal_user(session=session, user_dict=create_public_user())
+    user2 = before_create_normal_user(session=session, user_dict=create_public_user())
+    db_user = get_user_by_token(session=session, token=token)
+    before_create_approved_follow_requests(
+        session=session, follower_id=db_user.id, following_id=user1.id
+    )
+    before_create_approved_follow_requests(
+        session=session, follower_id=user2.id, following_id=db_user.id
+    )
+    usernames = [user1.username, user2.username, get_username()]
+    session.close()
+    response = client.post(
+        "/follow/status/",
+        headers=get_auth_header(token=token),
+        json={"usernames": usernames},
+    )
+    assert response.status_code == 200
+    assert response.json()["data"] == [
+        {"username": usernames[0], "following": True, "followed_by": False},
+        {"username": usernames[1], "following": False, "followed_by": True},
+    ]
+
+
+def test_list_follow_status_with_admin(before_admin_login_cred):
+    session = create_session()
+    token = before_admin_login_cred(session=session)
+    response = client.post(
+        "/follow/status/",
+        headers=get_auth_header(token=token),
+        json={"usernames": [get_username()]},
+    )
+    assert response.status_code == 403
+
+
+def test_list_mutual_followers(
+    before_create_public_user_login_cred,
+    before_create_normal_user,
+    before_create_approved_follow_requests,
+):
+    session = create_session()
+    FollowGraph().clear()
+    token = before_create_public_user_login_cred(session=session)
+    user1 = before_create_normal_user(session=session, user_dict=create_public_user())
+    user2 = before_create_normal_user(session=session, user_dict=create_public_user())
+    user3 = before_create_normal_user(session=session, user_dict=create_public_user())
+    db_user = get_user_by_token(session=session, token=token)
+    for follower in (user1, user2):
+        before_create_approved_follow_requests(
+            session=session, follower_id=follower.id, following_id=user3.id
+        )
+    before_create_approved_follow_requests(
+        session=session, follower_id=db_user.id, following_id=user1.id
+    )
+    username, mutual_username = user3.username, user1.username
+    session.close()
+    response = client.post(
+        "/follow/mutual/",
+        headers=get_auth_header(token=token),
+        json={"username": username},
+    )
+    assert response.status_code == 200
+    assert [user["username"] for user in response.json()["data"]] == [mutual_username]
+
+
+def test_list_suggestions(
+    before_create_public_user_login_cred,
+    before_create_normal_user,
+    before_create_approved_follow_requests,
+    before_create_follow_request,
+):
+    session = create_session()
+    FollowGraph().clear()
+    token = before_create_public_user_login_cred(session=session)
+    user1 = before_create_normal_user(session=session, user_dict=create_public_user())
+    user2 = before_create_normal_user(session=session, user_dict=create_public_user())
+    db_user = get_user_by_token(session=session, token=token)
+    before_create_approved_follow_requests(
+        session=session, follower_id=db_user.id, following_id=user1.id
+    )
+    before_create_approved_follow_requests(
+        session=session, follower_id=user1.id, following_id=user2.id
+    )
+    suggested_username = user2.username
+    session.close()
+    response = client.get("/follow/suggestions/", headers=get_auth_header(token=token))
+    assert response.status_code == 200
+    assert [user["username"] for user in response.json()["data"]] == [suggested_username]
+
+
 def test_send_request(before_create_private_user_login_cred, before_create_normal_user):
     session = create_session()
     token = before_create_private_user_login_cred(session=session)
@@ -665,3 +767,114 @@ def test_follow_send_request_to_private_user_then_reject_request(
     ).first()
     assert db_follow is None
     session.close()
+
+
+def test_bulk_accept_all_pending_requests(
+    before_create_private_user_login_cred,
+    before_create_normal_user,
+    before_create_follow_request,
+):
+    session = create_session()
+    token = before_create_private_user_login_cred(session=session)
+    db_user = get_user_by_token(session=session, token=token)
+    usernames = []
+    for _ in range(2):
+        follower = before_create_normal_user(session=session, user_dict=create_public_user())
+        before_create_follow_request(
+            session=session, follower_id=follower.id, following_id=db_user.id
+        )
+        usernames.append(follower.username)
+    user_id = db_user.id
+    session.close()
+    response = client.post(
+        "/follow/accept/bulk/",
+        headers=get_auth_header(token=token),
+        json={"all_pending": True},
+    )
+    assert response.status_code == 200
+    assert sorted(item["username"] for item in response.json()["data"]) == sorted(usernames)
+    session = create_session()
+    statuses = session.scalars(
+        select(FollowersModel.status).where(FollowersModel.following_id == user_id)
+    ).all()
+    assert statuses == [StatusType.APPROVED, StatusType.APPROVED]
+    session.close()
+
+
+def test_bulk_reject_requests(
+    before_create_private_user_login_cred,
+    before_create_normal_user,
+    before_create_follow_request,
+):
+    session = create_session()
+    token = before_create_private_user_login_cred(session=session)
+    db_user = get_user_by_token(session=session, token=token)
+    user1 = before_create_normal_user(session=session, user_dict=create_public_user())
+    user2 = before_create_normal_user(session=session, user_dict=create_public_user())
+    before_create_follow_request(
+        session=session, follower_id=user1.id, following_id=db_user.id
+    )
+    usernames = [user1.username, user2.username, get_username()]
+    session.close()
+    response = client.post(
+        "/follow/reject/bulk/",
+        headers=get_auth_header(token=token),
+        json={"usernames": usernames},
+    )
+    assert response.status_code == 200
+    assert [item["result"] for item in response.json()["data"]] == [
+        BulkFollowResult.APPLIED.value,
+        BulkFollowResult.SKIPPED.value,
+        BulkFollowResult.USER_NOT_FOUND.value,
+    ]
+
+
+def test_bulk_reject_requests_without_usernames(before_create_private_user_login_cred):
+    session = create_session()
+    token = before_create_private_user_login_cred(session=session)
+    response = client.post(
+        "/follow/reject/bulk/", headers=get_auth_header(token=token), json={}
+    )
+    assert response.status_code == 422
+
+
+def test_bulk_unfollow_and_remove_followers(
+    before_create_public_user_login_cred,
+    before_create_normal_user,
+    before_create_approved_follow_requests,
+):
+    session = create_session()
+    token = before_create_public_user_login_cred(session=session)
+    db_user = get_user_by_token(session=session, token=token)
+    user1 = before_create_normal_user(session=session, user_dict=create_public_user())
+    user2 = before_create_normal_user(session=session, user_dict=create_public_user())
+    before_create_approved_follow_requests(
+        session=session, follower_id=db_user.id, following_id=user1.id
+    )
+    before_create_approved_follow_requests(
+        session=session, follower_id=user2.id, following_id=db_user.id
+    )
+    user_id, username1, username2 = db_user.id, user1.username, user2.username
+    session.close()
+    response = client.post(
+        "/follow/unfollow/bulk/",
+        headers=get_auth_header(token=token),
+        json={"usernames": [username1]},
+    )
+    assert response.status_code == 200
+    assert response.json()["data"] == [
+        {"username": username1, "result": BulkFollowResult.APPLIED.value}
+    ]
+    response = client.post(
+        "/follow/remove-follower/bulk/",
+        headers=get_auth_header(token=token),
+        json={"usernames": [username2]},
+    )
+    assert response.status_code == 200
+    assert response.json()["data"] == [
+        {"username": username2, "result": BulkFollowResult.APPLIED.value}
+    ]
+    session = create_session()
+    db_user = session.get(User, user_id)
+    assert (db_user.followers_count, db_user.following_count) == (0, 0)
+    session.close()
@@ -1,5 +1,10 @@
+import csv
+import io
+import json
 import uuid
 
+import httpx
+
 from src.tests.test_client import client, setup_database
 from src.tests.test_fixtures import (
     before_user_login_cred,
@@ -19,6 +24,7 @@ from src.tests.test_utils import create_session, get_auth_header, get_user_by_to
 from lib.fastapi.custom_enums import ProfileType
 from src.application.users.services import JWTService
 from src.domain.models import User
+from src.setup.config.settings import settings
 
 
 def test_list_users(before_admin_login_cred, before_create_normal_user):
@@ -30,7 +36,8 @@ def test_list_users(before_admin_login_cred, before_create_normal_user):
     response = client.get("/users/", headers=get_auth_header(token))
     data = response.json()["data"]
     assert response.status_code == 200
-    assert len(data) == 2
+    assert len(data["items"]) == 2
+    assert data["next_cursor"] is None
 
 
 def test_list_users_with_user_login(before_create_public_user_login_cred):
@@ -40,7 +47,7 @@ def test_list_users_with_user_login(before_create_public_user_login_cred):
     response = client.get("/users/", headers=get_auth_header(token))
     data = response.json()["data"]
     assert response.status_code == 200
-    assert len(data) == 1
+    assert len(data["items"]) == 1
 
 
 def test_list_users_with_unauthorized_access():
@@ -50,6 +57,37 @@ def test_list_users_with_unauthorized_access():
     assert response.status_code == 401
 
 
+def test_export_users(before_admin_login_cred, before_create_normal_user, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 1)
+    session = create_session()
+    token = before_admin_login_cred(session)
+    users = [
+        before_create_normal_user(session=session, user_dict=create_public_user())
+        for _ in range(2)
+    ]
+    usernames = [user.username for user in users]
+    session.close()
+    response = client.get("/users/export/", headers=get_auth_header(token))
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["username"] for row in rows] == usernames
+    response = client.get(
+        "/users/export/?export_format=csv", headers=get_auth_header(token)
+    )
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["username"] for row in rows] == usernames
+
+
+def test_export_users_with_user_login(before_create_public_user_login_cred):
+    session = create_session()
+    token = before_create_public_user_login_cred(session=session)
+    session.close()
+    response = client.get("/users/export/", headers=get_auth_header(token))
+    assert response.status_code == 403
+
+
 def test_get_user(before_create_private_user_login_cred, before_create_normal_user):
     session = create_session()
     token = before_create_private_user_login_cred(session=session)
@@ -103,6 +141,32 @@ def test_update_user(before_create_public_user_login_cred):
     assert data["username"] == update_dict["username"]
     session.close()
 
+def test_update_profile_with_direct_upload(before_create_public_user_login_cred):
+    session = create_session()
+    token = before_create_public_user_login_cred(session=session)
+    response = client.post(
+        "/user/profile/upload/",
+        headers=get_auth_header(token),
+        json={"filename": "profile.png", "content_type": "image/png", "size": 4},
+    )
+    assert response.status_code == 200
+    upload = response.json()["data"]
+    storage_response = httpx.post(
+        upload["url"], data=upload["fields"], files={"file": ("profile.png", b"test")}
+    )
+    assert storage_response.status_code in (200, 201, 204)
+    response = client.put(
+        "/user/profile/",
+        headers=get_auth_header(token),
+        json={"object_key": upload["object_key"]},
+    )
+    assert response.status_code == 200
+    assert response.json()["data"]["profile"] is not None
+    user = get_user_by_token(token=token, session=session)
+    assert user.profile == upload["object_key"]
+    session.close()
+
+
 def test_update_user_with_unauthorized_access():
     response = client.put("/user/")
     assert response.status_code == 401
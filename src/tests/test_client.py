@@ -6,7 +6,7 @@ from sqlmodel import Session, create_engine, SQLModel
 from sqlalchemy.orm.session import close_all_sessions
 
 
-from src.infrastructure.file_upload.services import Boto3Service
+from src.infrastructure.file_upload.services import get_storage_service
 from src.setup.app_factory import app
 from src.setup.config.settings import settings
 from src.setup.config.database import get_session
@@ -33,7 +33,7 @@ def setup_database():
     yield db
     # db.close_all()
     close_all_sessions()
-    Boto3Service().delete_bucket(bucket_name=settings.TEST_AWS_BUCKET_NAME)
+    get_storage_service().delete_bucket(bucket_name=settings.TEST_AWS_BUCKET_NAME)
     SQLModel.metadata.drop_all(test_engine)
 
 
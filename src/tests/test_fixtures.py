@@ -29,6 +29,8 @@ from .test_data import (
     create_private_user,
 )
 from src.application.users.services import PasswordService, JWTService
+from src.domain.users.users.follow_management.services import FollowService
+from src.interface.users.users.follow_management.schemas import FollowRequest
 from .test_utils import create_value_using_session
 from src.setup.config.settings import settings
 from src.infrastructure.file_upload.services import Boto3Service
@@ -326,16 +328,16 @@ def before_create_follow_request():
         session: Session, follower_id: uuid.UUID, following_id: uuid.UUID
     ) -> FollowersModel:
         db_following = session.get(User, following_id)
-        db_follow = FollowersModel.model_validate(
-            {
-                "follower_id": follower_id,
-                "following_id": following_id,
-                "status": StatusType.PENDING
+        # created by the follow service to keep the users' follow counts
+        db_follow = FollowService(session=session).create(
+            follow=FollowRequest(
+                follower_id=follower_id,
+                following_id=following_id,
+                status=StatusType.PENDING
                 if db_following.profile_type == ProfileType.PRIVATE.value
                 else StatusType.APPROVED,
-            }
+            )
         )
-        create_value_using_session(session=session, value=db_follow)
         return db_follow
 
     return create_follow_request
@@ -346,14 +348,13 @@ def before_create_approved_follow_requests(before_create_normal_user):
     def create_follow_request(
         session: Session, follower_id: uuid.UUID, following_id: uuid.UUID
     ) -> FollowersModel:
-        db_follow = FollowersModel.model_validate(
-            {
-                "follower_id": follower_id,
-                "following_id": following_id,
-                "status": StatusType.APPROVED,
-            }
+        db_follow = FollowService(session=session).create(
+            follow=FollowRequest(
+                follower_id=follower_id,
+                following_id=following_id,
+                status=StatusType.APPROVED,
+            )
         )
-        create_value_using_session(session=session, value=db_follow)
         return db_follow
 
     return create_follow_request